@@ -0,0 +1,448 @@
+"""Асинхронный нативный S3-клиент для engine: asyncio.
+
+Потоковый executor держит по OS-потоку на каждую операцию в полёте, и
+несколько тысяч одновременных запросов упираются в потоки и GIL-переключения.
+Здесь тот же HTTP/1.1 + SigV4, что и в s3client, но поверх asyncio streams:
+тысячи запросов в полёте обслуживает один поток с event loop.
+
+Подпись, пути и разбор XML-ответов общие с S3Client; отличается только
+транспорт — пул keep-alive соединений на asyncio.StreamReader/StreamWriter.
+Пул привязан к event loop, в котором создан: клиентами управляет
+NativeRunner, abort() из другого потока передаётся в loop через
+call_soon_threadsafe.
+"""
+from __future__ import annotations
+
+import asyncio
+import http.client
+import os
+import socket
+import ssl
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .s3client import (
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MULTIPART_THRESHOLD,
+    IO_CHUNK,
+    POOL_MAX_IDLE,
+    RequestAborted,
+    RequestPhases,
+    S3Client,
+    S3Error,
+    S3Response,
+    SyntheticObject,
+    _check_complete,
+    _complete_body,
+    _describe_error,
+    _error_from_response,
+    _FileBody,
+    _parse_upload_id,
+    _part_ranges,
+    _result,
+    split_bucket,
+    upload_source,
+)
+
+# Соединение закрыто сервером между запросами — повторяем на свежем
+_AIO_STALE_CONN_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+    ConnectionAbortedError,
+)
+# Ошибки, которые async-обёртки превращают в текст для classify_error
+AIO_ERRORS = (
+    S3Error,
+    RequestAborted,
+    OSError,
+    http.client.HTTPException,
+    asyncio.IncompleteReadError,
+    asyncio.TimeoutError,
+)
+
+
+class _AioConnection:
+    __slots__ = ("reader", "writer", "aborted", "setup_ms")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 setup_ms: dict[str, float] | None = None):
+        self.reader = reader
+        self.writer = writer
+        self.aborted = False
+        # dns/connect/tls установки соединения — для первого запроса на нём
+        self.setup_ms = setup_ms or {}
+
+    def close(self) -> None:
+        transport = self.writer.transport
+        if transport is not None and not transport.is_closing():
+            transport.abort()
+
+
+class AsyncConnectionPool:
+    """Пул keep-alive соединений одного endpoint внутри одного event loop (LIFO)."""
+
+    def __init__(self, scheme: str, host: str, port: int | None, timeout: float,
+                 max_idle: int = POOL_MAX_IDLE):
+        self.host = host
+        self.port = port or (443 if scheme == "https" else 80)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: list[_AioConnection] = []
+        self._busy: set[_AioConnection] = set()
+        self._ssl_context: ssl.SSLContext | None = None
+        if scheme == "https":
+            self._ssl_context = ssl.create_default_context(
+                cafile=os.environ.get("AWS_CA_BUNDLE") or None
+            )
+
+    async def acquire(self) -> tuple[_AioConnection, bool]:
+        if self._idle:
+            conn = self._idle.pop()
+            self._busy.add(conn)
+            return conn, True
+        reader, writer, setup_ms = await asyncio.wait_for(self._connect(), self.timeout)
+        conn = _AioConnection(reader, writer, setup_ms)
+        self._busy.add(conn)
+        return conn, False
+
+    async def _connect(self):
+        """Новое соединение с замером фаз: DNS, TCP connect и TLS по отдельности."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        infos = await loop.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        timings = {"dns": (resolved - started) * 1000}
+        # StreamWriter.start_tls появился в 3.11; раньше TLS входит в connect
+        tls_later = self._ssl_context is not None and hasattr(asyncio.StreamWriter, "start_tls")
+        inline_ssl = self._ssl_context if not tls_later else None
+        error: OSError | None = None
+        for _family, _type, _proto, _name, sockaddr in infos:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    sockaddr[0], sockaddr[1], ssl=inline_ssl, limit=IO_CHUNK,
+                    server_hostname=self.host if inline_ssl else None,
+                )
+            except OSError as exc:
+                error = exc
+                continue
+            break
+        else:
+            raise error or OSError(f"getaddrinfo returned no addresses for {self.host}")
+        connected = time.perf_counter()
+        timings["connect"] = (connected - resolved) * 1000
+        if tls_later:
+            await writer.start_tls(self._ssl_context, server_hostname=self.host)
+            timings["tls"] = (time.perf_counter() - connected) * 1000
+        return reader, writer, timings
+
+    def release(self, conn: _AioConnection) -> None:
+        self._busy.discard(conn)
+        if len(self._idle) < self.max_idle and not conn.writer.is_closing():
+            self._idle.append(conn)
+            return
+        conn.close()
+
+    def discard(self, conn: _AioConnection) -> None:
+        self._busy.discard(conn)
+        conn.close()
+
+    def abort(self) -> None:
+        """Рвёт все соединения, включая занятые; вызывать из потока event loop."""
+        conns = list(self._busy) + self._idle
+        self._idle.clear()
+        for conn in conns:
+            conn.aborted = True
+            conn.close()
+
+    def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+@dataclass
+class AsyncS3Client(S3Client):
+    """S3Client с транспортом на asyncio: те же подпись и пути, async-операции."""
+
+    _aio_pool: AsyncConnectionPool = field(init=False, repr=False)
+
+    def __post_init__(self):
+        super().__post_init__()
+        parts = urlsplit(self.endpoint if "://" in self.endpoint else f"http://{self.endpoint}")
+        self._aio_pool = AsyncConnectionPool(self.scheme, parts.hostname or "", parts.port,
+                                             self.timeout)
+
+    async def request_async(
+        self,
+        method: str,
+        bucket: str,
+        key: str = "",
+        query: list[tuple[str, str]] | None = None,
+        headers: dict | None = None,
+        body: bytes | _FileBody | None = None,
+        discard_body: bool = False,
+        stop: threading.Event | None = None,
+        operation: str = "request",
+        phases: RequestPhases | None = None,
+    ) -> S3Response:
+        """Async-аналог S3Client.request (те же ошибки: S3Error, OSError, RequestAborted)."""
+        target, hdrs = self._build_request(method, bucket, key, query, headers, body)
+        for attempt in (0, 1):
+            conn, reused = await self._aio_pool.acquire()
+            timings = {} if reused else dict(conn.setup_ms)
+            try:
+                resp = await self._exchange_async(conn, method, target, hdrs, body,
+                                                  discard_body, stop, timings)
+            except BaseException as exc:
+                self._aio_pool.discard(conn)
+                if conn.aborted:
+                    raise RequestAborted("interrupted by user") from exc
+                if isinstance(exc, _AIO_STALE_CONN_ERRORS) and reused and attempt == 0:
+                    continue
+                raise
+            break
+        if phases is not None:
+            phases.add(timings)
+        if resp.status >= 300:
+            raise _error_from_response(resp, operation)
+        return resp
+
+    async def _throttle_async(self, nbytes: int, stop: threading.Event | None) -> None:
+        limiter = self.limiter
+        if limiter is not None and not await limiter.acquire_bytes_async(self.endpoint, nbytes,
+                                                                         stop):
+            raise RequestAborted("interrupted by user")
+
+    async def _exchange_async(self, conn: _AioConnection, method, target, headers, body,
+                              discard_body, stop, timings: dict) -> S3Response:
+        started = time.perf_counter()
+        head = [f"{method} {target} HTTP/1.1\r\n"]
+        head.extend(f"{name}: {value}\r\n" for name, value in headers.items())
+        head.append("\r\n")
+        writer = conn.writer
+        writer.write("".join(head).encode("latin-1"))
+        if isinstance(body, (bytes, bytearray)):
+            if body:
+                await self._throttle_async(len(body), stop)
+                writer.write(body)
+        elif body is not None:
+            for chunk in body:
+                if stop is not None and stop.is_set():
+                    raise RequestAborted("interrupted by user")
+                await self._throttle_async(len(chunk), stop)
+                writer.write(chunk)
+                await asyncio.wait_for(writer.drain(), self.timeout)
+        await asyncio.wait_for(writer.drain(), self.timeout)
+        sent = time.perf_counter()
+
+        status, version, resp_headers = await asyncio.wait_for(
+            self._read_head(conn.reader), self.timeout
+        )
+        first_byte = time.perf_counter()
+        data, nbytes, will_close = await self._read_body(
+            conn.reader, method, status, resp_headers, discard_body and status < 300, stop
+        )
+        timings["send"] = (sent - started) * 1000
+        timings["ttfb"] = (first_byte - sent) * 1000
+        timings["transfer"] = (time.perf_counter() - first_byte) * 1000
+        if will_close or version == "HTTP/1.0" or \
+                resp_headers.get("connection", "").lower() == "close":
+            self._aio_pool.discard(conn)
+        else:
+            self._aio_pool.release(conn)
+        return S3Response(status, resp_headers, data, nbytes)
+
+    @staticmethod
+    async def _read_head(reader: asyncio.StreamReader) -> tuple[int, str, dict[str, str]]:
+        line = await reader.readline()
+        if not line:
+            raise http.client.RemoteDisconnected("Remote end closed connection without response")
+        try:
+            version, code = line.decode("latin-1").split(None, 2)[:2]
+            status = int(code)
+        except ValueError as exc:
+            raise http.client.BadStatusLine(line.decode("latin-1", "replace")) from exc
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, version, headers
+
+    async def _read_body(self, reader, method, status, headers, discard, stop):
+        """Читает тело ответа; возвращает (data, nbytes, will_close)."""
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            return b"", 0, False
+        data = bytearray()
+        nbytes = 0
+
+        def consume(chunk: bytes) -> None:
+            nonlocal nbytes
+            nbytes += len(chunk)
+            if not discard:
+                data.extend(chunk)
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size_line = await asyncio.wait_for(reader.readline(), self.timeout)
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    while (await asyncio.wait_for(reader.readline(), self.timeout)) \
+                            not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                consume(await asyncio.wait_for(reader.readexactly(size), self.timeout))
+                await asyncio.wait_for(reader.readexactly(2), self.timeout)
+            return bytes(data), nbytes, False
+        length = headers.get("content-length")
+        if length is None:
+            # Без длины тело идёт до закрытия соединения
+            while True:
+                chunk = await asyncio.wait_for(reader.read(IO_CHUNK), self.timeout)
+                if not chunk:
+                    break
+                consume(chunk)
+            return bytes(data), nbytes, True
+        remaining = int(length)
+        while remaining > 0:
+            if stop is not None and stop.is_set():
+                raise RequestAborted("interrupted by user")
+            chunk = await asyncio.wait_for(reader.read(min(IO_CHUNK, remaining)), self.timeout)
+            if not chunk:
+                raise http.client.IncompleteRead(b"", remaining)
+            remaining -= len(chunk)
+            consume(chunk)
+            await self._throttle_async(len(chunk), stop)
+        return bytes(data), nbytes, False
+
+    # --- операции ---
+
+    async def get_object_async(self, bucket: str, key: str,
+                               stop: threading.Event | None = None,
+                               phases: RequestPhases | None = None) -> int:
+        resp = await self.request_async("GET", bucket, key, discard_body=True, stop=stop,
+                                        operation="GetObject", phases=phases)
+        return resp.nbytes
+
+    async def upload_file_async(
+        self,
+        path: Path | SyntheticObject,
+        bucket: str,
+        key: str,
+        multipart_threshold: int | None = None,
+        multipart_chunksize: int | None = None,
+        max_concurrent_requests: int | None = None,
+        stop: threading.Event | None = None,
+        phases: RequestPhases | None = None,
+    ) -> int:
+        """Async-аналог S3Client.upload_file: части multipart идут параллельно в том же loop.
+
+        Файл читается блоками по IO_CHUNK прямо в loop — для чтения из page cache
+        это дешевле, чем уводить каждый блок в пул потоков.
+        """
+        size, make_body = upload_source(path)
+        threshold = multipart_threshold or DEFAULT_MULTIPART_THRESHOLD
+        if size < threshold:
+            await self.request_async("PUT", bucket, key, body=make_body(0, size),
+                                     stop=stop, operation="PutObject", phases=phases)
+            return size
+        ranges = _part_ranges(size, multipart_chunksize)
+        resp = await self.request_async("POST", bucket, key, query=[("uploads", "")],
+                                        operation="CreateMultipartUpload", phases=phases)
+        upload_id = _parse_upload_id(resp)
+        limit = asyncio.Semaphore(max_concurrent_requests or DEFAULT_MAX_CONCURRENT_REQUESTS)
+
+        async def send_part(number: int, offset: int, length: int) -> str:
+            async with limit:
+                part = await self.request_async(
+                    "PUT", bucket, key,
+                    query=[("partNumber", str(number)), ("uploadId", upload_id)],
+                    body=make_body(offset, length), stop=stop, operation="UploadPart",
+                    phases=phases,
+                )
+            return part.headers.get("etag", "")
+
+        try:
+            etags = await asyncio.gather(
+                *(send_part(n, off, length) for n, (off, length) in enumerate(ranges, start=1))
+            )
+            resp = await self.request_async(
+                "POST", bucket, key, query=[("uploadId", upload_id)],
+                body=_complete_body(list(etags)), operation="CompleteMultipartUpload",
+                phases=phases,
+            )
+            _check_complete(resp)
+        except BaseException:
+            try:
+                await self.request_async("DELETE", bucket, key, query=[("uploadId", upload_id)],
+                                         operation="AbortMultipartUpload")
+            except AIO_ERRORS:
+                pass
+            raise
+        return size
+
+    def abort_async(self) -> None:
+        self._aio_pool.abort()
+
+    def close_async(self) -> None:
+        self._aio_pool.close()
+
+
+def _aio_describe(exc: BaseException, url: str) -> str:
+    """_describe_error с учётом asyncio-исключений (таймаут, недочитанное тело)."""
+    if isinstance(exc, asyncio.TimeoutError):
+        exc = socket.timeout("timed out")
+    elif isinstance(exc, asyncio.IncompleteReadError):
+        exc = http.client.IncompleteRead(exc.partial, exc.expected)
+    return _describe_error(exc, url)
+
+
+async def aio_upload(
+    client: AsyncS3Client,
+    local: Path | SyntheticObject,
+    bucket: str,
+    key: str,
+    multipart_threshold: int | None = None,
+    multipart_chunksize: int | None = None,
+    max_concurrent_requests: int | None = None,
+    stop: threading.Event | None = None,
+) -> subprocess.CompletedProcess:
+    """Загрузка файла async-клиентом (результат как у native_upload)."""
+    name, prefix = split_bucket(bucket)
+    url = f"{client.endpoint}/{name}/{prefix}{key}"
+    args = ["native-async", "PUT", url]
+    phases = RequestPhases()
+    try:
+        await client.upload_file_async(
+            local if isinstance(local, SyntheticObject) else Path(local), name, prefix + key,
+            multipart_threshold, multipart_chunksize, max_concurrent_requests, stop=stop,
+            phases=phases,
+        )
+    except AIO_ERRORS as exc:
+        return _result(args, _aio_describe(exc, url), phases=phases)
+    return _result(args, None, phases=phases)
+
+
+async def aio_download(
+    client: AsyncS3Client,
+    bucket: str,
+    key: str,
+    stop: threading.Event | None = None,
+) -> subprocess.CompletedProcess:
+    """Чтение объекта async-клиентом без записи на диск (результат как у native_download)."""
+    name, prefix = split_bucket(bucket)
+    url = f"{client.endpoint}/{name}/{prefix}{key}"
+    args = ["native-async", "GET", url]
+    phases = RequestPhases()
+    try:
+        nbytes = await client.get_object_async(name, prefix + key, stop=stop, phases=phases)
+    except AIO_ERRORS as exc:
+        return _result(args, _aio_describe(exc, url), phases=phases)
+    return _result(args, None, stdout=str(nbytes), phases=phases)
@@ -4,6 +4,7 @@
 к списку бакетов. Enter на объекте открывает его версии как «папку».
 Space выделяет несколько объектов; F5 копирует, F6 перемещает (в режиме
 версий — откатывает объект к версии), F8 удаляет — пакетно, с прогрессом.
+F3 считает объём «папки» параллельным листингом (listing.ParallelLister).
 Построен на prompt_toolkit по образцу ConfigEditorApp — тот же стек и
 стилистика, что и остальной TUI s3flood.
 """
@@ -35,6 +36,7 @@ from prompt_toolkit.styles import Style
 from prompt_toolkit.widgets import Frame
 
 from .executor import format_bytes
+from .listing import ParallelLister
 from .s3browser_io import (
     S3Entry,
     S3Version,
@@ -46,6 +48,7 @@ from .s3browser_io import (
     build_versioning_status_cmd,
     build_versions_cmd,
     list_prefix,
+    _bucket_name,
     list_versions,
     parse_buckets,
     parse_version_counts,
@@ -163,9 +166,14 @@ def render_progress_lines(p: ProgressState, width: int) -> list[tuple[str, str]]
 
     bar_w = max(width - 26, 5)
     lines: list[tuple[str, str]] = [("class:progress.file", cut(f" {p.current}") + "\n")]
-    frac_files = p.done / p.total if p.total else 0.0
-    lines.append(("class:progress.bar",
-                  cut(f" Файлы  {make_bar(frac_files, bar_w)}  {p.done}/{p.total}") + "\n"))
+    if p.total:
+        frac_files = p.done / p.total
+        lines.append(("class:progress.bar",
+                      cut(f" Файлы  {make_bar(frac_files, bar_w)}  {p.done}/{p.total}") + "\n"))
+    else:
+        # Итог заранее неизвестен (подсчёт объёма): только счётчики
+        lines.append(("class:progress.bar",
+                      cut(f" Найдено  {p.done} объектов · {format_bytes(p.bytes_done)}") + "\n"))
     if p.bytes_total > 0:
         frac_bytes = p.bytes_done / p.bytes_total
         lines.append(("class:progress.bar",
@@ -265,7 +273,7 @@ def render_panel_lines(panel: Panel, width: int, focused: bool) -> list[tuple[st
         is_sel = idx == panel.selection
         cursor = "»" if is_sel and focused else " "
         mark = "*" if row.marked else " "
-        size_disp = "" if row.is_dir else format_bytes(row.size)
+        size_disp = "" if row.is_dir and not row.size else format_bytes(row.size)
         text = f"{cursor}{mark} " + format_columns(row.name, size_disp, row.meta, width)
         style = "class:row.dir" if row.is_dir else "class:row"
         if row.marked:
@@ -280,10 +288,12 @@ def render_panel_lines(panel: Panel, width: int, focused: bool) -> list[tuple[st
 
 class BucketBrowserApp:
     def __init__(self, *, bucket: str, endpoint: str, env: dict,
-                 start_dir: Path, prefix: str = "", input=None, output=None):
+                 start_dir: Path, prefix: str = "", client=None, input=None, output=None):
         self.bucket = bucket
         self.endpoint = endpoint
         self.env = env
+        # Встроенный S3Client для подсчёта объёма (F3); без него F3 недоступна
+        self.client = client
         self.local_path = start_dir.resolve()
         self.prefix = prefix
         self.versions_key: Optional[str] = None
@@ -382,6 +392,7 @@ class BucketBrowserApp:
         kb.add("f5", filter=active)(self._key_copy)
         kb.add("f6", filter=active)(self._key_move_or_restore)
         kb.add("f8", filter=active)(self._key_delete)
+        kb.add("f3", filter=active)(self._key_size)
         kb.add("r", filter=active)(self._key_refresh)
         kb.add("q", filter=active)(self._key_quit)
         kb.add("f10")(self._key_quit)
@@ -483,7 +494,7 @@ class BucketBrowserApp:
             keys = (" Enter/.. Назад  F5 Скачать версию  F6 Откатить к версии"
                     "  F8 Удалить версию  q Выход")
         else:
-            keys = (" Tab Панель  Enter Открыть  Space Выделить  F5 Копировать"
+            keys = (" Tab Панель  Enter Открыть  Space Выделить  F3 Объём  F5 Копировать"
                     "  F6 Переместить  F8 Удалить  r Обновить  q Выход")
         return [("class:keybar", keys)]
 
@@ -685,6 +696,16 @@ class BucketBrowserApp:
         prompt = f"Удалить {len(keys)} объект(ов) из бакета?"
         self.confirm = (prompt, self._op_delete_batch(keys))
 
+    def _key_size(self, event) -> None:
+        """F3: объём выбранной «папки» (на «..» — текущего префикса)."""
+        if not self.focus_right or self.right.mode != "list":
+            return
+        row = self.right.selected()
+        if row is not None and row.is_dir and isinstance(row.payload, S3Entry):
+            self._spawn(self._op_prefix_size(row.payload.key, row))
+        elif row is None or row.name == "..":
+            self._spawn(self._op_prefix_size(self.prefix, None))
+
     def _key_confirm_yes(self, event) -> None:
         if self.confirm:
             _, coro = self.confirm
@@ -920,6 +941,42 @@ class BucketBrowserApp:
                 f", ошибок {prog.errors}" if prog.errors else "")
         self._invalidate()
 
+    async def _op_prefix_size(self, prefix: str, row: Optional[Row]) -> None:
+        """Объём префикса: листинг диапазонами ключей в несколько потоков, Esc — отмена."""
+        if self.client is None:
+            self.status_err = "Объём: нужен встроенный клиент (endpoint и креды из настроек)"
+            return
+        prog = ProgressState(title="Объём префикса", current=prefix or "/")
+        self.progress = prog
+        self._invalidate()
+        lister = ParallelLister(self.client, _bucket_name(self.bucket), prefix)
+
+        def count() -> None:
+            for page in lister.pages():
+                prog.done += len(page)
+                prog.bytes_done += sum(obj["size"] for obj in page)
+                if prog.cancelled:
+                    break
+
+        try:
+            await asyncio.to_thread(count)
+        except Exception as exc:  # ошибка листинга — в статус, не роняем интерфейс
+            self.status_err = f"Объём: {exc}"
+        else:
+            elapsed = lister.stats.elapsed
+            summary = f"{prog.done} объектов · {format_bytes(prog.bytes_done)}"
+            if prog.cancelled:
+                self.status_msg = f"Объём {prefix or '/'}: отменено, найдено {summary}"
+            else:
+                self.status_msg = (f"Объём {prefix or '/'}: {summary} "
+                                   f"({lister.stats.requests} LIST, {elapsed:.1f} с)")
+                if row is not None:
+                    row.size = prog.bytes_done
+                    row.meta = f"{prog.done} объектов"
+        finally:
+            self.progress = None
+            self._invalidate()
+
     async def _op_restore(self, key: str, version_id: str) -> None:
         prog = ProgressState(title="Откат к версии", current=version_id[:8], total=1)
         self.progress = prog
@@ -948,6 +1005,7 @@ class BucketBrowserApp:
 def browse_bucket(settings, prefix: str = "") -> None:
     """Точка входа: собирает окружение из настроек прогона и запускает браузер."""
     from .runner import _get_aws_env
+    from .s3client import get_client
 
     env, _profile = _get_aws_env(
         getattr(settings, "access_key", None),
@@ -962,5 +1020,11 @@ def browse_bucket(settings, prefix: str = "") -> None:
         env=env,
         start_dir=start_dir,
         prefix=prefix,
+        client=get_client(
+            settings.endpoint,
+            getattr(settings, "access_key", None),
+            getattr(settings, "secret_key", None),
+            getattr(settings, "aws_profile", None),
+        ),
     )
     app.run()
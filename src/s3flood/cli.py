@@ -1,7 +1,7 @@
 import argparse
 from .config import load_run_config, resolve_run_settings
 from .dataset import plan_and_generate
-from .executor import run_profile
+from .findmax import run_or_find_max
 
 
 def main():
@@ -44,6 +44,9 @@ def main():
   # Создать датасет с символическими ссылками (экономит место)
   s3flood dataset-create --path ./loadset --use-symlinks
 
+  # Параллельно в 8 процессов, воспроизводимо на всех узлах нагрузки
+  s3flood dataset-create --path ./loadset --target-bytes 2TB --jobs 8 --seed 42
+
   # Создать датасет с кастомными параметрами
   s3flood dataset-create --path ./loadset --target-bytes 10GB \\
     --min-counts 200,100,50 --group-limits 50MB,500MB,5GB
@@ -61,6 +64,9 @@ def main():
     dcreate.add_argument("--group-limits", type=str, default="100MB,1GB,10GB", help="Максимальные размеры файлов для групп small,medium,large (формат: '100MB,1GB,10GB'). Совет: ≤5GB для защиты от BadDigest")
     dcreate.add_argument("--safety-ratio", type=float, default=0.8, help="Доля свободного места для использования при --target-bytes auto (по умолчанию 0.8 = 80%%)")
     dcreate.add_argument("--fill", choices=["random", "zero"], default="random", help="Содержимое файлов: random (несжимаемое, честные результаты) или zero (нули, быстрое создание, но хранилища с компрессией/дедупликацией покажут завышенные скорости)")
+    dcreate.add_argument("--distribution", default=None, help="Распределение размеров: uniform (равномерно внутри групп, по умолчанию), lognormal:median=64KB,sigma=1.5, pareto:alpha=1.2, zipf:s=1.1 или empirical:path=hist.csv (CSV lower,upper,count); min=/max= ограничивают диапазон, группа файла — по --group-limits")
+    dcreate.add_argument("--jobs", type=int, default=1, help="Число процессов генерации: файлы создаются параллельно (по умолчанию: 1)")
+    dcreate.add_argument("--seed", type=int, default=None, help="Seed датасета: одинаковый seed и параметры дают те же имена, размеры и содержимое на любой машине (по умолчанию случайный, печатается в конце)")
 
     run_epilog = """
 Примеры запуска тестирования:
@@ -101,31 +107,130 @@ def main():
         epilog=run_epilog,
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
-    runp.add_argument("--config", help="YAML-файл с параметрами запуска (endpoint, bucket, креденшлы). Все параметры из конфига можно переопределить через CLI")
-    runp.add_argument("--profile", choices=["write","read","mixed"], default=None, help="Профиль нагрузки: write (только запись), read (только чтение из бакета), mixed (смешанные операции)")
-    runp.add_argument("--client", choices=["awscli","rclone","s3cmd"], default=None, help="S3 клиент для использования (по умолчанию: awscli)")
-    runp.add_argument("--endpoint", default=None, help="URL S3 endpoint (например, http://localhost:9000 для MinIO)")
-    runp.add_argument("--endpoints", nargs="+", default=None, help="Список endpoint'ов для кластерного режима (например: http://node1:9000 http://node2:9000)")
-    runp.add_argument("--endpoint-mode", choices=["round-robin","random"], default=None, help="Стратегия выбора endpoint'а при кластерном режиме: round-robin (по кругу) или random (случайно)")
-    runp.add_argument("--bucket", default=None, help="Имя S3 бакета для тестирования")
-    runp.add_argument("--access-key", dest="access_key", default=None, help="AWS Access Key ID (или S3-совместимый ключ доступа)")
-    runp.add_argument("--secret-key", dest="secret_key", default=None, help="AWS Secret Access Key (или S3-совместимый секретный ключ)")
-    runp.add_argument("--aws-profile", dest="aws_profile", default=None, help="Имя профиля AWS CLI (из ~/.aws/credentials). Альтернатива --access-key/--secret-key")
-    runp.add_argument("--threads", type=int, default=None, help="Количество параллельных потоков для операций (по умолчанию: 8)")
-    runp.add_argument("--infinite", action="store_true", default=None, help="Бесконечный режим: после завершения всех файлов начинать заново")
-    runp.add_argument("--report", default=None, help="Путь к JSON файлу с итоговым отчётом (по умолчанию: report.json)")
-    runp.add_argument("--metrics", default=None, help="Путь к CSV файлу с детальными метриками по каждой операции (по умолчанию: metrics.csv)")
-    runp.add_argument("--data-dir", dest="data_dir", default=None, help="Путь к корню датасета (сканируется рекурсивно, по умолчанию: ./data)")
-    runp.add_argument("--mixed-read-ratio", type=float, dest="mixed_read_ratio", default=None, help="Доля операций чтения для mixed профиля (0.0-1.0, по умолчанию для mixed: 0.7)")
-    runp.add_argument("--pattern", choices=["sustained","bursty"], default=None, help="Паттерн нагрузки: sustained (ровная постоянная) или bursty (чередование всплесков и пауз)")
-    runp.add_argument("--burst-duration-sec", type=float, dest="burst_duration_sec", default=None, help="Длительность всплеска в секундах для bursty паттерна (по умолчанию: 10.0)")
-    runp.add_argument("--burst-intensity-multiplier", type=float, dest="burst_intensity_multiplier", default=None, help="Множитель интенсивности во время всплеска для bursty паттерна (по умолчанию: 10.0)")
-    runp.add_argument("--queue-limit", type=int, dest="queue_limit", default=None, help="Максимальный размер очереди операций (по умолчанию: без ограничений)")
-    runp.add_argument("--max-retries", type=int, dest="max_retries", default=None, help="Максимальное количество повторов при ошибке (по умолчанию: 3)")
-    runp.add_argument("--retry-backoff-base", type=float, dest="retry_backoff_base", default=None, help="Базовый множитель для экспоненциального backoff при повторах (по умолчанию: 2.0, т.е. задержки: 1s, 2s, 4s)")
-    runp.add_argument("--order", choices=["sequential","random"], default=None, help="Порядок обработки файлов: sequential (сначала маленькие, потом средние, потом большие) или random (случайный порядок)")
-    runp.add_argument("--unique-remote-names", dest="unique_remote_names", action="store_true", default=None, help="Добавлять уникальный постфикс к имени объекта при загрузке (полезно для бесконечных прогонов, чтобы не перезаписывать предыдущие файлы)")
-    runp.add_argument("--warmup-sec", type=float, dest="warmup_sec", default=None, help="Прогрев: операции первых N секунд выполняются, но исключаются из статистики (по умолчанию: 0)")
+
+    def add_run_arguments(p):
+        """Параметры прогона: общие для run и controller."""
+        p.add_argument("--config", help="YAML-файл с параметрами запуска (endpoint, bucket, креденшлы). Все параметры из конфига можно переопределить через CLI")
+        p.add_argument("--profile", choices=["write","read","mixed"], default=None, help="Профиль нагрузки: write (только запись), read (только чтение из бакета), mixed (смешанные операции)")
+        p.add_argument("--client", choices=["awscli","native","s5cmd","rclone"], default=None, help="S3 клиент: awscli (процесс aws на каждую операцию, по умолчанию), native (встроенный HTTP-клиент с keep-alive, без оверхеда запуска процесса), s5cmd (один процесс s5cmd run, команды через stdin) или rclone (один rclone rcd, операции через rc API)")
+        p.add_argument("--engine", choices=["threads","asyncio"], default=None, help="Движок исполнения: threads (поток на каждую операцию в полёте, по умолчанию) или asyncio (один event loop, --threads задаёт число запросов в полёте; только с --client native)")
+        p.add_argument("--endpoint", default=None, help="URL S3 endpoint (например, http://localhost:9000 для MinIO)")
+        p.add_argument("--endpoints", nargs="+", default=None, help="Список endpoint'ов для кластерного режима (например: http://node1:9000 http://node2:9000)")
+        p.add_argument("--endpoint-mode", choices=["round-robin","random"], default=None, help="Стратегия выбора endpoint'а при кластерном режиме: round-robin (по кругу) или random (случайно)")
+        p.add_argument("--bucket", default=None, help="Имя S3 бакета для тестирования")
+        p.add_argument("--access-key", dest="access_key", default=None, help="AWS Access Key ID (или S3-совместимый ключ доступа)")
+        p.add_argument("--secret-key", dest="secret_key", default=None, help="AWS Secret Access Key (или S3-совместимый секретный ключ)")
+        p.add_argument("--aws-profile", dest="aws_profile", default=None, help="Имя профиля AWS CLI (из ~/.aws/credentials). Альтернатива --access-key/--secret-key")
+        p.add_argument("--threads", type=int, default=None, help="Количество параллельных потоков для операций (по умолчанию: 8)")
+        p.add_argument("--processes", type=int, default=None, help="Число процессов: задачи и потоки (--threads) делятся между ними, отчёт и дашборд общие (по умолчанию: 1)")
+        p.add_argument("--infinite", action="store_true", default=None, help="Бесконечный режим: после завершения всех файлов начинать заново")
+        p.add_argument("--report", default=None, help="Путь к JSON файлу с итоговым отчётом (по умолчанию: report.json)")
+        p.add_argument("--metrics", default=None, help="Путь к CSV файлу с детальными метриками по каждой операции (по умолчанию: metrics.csv)")
+        p.add_argument("--metrics-format", choices=["csv","binary"], dest="metrics_format", default=None, help="Формат журнала операций: csv (по умолчанию) или binary — записи фиксированной ширины и таблица строк, читаются через mmap (по умолчанию файл metrics.ops)")
+        p.add_argument("--data-dir", dest="data_dir", default=None, help="Путь к корню датасета (сканируется рекурсивно, по умолчанию: ./data)")
+        p.add_argument("--data-source", choices=["files","synthetic"], dest="data_source", default=None, help="Источник данных для write/mixed: files (датасет --data-dir, по умолчанию) или synthetic (несжимаемые тела из памяти, датасет не нужен; только --client native)")
+        p.add_argument("--synthetic-bytes", dest="synthetic_bytes", default=None, help="Объём одного прохода synthetic (например, '10GB', по умолчанию: 1GB)")
+        p.add_argument("--synthetic-group-limits", dest="synthetic_group_limits", default=None, help="Максимальные размеры объектов synthetic для групп small,medium,large (по умолчанию: '1MB,32MB,256MB')")
+        p.add_argument("--synthetic-min-counts", dest="synthetic_min_counts", default=None, help="Минимальное количество объектов synthetic по группам small,medium,large (по умолчанию: '10,5,1')")
+        p.add_argument("--synthetic-distribution", dest="synthetic_distribution", default=None, help="Распределение размеров synthetic: uniform (по группам, по умолчанию), lognormal, pareto, zipf или empirical, с параметрами через ':' (например, 'lognormal:median=16KB,sigma=2')")
+        p.add_argument("--mixed-read-ratio", type=float, dest="mixed_read_ratio", default=None, help="Доля операций чтения для mixed профиля (0.0-1.0, по умолчанию для mixed: 0.7)")
+        p.add_argument("--pattern", choices=["sustained","bursty","open-loop"], default=None, help="Паттерн нагрузки: sustained (ровная постоянная), bursty (чередование всплесков и пауз) или open-loop (старты по расписанию с частотой --arrival-rate)")
+        p.add_argument("--arrival-rate", type=float, dest="arrival_rate", default=None, help="Целевая частота стартов операций, оп/с, для open-loop (на весь прогон)")
+        p.add_argument("--arrival-distribution", choices=["constant","poisson"], dest="arrival_distribution", default=None, help="Интервалы между стартами open-loop: constant (равные) или poisson (экспоненциальные, по умолчанию: constant)")
+        p.add_argument("--max-iops", type=float, dest="max_iops", default=None, help="Потолок операций в секунду на весь прогон (token bucket; на дашборде +/- меняют лимит на 10%%)")
+        p.add_argument("--max-throughput-mbps", type=float, dest="max_throughput_mbps", default=None, help="Потолок суммарной полосы, MB/s (соблюдает только --client native)")
+        p.add_argument("--throttle-scope", choices=["global","endpoint"], dest="throttle_scope", default=None, help="Область лимитов: global (на весь прогон) или endpoint (на каждый endpoint отдельно, по умолчанию: global)")
+        p.add_argument("--stages", default=None, help="Стадии нагрузки через запятую, ДЛИТЕЛЬНОСТЬ:ПОТОКИ: пул линейно доходит до ПОТОКИ за ДЛИТЕЛЬНОСТЬ ('=' перед числом — сразу, без ramp). Пример: 5m:200,10m:200,5m:=50")
+        p.add_argument("--burst-duration-sec", type=float, dest="burst_duration_sec", default=None, help="Длительность всплеска в секундах для bursty паттерна (по умолчанию: 10.0)")
+        p.add_argument("--burst-intensity-multiplier", type=float, dest="burst_intensity_multiplier", default=None, help="Множитель интенсивности во время всплеска для bursty паттерна (по умолчанию: 10.0)")
+        p.add_argument("--queue-limit", type=int, dest="queue_limit", default=None, help="Максимальный размер очереди операций (по умолчанию: без ограничений)")
+        p.add_argument("--max-retries", type=int, dest="max_retries", default=None, help="Максимальное количество повторов при ошибке (по умолчанию: 3)")
+        p.add_argument("--retry-backoff-base", type=float, dest="retry_backoff_base", default=None, help="Базовый множитель для экспоненциального backoff при повторах (по умолчанию: 2.0, т.е. задержки: 1s, 2s, 4s)")
+        p.add_argument("--order", choices=["sequential","random"], default=None, help="Порядок обработки файлов: sequential (сначала маленькие, потом средние, потом большие) или random (случайный порядок)")
+        p.add_argument("--list-workers", type=int, dest="list_workers", default=None, help="read: потоков параллельного листинга бакета по диапазонам ключей (по умолчанию: 1 — один постраничный курсор)")
+        p.add_argument("--list-mode", choices=["range","prefix"], dest="list_mode", default=None, help="Деление ключей при --list-workers > 1: range (диапазоны start-after, делятся на лету) или prefix (общие префиксы по '/')")
+        p.add_argument("--metrics-listen", dest="metrics_listen", default=None, help="Живой экспорт метрик для Prometheus: адрес [host]:port эндпоинта /metrics (например, ':9109')")
+        p.add_argument("--unique-remote-names", dest="unique_remote_names", action="store_true", default=None, help="Добавлять уникальный постфикс к имени объекта при загрузке (полезно для бесконечных прогонов, чтобы не перезаписывать предыдущие файлы)")
+        p.add_argument("--warmup-sec", type=float, dest="warmup_sec", default=None, help="Прогрев: операции первых N секунд выполняются, но исключаются из статистики (по умолчанию: 0)")
+        p.add_argument("--find-max", dest="find_max", action="store_true", default=None, help="Поиск предела: шаги с растущей нагрузкой (удвоение, затем бинарный поиск) до нарушения SLO; кривая шагов — в отчёте")
+        p.add_argument("--find-max-by", choices=["threads","rate"], dest="find_max_by", default=None, help="Чем наращивать нагрузку: threads (число потоков, по умолчанию) или rate (частота стартов open-loop, оп/с)")
+        p.add_argument("--find-max-start", type=float, dest="find_max_start", default=None, help="Первая точка поиска (по умолчанию: --threads или --arrival-rate)")
+        p.add_argument("--find-max-limit", type=float, dest="find_max_limit", default=None, help="Верхняя граница поиска (по умолчанию: 1024 потока или старт×1024 оп/с)")
+        p.add_argument("--find-max-step-sec", type=float, dest="find_max_step_sec", default=None, help="Длительность шага без учёта прогрева --warmup-sec (по умолчанию: 30)")
+        p.add_argument("--slo-p99-ms", type=float, dest="slo_p99_ms", default=None, help="SLO для --find-max: p99 латентности, мс (обязателен)")
+        p.add_argument("--slo-error-rate", type=float, dest="slo_error_rate", default=None, help="SLO для --find-max: допустимая доля ошибок (по умолчанию: 0.01)")
+
+    add_run_arguments(runp)
+
+    controller_epilog = """
+Пример распределённого прогона (агенты уже запущены на узлах):
+
+  # На каждом узле нагрузки
+  S3FLOOD_AGENT_KEY=secret s3flood agent --listen 0.0.0.0:9700
+
+  # На управляющей машине: общий отчёт и дашборд
+  S3FLOOD_AGENT_KEY=secret s3flood controller --config config.yaml \\
+    --agents node1:9700 node2:9700 node3:9700
+"""
+    ctrlp = sub.add_parser(
+        "controller",
+        help="Распределённый прогон: раздать настройки агентам и собрать общий отчёт",
+        epilog=controller_epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    add_run_arguments(ctrlp)
+    ctrlp.add_argument("--agents", nargs="+", default=None, help="Адреса агентов host:port (порт по умолчанию 9700)")
+    ctrlp.add_argument("--authkey", default=None, help="Общий ключ агентов (по умолчанию: переменная S3FLOOD_AGENT_KEY)")
+    ctrlp.add_argument("--start-delay", type=float, dest="start_delay", default=2.0, help="Через сколько секунд после рассылки настроек агенты стартуют одновременно (по умолчанию: 2)")
+
+    agentp = sub.add_parser(
+        "agent",
+        help="Агент распределённого прогона: исполняет прогоны контроллера",
+    )
+    agentp.add_argument("--listen", default="0.0.0.0:9700", help="Адрес для подключения контроллера (по умолчанию: 0.0.0.0:9700)")
+    agentp.add_argument("--authkey", default=None, help="Общий ключ с контроллером (по умолчанию: переменная S3FLOOD_AGENT_KEY)")
+    agentp.add_argument("--data-dir", dest="data_dir", default=None, help="Датасет этой машины для write/mixed (по умолчанию: dataset_dir из .s3flood.yml)")
+
+    mockp = sub.add_parser(
+        "mock-server",
+        help="Локальный S3-совместимый сервер для офлайн-прогонов и калибровки клиента",
+    )
+    mockp.add_argument("--listen", default="127.0.0.1:9000", help="Адрес сервера host:port (по умолчанию: 127.0.0.1:9000)")
+    mockp.add_argument("--backend", choices=["memory","null","disk"], default="memory", help="Хранилище: memory (в памяти), null (данные отбрасываются, GET отдаёт нули — потолок клиента) или disk (файлы в --root)")
+    mockp.add_argument("--root", default=None, help="Каталог для --backend disk")
+    mockp.add_argument("--latency-ms", type=float, dest="latency_ms", default=0.0, help="Задержка каждого ответа, мс")
+    mockp.add_argument("--latency-jitter-ms", type=float, dest="latency_jitter_ms", default=0.0, help="Случайная добавка к задержке (0..N мс)")
+    mockp.add_argument("--bandwidth", default=None, help="Общая полоса сервера в секунду, например '100MB' (по умолчанию: без ограничения)")
+    mockp.add_argument("--error-rate", type=float, dest="error_rate", default=0.0, help="Доля запросов, на которые сервер отвечает 503 SlowDown (0.0-1.0)")
+
+    profilep = sub.add_parser(
+        "profile-bucket",
+        help="Профиль нагрузки из бакета: гистограмма размеров и ветвление префиксов (для --distribution empirical)",
+    )
+    profilep.add_argument("--config", help="YAML-конфиг с endpoint/bucket/кредами")
+    profilep.add_argument("--endpoint", default=None, help="URL S3 endpoint (вместо конфига)")
+    profilep.add_argument("--bucket", default=None, help="Бакет, можно с префиксом: s3://bucket/prefix (вместо конфига)")
+    profilep.add_argument("--access-key", dest="access_key", default=None)
+    profilep.add_argument("--secret-key", dest="secret_key", default=None)
+    profilep.add_argument("--aws-profile", dest="aws_profile", default=None)
+    profilep.add_argument("--out", default="workload.json", help="Куда записать дескриптор нагрузки (по умолчанию: workload.json)")
+    profilep.add_argument("--max-objects", type=int, dest="max_objects", default=None, help="Остановиться после N объектов (выборка с начала листинга)")
+    profilep.add_argument("--page-size", type=int, dest="page_size", default=1000, help="Ключей на страницу ListObjectsV2 (по умолчанию: 1000)")
+
+    listp = sub.add_parser(
+        "list-bench",
+        help="Пропускная способность LIST: полный листинг бакета параллельно по диапазонам ключей",
+    )
+    listp.add_argument("--config", help="YAML-конфиг с endpoint/bucket/кредами")
+    listp.add_argument("--endpoint", default=None, help="URL S3 endpoint (вместо конфига)")
+    listp.add_argument("--bucket", default=None, help="Бакет, можно с префиксом: s3://bucket/prefix (вместо конфига)")
+    listp.add_argument("--access-key", dest="access_key", default=None)
+    listp.add_argument("--secret-key", dest="secret_key", default=None)
+    listp.add_argument("--aws-profile", dest="aws_profile", default=None)
+    listp.add_argument("--workers", default="1,8", help="Потоков листинга; через запятую — прогон на каждое значение (по умолчанию: 1,8)")
+    listp.add_argument("--mode", choices=["range","prefix"], default="range", help="Деление ключей: range (диапазоны start-after) или prefix (общие префиксы по '/')")
+    listp.add_argument("--page-size", type=int, dest="page_size", default=1000, help="Ключей на страницу ListObjectsV2 (по умолчанию: 1000)")
+    listp.add_argument("--report", default=None, help="JSON с итогами прогонов")
 
     browsep = sub.add_parser(
         "browse",
@@ -148,15 +253,21 @@ def main():
         return
 
     if args.cmd == "dataset-create":
-        plan_and_generate(
-            path=args.path,
-            target_bytes=args.target_bytes,
-            use_symlinks=args.use_symlinks,
-            min_counts=args.min_counts,
-            group_limits=args.group_limits,
-            safety_ratio=args.safety_ratio,
-            fill=args.fill,
-        )
+        try:
+            plan_and_generate(
+                path=args.path,
+                target_bytes=args.target_bytes,
+                use_symlinks=args.use_symlinks,
+                min_counts=args.min_counts,
+                group_limits=args.group_limits,
+                safety_ratio=args.safety_ratio,
+                fill=args.fill,
+                jobs=max(args.jobs, 1),
+                seed=args.seed,
+                distribution=args.distribution,
+            )
+        except ValueError as exc:
+            raise SystemExit(f"dataset-create: {exc}") from None
         from pathlib import Path as _Path
 
         from .app_settings import APP_SETTINGS_FILE, save_app_settings
@@ -170,7 +281,108 @@ def main():
             except (OSError, ValueError) as exc:
                 raise SystemExit(f"Не удалось прочитать конфиг: {exc}") from exc
         settings = resolve_run_settings(args, config_model)
-        run_profile(settings.to_namespace())
+        settings.agents = []  # агенты из конфига используются только командой controller
+        run_or_find_max(settings.to_namespace())
+    elif args.cmd == "controller":
+        config_model = None
+        if args.config:
+            try:
+                config_model = load_run_config(args.config)
+            except (OSError, ValueError) as exc:
+                raise SystemExit(f"Не удалось прочитать конфиг: {exc}") from exc
+        settings = resolve_run_settings(args, config_model)
+        if not settings.agents:
+            raise SystemExit("controller: не заданы агенты (--agents или agents в конфиге)")
+        run_args = settings.to_namespace()
+        run_args.agent_authkey = args.authkey
+        run_args.agent_start_delay = args.start_delay
+        run_or_find_max(run_args)
+    elif args.cmd == "agent":
+        from .distributed import run_agent
+        run_agent(args.listen, authkey=args.authkey, data_dir=args.data_dir)
+    elif args.cmd == "mock-server":
+        from .dataset import parse_size
+        from .mockserver import run_mock_server
+        if args.backend == "disk" and not args.root:
+            raise SystemExit("mock-server: для --backend disk нужен --root")
+        run_mock_server(
+            listen=args.listen,
+            backend=args.backend,
+            root=args.root,
+            latency_ms=args.latency_ms,
+            latency_jitter_ms=args.latency_jitter_ms,
+            bandwidth=parse_size(args.bandwidth) if args.bandwidth else None,
+            error_rate=args.error_rate,
+        )
+    elif args.cmd == "profile-bucket":
+        config_model = None
+        if args.config:
+            try:
+                config_model = load_run_config(args.config)
+            except (OSError, ValueError) as exc:
+                raise SystemExit(f"Не удалось прочитать конфиг: {exc}") from exc
+        args.profile = "read"  # профиль не используется, нужен для resolve
+        settings = resolve_run_settings(args, config_model)
+        import http.client
+
+        from .s3client import RequestAborted, S3Error, get_client
+        from .workload import profile_bucket
+        client = get_client(settings.endpoint, settings.access_key, settings.secret_key, settings.aws_profile)
+        try:
+            desc = profile_bucket(client, settings.bucket, args.out,
+                                  max_objects=args.max_objects, page_size=args.page_size)
+        except (S3Error, RequestAborted, OSError, http.client.HTTPException) as exc:
+            raise SystemExit(f"profile-bucket: листинг не удался: {exc}") from None
+        if not desc["objects"]:
+            raise SystemExit(f"profile-bucket: в {settings.bucket} нет объектов — дескриптор пуст ({args.out})")
+        size = desc["size"]
+        print(
+            f"{desc['objects']} объектов, {desc['bytes']/1024/1024:.1f} MB"
+            f"{'' if desc['complete'] else ' (выборка)'}; размер p50 ≤ {size['p50']} B,"
+            f" p99 ≤ {size['p99']} B, max {size['max']} B; корзин: {len(desc['histogram'])},"
+            f" глубина префиксов: {len(desc['prefixes'])}"
+        )
+        print(f"Дескриптор: {args.out} — повторить форму: dataset-create --distribution empirical:path={args.out}")
+    elif args.cmd == "list-bench":
+        config_model = None
+        if args.config:
+            try:
+                config_model = load_run_config(args.config)
+            except (OSError, ValueError) as exc:
+                raise SystemExit(f"Не удалось прочитать конфиг: {exc}") from exc
+        args.profile = "read"  # профиль не используется, нужен для resolve
+        settings = resolve_run_settings(args, config_model)
+        try:
+            workers_list = [int(w) for w in str(args.workers).split(",") if w.strip()]
+        except ValueError:
+            raise SystemExit(f"list-bench: --workers — числа через запятую, а не {args.workers!r}") from None
+        if not workers_list or min(workers_list) < 1:
+            raise SystemExit("list-bench: --workers должны быть ≥ 1")
+        import http.client
+        import json
+
+        from .listing import list_bench
+        from .s3client import RequestAborted, S3Error, get_client, split_bucket
+        client = get_client(settings.endpoint, settings.access_key, settings.secret_key, settings.aws_profile)
+        name, prefix = split_bucket(settings.bucket)
+        results = []
+        for workers in workers_list:
+            try:
+                res = list_bench(client, name, prefix, workers=workers, mode=args.mode, page_size=args.page_size)
+            except (S3Error, RequestAborted, OSError, http.client.HTTPException) as exc:
+                raise SystemExit(f"list-bench: листинг не удался: {exc}") from None
+            results.append(res)
+            lat = res["latency"] or {}
+            print(
+                f"workers={workers:<3} {args.mode}: {res['objects']} объектов за {res['elapsed_sec']:.2f} с —"
+                f" {res['objects_per_sec']:.0f} объектов/с, {res['requests']} LIST"
+                f" ({res['requests_per_sec']:.1f}/с, диапазонов {res['ranges']}),"
+                f" p50 {lat.get('p50_ms', 0.0):.1f} мс, p99 {lat.get('p99_ms', 0.0):.1f} мс"
+            )
+        if args.report:
+            with open(args.report, "w") as fh:
+                json.dump({"endpoint": settings.endpoint, "bucket": settings.bucket, "runs": results}, fh, indent=2)
+            print(f"Отчёт: {args.report}")
     elif args.cmd == "browse":
         config_model = None
         if args.config:
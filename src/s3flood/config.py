@@ -10,7 +10,16 @@ import yaml
 from pydantic import AliasChoices, BaseModel, ConfigDict, Field, ValidationError
 
 from .app_settings import APP_SETTINGS_FILE, get_dataset_dir
-from .dataset import parse_size
+from .dataset import parse_distribution, parse_size
+from .exporter import parse_listen
+from .listing import LIST_MODES
+from .oplog import METRICS_FORMATS
+
+
+# data_source: synthetic по умолчанию — ~1 GB на проход, объекты до 256 MB
+SYNTHETIC_BYTES = "1GB"
+SYNTHETIC_GROUP_LIMITS = "1MB,32MB,256MB"
+SYNTHETIC_MIN_COUNTS = "10,5,1"
 
 
 class RunConfigModel(BaseModel):
@@ -18,6 +27,7 @@ class RunConfigModel(BaseModel):
 
     profile: Optional[str] = None
     client: Optional[str] = None
+    engine: Optional[str] = None  # threads | asyncio
     endpoint: Optional[str] = None
     endpoints: Optional[List[str]] = Field(
         default=None,
@@ -41,25 +51,52 @@ class RunConfigModel(BaseModel):
         validation_alias=AliasChoices("aws_profile", "aws-profile"),
     )
     threads: Optional[int] = None
+    # Число процессов: задачи делятся между ними, потоки (threads) — тоже
+    processes: Optional[int] = Field(default=None, ge=1)
+    # Агенты распределённого прогона (s3flood controller): host:port
+    agents: Optional[List[str]] = None
     data_dir: Optional[str] = Field(
         default=None,
         validation_alias=AliasChoices("data_dir", "data-dir"),
     )
+    # Источник тел загрузки: files (датасет data_dir) | synthetic (в памяти, без диска)
+    data_source: Optional[str] = None
+    # Распределение размеров synthetic — как у dataset-create
+    synthetic_bytes: Optional[Union[str, int]] = None
+    synthetic_group_limits: Optional[str] = None
+    synthetic_min_counts: Optional[str] = None
+    # Распределение размеров synthetic: 'lognormal:median=64KB,sigma=2' или маппинг
+    synthetic_distribution: Optional[Union[str, dict]] = None
     report: Optional[str] = None
     metrics: Optional[str] = None
+    metrics_format: Optional[str] = None  # csv | binary
     infinite: Optional[bool] = None
     # Параметры для mixed профиля
     mixed_read_ratio: Optional[float] = Field(default=None, ge=0.0, le=1.0)
     # Паттерны нагрузки
-    pattern: Optional[str] = None  # sustained | bursty
+    pattern: Optional[str] = None  # sustained | bursty | open-loop
     burst_duration_sec: Optional[float] = Field(default=None, gt=0.0)
     burst_intensity_multiplier: Optional[float] = Field(default=None, gt=1.0)
+    # Open-loop: целевая частота стартов (оп/с) и распределение интервалов
+    arrival_rate: Optional[float] = Field(default=None, gt=0.0)
+    arrival_distribution: Optional[str] = None  # constant | poisson
+    max_iops: Optional[float] = Field(default=None, gt=0.0)
+    max_throughput_mbps: Optional[float] = Field(default=None, gt=0.0)
+    throttle_scope: Optional[str] = None  # global | endpoint
+    # Стадии нагрузки: [{duration: 5m, threads: 200}, {duration: 10m, threads: 200}, ...]
+    # или строка "5m:200,10m:200,5m:=50"
+    stages: Optional[Union[str, List[dict]]] = None
     # Управление очередью
     queue_limit: Optional[int] = Field(default=None, gt=0)
     max_retries: Optional[int] = Field(default=None, ge=0)
     retry_backoff_base: Optional[float] = Field(default=None, gt=1.0)
     # Порядок обработки файлов
     order: Optional[str] = None  # sequential | random
+    # read: параллельный листинг бакета — потоков и деление ключей (range | prefix)
+    list_workers: Optional[int] = Field(default=None, ge=1)
+    list_mode: Optional[str] = None
+    # Живой экспорт метрик для Prometheus: "[host]:port" (например, ":9109")
+    metrics_listen: Optional[str] = None
     unique_remote_names: Optional[bool] = None
     # Прогрев: операции первых N секунд не учитываются в статистике
     warmup_sec: Optional[float] = Field(
@@ -67,6 +104,14 @@ class RunConfigModel(BaseModel):
         ge=0.0,
         validation_alias=AliasChoices("warmup_sec", "warmup-sec"),
     )
+    # Поиск предела под SLO (run --find-max)
+    find_max: Optional[bool] = None
+    find_max_by: Optional[str] = None  # threads | rate
+    find_max_start: Optional[float] = Field(default=None, gt=0.0)
+    find_max_limit: Optional[float] = Field(default=None, gt=0.0)
+    find_max_step_sec: Optional[float] = Field(default=None, gt=0.0)
+    slo_p99_ms: Optional[float] = Field(default=None, gt=0.0)
+    slo_error_rate: Optional[float] = Field(default=None, ge=0.0, le=1.0)
     # Настройки AWS CLI (переопределяют настройки из ~/.aws/config)
     # Принимаем строки типа "5GB", "8MB" или числа (интерпретируются как MB)
     aws_cli_multipart_threshold: Optional[Union[str, int]] = Field(default=None)  # порог для multipart (MB или строка типа "5GB")
@@ -78,6 +123,7 @@ class RunConfigModel(BaseModel):
 class RunSettings:
     profile: str
     client: str
+    engine: str
     endpoint: str
     endpoints: List[str]
     endpoint_mode: str
@@ -86,20 +132,44 @@ class RunSettings:
     secret_key: Optional[str]
     aws_profile: Optional[str]
     threads: int
+    processes: int
+    agents: List[str]
     infinite: bool
     report: str
     metrics: str
+    metrics_format: str
     data_dir: str
+    data_source: str
+    synthetic_bytes: int
+    synthetic_group_limits: List[int]
+    synthetic_min_counts: List[int]
+    synthetic_distribution: Optional[dict]
     mixed_read_ratio: Optional[float]
     pattern: Optional[str]
     burst_duration_sec: Optional[float]
     burst_intensity_multiplier: Optional[float]
+    arrival_rate: Optional[float]
+    arrival_distribution: str
+    max_iops: Optional[float]
+    max_throughput_mbps: Optional[float]
+    throttle_scope: str
+    stages: List[dict]
     queue_limit: Optional[int]
     max_retries: Optional[int]
     retry_backoff_base: Optional[float]
     order: Optional[str]
+    list_workers: int
+    list_mode: str
+    metrics_listen: Optional[str]
     unique_remote_names: bool
     warmup_sec: float
+    find_max: bool
+    find_max_by: str
+    find_max_start: Optional[float]
+    find_max_limit: Optional[float]
+    find_max_step_sec: float
+    slo_p99_ms: Optional[float]
+    slo_error_rate: float
     aws_cli_multipart_threshold: Optional[int]
     aws_cli_multipart_chunksize: Optional[int]
     aws_cli_max_concurrent_requests: Optional[int]
@@ -108,6 +178,61 @@ class RunSettings:
         return Namespace(**asdict(self))
 
 
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Union[str, int, float]) -> float:
+    """'90', '90s', '5m', '1.5h', '250ms' → секунды."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    s = str(value).strip().lower()
+    for unit in ("ms", "s", "m", "h"):
+        if s.endswith(unit):
+            return float(s[:-len(unit)]) * _DURATION_UNITS[unit]
+    return float(s)
+
+
+def parse_stages(raw: Union[str, List[dict], None], initial_threads: int) -> List[dict]:
+    """Стадии нагрузки в виде [{name, duration_sec, threads, ramp}].
+
+    Стадия с ramp (по умолчанию) линейно ведёт пул от цели предыдущей стадии
+    (для первой — threads) к своей; ramp: false — цель ставится сразу. В
+    строковой форме стадии разделены запятыми: 'ДЛИТЕЛЬНОСТЬ:ПОТОКИ', '='
+    перед числом потоков — без ramp.
+    """
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        items = []
+        for part in raw.split(","):
+            duration, sep, threads = part.strip().partition(":")
+            if not sep:
+                raise SystemExit(f"run: стадия {part.strip()!r}: ожидается ДЛИТЕЛЬНОСТЬ:ПОТОКИ (например 5m:200)")
+            jump = threads.strip().startswith("=")
+            items.append({"duration": duration, "threads": threads.strip().lstrip("="), "ramp": not jump})
+        raw = items
+    stages = []
+    prev = initial_threads
+    for index, item in enumerate(raw, 1):
+        if not isinstance(item, dict):
+            raise SystemExit(f"run: стадия {index}: ожидается маппинг с duration и threads")
+        try:
+            duration = parse_duration(item.get("duration", item.get("duration_sec")))
+            threads = int(item.get("threads", item.get("target")))
+        except (TypeError, ValueError):
+            raise SystemExit(f"run: стадия {index}: некорректные duration/threads: {item!r}") from None
+        if duration <= 0 or threads < 1:
+            raise SystemExit(f"run: стадия {index}: duration должна быть > 0, threads ≥ 1")
+        ramp = bool(item.get("ramp", True))
+        if not item.get("name"):
+            name = f"ramp {prev}→{threads}" if ramp and threads != prev else f"hold {threads}"
+        else:
+            name = str(item["name"])
+        stages.append({"name": name, "duration_sec": duration, "threads": threads, "ramp": ramp})
+        prev = threads
+    return stages
+
+
 # Ключи, по которым YAML-файл распознаётся как конфиг прогона
 KNOWN_CONFIG_KEYS = {"endpoint", "endpoints", "bucket", "profile"}
 
@@ -167,6 +292,9 @@ def resolve_run_settings(cli_args: Namespace, config: Optional[RunConfigModel])
         raise SystemExit("run: missing profile (use --profile or set in config file)")
 
     client = pick("client", default="awscli")
+    engine = pick("engine", default="threads")
+    if engine not in {"threads", "asyncio"}:
+        engine = "threads"
     endpoint_mode = pick("endpoint_mode", default="round-robin")
     endpoints = pick("endpoints")
     endpoint = pick("endpoint")
@@ -187,6 +315,8 @@ def resolve_run_settings(cli_args: Namespace, config: Optional[RunConfigModel])
         raise SystemExit("run: missing bucket (use --bucket or set in config file)")
 
     threads = pick("threads", default=8)
+    processes = pick("processes", default=1)
+    agents = [str(agent) for agent in (pick("agents") or []) if agent]
 
     # data_dir: датасет задаётся приложением (.s3flood.yml), не конфигом прогона
     cli_data_dir = getattr(cli_args, "data_dir", None)
@@ -199,8 +329,32 @@ def resolve_run_settings(cli_args: Namespace, config: Optional[RunConfigModel])
         )
     data_dir = cli_data_dir or get_dataset_dir() or "./data"
 
+    data_source = pick("data_source", default="files")
+    if data_source not in {"files", "synthetic"}:
+        raise SystemExit(f"run: неизвестный data_source {data_source!r} (files | synthetic)")
+    try:
+        synthetic_bytes = parse_size(pick("synthetic_bytes", default=SYNTHETIC_BYTES))
+        synthetic_group_limits = [parse_size(x) for x in
+                                  str(pick("synthetic_group_limits", default=SYNTHETIC_GROUP_LIMITS)).split(",")]
+        synthetic_min_counts = [int(x) for x in
+                                str(pick("synthetic_min_counts", default=SYNTHETIC_MIN_COUNTS)).split(",")]
+    except ValueError as exc:
+        raise SystemExit(f"run: некорректные параметры synthetic: {exc}") from None
+    if len(synthetic_group_limits) != 3 or len(synthetic_min_counts) != 3:
+        raise SystemExit("run: synthetic_group_limits и synthetic_min_counts — по три значения (small,medium,large)")
+    if synthetic_bytes <= 0 or min(synthetic_group_limits) <= 0 or min(synthetic_min_counts) < 0:
+        raise SystemExit("run: synthetic_bytes и synthetic_group_limits должны быть > 0, synthetic_min_counts ≥ 0")
+    try:
+        synthetic_distribution = parse_distribution(pick("synthetic_distribution"), tuple(synthetic_group_limits))
+    except (OSError, ValueError) as exc:
+        raise SystemExit(f"run: synthetic_distribution: {exc}") from None
+
     report = pick("report", default="report.json")
-    metrics = pick("metrics", default="metrics.csv")
+    # Журнал операций: CSV или компактный бинарный (oplog)
+    metrics_format = pick("metrics_format", default="csv")
+    if metrics_format not in METRICS_FORMATS:
+        raise SystemExit(f"run: неизвестный metrics_format {metrics_format!r} ({' | '.join(METRICS_FORMATS)})")
+    metrics = pick("metrics", default="metrics.ops" if metrics_format == "binary" else "metrics.csv")
 
     infinite = pick("infinite", default=False)
     if infinite is None:
@@ -222,6 +376,19 @@ def resolve_run_settings(cli_args: Namespace, config: Optional[RunConfigModel])
     pattern = pick("pattern", default="sustained")
     burst_duration_sec = pick("burst_duration_sec")
     burst_intensity_multiplier = pick("burst_intensity_multiplier", default=10.0)
+    arrival_rate = pick("arrival_rate")
+    arrival_distribution = pick("arrival_distribution", default="constant")
+    if arrival_distribution not in {"constant", "poisson"}:
+        raise SystemExit(f"run: неизвестное arrival_distribution {arrival_distribution!r} (constant | poisson)")
+    if pattern == "open-loop" and not arrival_rate:
+        raise SystemExit("run: pattern open-loop требует arrival_rate (--arrival-rate, оп/с)")
+    max_iops = pick("max_iops")
+    max_throughput_mbps = pick("max_throughput_mbps")
+    throttle_scope = pick("throttle_scope", default="global")
+    if throttle_scope not in {"global", "endpoint"}:
+        raise SystemExit(f"run: неизвестный throttle_scope {throttle_scope!r} (global | endpoint)")
+
+    stages = parse_stages(pick("stages"), threads)
 
     # Управление очередью
     queue_limit = pick("queue_limit")
@@ -233,6 +400,31 @@ def resolve_run_settings(cli_args: Namespace, config: Optional[RunConfigModel])
     
     # Порядок обработки файлов
     order = pick("order", default="sequential")
+
+    # Листинг бакета для read: list_workers > 1 — параллельно по диапазонам ключей
+    list_workers = int(pick("list_workers", default=1))
+    list_mode = pick("list_mode", default="range")
+    if list_workers < 1:
+        raise SystemExit("run: list_workers должен быть ≥ 1")
+    if list_mode not in LIST_MODES:
+        raise SystemExit(f"run: неизвестный list_mode {list_mode!r} ({' | '.join(LIST_MODES)})")
+
+    metrics_listen = pick("metrics_listen") or None
+    if metrics_listen is not None:
+        metrics_listen = str(metrics_listen)
+        try:
+            parse_listen(metrics_listen)
+        except ValueError as exc:
+            raise SystemExit(f"run: metrics_listen — {exc}") from None
+
+    # Поиск предела под SLO
+    find_max = bool(pick("find_max", default=False))
+    find_max_by = pick("find_max_by", default="threads")
+    if find_max_by not in {"threads", "rate"}:
+        raise SystemExit(f"run: неизвестный find_max_by {find_max_by!r} (threads | rate)")
+    slo_p99_ms = pick("slo_p99_ms")
+    if find_max and not slo_p99_ms:
+        raise SystemExit("run: --find-max требует SLO по латентности (--slo-p99-ms или slo_p99_ms)")
     
     # Настройки AWS CLI (переопределяют настройки из ~/.aws/config через переменные окружения)
     # Конвертируем строки/числа в байты
@@ -265,6 +457,7 @@ def resolve_run_settings(cli_args: Namespace, config: Optional[RunConfigModel])
     return RunSettings(
         profile=profile,
         client=client,
+        engine=engine,
         endpoint=primary_endpoint,
         endpoints=endpoints,
         endpoint_mode=endpoint_mode,
@@ -273,20 +466,44 @@ def resolve_run_settings(cli_args: Namespace, config: Optional[RunConfigModel])
         secret_key=secret_key,
         aws_profile=aws_profile,
         threads=threads,
+        processes=processes,
+        agents=agents,
         infinite=bool(infinite),
         report=report,
         metrics=metrics,
+        metrics_format=metrics_format,
         data_dir=data_dir,
+        data_source=data_source,
+        synthetic_bytes=synthetic_bytes,
+        synthetic_group_limits=synthetic_group_limits,
+        synthetic_min_counts=synthetic_min_counts,
+        synthetic_distribution=synthetic_distribution,
         mixed_read_ratio=mixed_read_ratio,
         pattern=pattern,
         burst_duration_sec=burst_duration_sec,
         burst_intensity_multiplier=burst_intensity_multiplier,
+        arrival_rate=arrival_rate,
+        arrival_distribution=arrival_distribution,
+        max_iops=max_iops,
+        max_throughput_mbps=max_throughput_mbps,
+        throttle_scope=throttle_scope,
+        stages=stages,
         queue_limit=queue_limit,
         max_retries=max_retries,
         retry_backoff_base=retry_backoff_base,
         order=order,
+        list_workers=list_workers,
+        list_mode=list_mode,
+        metrics_listen=metrics_listen,
         unique_remote_names=unique_remote_names,
         warmup_sec=warmup_sec,
+        find_max=find_max,
+        find_max_by=find_max_by,
+        find_max_start=pick("find_max_start"),
+        find_max_limit=pick("find_max_limit"),
+        find_max_step_sec=float(pick("find_max_step_sec", default=30.0)),
+        slo_p99_ms=slo_p99_ms,
+        slo_error_rate=float(pick("slo_error_rate", default=0.01)),
         aws_cli_multipart_threshold=aws_cli_multipart_threshold,
         aws_cli_multipart_chunksize=aws_cli_multipart_chunksize,
         aws_cli_max_concurrent_requests=aws_cli_max_concurrent_requests,
@@ -86,20 +86,38 @@ FIELD_DEFS: List[FieldSpec] = [
     FieldSpec("endpoint", "endpoint (single)", "text"),
     FieldSpec("endpoints", "endpoints (через запятую)", "list"),
     FieldSpec("endpoint_mode", "endpoint_mode", "choice", choices=["round-robin", "random"]),
-    FieldSpec("client", "client", "choice", choices=["awscli"]),
+    FieldSpec("client", "client", "choice", choices=["awscli", "native", "s5cmd", "rclone"]),
+    FieldSpec("engine", "engine", "choice", choices=["threads", "asyncio"]),
     FieldSpec("access_key", "access_key", "text"),
     FieldSpec("secret_key", "secret_key", "password"),
     FieldSpec("aws_profile", "aws_profile", "text"),
     FieldSpec("threads", "threads", "int", allow_empty=False, min_value=1),
+    FieldSpec("processes", "processes", "int", allow_empty=False, min_value=1),
+    FieldSpec("agents", "agents (через запятую, для controller)", "list"),
     FieldSpec("report", "report", "text", allow_empty=False),
     FieldSpec("metrics", "metrics", "text", allow_empty=False),
+    FieldSpec("metrics_format", "metrics_format", "choice", choices=["csv", "binary"]),
+    FieldSpec("data_source", "data_source", "choice", choices=["files", "synthetic"]),
+    FieldSpec("synthetic_bytes", "synthetic_bytes (объём прохода synthetic)", "size"),
+    FieldSpec("synthetic_distribution", "synthetic_distribution (например, lognormal:median=16KB)", "text"),
     FieldSpec("infinite", "infinite", "bool"),
     FieldSpec("unique_remote_names", "unique_remote_names", "bool"),
     FieldSpec("mixed_read_ratio", "mixed_read_ratio", "float", min_value=0.0),
-    FieldSpec("pattern", "pattern", "choice", choices=["sustained", "bursty"]),
+    FieldSpec("pattern", "pattern", "choice", choices=["sustained", "bursty", "open-loop"]),
+    FieldSpec("arrival_rate", "arrival_rate (оп/с, для open-loop)", "float", min_value=0.0),
+    FieldSpec("arrival_distribution", "arrival_distribution", "choice", choices=["constant", "poisson"]),
+    FieldSpec("max_iops", "max_iops (оп/с, потолок)", "float", min_value=0.0),
+    FieldSpec("max_throughput_mbps", "max_throughput_mbps (MB/s, потолок)", "float", min_value=0.0),
+    FieldSpec("throttle_scope", "throttle_scope", "choice", choices=["global", "endpoint"]),
     FieldSpec("burst_duration_sec", "burst_duration_sec", "float", min_value=0.0),
     FieldSpec("burst_intensity_multiplier", "burst_intensity_multiplier", "float", min_value=1.0),
     FieldSpec("order", "order", "choice", choices=["sequential", "random"]),
+    FieldSpec("list_workers", "list_workers (потоков листинга для read)", "int", min_value=1),
+    FieldSpec("list_mode", "list_mode", "choice", choices=["range", "prefix"]),
+    FieldSpec("metrics_listen", "metrics_listen (адрес /metrics, например :9109)", "text"),
+    FieldSpec("find_max", "find_max (поиск предела под SLO)", "bool"),
+    FieldSpec("find_max_by", "find_max_by", "choice", choices=["threads", "rate"]),
+    FieldSpec("slo_p99_ms", "slo_p99_ms (мс, для find_max)", "float", min_value=0.0),
     FieldSpec("aws_cli_multipart_threshold", "aws_cli_multipart_threshold", "size"),
     FieldSpec("aws_cli_multipart_chunksize", "aws_cli_multipart_chunksize", "size"),
     FieldSpec(
@@ -115,6 +133,7 @@ FIELD_DEFS: List[FieldSpec] = [
 def build_default_config() -> Dict[str, Any]:
     return {
         "client": "awscli",
+        "engine": "threads",
         "bucket": "your-bucket-name",
         # По умолчанию ориентируемся на MinIO/S3 endpoint на 9080 порту
         "endpoint": DEFAULT_ENDPOINT,
@@ -124,6 +143,8 @@ def build_default_config() -> Dict[str, Any]:
         "secret_key": None,
         "aws_profile": None,
         "threads": 8,
+        "processes": 1,
+        "agents": [],
         "report": "out.json",
         "metrics": "out.csv",
         "infinite": False,
@@ -132,7 +153,15 @@ def build_default_config() -> Dict[str, Any]:
         "pattern": "sustained",
         "burst_duration_sec": 60.0,
         "burst_intensity_multiplier": 5.0,
+        "arrival_rate": None,
+        "arrival_distribution": "constant",
+        "max_iops": None,
+        "max_throughput_mbps": None,
+        "throttle_scope": "global",
         "order": "random",
+        "find_max": False,
+        "find_max_by": "threads",
+        "slo_p99_ms": None,
         "aws_cli_multipart_threshold": None,
         "aws_cli_multipart_chunksize": None,
         "aws_cli_max_concurrent_requests": None,
@@ -2,10 +2,17 @@
 
 build_dashboard(state) собирает renderable из снапшота состояния — рендеринг
 полностью отделён от логики executor'а: шапка с endpoint/bucket, прогресс,
-спарклайны RPS, последние операции с анимацией активных.
+спарклайны RPS, фазы латентности (p50/p99), последние операции с анимацией
+активных.
+listen_keys — чтение одиночных клавиш во время прогона (лимиты +/-).
 """
 from __future__ import annotations
 
+import os
+import sys
+import threading
+from collections.abc import Callable
+
 from rich import box
 from rich.console import Group
 from rich.panel import Panel
@@ -85,6 +92,13 @@ def _header(state: dict) -> Text:
     if state.get("pattern") == "bursty":
         line.append("  BURST" if state.get("burst_active") else "  пауза",
                     style="bold yellow" if state.get("burst_active") else "dim")
+    if state.get("stage"):
+        line.append(f"  стадия {state['stage']}", style="bold cyan")
+    if state.get("arrival_rate"):
+        line.append(f"  план {state['arrival_rate']:g} оп/с", style="cyan")
+    if state.get("limits"):
+        line.append(f"  лимит {state['limits']}", style="bold magenta")
+        line.append(" [+/-]", style="dim")
     if state.get("infinite"):
         line.append(f"  ∞ цикл {state.get('cycle_count', 0)}", style="magenta")
     if state.get("warmup_active"):
@@ -175,6 +189,22 @@ def _rates_block(state: dict) -> Group:
     return Group(rps_line, speed_line)
 
 
+def _phases_block(state: dict) -> Text | None:
+    """p50/p99 фаз латентности (dns … transfer) — строка на запись и на чтение."""
+    phases = state.get("phases") or {}
+    lines = Text()
+    for kind, icon, style in (("write", WRITE_ICON, WRITE_STYLE), ("read", READ_ICON, READ_STYLE)):
+        values = phases.get(kind)
+        if not values:
+            continue
+        if lines.plain:
+            lines.append("\n")
+        lines.append(f"{icon} p50/p99 мс ", style=f"bold {style}")
+        lines.append("  ".join(f"{phase} {p50:.1f}/{p99:.1f}" for phase, (p50, p99) in values.items()),
+                     style="dim")
+    return lines if lines.plain else None
+
+
 def _recent_ops_table(state: dict) -> Table | None:
     ops = state.get("recent_ops") or []
     if not ops:
@@ -218,6 +248,9 @@ def build_dashboard(state: dict) -> Panel:
         Text(),
         _rates_block(state),
     ]
+    phases = _phases_block(state)
+    if phases is not None:
+        parts.append(phases)
     recent = _recent_ops_table(state)
     if recent is not None:
         rule = Text("── операции ", style="dim")
@@ -236,3 +269,57 @@ def build_dashboard(state: dict) -> Panel:
         border_style="dim",
         padding=(0, 1),
     )
+
+
+def listen_keys(on_key: Callable[[str], None]) -> Callable[[], None] | None:
+    """Читает одиночные нажатия клавиш в фоновом потоке.
+
+    Терминал переводится в cbreak (Ctrl+C продолжает работать); возвращает
+    функцию остановки, которая восстанавливает терминал. None — stdin не
+    терминал, клавиши не читаются.
+    """
+    if not sys.stdin.isatty():
+        return None
+    done = threading.Event()
+    try:
+        import select
+        import termios
+        import tty
+    except ImportError:
+        import msvcrt
+
+        def poll_windows():
+            while not done.wait(0.1):
+                while msvcrt.kbhit():
+                    on_key(msvcrt.getwch())
+
+        thread = threading.Thread(target=poll_windows, daemon=True, name="keys")
+        thread.start()
+
+        def stop_windows():
+            done.set()
+            thread.join(timeout=1)
+
+        return stop_windows
+
+    fd = sys.stdin.fileno()
+    saved = termios.tcgetattr(fd)
+    tty.setcbreak(fd)
+
+    def poll_posix():
+        while not done.is_set():
+            ready, _, _ = select.select([fd], [], [], 0.2)
+            if ready:
+                key = os.read(fd, 1).decode("utf-8", "ignore")
+                if key:
+                    on_key(key)
+
+    thread = threading.Thread(target=poll_posix, daemon=True, name="keys")
+    thread.start()
+
+    def stop_posix():
+        done.set()
+        thread.join(timeout=1)
+        termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+    return stop_posix
@@ -3,13 +3,31 @@
 Файлы получают случайные размеры внутри диапазона своей группы и по умолчанию
 заполняются несжимаемыми данными: датасет из нулей одного размера давал
 ложно-высокие результаты на хранилищах с компрессией/дедупликацией.
+Несжимаемое содержимое — поток SHAKE128 в режиме счётчика от seed файла:
+быстрее os.urandom, не повторяется между файлами и блоками, а при заданном
+--seed датасет (имена, размеры, содержимое) одинаков на любой машине.
+
+Рядом с файлами dataset-create пишет манифест (MANIFEST_NAME): прогон читает
+список файлов одним чтением вместо обхода дерева со stat на каждый файл.
 """
+import bisect
+import csv
+import hashlib
+import json
+import math
+import multiprocessing
 import os
 import random
 import shutil
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Tuple
+from typing import Callable, Tuple
+
+try:  # numpy необязателен: без него размеры считаются тем же кодом поэлементно
+    import numpy as _np
+except ImportError:
+    _np = None
 
 # Utilities to parse sizes like "100MB", "1GB"
 UNITS = {"kb": 1024, "mb": 1024**2, "gb": 1024**3, "tb": 1024**4}
@@ -18,6 +36,19 @@ GROUP_NAMES = ["small", "medium", "large"]
 # Нижняя граница размеров первой группы — доля от её верхней границы
 SMALL_GROUP_LOWER_RATIO = 100
 _RANDOM_CHUNK = 1024 * 1024
+# Манифест датасета в корне data_dir: заголовок, затем по строке JSON на файл
+MANIFEST_NAME = ".s3flood-manifest.jsonl"
+MANIFEST_VERSION = 1
+# Распределения размеров; uniform — равномерно внутри групп small/medium/large
+DISTRIBUTIONS = ("uniform", "lognormal", "pareto", "zipf", "empirical")
+_DISTRIBUTION_DEFAULTS = {
+    "lognormal": {"median": 64 * 1024, "sigma": 1.5},
+    "pareto": {"alpha": 1.2},
+    "zipf": {"s": 1.1, "classes": 64},
+    "empirical": {},
+}
+_SIZE_PARAMS = {"median", "min", "max"}
+_SAMPLE_BATCH = 4096
 
 
 def parse_size(s: str) -> int:
@@ -47,14 +78,21 @@ def group_bounds(limits: Tuple[int, ...]) -> list[tuple[int, int]]:
     return bounds
 
 
-def write_random_file(path: Path, size: int) -> None:
-    """Создаёт файл заданного размера с несжимаемым содержимым."""
+def random_chunk(seed: bytes, index: int, size: int) -> bytes:
+    """Блок index несжимаемого потока файла: SHAKE128(seed || index), size байт."""
+    return hashlib.shake_128(seed + index.to_bytes(8, "little")).digest(size)
+
+
+def write_random_file(path: Path, size: int, seed: bytes | None = None) -> None:
+    """Создаёт файл заданного размера с несжимаемым содержимым из потока seed.
+
+    Без seed берётся случайный — содержимое не воспроизводится.
+    """
+    if seed is None:
+        seed = os.urandom(16)
     with open(path, "wb") as fh:
-        remaining = size
-        while remaining > 0:
-            chunk = os.urandom(min(_RANDOM_CHUNK, remaining))
-            fh.write(chunk)
-            remaining -= len(chunk)
+        for index, offset in enumerate(range(0, size, _RANDOM_CHUNK)):
+            fh.write(random_chunk(seed, index, min(_RANDOM_CHUNK, size - offset)))
 
 
 def write_zero_file(path: Path, size: int) -> None:
@@ -72,13 +110,249 @@ def plan_groups(target_bytes: int, min_counts: Tuple[int, int, int]):
     return alloc, base
 
 
+def fill_group(bytes_target: int, min_count: int, upper: int, add: Callable[[], int]) -> int:
+    """Добавляет объекты группы: сначала min_count, затем добор до bytes_target.
+
+    add() создаёт очередной объект и возвращает его размер; результат — число объектов.
+    """
+    total_bytes = 0
+    count = 0
+    for _ in range(min_count):
+        total_bytes += add()
+        count += 1
+    while total_bytes + upper <= bytes_target:
+        total_bytes += add()
+        count += 1
+    return count
+
+
+def load_histogram(path: str | Path) -> list[list[int]]:
+    """Гистограмма размеров из CSV: строки lower,upper,count (размеры — байты или '4KB').
+
+    Строка заголовка (нечисловая) и корзины с count 0 пропускаются. Файл
+    .json — дескриптор нагрузки s3flood profile-bucket (ключ histogram).
+    """
+    buckets: list[list[int]] = []
+    if str(path).lower().endswith(".json"):
+        with open(path, encoding="utf-8") as fh:
+            try:
+                rows = json.load(fh)["histogram"]
+                buckets = [[int(lo), int(hi), int(n)] for lo, hi, n in rows if n]
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"{path}: нет гистограммы (ожидается дескриптор profile-bucket)") from None
+        if not buckets:
+            raise ValueError(f"{path}: гистограмма пуста")
+        return buckets
+    with open(path, newline="", encoding="utf-8") as fh:
+        for lineno, row in enumerate(csv.reader(fh), start=1):
+            cells = [c.strip() for c in row if c.strip()]
+            if not cells or cells[0].startswith("#"):
+                continue
+            try:
+                lower, upper, count = parse_size(cells[0]), parse_size(cells[1]), int(float(cells[2]))
+            except (IndexError, ValueError):
+                if lineno == 1:
+                    continue  # заголовок
+                raise ValueError(f"{path}:{lineno}: ожидается lower,upper,count") from None
+            if lower < 0 or upper < lower or count < 0:
+                raise ValueError(f"{path}:{lineno}: некорректная корзина {lower}..{upper} ×{count}")
+            if count:
+                buckets.append([lower, upper, count])
+    if not buckets:
+        raise ValueError(f"{path}: гистограмма пуста")
+    return buckets
+
+
+def parse_distribution(spec, limits: Tuple[int, ...]) -> dict | None:
+    """Распределение размеров из 'имя:ключ=значение,...' или маппинга {name: ..., ...}.
+
+    None — uniform (равномерно внутри групп, как раньше). Остальные
+    распределения действуют на весь датасет в диапазоне [min, max] (по
+    умолчанию — границы групп), группа файла определяется по его размеру.
+    Результат самодостаточен (гистограмма empirical загружена в него) и
+    пишется в манифест.
+    """
+    if not spec:
+        return None
+    if isinstance(spec, str):
+        name, _, rest = spec.strip().partition(":")
+        params = {}
+        for item in filter(None, (p.strip() for p in rest.split(","))):
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise ValueError(f"distribution: ожидается ключ=значение, получено {item!r}")
+            params[key.strip()] = value.strip()
+    else:
+        params = dict(spec)
+        name = str(params.pop("name", ""))
+    name = name.strip().lower()
+    if name not in DISTRIBUTIONS:
+        raise ValueError(f"неизвестное distribution {name!r} ({' | '.join(DISTRIBUTIONS)})")
+    if name == "uniform":
+        return None
+    unknown = set(params) - set(_DISTRIBUTION_DEFAULTS[name]) - {"min", "max"} - ({"path"} if name == "empirical" else set())
+    if unknown:
+        raise ValueError(f"distribution {name}: неизвестные параметры {', '.join(sorted(unknown))}")
+    dist: dict = {"name": name, **_DISTRIBUTION_DEFAULTS[name]}
+    for key, value in params.items():
+        if key in _SIZE_PARAMS:
+            dist[key] = parse_size(value)
+        elif key == "path":
+            dist[key] = str(value)
+        else:
+            dist[key] = float(value)
+    if name == "empirical":
+        if "histogram" not in dist:
+            if "path" not in dist:
+                raise ValueError("distribution empirical: нужен path=гистограмма.csv")
+            dist["histogram"] = load_histogram(dist["path"])
+        dist.setdefault("min", min(b[0] for b in dist["histogram"]))
+        dist.setdefault("max", max(b[1] for b in dist["histogram"]))
+    dist.setdefault("min", max(1, limits[0] // SMALL_GROUP_LOWER_RATIO))
+    dist.setdefault("max", limits[-1])
+    if "classes" in dist:
+        dist["classes"] = int(dist["classes"])
+    if dist["min"] < 0 or dist["max"] < dist["min"]:
+        raise ValueError(f"distribution {name}: некорректный диапазон {dist['min']}..{dist['max']}")
+    for key in ("sigma", "alpha", "s", "classes"):
+        if key in dist and dist[key] <= 0:
+            raise ValueError(f"distribution {name}: {key} должен быть > 0")
+    return dist
+
+
+def _apply(formula, *columns):
+    """formula(xp, *колонки) над массивами numpy (векторно) или поэлементно через math."""
+    if _np is not None:
+        return formula(_np, *(_np.asarray(c, dtype=_np.float64) for c in columns))
+    return [formula(math, *values) for values in zip(*columns)]
+
+
+def _bucket_index(cdf: list[float], u):
+    """Номер корзины по накопленным долям cdf для равномерных u."""
+    last = len(cdf) - 1
+    if _np is not None:
+        return _np.minimum(_np.searchsorted(_np.asarray(cdf), u, side="right"), last)
+    return [min(bisect.bisect_right(cdf, x), last) for x in u]
+
+
+def _cdf(weights) -> list[float]:
+    weights = list(weights)
+    total = float(sum(weights))
+    acc = 0.0
+    out = []
+    for w in weights:
+        acc += w
+        out.append(acc / total)
+    return out
+
+
+def sample_sizes(dist: dict, count: int, rng: random.Random) -> list[int]:
+    """count размеров из распределения dist (см. parse_distribution).
+
+    Равномерные числа берутся из rng пачкой — при одном seed выборка та же,
+    преобразование в размеры идёт векторно (numpy) или поэлементно. lognormal
+    обрезается по [min, max], pareto и zipf усечены точно, empirical выбирает
+    корзину по count и размер равномерно внутри неё.
+    """
+    lo, hi = dist["min"], dist["max"]
+    u1 = [rng.random() for _ in range(count)]
+    u2 = [rng.random() for _ in range(count)]
+    name = dist["name"]
+    if name == "lognormal":
+        # Box–Muller: z ~ N(0, 1), размер = median · e^(sigma·z)
+        median, sigma = dist["median"], dist["sigma"]
+        values = _apply(lambda xp, a, b: median * xp.exp(
+            sigma * xp.sqrt(-2.0 * xp.log(1.0 - a)) * xp.cos(2.0 * xp.pi * b)), u1, u2)
+    elif name == "pareto":
+        # обратная функция усечённого на [min, max] Парето
+        alpha = dist["alpha"]
+        low = max(lo, 1)
+        tail = 1.0 - (low / max(hi, low)) ** alpha
+        values = _apply(lambda xp, a: low / (1.0 - a * tail) ** (1.0 / alpha), u1)
+    else:
+        if name == "zipf":
+            # классы размеров с лог-шагом от min до max, P(класс k) ∝ 1/k^s — мелкие чаще
+            classes, s = dist["classes"], dist["s"]
+            low = max(lo, 1)
+            edges = [low * (max(hi, low) / low) ** (i / classes) for i in range(classes + 1)]
+            buckets = [(edges[i], edges[i + 1]) for i in range(classes)]
+            cdf = _cdf(1.0 / (k ** s) for k in range(1, classes + 1))
+        else:  # empirical
+            buckets = [(b[0], b[1]) for b in dist["histogram"]]
+            cdf = _cdf(b[2] for b in dist["histogram"])
+        index = _bucket_index(cdf, u1)
+        if _np is not None:
+            bounds = _np.asarray(buckets, dtype=_np.float64)
+            values = bounds[index, 0] + _np.asarray(u2) * (bounds[index, 1] - bounds[index, 0])
+        else:
+            values = [buckets[i][0] + b * (buckets[i][1] - buckets[i][0]) for i, b in zip(index, u2)]
+    if _np is not None:
+        return _np.clip(_np.rint(values), lo, hi).astype(_np.int64).tolist()
+    return [min(max(int(round(v)), lo), hi) for v in values]
+
+
+def size_group(size: int, limits: Tuple[int, ...]) -> str:
+    """Группа small/medium/large по верхним границам limits."""
+    for name, upper in zip(GROUP_NAMES, limits):
+        if size <= upper:
+            return name
+    return GROUP_NAMES[len(limits) - 1]
+
+
+def plan_sizes(
+    target_bytes: int,
+    min_counts: Tuple[int, int, int],
+    limits: Tuple[int, ...],
+    rng: random.Random,
+    distribution: dict | None = None,
+) -> list[tuple[str, int]]:
+    """Пары (группа, размер) на target_bytes — для датасета и data_source: synthetic.
+
+    Без distribution — равномерно внутри групп с долями plan_groups и
+    минимумом min_counts. С distribution размеры выбираются пачками, пока
+    объём не наберётся: не помещающийся в остаток размер пропускается.
+    """
+    planned: list[tuple[str, int]] = []
+    if distribution is None:
+        alloc, _ = plan_groups(target_bytes, min_counts)
+        for gi, (bytes_target, minc, (lower, upper)) in enumerate(zip(alloc, min_counts, group_bounds(limits))):
+            def add() -> int:
+                size = plan_file_sizes(lower, upper, 1, rng)[0]
+                planned.append((GROUP_NAMES[gi], size))
+                return size
+
+            fill_group(bytes_target, minc, upper, add)
+        return planned
+    total = 0
+    misses = 0
+    # хвост распределения может не помещаться в остаток — конец, когда остаток
+    # меньше min или подряд пачка промахов
+    while total < target_bytes - distribution["min"] and misses < _SAMPLE_BATCH:
+        for size in sample_sizes(distribution, _SAMPLE_BATCH, rng):
+            if total + size > target_bytes:
+                misses += 1
+                if misses >= _SAMPLE_BATCH:
+                    break
+                continue
+            misses = 0
+            planned.append((size_group(size, limits), size))
+            total += size
+            if total >= target_bytes - distribution["min"]:
+                break
+    return planned
+
+
 def ensure_dir(p: Path):
     p.mkdir(parents=True, exist_ok=True)
 
 
+def content_seed(rng: random.Random) -> bytes:
+    """Seed содержимого очередного файла из общего генератора датасета."""
+    return rng.getrandbits(128).to_bytes(16, "little")
+
+
 def make_seed_files(base_dir: Path, bounds, rng: random.Random, fill: str, seeds_per_group: int = 8):
     """Создаёт несколько seed-файлов разных размеров на группу (для symlink-режима)."""
-    write_file = write_random_file if fill == "random" else write_zero_file
     seeds: list[list[Path]] = []
     for gi, (lower, upper) in enumerate(bounds):
         gdir = base_dir / f"seed_g{gi}"
@@ -86,13 +360,116 @@ def make_seed_files(base_dir: Path, bounds, rng: random.Random, fill: str, seeds
         group_seeds = []
         for si, size in enumerate(plan_file_sizes(lower, upper, seeds_per_group, rng)):
             f = gdir / f"seed_{si}.bin"
+            seed = content_seed(rng)
             if not f.exists() or f.stat().st_size != size:
-                write_file(f, size)
+                if fill == "random":
+                    write_random_file(f, size, seed)
+                else:
+                    write_zero_file(f, size)
             group_seeds.append(f)
         seeds.append(group_seeds)
     return seeds
 
 
+def _write_planned(item: tuple[str, int, str, bytes]) -> None:
+    """Создаёт запланированный файл (выполняется в пуле --jobs)."""
+    path, size, fill, seed = item
+    if fill == "random":
+        write_random_file(Path(path), size, seed)
+    else:
+        write_zero_file(Path(path), size)
+
+
+def scan_dataset(data_dir: Path) -> list[dict]:
+    """Один обход os.scandir: записи {path, size, group} со stat на каждый файл один раз.
+
+    Скрытые файлы и каталоги (в том числе манифест) пропускаются, symlink на
+    файл учитывается размером цели; group — первый компонент относительного пути.
+    """
+    entries: list[dict] = []
+    stack = [(data_dir, "")]
+    while stack:
+        current, rel = stack.pop()
+        try:
+            it = os.scandir(current)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                rel_path = f"{rel}{entry.name}"
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, rel_path + "/"))
+                        continue
+                    if not entry.is_file():
+                        continue
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                entries.append({"path": rel_path, "size": size, "group": rel_path.split("/", 1)[0]})
+    return entries
+
+
+def write_manifest(data_dir: Path, entries: list[dict], meta: dict | None = None) -> Path:
+    """Пишет манифест атомарно (через временный файл и rename).
+
+    meta (seed, distribution последнего dataset-create) попадает в заголовок.
+    """
+    path = data_dir / MANIFEST_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    total = sum(e["size"] for e in entries)
+    header = {"s3flood_manifest": MANIFEST_VERSION, "files": len(entries), "bytes": total, **(meta or {})}
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(json.dumps(header) + "\n")
+        for e in entries:
+            fh.write(json.dumps(e, separators=(",", ":")) + "\n")
+    os.replace(tmp, path)
+    # rename обновил mtime каталога — манифест должен быть не старше его
+    os.utime(path)
+    return path
+
+
+def load_manifest(data_dir: Path) -> list[dict] | None:
+    """Записи манифеста или None, если его нет, он повреждён или устарел.
+
+    Устаревшим считается манифест старше data_dir или любого из его
+    подкаталогов (групп): файлы добавляли или удаляли после dataset-create.
+    """
+    path = data_dir / MANIFEST_NAME
+    try:
+        mtime = path.stat().st_mtime_ns
+        if os.stat(data_dir).st_mtime_ns > mtime:
+            return None
+        with os.scandir(data_dir) as it:
+            for entry in it:
+                if entry.is_dir() and entry.stat().st_mtime_ns > mtime:
+                    return None
+        with open(path, "rb") as fh:
+            lines = fh.read().splitlines()
+    except OSError:
+        return None
+    try:
+        header = json.loads(lines[0])
+        if header.get("s3flood_manifest") != MANIFEST_VERSION or header.get("files") != len(lines) - 1:
+            return None
+        return [json.loads(line) for line in lines[1:]]
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+def load_dataset(data_dir: Path) -> tuple[list[dict], bool]:
+    """Файлы датасета: из манифеста, если он актуален, иначе обходом каталога.
+
+    Второй элемент — True, если список взят из манифеста.
+    """
+    entries = load_manifest(data_dir)
+    if entries is not None:
+        return entries, True
+    return scan_dataset(data_dir), False
+
+
 def plan_and_generate(
     path: str,
     target_bytes: str,
@@ -101,7 +478,16 @@ def plan_and_generate(
     group_limits: str,
     safety_ratio: float,
     fill: str = "random",
+    jobs: int = 1,
+    seed: int | None = None,
+    distribution=None,
 ):
+    """Создаёт датасет под path/data; jobs > 1 — файлы пишет пул процессов.
+
+    Сначала по seed планируется весь датасет (имена, размеры, seed содержимого),
+    затем файлы создаются в любом порядке — результат от jobs не зависит.
+    distribution — спецификация для parse_distribution (None — uniform).
+    """
     base = Path(path).expanduser()
     ensure_dir(base)
     base = base.resolve()
@@ -109,8 +495,12 @@ def plan_and_generate(
     mins = tuple(int(x) for x in min_counts.split(","))
     limits = tuple(parse_size(x) for x in group_limits.split(","))
     bounds = group_bounds(limits)
-    rng = random.Random()
-    write_file = write_random_file if fill == "random" else write_zero_file
+    dist = parse_distribution(distribution, limits)
+    if dist is not None and use_symlinks:
+        raise ValueError("use_symlinks несовместим с distribution: размеры задают seed-файлы групп")
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(63)
+    rng = random.Random(seed)
 
     if target_bytes == "auto":
         st = shutil.disk_usage(base)
@@ -118,34 +508,61 @@ def plan_and_generate(
     else:
         target = parse_size(target_bytes)
 
-    alloc, _ = plan_groups(target, mins)
-    seeds = make_seed_files(base / "seeds", bounds, rng, fill) if use_symlinks else None
-
     data_dir = base / "data"
+    # Дозапись в существующий датасет: к новым файлам добавляются записи
+    # прежнего манифеста, а без него — обход каталога после генерации
+    fresh = not data_dir.exists() or not any(data_dir.iterdir())
+    previous = [] if fresh else load_manifest(data_dir)
     ensure_dir(data_dir)
+    for name in GROUP_NAMES[:len(limits)]:
+        ensure_dir(data_dir / name)
+    entries: list[dict] = []
+    planned: list[tuple[str, int, str, bytes]] = []
 
-    for gi, (bytes_target, minc, (lower, upper)) in enumerate(zip(alloc, mins, bounds)):
-        gdir = data_dir / GROUP_NAMES[gi]
-        ensure_dir(gdir)
-        total_bytes = 0
-        count = 0
-
-        def add_file() -> int:
-            key = gdir / f"{uuid.uuid4()}.bin"
-            if use_symlinks:
-                seed = rng.choice(seeds[gi])
-                os.symlink(os.path.relpath(seed, start=gdir), key)
-                return seed.stat().st_size
-            size = plan_file_sizes(lower, upper, 1, rng)[0]
-            write_file(key, size)
-            return size
-
-        # минимальное количество файлов, затем добор до целевого объёма группы
-        for _ in range(minc):
-            total_bytes += add_file()
-            count += 1
-        while total_bytes + upper <= bytes_target:
-            total_bytes += add_file()
-            count += 1
-
-    print(f"Dataset prepared under {data_dir}")
+    def add_entry(group: str, key: Path, size: int, content: str) -> None:
+        entries.append({"path": f"{group}/{key.name}", "size": size, "group": group, "content": content})
+
+    if use_symlinks:
+        alloc, _ = plan_groups(target, mins)
+        seeds = make_seed_files(base / "seeds", bounds, rng, fill)
+        for gi, (bytes_target, minc, (lower, upper)) in enumerate(zip(alloc, mins, bounds)):
+            gdir = data_dir / GROUP_NAMES[gi]
+
+            def add_link() -> int:
+                key = gdir / f"{uuid.UUID(int=rng.getrandbits(128), version=4)}.bin"
+                seed_file = rng.choice(seeds[gi])
+                if not os.path.lexists(key):
+                    os.symlink(os.path.relpath(seed_file, start=gdir), key)
+                size = seed_file.stat().st_size
+                add_entry(GROUP_NAMES[gi], key, size, seed_file.relative_to(base).as_posix())
+                return size
+
+            fill_group(bytes_target, minc, upper, add_link)
+    else:
+        for group, size in plan_sizes(target, mins, limits, rng, dist):
+            key = data_dir / group / f"{uuid.UUID(int=rng.getrandbits(128), version=4)}.bin"
+            file_seed = content_seed(rng)
+            planned.append((str(key), size, fill, file_seed))
+            add_entry(group, key, size, f"shake128:{file_seed.hex()}" if fill == "random" else fill)
+
+    if jobs > 1 and len(planned) > 1:
+        # Крупные файлы первыми: пул не ждёт в конце одного большого файла
+        planned.sort(key=lambda item: item[1], reverse=True)
+        # spawn, как у --processes прогона: под интерактивным меню уже работают потоки
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for _ in pool.map(_write_planned, planned, chunksize=max(1, len(planned) // (jobs * 16))):
+                pass
+    else:
+        for item in planned:
+            _write_planned(item)
+
+    if previous is None:
+        manifest_entries = scan_dataset(data_dir)
+    else:
+        # Тот же seed повторно создаёт те же файлы — записи не дублируются
+        new_paths = {e["path"] for e in entries}
+        manifest_entries = [e for e in previous if e["path"] not in new_paths] + entries
+    meta = {"seed": seed, "distribution": dist or {"name": "uniform", "group_limits": list(limits),
+                                                   "min_counts": list(mins)}}
+    manifest = write_manifest(data_dir, manifest_entries, meta)
+    print(f"Dataset prepared under {data_dir} (manifest: {manifest.name}, seed: {seed})")
@@ -0,0 +1,120 @@
+"""Распределённый прогон: s3flood controller и s3flood agent.
+
+Агент слушает TCP-порт (multiprocessing.connection с authkey), получает от
+контроллера настройки прогона и момент синхронного старта, исполняет прогон
+без дашборда и стримит операции обратно тем же протоколом, что и дочерние
+процессы processes > 1 (ShardSink). Контроллер собирает их в один Metrics:
+общий CSV, отчёт и дашборд.
+"""
+from __future__ import annotations
+
+import os
+import time
+from argparse import Namespace
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+from .app_settings import get_dataset_dir
+
+DEFAULT_AGENT_PORT = 9700
+AUTHKEY_ENV = "S3FLOOD_AGENT_KEY"
+
+
+def parse_agent_address(address: str, default_host: str = "127.0.0.1") -> tuple[str, int]:
+    """'host:port', ':port' или 'host' → (host, port)."""
+    host, sep, port = address.strip().rpartition(":")
+    if not sep:
+        return address.strip() or default_host, DEFAULT_AGENT_PORT
+    try:
+        return host or default_host, int(port)
+    except ValueError:
+        raise ValueError(f"некорректный адрес агента: {address!r}") from None
+
+
+def resolve_authkey(value: str | bytes | None) -> bytes:
+    """Ключ аутентификации агента: аргумент или переменная S3FLOOD_AGENT_KEY.
+
+    Без ключа агент не запускается: по соединению приходят pickle-сообщения.
+    """
+    if value is None:
+        value = os.environ.get(AUTHKEY_ENV)
+    if not value:
+        raise SystemExit(f"agent: задайте ключ --authkey или переменную {AUTHKEY_ENV}")
+    return value.encode() if isinstance(value, str) else value
+
+
+def connect_agents(
+    agents: list[str], settings: dict, authkey: str | bytes | None, start_delay: float = 2.0,
+) -> tuple[list, float]:
+    """Подключается к агентам и рассылает им прогон с общим моментом старта.
+
+    Возвращает соединения (в порядке agents) и момент старта по часам контроллера.
+    Каждому агенту уходят текущие часы контроллера — по ним агент вычисляет
+    поправку к своим часам, и отметки операций приходят уже в часах контроллера.
+    """
+    key = resolve_authkey(authkey)
+    conns = []
+    try:
+        for address in agents:
+            try:
+                conns.append(Client(parse_agent_address(address), authkey=key))
+            except (OSError, AuthenticationError) as exc:
+                raise SystemExit(f"controller: агент {address} недоступен: {exc}") from exc
+        start_at = time.time() + max(start_delay, 0.0)
+        for index, conn in enumerate(conns):
+            now = time.time()
+            conn.send(("run", settings, now, start_at - now, index, len(conns)))
+    except BaseException:
+        for conn in conns:
+            conn.close()
+        raise
+    return conns, start_at
+
+
+def serve_agent(listener: Listener, data_dir: str | None = None, once: bool = False) -> None:
+    """Цикл агента: принимает прогоны контроллера по одному.
+
+    data_dir — датасет этой машины (по умолчанию dataset_dir из .s3flood.yml,
+    иначе путь из настроек контроллера).
+    """
+    from .executor import Shard, run_profile
+
+    while True:
+        try:
+            conn = listener.accept()
+        except (OSError, AuthenticationError) as exc:
+            print(f"agent: отклонено подключение: {exc}", flush=True)
+            continue
+        try:
+            message = conn.recv()
+            received = time.time()
+            if not (isinstance(message, tuple) and message and message[0] == "run"):
+                continue
+            _, settings, controller_now, start_in, index, count = message
+            args = Namespace(**settings)
+            args.data_dir = data_dir or get_dataset_dir() or args.data_dir
+            print(
+                f"agent: прогон {args.profile} от {listener.last_accepted}, "
+                f"доля {index + 1}/{count}, старт через {start_in:.1f} с",
+                flush=True,
+            )
+            time.sleep(max(received + start_in - time.time(), 0.0))
+            shard = Shard(conn, index=index, count=count, clock_offset=controller_now - received)
+            run_profile(args, shard=shard)
+            print("agent: прогон завершён", flush=True)
+        except (EOFError, OSError) as exc:
+            print(f"agent: соединение с контроллером потеряно: {exc}", flush=True)
+        finally:
+            conn.close()
+        if once:
+            return
+
+
+def run_agent(listen: str, authkey: str | None = None, data_dir: str | None = None) -> None:
+    """Точка входа s3flood agent."""
+    address = parse_agent_address(listen, default_host="0.0.0.0")
+    with Listener(address, authkey=resolve_authkey(authkey)) as listener:
+        print(f"agent: слушаю {address[0]}:{listener.address[1]}", flush=True)
+        try:
+            serve_agent(listener, data_dir=data_dir)
+        except KeyboardInterrupt:
+            print("\nagent: остановлен", flush=True)
@@ -1,25 +1,32 @@
-import json, time, queue, threading, subprocess, os, socket, random, uuid, signal
+import argparse, asyncio, itertools, json, time, queue, threading, subprocess, os, socket, random, uuid, signal, sys, zlib
 from pathlib import Path
 from collections import deque
 from dataclasses import dataclass
 
+from .dataset import load_dataset, plan_sizes
 from .runner import (
-    _terminate_all_processes,
-    aws_cp_download,
-    aws_cp_upload,
-    aws_list_objects,
+    LIST_PAGE_SIZE,
+    ListingError,
+    make_runner,
+    native_parallel_pages,
     retry_with_backoff,
+    retry_with_backoff_async,
 )
+from .s3client import SyntheticObject
+from .throttle import Limiter
+from .exporter import MetricsExporter
+from .oplog import MetricsBinaryWriter
 from .metrics import (
+    PHASES,
+    LatencyHistogram,
     MetricsCsvWriter,
+    OpStore,
     RateWindow,
     build_timeline,
     classify_error,
-    summarize_latencies,
-    summarize_speeds,
 )
 
-# Minimal executor with AWS CLI runner only (v1)
+# Executor: aws CLI (по процессу на операцию) или нативный клиент in-process
 
 # Определяем, поддерживает ли терминал ANSI цвета
 # На Windows проверяем переменные окружения и версию терминала
@@ -76,7 +83,7 @@ def format_bytes(num_bytes: int) -> str:
 
 @dataclass
 class Job:
-    path: Path
+    path: Path | SyntheticObject  # SyntheticObject — data_source: synthetic
     size: int
     group: str
     endpoint: str | None = None  # Привязанный endpoint для кластерного режима
@@ -93,16 +100,20 @@ def make_remote_key(filename: str, unique: bool) -> str:
 
 
 class Metrics:
-    def __init__(self, metrics_csv: str, report_json: str, warmup_sec: float = 0.0):
+    def __init__(self, metrics_csv: str, report_json: str, warmup_sec: float = 0.0,
+                 metrics_format: str = "csv"):
         self.csv_path = metrics_csv
         self.json_path = report_json
         self._lock = threading.Lock()
-        self.ops = []  # per-op tuples: (op, start, end, nbytes, ok, lat_ms)
+        self.ops = OpStore()  # колонки (op, start, end, nbytes, ok, lat_ms)
         self.window = RateWindow()
-        self._writer = MetricsCsvWriter(metrics_csv)
+        # binary — журнал фиксированной ширины (oplog) вместо CSV
+        self._writer = (MetricsBinaryWriter if metrics_format == "binary" else MetricsCsvWriter)(metrics_csv)
         self._start = time.time()
         self.warmup_until = self._start + max(warmup_sec or 0.0, 0.0)
         self.warmup_ops = 0
+        # Окна стадий (stages) для разбивки отчёта: {name, threads, ramp, start, end}
+        self.stages: list[dict] = []
         self.client_overhead_ms: float | None = None
         self.meta: dict | None = None
         self.error_counts: dict[str, int] = {}
@@ -111,8 +122,18 @@ class Metrics:
         self.read_ops_ok = 0
         self.write_ops_ok = 0
         self.err_ops = 0
-        self.write_latencies_ms: list[int] = []
-        self.read_latencies_ms: list[int] = []
+        # Фиксированная память вместо списков латентностей: на --infinite списки росли без предела
+        self.write_latency = LatencyHistogram()
+        self.read_latency = LatencyHistogram()
+        # Open-loop: латентность от планового старта (включает ожидание свободного воркера)
+        self.write_latency_intended = LatencyHistogram()
+        self.read_latency_intended = LatencyHistogram()
+        # Фазы латентности успешных операций нативного клиента: {write|read: {фаза: гистограмма}}
+        self.phase_latency: dict[str, dict[str, LatencyHistogram]] = {"write": {}, "read": {}}
+        # Ряды экспортёра Prometheus: пишутся под self._lock, читаются снимками без него
+        self.op_counts: dict[tuple[str, str, str], int] = {}  # (op, endpoint, ok|err)
+        self.op_bytes: dict[tuple[str, str], int] = {}
+        self.endpoint_latency: dict[tuple[str, str], LatencyHistogram] = {}
         self.last_upload = None
         self.last_download = None
         self.recent_ops = deque(maxlen=30)  # Буфер последних операций для дашборда
@@ -154,6 +175,7 @@ class Metrics:
         filename: str | None = None, recent_id: int | None = None,
         endpoint: str | None = None, thread_id: int | None = None,
         attempt: int | None = None, size_group: str | None = None,
+        intended: float | None = None, phases: dict[str, float] | None = None,
     ):
         lat_ms = int((end-start)*1000)
         is_warmup = self.warmup_until > self._start and end < self.warmup_until
@@ -161,16 +183,40 @@ class Metrics:
             ts_start=start, ts_end=end, op=op, nbytes=nbytes, ok=ok,
             latency_ms=lat_ms, error=err, endpoint=endpoint,
             thread_id=thread_id, attempt=attempt, size_group=size_group,
+            ts_intended=intended, phases=phases,
         )
+        if not is_warmup:
+            # у окна свои блокировки по полосам — не держим ради него общий lock
+            self.window.add(ts=end, op=op, nbytes=nbytes, ok=ok)
         with self._lock:
             if not is_warmup:
-                self.ops.append((op, start, end, nbytes, ok, lat_ms))
-                self.window.add(ts=end, op=op, nbytes=nbytes, ok=ok)
+                self.ops.append(op, start, end, nbytes, ok, lat_ms)
+                series = (op, endpoint or "")
+                counted = (*series, "ok" if ok else "err")
+                self.op_counts[counted] = self.op_counts.get(counted, 0) + 1
                 if ok:
+                    self.op_bytes[series] = self.op_bytes.get(series, 0) + nbytes
+                    hist = self.endpoint_latency.get(series)
+                    if hist is None:
+                        hist = self.endpoint_latency[series] = LatencyHistogram()
+                    hist.record(lat_ms)
                     if op == "download":
-                        self.read_latencies_ms.append(lat_ms)
+                        self.read_latency.record(lat_ms)
                     elif op == "upload":
-                        self.write_latencies_ms.append(lat_ms)
+                        self.write_latency.record(lat_ms)
+                    if intended is not None:
+                        lat_intended_ms = max(end - intended, 0.0) * 1000
+                        if op == "download":
+                            self.read_latency_intended.record(lat_intended_ms)
+                        elif op == "upload":
+                            self.write_latency_intended.record(lat_intended_ms)
+                    if phases and op in ("upload", "download"):
+                        per_phase = self.phase_latency["read" if op == "download" else "write"]
+                        for phase, value in phases.items():
+                            hist = per_phase.get(phase)
+                            if hist is None:
+                                hist = per_phase[phase] = LatencyHistogram()
+                            hist.record(value)
             else:
                 self.warmup_ops += 1
             entry = None
@@ -231,81 +277,64 @@ class Metrics:
             return data["lat_ms"]
         return None
 
-    def get_file_stats(self, op_type="upload"):
-        """Возвращает статистику по файлам: ТОП10 больших, ТОП10 маленьких, средняя скорость."""
-        file_stats = {}  # key: (bytes, count, total_time_ms, speeds)
+    def phase_summary(self) -> dict:
+        """Сводка фаз латентности: {write|read: {фаза: summary}} в порядке PHASES."""
         with self._lock:
-            for op, start, end, nbytes, ok, lat_ms in self.ops:
-                if op == op_type and ok:
-                    if nbytes not in file_stats:
-                        file_stats[nbytes] = {"count": 0, "total_time_ms": 0, "speeds": []}
-                    file_stats[nbytes]["count"] += 1
-                    file_stats[nbytes]["total_time_ms"] += lat_ms
-                    if lat_ms > 0:
-                        speed_mbps = (nbytes / 1024 / 1024) / (lat_ms / 1000)
-                        file_stats[nbytes]["speeds"].append(speed_mbps)
-        
-        if not file_stats:
-            return None, None, None
-
-        # ТОП10 маленьких/больших по уникальному размеру файла
-        sorted_by_size = sorted(file_stats.items(), key=lambda x: x[0])
-        total_unique_sizes = len(sorted_by_size)
-        if total_unique_sizes <= 1:
-            top10_small = sorted_by_size
-            top10_large = sorted_by_size
-        elif total_unique_sizes <= 10:
-            mid = total_unique_sizes // 2
-            top10_small = sorted_by_size[:mid] if mid > 0 else sorted_by_size[:1]
-            top10_large = sorted_by_size[mid:] if mid < total_unique_sizes else sorted_by_size[-1:]
-        else:
-            top10_small = sorted_by_size[:10]
-            top10_large = sorted_by_size[-10:]
-
-        def size_entry(size_bytes, stats):
-            entry = {"size_bytes": size_bytes, "count": stats["count"]}
-            entry.update(summarize_speeds(stats["speeds"]))
-            return entry
-
-        small_stats = [size_entry(size, st) for size, st in top10_small]
-        large_stats = [size_entry(size, st) for size, st in top10_large]
+            return {
+                kind: {phase: per_phase[phase].summary() for phase in PHASES if phase in per_phase}
+                for kind, per_phase in self.phase_latency.items() if per_phase
+            }
 
-        all_speeds = []
-        for stats in file_stats.values():
-            all_speeds.extend(stats["speeds"])
-        overall = summarize_speeds(all_speeds)
+    def phase_quantiles(self, qs=(0.5, 0.99)) -> dict:
+        """Квантили фаз для дашборда: {write|read: {фаза: [значения qs]}}."""
+        with self._lock:
+            return {
+                kind: {phase: [per_phase[phase].quantile(q) for q in qs]
+                       for phase in PHASES if phase in per_phase}
+                for kind, per_phase in self.phase_latency.items() if per_phase
+            }
 
-        return small_stats, large_stats, overall
+    def get_file_stats(self, op_type="upload"):
+        """Возвращает статистику по файлам: ТОП10 больших, ТОП10 маленьких, средняя скорость."""
+        with self._lock:
+            return self.ops.file_stats(op_type)
 
     def close(self):
         self._writer.close()
 
+    def stage_breakdown(self, now: float) -> list[dict]:
+        """Пропускная способность и латентность по стадиям; операция — в стадии своего начала."""
+        result = []
+        for stage in self.stages:
+            with self._lock:
+                stats = self.ops.window_stats(stage["start"], stage["end"])
+            # Последняя стадия могла оборваться (Ctrl+C): делим на фактическую длительность
+            duration = max(min(stage["end"], now) - stage["start"], 1e-6)
+            ok_ops = stats["write_ok_ops"] + stats["read_ok_ops"]
+            result.append({
+                "name": stage["name"],
+                "threads": stage["threads"],
+                "ramp": stage["ramp"],
+                "offset_sec": stage["start"] - self.stages[0]["start"],
+                "duration_sec": duration,
+                "ops_per_sec": ok_ops / duration,
+                "write_MBps": stats["write_bytes"] / 1024 / 1024 / duration,
+                "read_MBps": stats["read_bytes"] / 1024 / 1024 / duration,
+                **stats,
+            })
+        return result
+
     def finalize(self):
         now = time.time()
         wall_clock = max(now - self._start, 1e-6)
 
         # Активная длительность — по временным меткам операций, а не wall clock:
         # при простоях/паузах wall clock многократно завышал длительность прогона
-        write_duration = 0.0
-        read_duration = 0.0
-        active_duration = 0.0
-
-        if self.ops:
-            ok_ops = [op for op in self.ops if op[4]]  # (op, start, end, nbytes, ok, lat_ms)
-            span_ops = ok_ops or self.ops
-            active_duration = max(
-                max(op[2] for op in span_ops) - min(op[1] for op in span_ops), 1e-6
-            )
-            write_ops = [op for op in ok_ops if op[0] == "upload"]
-            read_ops = [op for op in ok_ops if op[0] == "download"]
-            if write_ops:
-                write_duration = max(
-                    max(op[2] for op in write_ops) - min(op[1] for op in write_ops), 1e-6
-                )
-            if read_ops:
-                read_duration = max(
-                    max(op[2] for op in read_ops) - min(op[1] for op in read_ops), 1e-6
-                )
+        with self._lock:
+            spans = self.ops.spans()
+        active_duration = spans["all"]
+        write_duration = spans["upload"]
+        read_duration = spans["download"]
 
         if write_duration == 0.0 and self.write_bytes > 0:
             write_duration = wall_clock
@@ -340,14 +369,32 @@ class Metrics:
             out["timeline"] = build_timeline(self.ops)
 
         latency = {}
-        write_lat = summarize_latencies(self.write_latencies_ms)
-        read_lat = summarize_latencies(self.read_latencies_ms)
+        with self._lock:
+            write_lat = self.write_latency.summary()
+            read_lat = self.read_latency.summary()
+            write_intended = self.write_latency_intended.summary()
+            read_intended = self.read_latency_intended.summary()
         if write_lat:
             latency["write"] = write_lat
         if read_lat:
             latency["read"] = read_lat
         if latency:
             out["latency"] = latency
+        # Open-loop: latency — от фактического старта, latency_intended — от планового
+        latency_intended = {}
+        if write_intended:
+            latency_intended["write"] = write_intended
+        if read_intended:
+            latency_intended["read"] = read_intended
+        if latency_intended:
+            out["latency_intended"] = latency_intended
+        # Разбивка латентности по фазам запроса (только нативный клиент)
+        latency_phases = self.phase_summary()
+        if latency_phases:
+            out["latency_phases"] = latency_phases
+
+        if self.stages:
+            out["stages"] = self.stage_breakdown(now)
 
         for op_type, key in (("upload", "write_file_analysis"), ("download", "read_file_analysis")):
             small_stats, large_stats, overall = self.get_file_stats(op_type)
@@ -365,35 +412,247 @@ class Metrics:
         return out
 
 
-def gather_files(root: Path):
-    files = []
-    for p in root.rglob("*"):
-        name = p.name
-        if name.startswith('.'):
-            continue
+def group_totals(jobs: list[Job]) -> tuple[dict[str, dict[str, float]], int]:
+    """Счётчики групп и общий объём для списка задач."""
+    groups: dict[str, dict[str, float]] = {}
+    total_bytes = 0
+    for job in jobs:
+        total_bytes += job.size
+        grp = groups.setdefault(job.group, {"total_files": 0, "total_bytes": 0, "done_files": 0, "done_bytes": 0, "errors": 0})
+        grp["total_files"] += 1
+        grp["total_bytes"] += job.size
+    return groups, total_bytes
+
+
+# read: очередь задач вмещает столько страниц листинга — дальше листинг ждёт воркеров
+LIST_QUEUE_PAGES = 4
+
+
+def object_job(obj: dict) -> Job:
+    """Задача чтения для объекта листинга {key, size}; группа — по размеру."""
+    size = obj["size"]
+    if size < 100 * 1024 * 1024:  # < 100MB
+        group = "small"
+    elif size < 1024 * 1024 * 1024:  # < 1GB
+        group = "medium"
+    else:
+        group = "large"
+    # Для read профиля path не используется, но нужен для совместимости с Job
+    return Job(path=Path(obj["key"]), size=size, group=group, remote_key=obj["key"])
+
+
+class ArrivalSchedule:
+    """Плановые моменты старта операций для pattern: open-loop.
+
+    Интервалы между стартами — постоянные (1/rate) или экспоненциальные
+    (пуассоновский поток). Расписание не зависит от того, успевает ли
+    бэкенд: если воркеры заняты, операция стартует позже плановой и это
+    ожидание попадает в латентность от планового старта — без coordinated
+    omission, при котором медленный бэкенд незаметно снижает нагрузку.
+    """
+
+    def __init__(self, rate: float, distribution: str = "constant",
+                 start: float | None = None, seed: int | None = None):
+        if rate <= 0:
+            raise ValueError("arrival_rate должен быть > 0")
+        self.rate = rate
+        self.distribution = distribution
+        self._rnd = random.Random(seed)
+        self._next = time.time() if start is None else start
+
+    def next_slot(self) -> float:
+        """Следующий плановый старт; вызывается одним потоком-диспетчером."""
+        slot = self._next
+        if self.distribution == "poisson":
+            self._next += self._rnd.expovariate(self.rate)
+        else:
+            self._next += 1.0 / self.rate
+        return slot
+
+
+class StageSchedule:
+    """Целевой размер пула во времени для stages (см. config.parse_stages).
+
+    Стадия с ramp линейно ведёт цель от предыдущей стадии (для первой —
+    initial) к своей, без ramp — ставит её сразу. После последней стадии
+    at() возвращает индекс None и цель последней стадии.
+    """
+
+    def __init__(self, stages: list[dict], initial: int):
+        self.stages = stages
+        self.initial = initial
+        self.offsets: list[float] = []
+        total = 0.0
+        for stage in stages:
+            self.offsets.append(total)
+            total += stage["duration_sec"]
+        self.total_sec = total
+        self.max_threads = max([initial] + [stage["threads"] for stage in stages])
+
+    def at(self, elapsed: float) -> tuple[int | None, int]:
+        """(индекс стадии, целевое число воркеров) через elapsed секунд от старта."""
+        prev = self.initial
+        for index, stage in enumerate(self.stages):
+            offset = self.offsets[index]
+            if elapsed < offset + stage["duration_sec"]:
+                if not stage["ramp"]:
+                    return index, stage["threads"]
+                frac = max(elapsed - offset, 0.0) / stage["duration_sec"]
+                return index, max(1, round(prev + (stage["threads"] - prev) * frac))
+            prev = stage["threads"]
+        return None, prev
+
+    def windows(self, started: float) -> list[dict]:
+        """Границы стадий в абсолютном времени — для разбивки отчёта."""
+        return [
+            {**stage, "start": started + offset, "end": started + offset + stage["duration_sec"]}
+            for stage, offset in zip(self.stages, self.offsets, strict=True)
+        ]
+
+
+@dataclass
+class Shard:
+    """Доля прогона в дочернем процессе (processes > 1) или на агенте (controller)."""
+    conn: object  # multiprocessing Connection к родителю/контроллеру
+    jobs: list[Job] | None = None  # None — задачи собираются на месте (агент)
+    index: int = 0
+    count: int = 1
+    clock_offset: float = 0.0  # поправка к часам родителя для ts_start/ts_end
+
+
+class ShardSink:
+    """Приёмник операций в дочернем процессе или на агенте.
+
+    Повторяет ту часть интерфейса Metrics, которой пользуются воркеры, и пачками
+    отправляет записи родителю по pipe: CSV, отчёт и дашборд ведёт только родитель.
+    """
+
+    BATCH = 256
+    FLUSH_SEC = 0.2
+
+    def __init__(self, conn, clock_offset: float = 0.0):
+        self._conn = conn
+        self._offset = clock_offset
+        self._lock = threading.Lock()
+        self._buf: list[tuple] = []
+        self._last_flush = time.time()
+        self.meta: dict | None = None
+        self.client_overhead_ms: float | None = None
+
+    def start_recent_op(self, op: str, filename: str, nbytes: int, started: float) -> None:
+        # Recent ops ведёт родитель по завершённым операциям
+        return None
+
+    def record(
+        self, op: str, start: float, end: float, nbytes: int, ok: bool, err: str | None,
+        filename: str | None = None, recent_id: int | None = None,
+        endpoint: str | None = None, thread_id: int | None = None,
+        attempt: int | None = None, size_group: str | None = None,
+        intended: float | None = None, phases: dict[str, float] | None = None,
+    ):
+        if intended is not None:
+            intended += self._offset
+        with self._lock:
+            self._buf.append((op, start + self._offset, end + self._offset, nbytes, ok, err,
+                              filename, endpoint, thread_id, attempt, size_group, intended,
+                              phases))
+            if len(self._buf) >= self.BATCH or end - self._last_flush >= self.FLUSH_SEC:
+                self._flush_locked()
+
+    def send(self, kind: str, payload) -> None:
+        """Отправляет служебное сообщение, предварительно сбросив накопленные операции."""
+        with self._lock:
+            self._flush_locked()
+            self._send_locked((kind, payload))
+
+    def _flush_locked(self) -> None:
+        if self._buf:
+            self._send_locked(("ops", self._buf))
+            self._buf = []
+        self._last_flush = time.time()
+
+    def _send_locked(self, message) -> None:
         try:
-            if p.is_file():
-                files.append(p)
-        except OSError:
-            continue
-    return files
+            self._conn.send(message)
+        except (OSError, ValueError):
+            # Родитель завершился — операции некому принимать, канал управления остановит прогон
+            pass
+
+
+def _shard_main(args, jobs: list[Job] | None, conn, index: int = 0, count: int = 1) -> None:
+    """Точка входа дочернего процесса: прогон своей доли задач без дашборда.
+
+    jobs=None — задачи процесс собирает сам (read: доля index из count листинга).
+    """
+    # Ctrl+C обрабатывает родитель и рассылает остановку по pipe
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        run_profile(args, shard=Shard(conn, jobs, index, count))
+    finally:
+        conn.close()
 
 
-def run_profile(args):
+def run_profile(args, shard=None):
     profile = getattr(args, "profile", "write")
     # Поддерживаем старое имя профиля mixed-70-30 (обратная совместимость)
     if profile == "mixed-70-30":
         profile = "mixed"
+    # stages: размер пула меняется по расписанию, прогон длится ровно сумму стадий,
+    # датасет при этом идёт по кругу
+    stages = list(getattr(args, "stages", None) or [])
+    if stages and not getattr(args, "infinite", False):
+        args = argparse.Namespace(**vars(args))
+        args.infinite = True
     order = getattr(args, "order", "sequential")
-    
+    # Движок S3-операций: awscli (процесс на операцию), native (in-process HTTP),
+    # s5cmd/rclone (один долгоживущий процесс на весь прогон)
+    runner = make_runner(args)
+    # threads — поток на операцию в полёте; asyncio — один event loop, в полёте до
+    # threads операций (тысячи мелких GET с одной машины)
+    engine = getattr(args, "engine", None) or "threads"
+    if engine == "asyncio" and not runner.supports_async:
+        print(f"engine: asyncio поддерживает только client: native — {runner.name} заменён на native")
+        runner = make_runner(args, client="native")
+    # synthetic: тела из памяти умеет отправлять только встроенный клиент
+    data_source = getattr(args, "data_source", None) or "files"
+    if data_source == "synthetic" and profile != "read" and runner.name != "native":
+        print(f"data_source: synthetic поддерживает только client: native — {runner.name} заменён на native")
+        runner = make_runner(args, client="native")
+    client = runner.name
+    # Лимиты IOPS и полосы: общий token bucket для всех воркеров (или на каждый endpoint)
+    max_iops = getattr(args, "max_iops", None)
+    max_throughput_mbps = getattr(args, "max_throughput_mbps", None)
+    limiter = Limiter(
+        max_iops, max_throughput_mbps * 1024 * 1024 if max_throughput_mbps else None,
+        getattr(args, "throttle_scope", None) or "global",
+    )
+    runner.limiter = limiter
+    # processes > 1 — задачи делятся между дочерними процессами (каждый со своим пулом
+    # потоков или event loop), родитель только собирает операции в Metrics и дашборд.
+    # agents — то же, но доли исполняют агенты на других машинах (s3flood controller).
+    # shard задан в самом дочернем процессе или на агенте.
+    headless = shard is not None
+    agents = [] if headless else list(getattr(args, "agents", None) or [])
+    processes = 1 if headless else max(int(getattr(args, "processes", 1) or 1), 1)
+
     jobs: list[Job] = []
     groups: dict[str, dict[str, float]] = {}
     total_files = 0
     total_bytes = 0
     data_root = None
-    
+
+    if agents:
+        # Задачи собирают сами агенты: свой датасет или свою долю листинга бакета
+        pass
+    elif headless and shard.jobs is not None:
+        jobs = shard.jobs
+        groups, total_bytes = group_totals(jobs)
+        total_files = len(jobs)
+    elif profile == "read" and min(processes, args.threads) > 1:
+        # Бакет листят сами дочерние процессы — каждый свою долю
+        pass
     # Для read профиля получаем список объектов из бакета
-    if profile == "read":
+    elif profile == "read":
         endpoints_list = list(getattr(args, "endpoints", []) or [])
         if not endpoints_list:
             maybe_single = getattr(args, "endpoint", None)
@@ -403,47 +662,53 @@ def run_profile(args):
             print("No endpoint configured for read profile")
             return
         
-        primary_endpoint = endpoints_list[0]
-        print(f"Fetching object list from bucket {args.bucket}...")
-        objects = aws_list_objects(
-            args.bucket,
-            primary_endpoint,
-            getattr(args, "access_key", None),
-            getattr(args, "secret_key", None),
-            getattr(args, "aws_profile", None),
-        )
-        if not objects:
+        # Листинг идёт по страницам в отдельном потоке (list_bucket ниже) прямо в
+        # очередь задач: чтение начинается после первой страницы, в памяти —
+        # несколько страниц, а не весь бакет. Первая страница — здесь, чтобы
+        # пустой бакет и ошибка доступа обнаружились до старта прогона.
+        # list_workers > 1 — диапазоны ключей листятся параллельно (listing.ParallelLister)
+        list_endpoint = endpoints_list[0]
+        list_workers = max(int(getattr(args, "list_workers", None) or 1), 1)
+        list_mode = getattr(args, "list_mode", None) or "range"
+
+        def open_listing():
+            if list_workers > 1:
+                return native_parallel_pages(args.bucket, list_endpoint, args.access_key, args.secret_key,
+                                             getattr(args, "aws_profile", None), list_workers, list_mode)
+            return runner.list_pages(args.bucket, list_endpoint)
+
+        list_pages = open_listing()
+        if list_workers > 1:
+            print(f"Listing bucket {args.bucket} in {list_workers} parallel {list_mode} partitions...")
+        else:
+            print(f"Listing bucket {args.bucket} page by page...")
+        try:
+            first_page = next(list_pages, [])
+        except ListingError as exc:
+            print(f"Listing bucket {args.bucket} failed: {exc}")
+            runner.close()
+            return
+        if not first_page:
             print(f"No objects found in bucket {args.bucket}")
+            runner.close()
             return
-        
-        # Создаём jobs из объектов бакета
-        total_files = len(objects)
-        for obj in objects:
-            key = obj["key"]
-            size = obj["size"]
-            # Определяем группу по размеру (аналогично файлам)
-            if size < 100 * 1024 * 1024:  # < 100MB
-                group = "small"
-            elif size < 1024 * 1024 * 1024:  # < 1GB
-                group = "medium"
-            else:
-                group = "large"
-            # Для read профиля path не используется, но нужен для совместимости с Job
-            fake_path = Path(key)
-            jobs.append(Job(path=fake_path, size=size, group=group, remote_key=key))
-            total_bytes += size
-            grp = groups.setdefault(group, {"total_files": 0, "total_bytes": 0, "done_files": 0, "done_bytes": 0, "errors": 0})
-            grp["total_files"] += 1
-            grp["total_bytes"] += size
-        
-        # Сортировка по порядку
+    elif data_source == "synthetic":
+        # Тела загрузки генерируются в памяти, размеры — как у dataset-create
+        planned = plan_sizes(
+            args.synthetic_bytes, tuple(args.synthetic_min_counts),
+            tuple(args.synthetic_group_limits), random.Random(),
+            getattr(args, "synthetic_distribution", None),
+        )
+        for group, size in planned:
+            jobs.append(Job(path=SyntheticObject(f"{uuid.uuid4()}.bin", size), size=size, group=group))
+        groups, total_bytes = group_totals(jobs)
+        total_files = len(jobs)
         if order == "sequential":
-            jobs.sort(key=lambda j: j.size)  # Маленькие → средние → большие
-        else:  # random
+            jobs.sort(key=lambda j: j.size)
+        else:
             random.shuffle(jobs)
-        
         group_summary = ", ".join(f"{g}={info['total_files']}" for g, info in groups.items())
-        print(f"Loaded {total_files} objects totalling {total_bytes/1024/1024:.1f} MB from bucket across groups: {group_summary}")
+        print(f"Planned {total_files} synthetic objects totalling {total_bytes/1024/1024:.1f} MB across groups: {group_summary}")
     else:
         # Для write и mixed профилей используем файлы из data_dir
         data_root = Path(args.data_dir).resolve()
@@ -451,38 +716,22 @@ def run_profile(args):
             print(f"Data dir not found: {data_root}")
             return
 
-        files = gather_files(data_root)
-        if not files:
+        # Манифест dataset-create — одно чтение; без него один обход scandir
+        entries, from_manifest = load_dataset(data_root)
+        if not entries:
             print(f"No dataset files found under {data_root}")
             return
 
-        try:
-            files.sort(key=lambda p: p.stat().st_size)
-            jobs: list[Job] = []
-            groups = {}
-            total_files = len(files)
-            total_bytes = 0
-            for p in files:
-                size = p.stat().st_size
-                rel = p.relative_to(data_root)
-                group = rel.parts[0] if rel.parts else "root"
-                jobs.append(Job(path=p, size=size, group=group))
-                total_bytes += size
-                grp = groups.setdefault(group, {"total_files": 0, "total_bytes": 0, "done_files": 0, "done_bytes": 0, "errors": 0})
-                grp["total_files"] += 1
-                grp["total_bytes"] += size
-            
-            # Сортировка по порядку
-            if order == "sequential":
-                jobs.sort(key=lambda j: j.size)  # Маленькие → средние → большие
-            else:  # random
-                random.shuffle(jobs)
-            
-            group_summary = ", ".join(f"{g}={info['total_files']}" for g, info in groups.items())
-            print(f"Loaded {total_files} files totalling {total_bytes/1024/1024:.1f} MB across groups: {group_summary}")
-        except OSError as e:
-            print(f"Failed to stat dataset files: {e}")
-            return
+        jobs = [Job(path=data_root / e["path"], size=e["size"], group=e["group"]) for e in entries]
+        jobs.sort(key=lambda j: j.size)  # Маленькие → средние → большие
+        groups, total_bytes = group_totals(jobs)
+        total_files = len(jobs)
+        if order == "random":
+            random.shuffle(jobs)
+
+        group_summary = ", ".join(f"{g}={info['total_files']}" for g, info in groups.items())
+        source = "manifest" if from_manifest else "scan"
+        print(f"Loaded {total_files} files totalling {total_bytes/1024/1024:.1f} MB across groups: {group_summary} ({source})")
 
     endpoints_list = list(getattr(args, "endpoints", []) or [])
     if not endpoints_list:
@@ -507,9 +756,20 @@ def run_profile(args):
             endpoint_rr_index = (endpoint_rr_index + 1) % len(endpoints_list)
             return endpoint
 
-    # Используем Queue с лимитом, если задан
+    if agents:
+        processes = len(agents)
+    else:
+        # Процессов больше, чем задач или потоков, не бывает: у каждого хотя бы по одной
+        # (read: задачи появятся из листинга уже в самих процессах)
+        processes = min(processes, args.threads)
+        if profile != "read":
+            processes = min(processes, len(jobs))
+    sharded = processes > 1 or bool(agents)
+
+    # Используем Queue с лимитом, если задан; read по умолчанию держит в очереди
+    # несколько страниц листинга — память не растёт с размером бакета
     queue_limit = getattr(args, "queue_limit", None)
-    q = queue.Queue(maxsize=queue_limit) if queue_limit else queue.Queue()
+    q = queue.Queue(maxsize=queue_limit or (LIST_QUEUE_PAGES * LIST_PAGE_SIZE if profile == "read" else 0))
     pending_counts = {g: info["total_files"] for g, info in groups.items()}
     
     # Инициализация параметров
@@ -517,15 +777,21 @@ def run_profile(args):
     pattern = getattr(args, "pattern", "sustained")
     burst_duration_sec = getattr(args, "burst_duration_sec", 10.0)
     burst_intensity_multiplier = getattr(args, "burst_intensity_multiplier", 10.0)
+    # Open-loop: операции стартуют по расписанию с заданной частотой, а не по мере
+    # освобождения воркеров; threads — предел операций в полёте
+    open_loop = pattern == "open-loop"
+    arrival_rate = float(getattr(args, "arrival_rate", None) or 0.0)
+    arrival_distribution = getattr(args, "arrival_distribution", None) or "constant"
+    if open_loop and arrival_rate <= 0:
+        raise SystemExit("run: pattern open-loop требует arrival_rate > 0 (оп/с)")
     max_retries = getattr(args, "max_retries", 3)
     retry_backoff_base = getattr(args, "retry_backoff_base", 2.0)
     unique_remote_names = bool(getattr(args, "unique_remote_names", False))
     
-    # Инициализация очереди в зависимости от профиля
-    if profile == "read":
-        # Для read профиля сразу добавляем задачи на чтение
-        for job in jobs:
-            q.put(("download", job))
+    # Инициализация очереди в зависимости от профиля (при шардировании очереди у процессов)
+    # (read: задачи кладёт в очередь поток листинга list_bucket)
+    if sharded:
+        pass
     elif profile == "write":
         # Для write профиля добавляем задачи на запись
         for job in jobs:
@@ -535,7 +801,18 @@ def run_profile(args):
         for job in jobs:
             q.put(("upload", job))
     warmup_sec = float(getattr(args, "warmup_sec", 0.0) or 0.0)
-    metrics = Metrics(args.metrics, args.report, warmup_sec=warmup_sec)
+    # Ограничение по времени (шаги --find-max, сумма stages): по истечении новые
+    # операции не берутся, операции в полёте завершаются штатно. При шардировании
+    # срок соблюдают сами дочерние процессы и агенты — родитель их не прерывает.
+    stage_schedule = StageSchedule(stages, args.threads) if stages else None
+    duration_sec = float(getattr(args, "duration_sec", None) or 0.0)
+    if stage_schedule is not None and not duration_sec:
+        duration_sec = stage_schedule.total_sec
+    if headless:
+        metrics = ShardSink(shard.conn, shard.clock_offset)
+    else:
+        metrics = Metrics(args.metrics, args.report, warmup_sec=warmup_sec,
+                          metrics_format=getattr(args, "metrics_format", None) or "csv")
     try:
         from importlib.metadata import version as _pkg_version
         _version = _pkg_version("s3flood")
@@ -546,29 +823,92 @@ def run_profile(args):
         "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
         "hostname": socket.gethostname(),
         "profile": profile,
+        "client": client,
+        "engine": engine,
         "pattern": pattern,
         "threads": args.threads,
+        "processes": processes,
+        "agents": agents,
         "endpoints": endpoints_list,
         "endpoint_mode": endpoint_mode,
         "bucket": args.bucket,
         "warmup_sec": warmup_sec,
         "infinite": bool(getattr(args, "infinite", False)),
     }
-    if warmup_sec > 0:
+    if open_loop:
+        metrics.meta.update(arrival_rate=arrival_rate, arrival_distribution=arrival_distribution)
+    if limiter.active:
+        metrics.meta.update(max_iops=max_iops, max_throughput_mbps=max_throughput_mbps,
+                            throttle_scope=limiter.scope)
+        if max_throughput_mbps and client != "native" and not headless:
+            print(f"max_throughput_mbps соблюдает только client: native — для {client} действует лишь max_iops")
+    if warmup_sec > 0 and not headless:
         print(f"Warmup: первые {warmup_sec:.0f} с исключаются из статистики")
+    # Живой /metrics для Prometheus: у родителя — он же собирает операции процессов и агентов
+    exporter = None
+    metrics_listen = getattr(args, "metrics_listen", None)
+    if metrics_listen and not headless:
+        try:
+            exporter = MetricsExporter(metrics, metrics_listen).start()
+        except (OSError, ValueError) as exc:
+            metrics.close()
+            raise SystemExit(f"run: не удалось открыть metrics_listen {metrics_listen}: {exc}") from None
+        host, port = exporter.address
+        print(f"Метрики Prometheus: http://{host}:{port}/metrics")
 
     # Базовый оверхед клиента: время холодного старта aws CLI без сетевых операций.
     # Он входит в latency каждой операции — фиксируем для честной интерпретации отчёта.
-    try:
-        _t0 = time.time()
-        subprocess.run(["aws", "--version"], capture_output=True, timeout=30)
-        metrics.client_overhead_ms = round((time.time() - _t0) * 1000, 1)
-        print(f"Оверхед запуска aws CLI: ~{metrics.client_overhead_ms:.0f} ms входит в latency каждой операции")
-    except Exception:
-        pass
+    # У остальных движков процесс на операцию не запускается — этого оверхеда нет.
+    if client == "awscli" and not headless:
+        try:
+            _t0 = time.time()
+            subprocess.run(["aws", "--version"], capture_output=True, timeout=30)
+            metrics.client_overhead_ms = round((time.time() - _t0) * 1000, 1)
+            print(f"Оверхед запуска aws CLI: ~{metrics.client_overhead_ms:.0f} ms входит в latency каждой операции")
+        except Exception:
+            pass
 
     stop = threading.Event()
-    
+    # Каналы к дочерним процессам (processes > 1)
+    shard_conns: list = []
+
+    shard_send_lock = threading.Lock()
+
+    def send_shards(message) -> None:
+        """Сообщение всем дочерним процессам/агентам (stop или ("limits", множитель))."""
+        with shard_send_lock:
+            for conn in shard_conns:
+                try:
+                    conn.send(message)
+                except (OSError, ValueError):
+                    pass
+
+    def abort_inflight():
+        """Прерывает текущие операции движка (процессы, соединения)."""
+        runner.abort()
+        send_shards("stop")
+
+    run_finished = threading.Event()
+
+    if headless:
+        def listen_parent():
+            """("limits", множитель) меняет лимиты; любое другое сообщение или обрыв pipe — остановка."""
+            while True:
+                try:
+                    message = shard.conn.recv()
+                except (EOFError, OSError):
+                    break
+                if isinstance(message, tuple) and message[0] == "limits":
+                    limiter.scale(message[1])
+                    continue
+                break
+            # Агент мог уже начать следующий прогон — его не трогаем
+            if not run_finished.is_set():
+                stop.set()
+                abort_inflight()
+
+        threading.Thread(target=listen_parent, daemon=True).start()
+
     # Обработчик сигнала для корректного завершения всех процессов
     original_sigint = None
     interrupt_count = [0]  # Используем список для изменяемого значения в замыкании
@@ -580,18 +920,18 @@ def run_profile(args):
             # Первое прерывание - корректное завершение
             print("\n[Получен сигнал прерывания, завершаем процессы...]", flush=True)
             stop.set()
-            _terminate_all_processes()
+            abort_inflight()
         else:
             # Второе прерывание - принудительный выход
             print("\n[Принудительное завершение...]", flush=True)
-            _terminate_all_processes()
+            abort_inflight()
             # Восстанавливаем стандартный обработчик и вызываем его
             if original_sigint is not None and original_sigint != signal.SIG_IGN:
                 signal.signal(signal.SIGINT, original_sigint)
                 os.kill(os.getpid(), signal.SIGINT)
     
     # Регистрируем обработчик сигнала только в главном потоке
-    if threading.current_thread() is threading.main_thread():
+    if threading.current_thread() is threading.main_thread() and not headless:
         original_sigint = signal.signal(signal.SIGINT, signal_handler)
         # Сохраняем оригинальный обработчик для восстановления при выходе
     
@@ -620,180 +960,450 @@ def run_profile(args):
     files_in_current_cycle = 0
     cycle_files_lock = threading.Lock()
     
-    # Для bursty режима в mixed профиле: инициализируем множество ID дополнительных потоков
-    extra_thread_ids = set()
-
-    def worker():
-        nonlocal active_uploads, active_downloads, files_in_current_cycle, extra_thread_ids
-        # Для bursty режима в mixed профиле: дополнительные потоки работают только во время всплеска
-        current_thread_id = threading.get_ident()
-        is_extra_thread = current_thread_id in extra_thread_ids if pattern == "bursty" and profile == "mixed" else False
-        
-        while not stop.is_set():
-            # Для дополнительных потоков в bursty режиме: работаем только во время всплеска
-            if is_extra_thread:
-                with pattern_lock:
-                    if not burst_active:
-                        # Во время паузы дополнительные потоки ждут
-                        time.sleep(0.1)
-                        continue
-            
+    # Пул воркеров переменного размера (stages, всплески bursty в mixed): при росте
+    # цели потоки добавляются, при сжатии лишний воркер выходит после своей операции
+    pool_lock = threading.Lock()
+    pool_target = args.threads
+    pool_size = 0
+
+    @dataclass
+    class OpContext:
+        """Состояние операции между begin_op и finish_op (общее для потоков и asyncio)."""
+        op: str
+        job: Job
+        start: float
+        display_name: str
+        recent_id: int
+        endpoint: str
+        key: str
+        intended: float | None = None  # плановый старт (open-loop)
+
+    # Open-loop: диспетчер по расписанию перекладывает задачи из q сюда вместе с плановым стартом
+    arrivals: queue.Queue = queue.Queue()
+    arrivals_done = threading.Event()
+    # Истёк duration_sec: новые задачи не выдаются, операции в полёте завершаются
+    draining = threading.Event()
+    # read: листинг бакета дошёл до конца (или прервался)
+    listing_done = threading.Event()
+    if profile != "read" or sharded:
+        listing_done.set()
+
+    def queue_drained() -> bool:
+        """Очередь пуста и новых задач не будет."""
+        if profile == "mixed":
+            return upload_phase_done.is_set() and q.empty()
+        return q.empty() and listing_done.is_set() and not getattr(args, "infinite", False)
+
+    def should_stop_consuming() -> bool:
+        """Задач больше не будет — потребитель может завершаться."""
+        if draining.is_set():
+            return True
+        if open_loop:
+            return arrivals_done.is_set() and arrivals.empty()
+        return queue_drained()
+
+    def queued() -> int:
+        """Задачи, ожидающие воркера (в open-loop — и опоздавшие по расписанию)."""
+        return q.qsize() + (arrivals.qsize() if open_loop else 0)
+
+    def next_task(timeout: float | None):
+        """Следующая задача (op, job, intended); timeout=None — без ожидания."""
+        if draining.is_set():
+            raise queue.Empty
+        source = arrivals if open_loop else q
+        item = source.get(timeout=timeout) if timeout is not None else source.get_nowait()
+        return item if open_loop else (*item, None)
+
+    def list_bucket(pages) -> None:
+        """read: страницы листинга превращаются в задачи прямо в очереди.
+
+        Очередь ограничена, поэтому листинг идёт не быстрее чтения. Агент или
+        дочерний процесс берёт объекты, чей crc32 ключа попадает в его долю —
+        от порядка страниц (у параллельного листинга он свой при каждом
+        проходе) это не зависит. order: random перемешивает задачи в пределах
+        страницы. infinite: каждый следующий цикл — новый листинг.
+        """
+        nonlocal total_files, total_bytes, cycle_count
+        share_index, share_count = (shard.index, shard.count) if headless else (0, 1)
+        try:
+            while True:
+                cycle_objects = 0
+                for page in pages:
+                    batch = [object_job(obj) for obj in page
+                             if share_count == 1 or zlib.crc32(obj["key"].encode()) % share_count == share_index]
+                    if order == "random":
+                        random.shuffle(batch)
+                    cycle_objects += len(batch)
+                    if cycle_count == 0:
+                        with group_lock:
+                            for job in batch:
+                                grp = groups.setdefault(job.group, {"total_files": 0, "total_bytes": 0,
+                                                                    "done_files": 0, "done_bytes": 0, "errors": 0})
+                                grp["total_files"] += 1
+                                grp["total_bytes"] += job.size
+                                total_bytes += job.size
+                            total_files += len(batch)
+                    for job in batch:
+                        while True:
+                            if stop.is_set() or draining.is_set():
+                                return
+                            try:
+                                q.put(("download", job), timeout=0.5)
+                                break
+                            except queue.Full:
+                                continue
+                if cycle_count == 0:
+                    with group_lock:
+                        group_summary = ", ".join(f"{g}={info['total_files']}" for g, info in groups.items())
+                    print(f"Listed {total_files} objects totalling {total_bytes/1024/1024:.1f} MB from bucket across groups: {group_summary}", flush=True)
+                if not getattr(args, "infinite", False) or not cycle_objects:
+                    return
+                # Бесконечный режим: бакет листится заново на каждый цикл
+                with cycle_lock:
+                    cycle_count += 1
+                pages = open_listing()
+        except ListingError as exc:
+            print(f"Listing bucket {args.bucket} failed: {exc}", flush=True)
+        finally:
+            listing_done.set()
+
+    def dispatch_arrivals():
+        """Open-loop: в плановые моменты берёт задачи из q и отдаёт их воркерам.
+
+        Если все воркеры заняты, задачи копятся в arrivals, а их латентность от
+        планового старта растёт — так и видна деградация бэкенда. Если в момент
+        прибытия задач нет (смена фазы, новый цикл), прибытие пропускается.
+        """
+        schedule = ArrivalSchedule(arrival_rate, arrival_distribution)
+        while not stop.is_set() and not draining.is_set():
+            slot = schedule.next_slot()
+            delay = slot - time.time()
+            if delay > 0 and stop.wait(delay):
+                break
             try:
-                op, job = q.get(timeout=0.5)
+                op, job = q.get_nowait()
             except queue.Empty:
-                # Для write и read профилей: если очередь пуста, завершаем worker
-                # Для mixed профиля: если upload фаза завершена и очередь пуста, завершаем worker
-                if profile == "mixed":
-                    if upload_phase_done.is_set() and q.empty():
-                        break
-                else:
-                    if q.empty() and not getattr(args, "infinite", False):
-                        break
-                if not getattr(args, "infinite", False):
-                    continue
-                else:
-                    continue
-            start = time.time()
-            remote_key = None
-            if op == "upload":
-                base_name = job.path.name
-                remote_key = make_remote_key(base_name, unique_remote_names)
-                display_name = remote_key
-            elif op == "download":
-                if profile == "read":
-                    remote_key = job.remote_key or str(job.path)
-                else:
-                    remote_key = job.remote_key or job.path.name
-                display_name = remote_key
+                if queue_drained():
+                    break
+                continue
+            arrivals.put((op, job, slot))
+        arrivals_done.set()
+
+    def throttle_op(ctx: OpContext) -> None:
+        """IOPS-лимит: ожидание токена не входит в латентность операции."""
+        if limiter.max_iops:
+            limiter.acquire_op(ctx.endpoint, stop)
+            ctx.start = time.time()
+
+    async def throttle_op_async(ctx: OpContext) -> None:
+        if limiter.max_iops:
+            await limiter.acquire_op_async(ctx.endpoint, stop)
+            ctx.start = time.time()
+
+    def begin_op(op: str, job: Job, intended: float | None = None) -> OpContext:
+        nonlocal active_uploads, active_downloads
+        start = time.time()
+        if op == "upload":
+            key = make_remote_key(job.path.name, unique_remote_names)
+            endpoint = next_endpoint()
+            # Сохраняем endpoint в job для последующего использования
+            job.endpoint = endpoint
+        else:
+            # Для read профиля key — путь объекта в бакете, для других — remote_key или имя файла
+            if profile == "read":
+                key = job.remote_key or str(job.path)
             else:
-                display_name = job.path.name
-            recent_op_id = metrics.start_recent_op(op, display_name, job.size, start)
-            with active_lock:
-                if op == "upload":
-                    active_uploads += 1
-                elif op == "download":
-                    active_downloads += 1
-                active_jobs[threading.get_ident()] = job
-            with pending_lock:
-                if op == "upload":
-                    pending_counts[job.group] -= 1
+                key = job.remote_key or job.path.name
+            # Используем endpoint из job, если он был сохранён при записи, иначе выбираем новый
+            endpoint = job.endpoint if job.endpoint else next_endpoint()
+        recent_op_id = metrics.start_recent_op(op, key, job.size, start)
+        ctx = OpContext(op, job, start, key, recent_op_id, endpoint, key, intended)
+        with active_lock:
             if op == "upload":
-                endpoint = next_endpoint()
-                # Сохраняем endpoint в job для последующего использования
-                job.endpoint = endpoint
-                # Используем retry с backoff
-                res, ok, err, attempts = retry_with_backoff(
-                    aws_cp_upload,
-                    max_retries,
-                    retry_backoff_base,
-                    job.path,
-                    args.bucket,
-                    remote_key or job.path.name,
-                    endpoint,
-                    getattr(args, "access_key", None),
-                    getattr(args, "secret_key", None),
-                    getattr(args, "aws_profile", None),
-                    getattr(args, "aws_cli_multipart_threshold", None),
-                    getattr(args, "aws_cli_multipart_chunksize", None),
-                    getattr(args, "aws_cli_max_concurrent_requests", None),
-                    stop=stop,
-                )
-                if not ok and res is None:
-                    err = err or "retry failed"
-                end = time.time()
-                nbytes = job.size
-                filename = job.path.name
-                metrics.record(
-                    "upload", start, end, nbytes, ok, err, display_name, recent_op_id,
-                    endpoint=endpoint, thread_id=threading.get_ident(),
-                    attempt=attempts, size_group=job.group,
-                )
-                if ok:
-                    with group_lock:
-                        grp = groups[job.group]
-                        grp["done_files"] += 1
-                        grp["done_bytes"] += nbytes
-                    job.remote_key = display_name
-                    with uploaded_objects_lock:
-                        uploaded_objects[job.path.name] = {
-                            "remote_key": display_name,
-                            "endpoint": endpoint,
-                        }
-                    # Обновляем счетчик файлов в текущем цикле для infinite режима
-                    if getattr(args, "infinite", False) and op == "upload":
-                        with cycle_files_lock:
-                            files_in_current_cycle += 1
-                else:
-                    with group_lock:
-                        groups[job.group]["errors"] += 1
+                active_uploads += 1
             elif op == "download":
-                # Для read профиля используем key из path (который содержит имя объекта)
-                # Для других профилей используем remote_key (если он есть) или имя файла
-                key = remote_key or (str(job.path) if profile == "read" else job.path.name)
-                # Используем endpoint из job, если он был сохранён при записи, иначе выбираем новый
-                endpoint = job.endpoint if job.endpoint else next_endpoint()
-                # Используем retry с backoff
+                active_downloads += 1
+            active_jobs[id(ctx)] = job
+        with pending_lock:
+            if op == "upload":
+                pending_counts[job.group] -= 1
+        return ctx
+
+    def finish_op(ctx: OpContext, res, ok: bool, err: str | None, attempts: int,
+                  thread_id: int) -> None:
+        nonlocal active_uploads, active_downloads, files_in_current_cycle
+        end = time.time()
+        job = ctx.job
+        if not ok and not err:
+            if res is None:
+                err = "retry failed: no result"
+            elif getattr(res, "stderr", None):
+                err = res.stderr[-300:]
+            else:
+                err = f"exit code {getattr(res, 'returncode', '?')}"
+        # Размер берём из job.size: для download он известен из листинга,
+        # aws s3 cp не возвращает размер, в отличие от s3api get-object
+        nbytes = job.size
+        metrics.record(
+            ctx.op, ctx.start, end, nbytes, ok, err, ctx.display_name, ctx.recent_id,
+            endpoint=ctx.endpoint, thread_id=thread_id,
+            attempt=attempts, size_group=job.group, intended=ctx.intended,
+            phases=getattr(res, "phases", None),
+        )
+        if ctx.op == "upload":
+            if ok:
+                with group_lock:
+                    grp = groups[job.group]
+                    grp["done_files"] += 1
+                    grp["done_bytes"] += nbytes
+                job.remote_key = ctx.display_name
+                with uploaded_objects_lock:
+                    uploaded_objects[job.path.name] = {
+                        "remote_key": ctx.display_name,
+                        "endpoint": ctx.endpoint,
+                    }
+                # Обновляем счетчик файлов в текущем цикле для infinite режима
+                if getattr(args, "infinite", False):
+                    with cycle_files_lock:
+                        files_in_current_cycle += 1
+            else:
+                with group_lock:
+                    groups[job.group]["errors"] += 1
+        with active_lock:
+            if ctx.op == "upload":
+                active_uploads -= 1
+            elif ctx.op == "download":
+                active_downloads -= 1
+            active_jobs.pop(id(ctx), None)
+        q.task_done()
+
+    def op_call_args(ctx: OpContext) -> tuple:
+        if ctx.op == "upload":
+            return (ctx.job.path, args.bucket, ctx.key, ctx.endpoint)
+        return (args.bucket, ctx.key, ctx.endpoint)
+
+    def worker():
+        nonlocal pool_size
+        current_thread_id = threading.get_ident()
+        retired = False
+        try:
+            while not stop.is_set() and not draining.is_set():
+                with pool_lock:
+                    if pool_size > pool_target:
+                        pool_size -= 1
+                        retired = True
+                        return
+                try:
+                    op, job, intended = next_task(0.5)
+                except queue.Empty:
+                    if should_stop_consuming():
+                        break
+                    continue
+                ctx = begin_op(op, job, intended)
+                throttle_op(ctx)
+                func = runner.upload if op == "upload" else runner.download
                 res, ok, err, attempts = retry_with_backoff(
-                    aws_cp_download,
-                    max_retries,
-                    retry_backoff_base,
-                    args.bucket,
-                    key,
-                    endpoint,
-                    getattr(args, "access_key", None),
-                    getattr(args, "secret_key", None),
-                    getattr(args, "aws_profile", None),
-                    getattr(args, "aws_cli_multipart_threshold", None),
-                    getattr(args, "aws_cli_multipart_chunksize", None),
-                    getattr(args, "aws_cli_max_concurrent_requests", None),
-                    stop=stop,
+                    func, max_retries, retry_backoff_base, *op_call_args(ctx), stop=stop,
                 )
-                end = time.time()
-                if not ok and not err:
-                    if res is None:
-                        err = "retry failed: no result"
-                    elif getattr(res, "stderr", None):
-                        err = res.stderr[-300:]
-                    else:
-                        err = f"exit code {getattr(res, 'returncode', '?')}"
-                # Для download используем размер из job.size (известен из списка объектов)
-                # aws s3 cp не возвращает JSON с размером, в отличие от s3api get-object
-                nbytes = job.size
-                # Определяем имя файла для отображения
-                filename = key
-                metrics.record(
-                    "download", start, end, nbytes, ok, err, filename, recent_op_id,
-                    endpoint=endpoint, thread_id=threading.get_ident(),
-                    attempt=attempts, size_group=job.group,
+                finish_op(ctx, res, ok, err, attempts, current_thread_id)
+        finally:
+            if not retired:
+                with pool_lock:
+                    pool_size -= 1
+
+    def set_pool_target(target: int) -> None:
+        """Новая цель пула; для engine: threads недостающие воркеры стартуют сразу."""
+        nonlocal pool_target, pool_size
+        with pool_lock:
+            pool_target = max(int(target), 1)
+            if sharded or engine == "asyncio" or stop.is_set() or should_stop_consuming():
+                return
+            threads[:] = [t for t in threads if t.is_alive()]
+            while pool_size < pool_target:
+                t = threading.Thread(target=worker, daemon=True)
+                pool_size += 1
+                t.start()
+                threads.append(t)
+
+    async def async_dispatch():
+        """Диспетчер engine: asyncio — задачи из q исполняются корутинами в одном потоке.
+
+        Число операций в полёте ограничено семафором на max_threads разрешений;
+        вне всплеска bursty-паттерна диспетчер держит у себя «лишние»
+        разрешения сверх args.threads и отдаёт их на время всплеска.
+        """
+        thread_id = threading.get_ident()
+        limit = asyncio.Semaphore(max_threads)
+        reserved = 0
+        tasks: set[asyncio.Task] = set()
+
+        async def run_op(op: str, job: Job, intended: float | None) -> None:
+            ctx = begin_op(op, job, intended)
+            func = runner.upload_async if op == "upload" else runner.download_async
+            try:
+                await throttle_op_async(ctx)
+                res, ok, err, attempts = await retry_with_backoff_async(
+                    func, max_retries, retry_backoff_base, *op_call_args(ctx), stop=stop,
                 )
-            with active_lock:
-                if op == "upload":
-                    active_uploads -= 1
-                elif op == "download":
-                    active_downloads -= 1
-                active_jobs.pop(threading.get_ident(), None)
-            q.task_done()
+            except Exception as exc:  # не даём упавшей задаче потерять учёт операции
+                res, ok, err, attempts = None, False, str(exc), 1
+            finish_op(ctx, res, ok, err, attempts, thread_id)
+
+        def on_done(task: asyncio.Task) -> None:
+            tasks.discard(task)
+            limit.release()
+
+        try:
+            while not stop.is_set():
+                want = max_threads - pool_target
+                while reserved > want:
+                    limit.release()
+                    reserved -= 1
+                while reserved < want and not limit.locked():
+                    await limit.acquire()
+                    reserved += 1
+                try:
+                    op, job, intended = next_task(None)
+                except queue.Empty:
+                    if should_stop_consuming() and not tasks:
+                        break
+                    await asyncio.sleep(0.01)
+                    continue
+                await limit.acquire()
+                task = asyncio.ensure_future(run_op(op, job, intended))
+                tasks.add(task)
+                task.add_done_callback(on_done)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            await runner.aclose()
 
     threads = []
     max_threads = args.threads
     if pattern == "bursty" and profile == "mixed":
-        # Для bursty режима в mixed профиле создаем максимальное количество потоков
+        # Во время всплеска пул растёт до threads × burst_intensity_multiplier
         max_threads = int(args.threads * burst_intensity_multiplier)
+    if stage_schedule is not None:
+        max_threads = max(max_threads, stage_schedule.max_threads)
+        pool_target = stage_schedule.at(0.0)[1]
     
-    # Создаем базовые потоки
-    base_threads = args.threads
-    for _ in range(base_threads):
-        t = threading.Thread(target=worker, daemon=True)
+    shard_procs: list = []
+    shard_status: dict[int, dict] = {}
+    shard_status_lock = threading.Lock()
+
+    def receive_shard(index: int, conn) -> None:
+        """Принимает операции дочернего процесса или агента и пишет их в общие Metrics."""
+        while True:
+            try:
+                kind, payload = conn.recv()
+            except (EOFError, OSError):
+                if agents and not stop.is_set():
+                    print(f"агент {agents[index]}: соединение закрыто до завершения прогона", flush=True)
+                break
+            if kind == "ops":
+                for (op, start, end, nbytes, ok, err, filename, endpoint,
+                     thread_id, attempt, size_group, intended, phases) in payload:
+                    metrics.record(
+                        op, start, end, nbytes, ok, err, filename,
+                        endpoint=endpoint, thread_id=thread_id,
+                        attempt=attempt, size_group=size_group, intended=intended,
+                        phases=phases,
+                    )
+            elif kind == "status":
+                with shard_status_lock:
+                    shard_status[index] = payload
+            elif kind == "done":
+                break
+
+    run_started = time.time()
+
+    if profile == "read" and not sharded:
+        t = threading.Thread(target=list_bucket, args=(itertools.chain([first_page], list_pages),),
+                             daemon=True, name="listing")
         t.start()
         threads.append(t)
-    
-    # Для bursty режима в mixed профиле создаем дополнительные потоки
-    if pattern == "bursty" and profile == "mixed":
-        for _ in range(max_threads - base_threads):
-            t = threading.Thread(target=worker, daemon=True)
+
+    if open_loop and not sharded:
+        t = threading.Thread(target=dispatch_arrivals, daemon=True, name="arrivals")
+        t.start()
+        threads.append(t)
+
+    if agents:
+        from .distributed import connect_agents
+        # Агентам уходят настройки прогона; клиент уже выбран (без повторного fallback)
+        agent_settings = {
+            name: value for name, value in vars(args).items()
+            if name not in ("agents", "agent_authkey", "agent_start_delay")
+        }
+        agent_settings.update(client=client, processes=1)
+        # Целевая частота и лимиты — на весь прогон: делим их между агентами
+        if open_loop:
+            agent_settings["arrival_rate"] = arrival_rate / len(agents)
+        if max_iops:
+            agent_settings["max_iops"] = max_iops / len(agents)
+        if max_throughput_mbps:
+            agent_settings["max_throughput_mbps"] = max_throughput_mbps / len(agents)
+        conns, start_at = connect_agents(
+            agents, agent_settings, getattr(args, "agent_authkey", None),
+            start_delay=getattr(args, "agent_start_delay", None) or 2.0,
+        )
+        run_started = start_at
+        # Прогрев отсчитывается от синхронного старта агентов
+        if warmup_sec > 0:
+            metrics.warmup_until = start_at + warmup_sec
+        for index, conn in enumerate(conns):
+            shard_conns.append(conn)
+            t = threading.Thread(target=receive_shard, args=(index, conn), daemon=True)
             t.start()
-            extra_thread_ids.add(t.ident)
             threads.append(t)
+    elif sharded:
+        import multiprocessing
+        # spawn, а не fork: у родителя уже есть потоки и открытые соединения движка
+        mp = multiprocessing.get_context("spawn")
+        base, rest = divmod(args.threads, processes)
+        for index in range(processes):
+            child_args = argparse.Namespace(**vars(args))
+            # Потоки делятся между процессами; клиент уже выбран (без повторного fallback)
+            child_args.threads = base + (1 if index < rest else 0)
+            child_args.client = client
+            child_args.processes = 1
+            if open_loop:
+                child_args.arrival_rate = arrival_rate / processes
+            if max_iops:
+                child_args.max_iops = max_iops / processes
+            if max_throughput_mbps:
+                child_args.max_throughput_mbps = max_throughput_mbps / processes
+            if stages:
+                share = child_args.threads / args.threads
+                child_args.stages = [
+                    {**stage, "threads": max(1, round(stage["threads"] * share))} for stage in stages
+                ]
+            parent_conn, child_conn = mp.Pipe()
+            # read: дочерний процесс листит бакет сам и читает свою долю
+            child_jobs = None if profile == "read" else jobs[index::processes]
+            proc = mp.Process(
+                target=_shard_main, args=(child_args, child_jobs, child_conn, index, processes),
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            shard_procs.append(proc)
+            shard_conns.append(parent_conn)
+            t = threading.Thread(target=receive_shard, args=(index, parent_conn), daemon=True)
+            t.start()
+            threads.append(t)
+    elif engine == "asyncio":
+        # Один поток с event loop вместо потока на каждую операцию в полёте
+        t = threading.Thread(target=lambda: asyncio.run(async_dispatch()), daemon=True)
+        t.start()
+        threads.append(t)
+    else:
+        set_pool_target(pool_target)
+
+    run_deadline = run_started + duration_sec if duration_sec > 0 and not sharded else None
+    stage_index: int | None = None
+    if stage_schedule is not None and not headless:
+        metrics.stages = stage_schedule.windows(run_started)
 
     last_print = 0
     last_plain_log = 0.0
@@ -805,15 +1415,12 @@ def run_profile(args):
 
     from rich.console import Console as _RichConsole
     from rich.live import Live as _RichLive
-    from .dashboard import build_dashboard
+    from .dashboard import build_dashboard, listen_keys
     _console = _RichConsole()
     # Живой дашборд только в терминале; в CI/пайпе — краткая строка раз в 5 с
-    live = _RichLive(console=_console, auto_refresh=False, transient=False) if _console.is_terminal else None
-    # Для read профиля используем key из path, для других - path.name
-    if profile == "read":
-        key_to_job = {str(job.path): job for job in jobs}  # path содержит key объекта
-    else:
-        key_to_job = {job.path.name: job for job in jobs}
+    live = _RichLive(console=_console, auto_refresh=False, transient=False) if _console.is_terminal and not headless else None
+    # Задачи по имени файла — для смешанной фазы mixed
+    key_to_job = {job.path.name: job for job in jobs}
     
     def start_mixed_phase():
         """Запускает смешанную фазу для mixed профиля."""
@@ -862,100 +1469,157 @@ def run_profile(args):
             else:
                 burst_active = False
     
+    def current_phase() -> str:
+        if profile == "read" or download_phase_started:
+            return "READ"
+        if mixed_phase_started:
+            return "MIXED"
+        return "WRITE"
+
+    def on_key(key: str) -> None:
+        """+/- на дашборде: лимиты на 10% выше/ниже, и у дочерних процессов/агентов тоже."""
+        factor = {"+": 1.1, "=": 1.1, "-": 1 / 1.1}.get(key)
+        if factor is not None and limiter.active:
+            limiter.scale(factor)
+            send_shards(("limits", factor))
+
+    stop_keys = None
     try:
         if live is not None:
             live.start()
+            if limiter.active:
+                stop_keys = listen_keys(on_key)
         while any(t.is_alive() for t in threads):
             time.sleep(0.5)
             now = time.time()
             
-            # Управление паттерном bursty
-            manage_burst_pattern()
+            if run_deadline is not None and now >= run_deadline:
+                draining.set()
+            if stage_schedule is not None:
+                stage_index, stage_target = stage_schedule.at(now - run_started)
+                if not sharded:
+                    set_pool_target(stage_target)
+
+            # При шардировании фазами и очередями управляют дочерние процессы
+            if not sharded:
+                # Управление паттерном bursty
+                manage_burst_pattern()
+                if pattern == "bursty" and profile == "mixed" and stage_schedule is None:
+                    set_pool_target(max_threads if burst_active else args.threads)
             
-            # Проверяем, завершены ли все upload операции, и начинаем следующую фазу
-            with pending_lock:
-                upload_pending = q.qsize()
-            with active_lock:
-                upload_active = active_uploads
+                # Проверяем, завершены ли все upload операции, и начинаем следующую фазу
+                with pending_lock:
+                    upload_pending = queued()
+                with active_lock:
+                    upload_active = active_uploads
             
-            # Переключение фаз в зависимости от профиля
-            # Для write профиля - только запись, фаза чтения не запускается
-            # Для read профиля - только чтение, фаза записи не нужна
-            if not download_phase_started and not mixed_phase_started:
-                # Проверяем завершение операций в зависимости от профиля
-                operations_pending = 0
-                operations_active = 0
-                if profile == "write":
-                    operations_pending = upload_pending
-                    operations_active = upload_active
-                elif profile == "read":
-                    with active_lock:
-                        operations_active = active_downloads
-                    with pending_lock:
-                        operations_pending = q.qsize()
+                # Переключение фаз в зависимости от профиля
+                # Для write профиля - только запись, фаза чтения не запускается
+                # Для read профиля - только чтение, фаза записи не нужна
+                if not download_phase_started and not mixed_phase_started:
+                    # Проверяем завершение операций в зависимости от профиля
+                    operations_pending = 0
+                    operations_active = 0
+                    if profile == "write":
+                        operations_pending = upload_pending
+                        operations_active = upload_active
+                    elif profile == "read":
+                        with active_lock:
+                            operations_active = active_downloads
+                        with pending_lock:
+                            operations_pending = queued()
                 
-                if operations_pending == 0 and operations_active == 0:
-                    if profile == "mixed":
-                        start_mixed_phase()
-                    elif getattr(args, "infinite", False):
-                        # Бесконечный режим: после завершения всех файлов начинаем новый цикл
-                        # Защита от повторного запуска в течение 1 секунды
-                        if now - last_cycle_restart > 1.0:
-                            if profile == "write":
-                                # Для write профиля добавляем все файлы снова в очередь
-                                with cycle_lock:
-                                    cycle_count += 1
-                                with cycle_files_lock:
-                                    files_in_current_cycle = 0  # Сбрасываем счетчик для нового цикла
-                                for job in jobs:
-                                    try:
-                                        q.put(("upload", job), block=False)
-                                    except queue.Full:
-                                        pass
-                                last_cycle_restart = now
-                            elif profile == "read":
-                                # Для read профиля добавляем все объекты снова в очередь
-                                with cycle_lock:
-                                    cycle_count += 1
-                                with cycle_files_lock:
-                                    files_in_current_cycle = 0  # Сбрасываем счетчик для нового цикла
-                                for job in jobs:
-                                    try:
-                                        q.put(("download", job), block=False)
-                                    except queue.Full:
-                                        pass
-                                last_cycle_restart = now
-            
-            # Для mixed профиля: добавляем новые задачи в смешанном режиме
-            if mixed_phase_started and profile == "mixed":
-                with uploaded_objects_lock:
-                    if uploaded_objects and q.qsize() < (queue_limit or 1000):
-                        # Добавляем новые задачи в зависимости от паттерна
-                        intensity = burst_intensity_multiplier if burst_active else 1.0
-                        tasks_to_add = int(args.threads * intensity) if burst_active else 1
-                        uploaded_list = list(uploaded_objects.items())
-                        random.shuffle(uploaded_list)
-                        added = 0
-                        for key, info in uploaded_list:
-                            if added >= tasks_to_add:
-                                break
-                            if key in key_to_job:
-                                job = key_to_job[key]
-                                job.endpoint = info.get("endpoint")
-                                job.remote_key = info.get("remote_key")
-                                if random.random() < mixed_read_ratio:
-                                    try:
-                                        q.put(("download", job), block=False)
-                                        added += 1
-                                    except queue.Full:
-                                        break
-                                else:
-                                    try:
-                                        q.put(("upload", job), block=False)
-                                        added += 1
-                                    except queue.Full:
-                                        break
+                    if operations_pending == 0 and operations_active == 0:
+                        if profile == "mixed":
+                            start_mixed_phase()
+                        elif getattr(args, "infinite", False):
+                            # Бесконечный режим: после завершения всех файлов начинаем новый цикл
+                            # Защита от повторного запуска в течение 1 секунды
+                            if now - last_cycle_restart > 1.0:
+                                if profile == "write":
+                                    # Для write профиля добавляем все файлы снова в очередь
+                                    with cycle_lock:
+                                        cycle_count += 1
+                                    with cycle_files_lock:
+                                        files_in_current_cycle = 0  # Сбрасываем счетчик для нового цикла
+                                    for job in jobs:
+                                        try:
+                                            q.put(("upload", job), block=False)
+                                        except queue.Full:
+                                            pass
+                                    last_cycle_restart = now
+                                # read: новый цикл начинает поток листинга (list_bucket)
             
+                # Для mixed профиля: добавляем новые задачи в смешанном режиме
+                if mixed_phase_started and profile == "mixed":
+                    with uploaded_objects_lock:
+                        if uploaded_objects and q.qsize() < (queue_limit or 1000):
+                            # Добавляем новые задачи в зависимости от паттерна
+                            intensity = burst_intensity_multiplier if burst_active else 1.0
+                            tasks_to_add = int(args.threads * intensity) if burst_active else 1
+                            if open_loop:
+                                # задач должно хватать на расписание до следующего тика
+                                tasks_to_add = int(arrival_rate * 0.5) + 1
+                            uploaded_list = list(uploaded_objects.items())
+                            random.shuffle(uploaded_list)
+                            added = 0
+                            for key, info in uploaded_list:
+                                if added >= tasks_to_add:
+                                    break
+                                if key in key_to_job:
+                                    job = key_to_job[key]
+                                    job.endpoint = info.get("endpoint")
+                                    job.remote_key = info.get("remote_key")
+                                    if random.random() < mixed_read_ratio:
+                                        try:
+                                            q.put(("download", job), block=False)
+                                            added += 1
+                                        except queue.Full:
+                                            break
+                                    else:
+                                        try:
+                                            q.put(("upload", job), block=False)
+                                            added += 1
+                                        except queue.Full:
+                                            break
+
+            if headless:
+                # Дочерний процесс без дашборда: состояние уходит родителю
+                if now - last_print >= 0.5:
+                    with active_lock:
+                        status = {"active_uploads": active_uploads, "active_downloads": active_downloads}
+                    with uploaded_objects_lock:
+                        status["total_to_read"] = len(uploaded_objects)
+                    status.update(
+                        total_files=total_files, total_bytes=total_bytes,
+                        queue=queued(), phase=current_phase(), burst_active=burst_active,
+                        cycle_count=cycle_count, current_cycle_files=files_in_current_cycle,
+                    )
+                    metrics.send("status", status)
+                    last_print = now
+                continue
+            if sharded:
+                # Сводное состояние дочерних процессов вместо собственных счётчиков
+                with shard_status_lock:
+                    statuses = list(shard_status.values())
+                shard_view = {
+                    name: sum(st[name] for st in statuses)
+                    for name in ("active_uploads", "active_downloads", "queue",
+                                 "total_to_read", "current_cycle_files")
+                }
+                phases = {st["phase"] for st in statuses}
+                active_uploads = shard_view["active_uploads"]
+                active_downloads = shard_view["active_downloads"]
+                download_phase_started = "READ" in phases
+                mixed_phase_started = "MIXED" in phases
+                burst_active = any(st["burst_active"] for st in statuses)
+                cycle_count = max((st["cycle_count"] for st in statuses), default=0)
+                files_in_current_cycle = shard_view["current_cycle_files"]
+                if agents or profile == "read":
+                    # Датасет или доля листинга у каждого агента/процесса своя
+                    total_files = sum(st["total_files"] for st in statuses)
+                    total_bytes = sum(st["total_bytes"] for st in statuses)
+
             if now - last_print >= 0.5:  # Обновляем дашборд каждые 0.5 секунды для плавной анимации спиннера
                 rbps, wbps, write_rps, read_rps = metrics.current_rates(5.0)
                 files_done = metrics.write_ops_ok
@@ -968,7 +1632,7 @@ def run_profile(args):
                     active_uploads_snap = active_uploads
                     active_downloads_snap = active_downloads
                 with pending_lock:
-                    pending = q.qsize()
+                    pending = shard_view["queue"] if sharded else queued()
                 elapsed = metrics.elapsed()
                 bytes_done = metrics.write_bytes
                 bytes_read = metrics.read_bytes
@@ -991,7 +1655,7 @@ def run_profile(args):
                 elif download_phase_started or mixed_phase_started:
                     # В фазе чтения или mixed: считаем ETA по оставшимся файлам для чтения
                     with uploaded_objects_lock:
-                        total_to_read = len(uploaded_objects)
+                        total_to_read = shard_view["total_to_read"] if sharded else len(uploaded_objects)
                     files_left_read = max(total_to_read - files_read, 0)
                     if rbps > 1 and files_left_read > 0:
                         # Приблизительная оценка: средний размер файла * оставшиеся файлы / скорость чтения
@@ -1005,17 +1669,14 @@ def run_profile(args):
                 eta_str = f"{eta_sec/60:.1f} min" if eta_sec and eta_sec > 60 else (f"{eta_sec:.0f} s" if eta_sec else "n/a")
                 
                 # Определяем фазу для отображения
-                if profile == "read" or download_phase_started:
-                    phase = "READ"
-                elif mixed_phase_started:
-                    phase = "MIXED"
-                else:
-                    phase = "WRITE"
+                phase = current_phase()
                 effective_threads = args.threads
-                if pattern == "bursty" and burst_active:
+                if stage_schedule is not None:
+                    effective_threads = stage_target
+                elif pattern == "bursty" and burst_active:
                     effective_threads = int(args.threads * burst_intensity_multiplier)
                 with uploaded_objects_lock:
-                    total_to_read = len(uploaded_objects)
+                    total_to_read = shard_view["total_to_read"] if sharded else len(uploaded_objects)
                 with cycle_lock:
                     cycle_snapshot = cycle_count
                 with cycle_files_lock:
@@ -1033,6 +1694,12 @@ def run_profile(args):
                 state = {
                     "profile": profile,
                     "pattern": pattern,
+                    "arrival_rate": arrival_rate if open_loop else None,
+                    "limits": limiter.describe() if limiter.active else None,
+                    "stage": (
+                        f"{stage_index + 1}/{len(stages)} {stages[stage_index]['name']}"
+                        if stage_index is not None else None
+                    ),
                     "version": (metrics.meta or {}).get("version"),
                     "endpoint": endpoint_disp,
                     "bucket": args.bucket,
@@ -1066,8 +1733,15 @@ def run_profile(args):
                     "active_downloads": active_downloads_snap,
                     "queue": pending,
                     "recent_ops": display_ops,
+                    "phases": metrics.phase_quantiles() if live is not None else None,
                     "now": now,
                 }
+                if exporter is not None:
+                    exporter.gauges = {
+                        "inflight": {"upload": active_uploads_snap, "download": active_downloads_snap},
+                        "queue": pending,
+                        "workers": effective_threads,
+                    }
                 if live is not None:
                     live.update(build_dashboard(state), refresh=True)
                 elif now - last_plain_log >= 5.0:
@@ -1084,23 +1758,40 @@ def run_profile(args):
         if not stop.is_set():
             print("\n[Получен сигнал прерывания, завершаем процессы...]", flush=True)
             stop.set()
-            _terminate_all_processes()
+            abort_inflight()
     finally:
+        if stop_keys is not None:
+            stop_keys()
         if live is not None:
             live.stop()
-
-    # Восстанавливаем оригинальный обработчик сигнала
-    if threading.current_thread() is threading.main_thread() and original_sigint is not None:
-        signal.signal(signal.SIGINT, original_sigint)
-
-    # Завершаем все процессы перед выходом
-    _terminate_all_processes()
-
-    for t in threads:
-        t.join()
-
+        # Восстанавливаем оригинальный обработчик сигнала
+        if threading.current_thread() is threading.main_thread() and original_sigint is not None:
+            signal.signal(signal.SIGINT, original_sigint)
+        # Завершаем все процессы перед выходом (и при исключении в цикле — чтобы не
+        # оставить процессы s5cmd/rcd и scratch-каталоги)
+        if sys.exc_info()[0] is not None:
+            stop.set()
+        abort_inflight()
+        for t in threads:
+            t.join()
+        for index, proc in enumerate(shard_procs):
+            proc.join(timeout=30)
+            if proc.exitcode != 0:
+                print(f"процесс {index + 1}/{processes} завершился с кодом {proc.exitcode}", flush=True)
+        for conn in shard_conns:
+            conn.close()
+        runner.close()
+        run_finished.set()
+        if exporter is not None:
+            exporter.close()
+
+    if headless:
+        metrics.send("done", None)
+        return None
     summary = metrics.finalize()
-    print_summary(summary, metrics.csv_path, metrics.json_path)
+    if getattr(args, "show_summary", True):
+        print_summary(summary, metrics.csv_path, metrics.json_path)
+    return summary
 
 
 def print_summary(summary: dict, csv_path: str, json_path: str) -> None:
@@ -1165,14 +1856,20 @@ def print_summary(summary: dict, csv_path: str, json_path: str) -> None:
     if latency:
         lt = Table(box=box.SIMPLE_HEAVY, title="Латентность, мс", title_justify="left")
         lt.add_column("")
-        for col in ("p50", "p95", "p99", "avg"):
+        for col in ("p50", "p95", "p99", "p99.9", "avg"):
             lt.add_column(col, justify="right")
-        for name, key in (("Запись", "write"), ("Чтение", "read")):
-            data = latency.get(key)
+        # Open-loop: вторая пара строк — от планового старта, с ожиданием свободного воркера
+        intended = summary.get("latency_intended") or {}
+        rows = (("Запись", latency.get("write")), ("Чтение", latency.get("read")),
+                ("Запись от плана", intended.get("write")),
+                ("Чтение от плана", intended.get("read")))
+        for name, data in rows:
             if data:
+                # p999_ms нет в отчётах старых версий
                 lt.add_row(
                     name,
-                    *(f"{data[k]:.0f}" for k in ("p50_ms", "p95_ms", "p99_ms", "avg_ms")),
+                    *(f"{data[k]:.0f}" if k in data else "—"
+                      for k in ("p50_ms", "p95_ms", "p99_ms", "p999_ms", "avg_ms")),
                 )
         console.print(lt)
         if summary.get("client_overhead_ms"):
@@ -1181,6 +1878,46 @@ def print_summary(summary: dict, csv_path: str, json_path: str) -> None:
                 f"оверхеда запуска aws CLI[/dim]"
             )
 
+    latency_phases = summary.get("latency_phases") or {}
+    if latency_phases:
+        pt = Table(box=box.SIMPLE_HEAVY, title="Фазы запроса, мс", title_justify="left")
+        pt.add_column("")
+        pt.add_column("фаза")
+        for col in ("n", "p50", "p95", "p99", "avg"):
+            pt.add_column(col, justify="right")
+        for kind, name in (("write", "Запись"), ("read", "Чтение")):
+            for phase, data in (latency_phases.get(kind) or {}).items():
+                pt.add_row(name, phase, str(data["count"]),
+                           *(f"{data[k]:.1f}" for k in ("p50_ms", "p95_ms", "p99_ms", "avg_ms")))
+                name = ""
+        console.print(pt)
+
+    stage_rows = summary.get("stages") or []
+    if stage_rows:
+        st = Table(box=box.SIMPLE_HEAVY, title="Стадии", title_justify="left")
+        st.add_column("стадия")
+        st.add_column("потоки", justify="right")
+        st.add_column("длит., с", justify="right")
+        st.add_column("оп/с", justify="right")
+        st.add_column("MB/s", justify="right")
+        st.add_column("p50, мс", justify="right")
+        st.add_column("p99, мс", justify="right")
+        st.add_column("ошибок", justify="right")
+        for stage in stage_rows:
+            # худшая из записи/чтения — стадия mixed оценивается по более медленной операции
+            lat = list(stage.get("latency", {}).values())
+            p50 = max((d["p50_ms"] for d in lat), default=None)
+            p99 = max((d["p99_ms"] for d in lat), default=None)
+            st.add_row(
+                stage["name"], str(stage["threads"]), f"{stage['duration_sec']:.0f}",
+                f"{stage['ops_per_sec']:.1f}",
+                f"{stage['write_MBps'] + stage['read_MBps']:.1f}",
+                "—" if p50 is None else f"{p50:.0f}",
+                "—" if p99 is None else f"{p99:.0f}",
+                str(stage["err_ops"]),
+            )
+        console.print(st)
+
     errors = summary.get("errors") or {}
     if errors:
         et = Table(box=box.SIMPLE_HEAVY, title="Ошибки", title_justify="left")
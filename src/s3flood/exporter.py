@@ -0,0 +1,169 @@
+"""Живой экспорт метрик прогона для Prometheus: s3flood run --metrics-listen :9109.
+
+Лёгкий HTTP-сервер в фоновом потоке отдаёт GET /metrics в текстовом формате
+Prometheus 0.0.4: счётчики операций и байт по op/endpoint, ошибки по типам
+(classify_error), гистограмму латентности и датчики «в полёте»/очередь/потоки.
+
+Рабочие потоки не ждут экспортёра: каждый запрос /metrics читает снимки
+словарей и гистограмм Metrics без его блокировки — копия dict/list атомарна
+под GIL, а число в гистограмме считается по тому же снимку корзин, что и сами
+корзины. Значения могут отставать на операции, которые пишутся в этот момент.
+"""
+from __future__ import annotations
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Границы гистограммы латентности, секунды (латентность операции целая, в мс)
+LATENCY_BUCKETS_SEC = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def parse_listen(value: str, default_host: str = "0.0.0.0") -> tuple[str, int]:
+    """':9109', 'host:9109', '[::1]:9109' или '9109' → (host, port); порт 0 — любой свободный."""
+    text = str(value).strip()
+    host, sep, port = text.rpartition(":")
+    if not sep:
+        host, port = "", text
+    host = host.strip("[]") or default_host
+    try:
+        number = int(port)
+    except ValueError:
+        raise ValueError(f"некорректный адрес {value!r}: ожидается [host]:port") from None
+    if not 0 <= number < 65536:
+        raise ValueError(f"некорректный порт в {value!r}")
+    return host, number
+
+
+class _ThreadingHTTPServer6(ThreadingHTTPServer):
+    address_family = socket.AF_INET6
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics(metrics, gauges: dict | None = None) -> str:
+    """Текст /metrics по снимку Metrics (executor.Metrics) и датчикам прогона.
+
+    gauges — {"inflight": {op: n}, "queue": n, "workers": n}; отсутствующие
+    датчики не выводятся.
+    """
+    gauges = gauges or {}
+    lines: list[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    meta = metrics.meta or {}
+    family("s3flood_info", "gauge", "Параметры прогона")
+    lines.append("s3flood_info" + _labels(
+        version=meta.get("version", ""), profile=meta.get("profile", ""),
+        client=meta.get("client", ""), engine=meta.get("engine", ""),
+    ) + " 1")
+    family("s3flood_elapsed_seconds", "gauge", "Время с начала прогона")
+    lines.append(f"s3flood_elapsed_seconds {_number(metrics.elapsed())}")
+
+    family("s3flood_operations_total", "counter", "Завершённые операции без прогрева")
+    for (op, endpoint, status), count in sorted(metrics.op_counts.copy().items()):
+        lines.append("s3flood_operations_total" + _labels(op=op, endpoint=endpoint, status=status) + f" {count}")
+    family("s3flood_bytes_total", "counter", "Байты успешных операций без прогрева")
+    for (op, endpoint), total in sorted(metrics.op_bytes.copy().items()):
+        lines.append("s3flood_bytes_total" + _labels(op=op, endpoint=endpoint) + f" {total}")
+    family("s3flood_errors_total", "counter", "Ошибки по типам (classify_error)")
+    for error_class, count in sorted(metrics.error_counts.copy().items()):
+        lines.append("s3flood_errors_total" + _labels(**{"class": error_class}) + f" {count}")
+    family("s3flood_warmup_operations_total", "counter", "Операции прогрева, не вошедшие в статистику")
+    lines.append(f"s3flood_warmup_operations_total {metrics.warmup_ops}")
+
+    family("s3flood_latency_seconds", "histogram", "Латентность успешных операций")
+    bounds_ms = [bound * 1000 for bound in LATENCY_BUCKETS_SEC]
+    for (op, endpoint), hist in sorted(metrics.endpoint_latency.copy().items()):
+        cumulative, count, sum_ms = hist.cumulative(bounds_ms)
+        for bound, seen in zip(LATENCY_BUCKETS_SEC, cumulative):
+            lines.append("s3flood_latency_seconds_bucket" + _labels(op=op, endpoint=endpoint, le=bound) + f" {seen}")
+        lines.append("s3flood_latency_seconds_bucket" + _labels(op=op, endpoint=endpoint, le="+Inf") + f" {count}")
+        lines.append("s3flood_latency_seconds_sum" + _labels(op=op, endpoint=endpoint) + f" {_number(sum_ms / 1000)}")
+        lines.append("s3flood_latency_seconds_count" + _labels(op=op, endpoint=endpoint) + f" {count}")
+
+    if "inflight" in gauges:
+        family("s3flood_inflight", "gauge", "Операции в полёте")
+        for op, count in sorted(gauges["inflight"].items()):
+            lines.append("s3flood_inflight" + _labels(op=op) + f" {count}")
+    if "queue" in gauges:
+        family("s3flood_queue_depth", "gauge", "Задачи в очереди")
+        lines.append(f"s3flood_queue_depth {gauges['queue']}")
+    if "workers" in gauges:
+        family("s3flood_workers", "gauge", "Целевое число потоков (операций в полёте)")
+        lines.append(f"s3flood_workers {gauges['workers']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """HTTP-эндпоинт /metrics поверх Metrics прогона (см. модуль).
+
+    gauges обновляет цикл прогона целиком новым словарём (присваивание
+    атомарно) — экспортёр только читает его.
+    """
+
+    def __init__(self, metrics, listen: str):
+        host, port = parse_listen(listen)
+        self.metrics = metrics
+        self.gauges: dict = {}
+        server_cls = _ThreadingHTTPServer6 if ":" in host else ThreadingHTTPServer
+        self._httpd = server_cls((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._httpd.server_address[:2]
+
+    def start(self) -> MetricsExporter:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="metrics-exporter")
+        self._thread.start()
+        return self
+
+    def render(self) -> str:
+        return render_metrics(self.metrics, self.gauges)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+
+def _make_handler(exporter: MetricsExporter):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "s3flood-exporter"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                status, content_type, body = 200, CONTENT_TYPE, exporter.render().encode()
+            elif path == "/":
+                status, content_type, body = 200, "text/plain; charset=utf-8", b"s3flood exporter: /metrics\n"
+            else:
+                status, content_type, body = 404, "text/plain; charset=utf-8", b"not found\n"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
@@ -0,0 +1,190 @@
+"""Поиск предела нагрузки под SLO: s3flood run --find-max.
+
+Прогон повторяется шагами фиксированной длины (warmup_sec + find_max_step_sec)
+с растущей нагрузкой — числом потоков (find_max_by: threads) или целевой
+частотой стартов open-loop (find_max_by: rate). Пока шаг укладывается в SLO
+(p99 латентности и доля ошибок), нагрузка удваивается; после первого
+нарушения — бинарный поиск между последним успешным и первым провальным
+шагом. В отчёт уходит кривая всех шагов и найденный максимум.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from .executor import run_profile
+
+# Бинарный поиск останавливается, когда вилка уже 5% от найденного максимума
+PRECISION = 0.05
+MAX_STEPS = 20
+
+
+class SaturationSearch:
+    """Выбор следующей точки: удвоение до первого нарушения SLO, затем бисекция.
+
+    integer=True — точки целые (потоки). Провал уже на стартовой точке
+    переводит поиск вниз, к нулю: пока нет ни одной точки в SLO, точность
+    считается от start. next_point() возвращает None, когда вилка сузилась
+    до PRECISION, достигнут limit или исчерпан max_steps.
+    """
+
+    def __init__(self, start: float, limit: float, integer: bool = True,
+                 precision: float = PRECISION, max_steps: int = MAX_STEPS):
+        if start <= 0 or limit < start:
+            raise ValueError(f"некорректный диапазон поиска: {start}..{limit}")
+        self.integer = integer
+        self.start = start
+        self.limit = limit
+        self.precision = precision
+        self.max_steps = max_steps
+        self.best: float | None = None  # максимальная точка в SLO
+        self.lowest_fail: float | None = None
+        self.steps = 0
+        self._next: float | None = self._round(start)
+
+    def _round(self, value: float) -> float:
+        return max(int(value), 1) if self.integer else value
+
+    def next_point(self) -> float | None:
+        if self.steps >= self.max_steps:
+            return None
+        return self._next
+
+    def report(self, point: float, passed: bool) -> None:
+        """Результат шага point; определяет следующую точку."""
+        self.steps += 1
+        if passed:
+            self.best = point if self.best is None else max(self.best, point)
+        else:
+            self.lowest_fail = point if self.lowest_fail is None else min(self.lowest_fail, point)
+        if self.lowest_fail is None:
+            # Рост: удвоение, пока не упрёмся в limit
+            self._next = None if point >= self.limit else self._round(min(point * 2, self.limit))
+            return
+        lo = self.best or 0.0
+        hi = self.lowest_fail
+        if hi - lo <= max((lo or self.start) * self.precision, 1 if self.integer else 0.0):
+            self._next = None
+            return
+        mid = self._round((lo + hi) / 2)
+        self._next = mid if lo < mid < hi else None
+
+
+def step_result(point: float, by: str, summary: dict, slo_p99_ms: float,
+                slo_error_rate: float) -> dict:
+    """Точка кривой из отчёта шага: p99, доля ошибок, ops/s, MB/s и вердикт по SLO.
+
+    В режиме rate p99 берётся от планового старта (latency_intended): очередь
+    к перегруженному бэкенду — тоже нарушение SLO.
+    """
+    latency = summary.get("latency", {})
+    if by == "rate":
+        latency = summary.get("latency_intended") or latency
+    p99 = max((lat.get("p99_ms", 0.0) for lat in latency.values()), default=None)
+    ok_ops = summary.get("write_ok_ops", 0) + summary.get("read_ok_ops", 0)
+    err_ops = summary.get("err_ops", 0)
+    total = ok_ops + err_ops
+    error_rate = err_ops / total if total else 0.0
+    duration = summary.get("duration_sec") or 0.0
+    passed = ok_ops > 0 and p99 is not None and p99 <= slo_p99_ms and error_rate <= slo_error_rate
+    return {
+        by: point,
+        "ops": total,
+        "ops_per_sec": ok_ops / duration if duration > 0 else 0.0,
+        "MBps": summary.get("write_MBps_avg", 0.0) + summary.get("read_MBps_avg", 0.0),
+        "p99_ms": p99,
+        "error_rate": error_rate,
+        "passed": passed,
+    }
+
+
+def _step_path(path: str, index: int) -> str:
+    p = Path(path)
+    return str(p.with_name(f"{p.stem}.step{index:02d}{p.suffix}"))
+
+
+def run_find_max(args: argparse.Namespace) -> dict:
+    """Шаги прогона с растущей нагрузкой; итог — в args.report."""
+    by = args.find_max_by
+    slo_p99_ms = args.slo_p99_ms
+    slo_error_rate = args.slo_error_rate
+    if by == "rate":
+        start = args.find_max_start or args.arrival_rate or 10.0
+        limit = args.find_max_limit or start * 1024
+    else:
+        start = args.find_max_start or args.threads
+        limit = args.find_max_limit or 1024
+    search = SaturationSearch(start, max(limit, start), integer=by == "threads")
+    step_sec = args.find_max_step_sec
+    print(
+        f"find-max: {by} от {start:g} до {limit:g}, шаг {step_sec:g} с"
+        f" (+{args.warmup_sec:g} с прогрева), SLO p99 ≤ {slo_p99_ms:g} мс,"
+        f" ошибок ≤ {slo_error_rate:.1%}",
+        flush=True,
+    )
+    steps: list[dict] = []
+    while (point := search.next_point()) is not None:
+        index = len(steps) + 1
+        step_args = argparse.Namespace(**vars(args))
+        step_args.report = _step_path(args.report, index)
+        step_args.metrics = _step_path(args.metrics, index)
+        step_args.duration_sec = args.warmup_sec + step_sec
+        step_args.infinite = True
+        step_args.show_summary = False
+        step_args.stages = []  # размер пула задаёт поиск, а не расписание стадий
+        if by == "rate":
+            step_args.pattern = "open-loop"
+            step_args.arrival_rate = point
+        else:
+            step_args.threads = point
+        summary = run_profile(step_args)
+        result = step_result(point, by, summary, slo_p99_ms, slo_error_rate)
+        result["report"] = step_args.report
+        steps.append(result)
+        search.report(point, result["passed"])
+        p99 = "—" if result["p99_ms"] is None else f"{result['p99_ms']:.1f} мс"
+        print(
+            f"find-max шаг {index}: {by}={point:g} → {result['ops_per_sec']:.1f} оп/с,"
+            f" {result['MBps']:.1f} MB/s, p99 {p99}, ошибок {result['error_rate']:.1%}"
+            f" — {'в SLO' if result['passed'] else 'НАРУШЕН SLO'}",
+            flush=True,
+        )
+    passed = [s for s in steps if s["passed"]]
+    best = max(passed, key=lambda s: s[by]) if passed else None
+    out = {
+        "meta": {
+            "profile": args.profile,
+            "client": args.client,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "find_max": {
+            "by": by,
+            "slo_p99_ms": slo_p99_ms,
+            "slo_error_rate": slo_error_rate,
+            "step_sec": step_sec,
+            "warmup_sec": args.warmup_sec,
+            "limit_reached": best is not None and best[by] >= search.limit,
+            "max": best,
+            "steps": steps,
+        },
+    }
+    with open(args.report, "w") as f:
+        json.dump(out, f, indent=2)
+    if best is None:
+        print(f"find-max: ни один шаг не уложился в SLO (минимум {by}={min(s[by] for s in steps):g})" if steps
+              else "find-max: шагов не было")
+    else:
+        print(
+            f"find-max: максимум в SLO — {by}={best[by]:g}: {best['ops_per_sec']:.1f} оп/с,"
+            f" {best['MBps']:.1f} MB/s (отчёт: {args.report})"
+        )
+    return out
+
+
+def run_or_find_max(args: argparse.Namespace) -> dict | None:
+    """run/controller: обычный прогон или поиск предела (find_max)."""
+    if getattr(args, "find_max", False):
+        return run_find_max(args)
+    return run_profile(args)
@@ -22,8 +22,9 @@ from prompt_toolkit.formatted_text import HTML
 from .app_settings import APP_SETTINGS_FILE, save_app_settings
 from .config import discover_configs, load_run_config, resolve_run_settings
 from .config_editor import build_default_config, edit_config_interactively
-from .dataset import plan_and_generate
-from .executor import run_profile, get_spinner
+from .dataset import load_dataset, plan_and_generate
+from .executor import get_spinner
+from .findmax import run_or_find_max
 from .runner import _get_aws_env, aws_check_bucket_access, aws_list_objects
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
@@ -255,6 +256,8 @@ def run_test_menu():
     summary_table.add_row("Bucket:", settings.bucket)
     summary_table.add_row("Профиль:", settings.profile)
     summary_table.add_row("Data_dir:", settings.data_dir)
+    if settings.data_source == "synthetic":
+        summary_table.add_row("Data_source:", f"synthetic ({format_bytes_to_readable(settings.synthetic_bytes)} на проход)")
     summary_table.add_row("Threads:", str(settings.threads))
     summary_table.add_row("Infinite:", "yes" if settings.infinite else "no")
     summary_table.add_row("unique_remote_names:", "yes" if settings.unique_remote_names else "no")
@@ -356,8 +359,9 @@ def run_test_menu():
         questionary.press_any_key_to_continue("Нажмите любую клавишу для запуска...").ask()
 
     # Запуск профиля (у самого теста уже есть свой спиннер в дашборде)
+    settings.agents = []  # агенты из конфига используются только командой controller
     try:
-        run_profile(settings.to_namespace())
+        run_or_find_max(settings.to_namespace())
     except KeyboardInterrupt:
         console.print("\n[bold yellow]Остановка по запросу пользователя.[/bold cyan]", style="dim")
     except Exception as exc:
@@ -518,7 +522,8 @@ def create_dataset_menu():
                 use_symlinks=use_symlinks,
                 min_counts=min_counts,
                 group_limits=group_limits,
-                safety_ratio=safety_ratio
+                safety_ratio=safety_ratio,
+                jobs=os.cpu_count() or 1,
             )
         console.print("[bold green]✅ Датасет успешно создан![/bold green]")
         dataset_path = str(Path(path).expanduser().resolve())
@@ -771,27 +776,20 @@ def validate_config_menu():
     # Проверка локального датасета
     console.print("\n[bold]Проверка датасета (data_dir)...[/bold]")
     data_root = Path(settings.data_dir).expanduser()
-    if not data_root.exists():
+    if settings.data_source == "synthetic":
+        console.print("[green]data_source: synthetic — тела загрузки генерируются в памяти, датасет не нужен[/green]")
+    elif not data_root.exists():
         console.print(f"[bold red]Каталог датасета не найден:[/bold red] [cyan]{data_root}[/cyan]")
     else:
-        # Подсчёт файлов и общего объёма
-        total_files = 0
-        total_bytes = 0
-        try:
-            for p in data_root.rglob("*"):
-                if p.is_file():
-                    total_files += 1
-                    try:
-                        total_bytes += p.stat().st_size
-                    except OSError:
-                        continue
-            size_gb = total_bytes / 1024 / 1024 / 1024 if total_bytes > 0 else 0.0
-            console.print(
-                f"[green]Каталог датасета найден:[/green] [cyan]{data_root}[/cyan] "
-                f"(файлов: {total_files}, объём: {size_gb:.2f} GB)"
-            )
-        except OSError as exc:
-            console.print(f"[bold red]Ошибка при обходе датасета: {exc}[/bold red]")
+        # Подсчёт файлов и общего объёма: манифест или один обход каталога
+        entries, from_manifest = load_dataset(data_root)
+        total_bytes = sum(e["size"] for e in entries)
+        size_gb = total_bytes / 1024 / 1024 / 1024 if total_bytes > 0 else 0.0
+        console.print(
+            f"[green]Каталог датасета найден:[/green] [cyan]{data_root}[/cyan] "
+            f"(файлов: {len(entries)}, объём: {size_gb:.2f} GB"
+            f"{', по манифесту' if from_manifest else ''})"
+        )
 
     console.print("\n[bold]Пробуем получить список объектов из бакета...[/bold]")
     try:
@@ -907,14 +905,14 @@ def validate_config_menu():
 
 
 def view_metrics_menu():
-    """Меню просмотра метрик: базовый анализ CSV."""
+    """Меню просмотра метрик: базовый анализ CSV или бинарного журнала операций."""
     console.clear()
     console.rule("[bold cyan]≡ Просмотр метрик[/bold cyan]", style="dim")
 
     cwd = Path(".").resolve()
-    csv_files = sorted(cwd.glob("*.csv"))
+    csv_files = sorted([*cwd.glob("*.csv"), *cwd.glob("*.ops")])
     if not csv_files:
-        console.print("[yellow]В текущем каталоге нет CSV-файлов с метриками.[/yellow]\n")
+        console.print("[yellow]В текущем каталоге нет файлов с метриками (*.csv, *.ops).[/yellow]\n")
         questionary.press_any_key_to_continue("Нажмите любую клавишу для возврата в меню...").ask()
         return
 
@@ -922,7 +920,7 @@ def view_metrics_menu():
     choices.append(f"{get_menu_emoji('⬅️', '[0]')} Вернуться в главное меню")
 
     choice = q_select(
-        "Выберите CSV с метриками:",
+        "Выберите файл с метриками:",
         choices=choices
     ).ask()
     if not choice or choice.startswith(get_menu_emoji("⬅️")):
@@ -931,16 +929,21 @@ def view_metrics_menu():
     metrics_path = cwd / choice
 
     from .dashboard import sparkline
-    from .metrics import analyze_operations, read_ops_csv
+    from .metrics import analyze_operations
+    from .oplog import STREAM_MIN_BYTES, analyze_stream, load_ops
 
     try:
-        ops = read_ops_csv(str(metrics_path))
-    except OSError as exc:
+        # многосуточный журнал целиком в память не грузим — однопроходная сводка
+        streamed = metrics_path.stat().st_size >= STREAM_MIN_BYTES
+        if streamed:
+            r = analyze_stream(str(metrics_path)).result()
+        else:
+            r = analyze_operations(load_ops(str(metrics_path)))
+    except (OSError, ValueError) as exc:
         console.print(f"[bold red]Не удалось прочитать файл метрик: {exc}[/bold red]")
         questionary.press_any_key_to_continue("Нажмите любую клавишу для возврата в меню...").ask()
         return
 
-    r = analyze_operations(ops)
     if r is None:
         console.print("[yellow]В файле не найдено ни одной операции.[/yellow]\n")
         questionary.press_any_key_to_continue("Нажмите любую клавишу для возврата в меню...").ask()
@@ -950,6 +953,8 @@ def view_metrics_menu():
         return f"{nbytes / 1024**3:.2f} GB" if nbytes >= 1024**3 else f"{nbytes / 1024**2:.1f} MB"
 
     console.print(f"\n[bold]Файл метрик:[/bold] [cyan]{metrics_path.name}[/cyan]\n")
+    if streamed:
+        console.print("[dim]большой файл: потоковый разбор, перцентили — оценка с точностью ~1%[/dim]")
 
     # Сводка
     err_style = "bold red" if r["err"] else "dim"
@@ -1007,6 +1012,22 @@ def view_metrics_menu():
         console.print()
         console.print(table)
 
+    # Фазы латентности (нативный клиент): где теряется время — соединение, сервер или передача
+    if r["phases"]:
+        table = Table(title="Фазы латентности, мс", box=None, title_justify="left", title_style="bold")
+        table.add_column("op", style="cyan")
+        table.add_column("фаза")
+        table.add_column("n", justify="right")
+        table.add_column("p50", justify="right")
+        table.add_column("p90", justify="right")
+        table.add_column("p99", justify="right")
+        for op, phases in sorted(r["phases"].items()):
+            for phase, plat in phases.items():
+                table.add_row(op, phase, str(plat["count"]), f"{plat['p50_ms']:.1f}",
+                              f"{plat['p90_ms']:.1f}", f"{plat['p99_ms']:.1f}")
+        console.print()
+        console.print(table)
+
     # Ошибки по типам
     if r["errors"]:
         table = Table(title="Ошибки", box=None, title_justify="left", title_style="bold")
@@ -1025,22 +1046,17 @@ def view_metrics_menu():
 
     # Топ медленных операций — с меткой времени от старта, чтобы можно было
     # сопоставить просадку с событиями на стороне хранилища
-    ok_ops = [o for o in ops if o["status"] == "ok" and o["ts_end"] > o["ts_start"]]
-    if ok_ops:
-        ts0 = min(o["ts_start"] for o in ops)
-        slow = sorted(ok_ops, key=lambda o: (o["bytes"] / 1024 / 1024) / (o["ts_end"] - o["ts_start"]))[:5]
+    if r["slowest"]:
         table = Table(title="Топ-5 медленных", box=None, title_justify="left", title_style="bold")
         table.add_column("t+", justify="right", style="dim")
         table.add_column("op", style="cyan")
         table.add_column("размер", justify="right")
         table.add_column("время", justify="right")
         table.add_column("MB/s", justify="right")
-        for o in slow:
-            dur = o["ts_end"] - o["ts_start"]
-            speed = (o["bytes"] / 1024 / 1024) / dur
+        for o in r["slowest"]:
             table.add_row(
-                f"{o['ts_start'] - ts0:.0f} с", o["op"], fmt_gb(o["bytes"]),
-                f"{dur:.1f} с", f"{speed:.1f}",
+                f"{o['offset_s']:.0f} с", o["op"], fmt_gb(o["bytes"]),
+                f"{o['duration_s']:.1f} с", f"{o['speed_mbps']:.1f}",
             )
         console.print()
         console.print(table)
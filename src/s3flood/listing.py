@@ -0,0 +1,271 @@
+"""Параллельный листинг бакета: ключевое пространство делится на диапазоны.
+
+Один курсор ListObjectsV2 — один запрос в полёте, и на бакете в десятки
+миллионов ключей листинг упирается в латентность LIST, а не в хранилище.
+ParallelLister листит диапазоны ключей [lower, upper) в несколько потоков:
+
+- range — начальный диапазон один (весь префикс); пока есть свободные
+  потоки, диапазон, у которого пришла неполная страница, делится
+  пополам по ключам (start-after) — ни структура ключей, ни распределение
+  заранее не нужны;
+- prefix — сначала листинг с delimiter: объекты уровня отдаются сразу,
+  каждый общий префикс становится своим диапазоном (и дальше делится так же).
+
+Страницы приходят по мере получения, без порядка между диапазонами.
+ListStats — счётчики и гистограмма латентности запросов: тот же листинг
+служит бенчмарком пропускной способности LIST (s3flood list-bench).
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from .metrics import LatencyHistogram
+from .s3client import S3Client
+
+LIST_MODES = ("range", "prefix")
+DEFAULT_LIST_WORKERS = 8
+# Верхний предел символа при делении диапазона без верхней границы: ключи обычно ASCII
+_SPLIT_CEILING = 0x80
+# start-after чуть меньше нижней границы диапазона: предыдущий символ + максимальный
+_AFTER_MAX = chr(0x10FFFF)
+
+
+def key_successor(prefix: str) -> str | None:
+    """Наименьшая строка больше всех ключей с этим префиксом (None — без границы)."""
+    prefix = prefix.rstrip(_AFTER_MAX)
+    if not prefix:
+        return None
+    code = ord(prefix[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000
+    return prefix[:-1] + chr(code)
+
+
+def split_point(lower: str, upper: str | None) -> str | None:
+    """Ключ m: lower < m < upper — середина диапазона по первому различающемуся символу.
+
+    None — между lower и upper делить нечего.
+    """
+    bound = upper or ""
+    i = 0
+    while i < len(lower) and i < len(bound) and lower[i] == bound[i]:
+        i += 1
+    lo = ord(lower[i]) if i < len(lower) else -1
+    hi = ord(bound[i]) if upper is not None and i < len(bound) else _SPLIT_CEILING
+    mid = (lo + hi) // 2
+    if lo < mid < hi and not 0xD800 <= mid <= 0xDFFF:
+        return lower[:i] + chr(mid)
+    if lo < 0:
+        return None
+    # Соседние символы: делим хвост lower — всё, что за ним, ещё меньше upper
+    tail = split_point(lower[i + 1:], None)
+    return None if tail is None else lower[:i + 1] + tail
+
+
+def _start_after(lower: str, prefix: str) -> str | None:
+    """start-after, с которого листинг захватывает ключи ≥ lower (ключи меньше lower отбрасываются)."""
+    if lower <= prefix:
+        return None
+    code = ord(lower[-1]) - 1
+    if code < 0:
+        return lower[:-1]
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xD7FF
+    return lower[:-1] + chr(code) + _AFTER_MAX
+
+
+@dataclass
+class _Range:
+    lower: str
+    upper: str | None
+    delimiter: bool = False  # prefix: листинг уровня с delimiter
+
+
+@dataclass
+class ListStats:
+    """Итоги листинга: запросы, объекты, диапазоны и латентность запросов."""
+    requests: int = 0
+    objects: int = 0
+    bytes: int = 0
+    ranges: int = 0
+    splits: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    @property
+    def elapsed(self) -> float:
+        return max((self.finished or time.monotonic()) - self.started, 1e-9)
+
+    def summary(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "requests": self.requests,
+            "objects": self.objects,
+            "bytes": self.bytes,
+            "ranges": self.ranges,
+            "splits": self.splits,
+            "elapsed_sec": round(elapsed, 3),
+            "requests_per_sec": self.requests / elapsed,
+            "objects_per_sec": self.objects / elapsed,
+            "latency": self.latency.summary(),
+        }
+
+
+class ParallelLister:
+    """Листинг s3://bucket/prefix в workers потоков по диапазонам ключей (см. модуль).
+
+    pages() — генератор страниц [{key, size}] (ключи полные, как в бакете);
+    ошибка запроса останавливает листинг и пробрасывается из pages().
+    """
+
+    def __init__(self, client: S3Client, bucket: str, prefix: str = "",
+                 workers: int = DEFAULT_LIST_WORKERS, mode: str = "range",
+                 page_size: int = 1000, delimiter: str = "/"):
+        if mode not in LIST_MODES:
+            raise ValueError(f"неизвестный режим листинга {mode!r} ({' | '.join(LIST_MODES)})")
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.workers = max(int(workers), 1)
+        self.mode = mode
+        self.page_size = page_size
+        self.delimiter = delimiter
+        self.stats = ListStats()
+        self._cond = threading.Condition()
+        self._work: deque[_Range] = deque()
+        self._outstanding = 0
+        self._idle = 0
+        self._stopped = False
+        self._error: BaseException | None = None
+        # Несколько страниц на поток: листинг не убегает от потребителя
+        self._results: queue.Queue = queue.Queue(maxsize=self.workers * 2)
+
+    def _add(self, rng: _Range) -> None:
+        """Новый диапазон в работу (под self._cond)."""
+        self._work.append(rng)
+        self._outstanding += 1
+        self.stats.ranges += 1
+        self._cond.notify()
+
+    def _emit(self, item) -> bool:
+        """Отдаёт страницу потребителю; False — листинг остановлен."""
+        while not self._stopped:
+            try:
+                self._results.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _list_range(self, rng: _Range) -> None:
+        token = None
+        after = _start_after(rng.lower, self.prefix)
+        while not self._stopped:
+            started = time.monotonic()
+            page = self.client.list_objects_page(
+                self.bucket, rng.lower if rng.delimiter else self.prefix,
+                continuation_token=token, start_after=None if token else after,
+                delimiter=self.delimiter if rng.delimiter else None, max_keys=self.page_size,
+            )
+            latency_ms = (time.monotonic() - started) * 1000
+            upper = rng.upper
+            objects = [obj for obj in page.objects
+                       if obj["key"] >= rng.lower and (upper is None or obj["key"] < upper)]
+            last = page.objects[-1]["key"] if page.objects else None
+            done = not page.is_truncated or not page.next_token or (
+                upper is not None and last is not None and last >= upper)
+            with self._cond:
+                self.stats.requests += 1
+                self.stats.latency.record(latency_ms)
+                self.stats.objects += len(objects)
+                self.stats.bytes += sum(obj["size"] for obj in objects)
+                for common in page.prefixes if rng.delimiter else ():
+                    self._add(_Range(common, key_successor(common)))
+                # Свободный поток и пустая очередь — отдаём ему верхнюю половину остатка
+                if not done and not rng.delimiter and last is not None and self._idle and not self._work:
+                    mid = split_point(last, rng.upper)
+                    if mid is not None:
+                        self._add(_Range(mid, rng.upper))
+                        self.stats.splits += 1
+                        rng.upper = mid
+            if objects and not self._emit(objects):
+                return
+            if done:
+                return
+            token = page.next_token
+
+    def _worker(self) -> None:
+        try:
+            while True:
+                with self._cond:
+                    while not self._work and self._outstanding and not self._stopped:
+                        self._idle += 1
+                        self._cond.wait()
+                        self._idle -= 1
+                    if self._stopped or not self._outstanding:
+                        return
+                    rng = self._work.popleft()
+                try:
+                    self._list_range(rng)
+                finally:
+                    with self._cond:
+                        self._outstanding -= 1
+                        if not self._outstanding:
+                            self._cond.notify_all()
+        except BaseException as exc:  # ошибка запроса останавливает весь листинг
+            with self._cond:
+                if self._error is None:
+                    self._error = exc
+                self._stopped = True
+                self._cond.notify_all()
+        finally:
+            self._results.put(None)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def pages(self):
+        """Страницы по мере получения; после последней stats.finished заполнен."""
+        self.stats.started = time.monotonic()
+        with self._cond:
+            self._add(_Range(self.prefix, key_successor(self.prefix), delimiter=self.mode == "prefix"))
+        threads = [threading.Thread(target=self._worker, daemon=True, name=f"list-{i}")
+                   for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        running = len(threads)
+        try:
+            while running:
+                item = self._results.get()
+                if item is None:
+                    running -= 1
+                    continue
+                yield item
+        finally:
+            self.stop()
+            # Потоки, ждущие места в очереди, видят остановку; остаток страниц не нужен
+            while running:
+                try:
+                    if self._results.get(timeout=0.2) is None:
+                        running -= 1
+                except queue.Empty:
+                    pass
+            self.stats.finished = time.monotonic()
+        if self._error is not None:
+            raise self._error
+
+
+def list_bench(client: S3Client, bucket: str, prefix: str = "", workers: int = DEFAULT_LIST_WORKERS,
+               mode: str = "range", page_size: int = 1000) -> dict:
+    """LIST как операция бенчмарка: полный листинг префикса, итог — ListStats.summary()."""
+    lister = ParallelLister(client, bucket, prefix, workers=workers, mode=mode, page_size=page_size)
+    for _ in lister.pages():
+        pass
+    return {"workers": lister.workers, "mode": mode, "page_size": page_size, **lister.stats.summary()}
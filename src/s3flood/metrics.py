@@ -1,26 +1,43 @@
 """Вычисление статистик и запись метрик s3flood.
 
 Чистые функции перцентилей/сводок и вспомогательные классы:
-RateWindow — скользящее окно для RPS без потери операций,
+LatencyHistogram — гистограмма латентности фиксированного размера,
+OpStore — компактное колоночное хранилище операций прогона,
+OpColumns — операции журнала по колонкам numpy для analyze_operations
+(read_ops_columns читает metrics.csv пачками),
+OpsSketch — однопроходная сводка журнала в памяти фиксированного размера,
+RateWindow — кольцо счётчиков по 100 мс для RPS без потери операций,
 MetricsCsvWriter — буферизованная запись CSV в отдельном потоке,
 чтобы дисковый I/O не сериализовал воркеров.
 """
 from __future__ import annotations
 
 import csv
+import heapq
+import itertools
 import math
 import queue
 import re
 import statistics
 import threading
 import time
-from collections import deque
+from array import array
+
+try:  # numpy необязателен: без него OpStore считает отчёт проходом по колонкам
+    import numpy as _np
+except ImportError:  # pragma: no cover - зависит от окружения
+    _np = None
 
 _AWS_ERROR_CODE_RE = re.compile(r"An error occurred \((\w+)\)")
 
+# Фазы латентности операции (s3client.RequestPhases) — по колонке <фаза>_ms в CSV
+PHASES = ("dns", "connect", "tls", "send", "ttfb", "transfer")
+
 CSV_FIELDS = [
     "ts_start", "ts_end", "op", "bytes", "status",
     "latency_ms", "error", "endpoint", "thread_id", "attempt", "size_group",
+    "ts_intended",
+    *(f"{phase}_ms" for phase in PHASES),
 ]
 
 
@@ -34,9 +51,12 @@ def percentile(values: list[float], p: int) -> float:
     return cuts[p - 1]
 
 
-def summarize_speeds(speeds: list[float]) -> dict:
-    """Сводка по скоростям (MB/s): avg/median/min/max/p90/p95."""
-    if not speeds:
+def summarize_speeds(speeds) -> dict:
+    """Сводка по скоростям (MB/s): avg/median/min/max/p90/p95.
+
+    speeds — список или numpy-массив (тогда сводка считается векторно).
+    """
+    if len(speeds) == 0:
         return {
             "avg_speed_mbps": 0.0,
             "median_speed_mbps": 0.0,
@@ -45,6 +65,17 @@ def summarize_speeds(speeds: list[float]) -> dict:
             "p90_speed_mbps": 0.0,
             "p95_speed_mbps": 0.0,
         }
+    if _np is not None and isinstance(speeds, _np.ndarray):
+        # линейная интерполяция numpy совпадает с method=inclusive у percentile()
+        p90, p95 = _np.percentile(speeds, [90, 95])
+        return {
+            "avg_speed_mbps": float(speeds.mean()),
+            "median_speed_mbps": float(_np.median(speeds)),
+            "min_speed_mbps": float(speeds.min()),
+            "max_speed_mbps": float(speeds.max()),
+            "p90_speed_mbps": float(p90),
+            "p95_speed_mbps": float(p95),
+        }
     return {
         "avg_speed_mbps": statistics.mean(speeds),
         "median_speed_mbps": statistics.median(speeds),
@@ -55,10 +86,25 @@ def summarize_speeds(speeds: list[float]) -> dict:
     }
 
 
-def summarize_latencies(latencies_ms: list[float]) -> dict | None:
-    """Сводка по латентности (мс): count/avg/min/max + p50/p90/p95/p99."""
-    if not latencies_ms:
+def summarize_latencies(latencies_ms) -> dict | None:
+    """Сводка по латентности (мс): count/avg/min/max + p50/p90/p95/p99.
+
+    latencies_ms — список или numpy-массив (тогда сводка считается векторно).
+    """
+    if len(latencies_ms) == 0:
         return None
+    if _np is not None and isinstance(latencies_ms, _np.ndarray):
+        p50, p90, p95, p99 = _np.percentile(latencies_ms, [50, 90, 95, 99])
+        return {
+            "count": int(latencies_ms.size),
+            "avg_ms": float(latencies_ms.mean()),
+            "min_ms": float(latencies_ms.min()),
+            "max_ms": float(latencies_ms.max()),
+            "p50_ms": float(p50),
+            "p90_ms": float(p90),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+        }
     return {
         "count": len(latencies_ms),
         "avg_ms": statistics.mean(latencies_ms),
@@ -71,6 +117,405 @@ def summarize_latencies(latencies_ms: list[float]) -> dict | None:
     }
 
 
+class LatencyHistogram:
+    """Логарифмическая гистограмма латентности (в духе HDR/DDSketch).
+
+    Память фиксирована: границы бакетов растут геометрически с шагом
+    gamma = (1 + a) / (1 - a), поэтому любой перцентиль восстанавливается
+    с относительной ошибкой не больше a (по умолчанию 1%) за O(бакетов),
+    независимо от длительности прогона. Нули (операции быстрее 1 мс при
+    целочисленной латентности) считаются отдельно и возвращаются точно.
+    Гистограммы с одинаковыми параметрами складываются через merge();
+    to_dict()/from_dict() дают компактный снимок для передачи и отчётов.
+    """
+
+    def __init__(self, relative_error: float = 0.01, min_ms: float = 0.001,
+                 max_ms: float = 86_400_000.0):
+        if not 0 < relative_error < 1:
+            raise ValueError("relative_error должен быть в (0, 1)")
+        self.relative_error = relative_error
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self._gamma = (1 + relative_error) / (1 - relative_error)
+        self._log_gamma = math.log(self._gamma)
+        self._counts = [0] * (self._index(max_ms) + 1)
+        self.zero_count = 0
+        self.count = 0
+        self.sum_ms = 0.0
+        self.min_seen: float | None = None
+        self.max_seen: float | None = None
+
+    def _index(self, value_ms: float) -> int:
+        if value_ms <= self.min_ms:
+            return 0
+        return math.ceil(math.log(value_ms / self.min_ms) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        # середина бакета (min*g^(i-1), min*g^i] с равной относительной ошибкой к краям
+        return self.min_ms * 2 * self._gamma ** index / (self._gamma + 1)
+
+    def record(self, value_ms: float, count: int = 1) -> None:
+        value_ms = max(float(value_ms), 0.0)
+        if value_ms == 0.0:
+            self.zero_count += count
+        else:
+            self._counts[min(self._index(value_ms), len(self._counts) - 1)] += count
+        self.count += count
+        self.sum_ms += value_ms * count
+        if self.min_seen is None or value_ms < self.min_seen:
+            self.min_seen = value_ms
+        if self.max_seen is None or value_ms > self.max_seen:
+            self.max_seen = value_ms
+
+    def record_many(self, values) -> None:
+        """record() для каждого значения; numpy-массив раскладывается по бакетам целиком."""
+        if _np is None or not isinstance(values, _np.ndarray):
+            for value in values:
+                self.record(value)
+            return
+        if not values.size:
+            return
+        values = _np.maximum(values.astype(_np.float64, copy=False), 0.0)
+        positive = values[values > 0]
+        self.zero_count += int(values.size - positive.size)
+        if positive.size:
+            index = _np.ceil(_np.log(positive / self.min_ms) / self._log_gamma)
+            index = _np.clip(index, 0, len(self._counts) - 1).astype(_np.int64)
+            for i, c in zip(*_np.unique(index, return_counts=True)):
+                self._counts[int(i)] += int(c)
+        self.count += int(values.size)
+        self.sum_ms += float(values.sum())
+        low, high = float(values.min()), float(values.max())
+        if self.min_seen is None or low < self.min_seen:
+            self.min_seen = low
+        if self.max_seen is None or high > self.max_seen:
+            self.max_seen = high
+
+    def _check_compatible(self, other: "LatencyHistogram") -> None:
+        if (other.relative_error, other.min_ms, other.max_ms) != (
+            self.relative_error, self.min_ms, self.max_ms
+        ):
+            raise ValueError("гистограммы с разными параметрами нельзя объединить")
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Добавляет к себе другую гистограмму (тех же параметров)."""
+        self._check_compatible(other)
+        for i, c in enumerate(other._counts):
+            if c:
+                self._counts[i] += c
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        for seen in (other.min_seen, other.max_seen):
+            if seen is None:
+                continue
+            if self.min_seen is None or seen < self.min_seen:
+                self.min_seen = seen
+            if self.max_seen is None or seen > self.max_seen:
+                self.max_seen = seen
+        return self
+
+    def copy(self) -> "LatencyHistogram":
+        return LatencyHistogram(self.relative_error, self.min_ms, self.max_ms).merge(self)
+
+    def quantile(self, q: float) -> float:
+        """Значение q-квантиля (0..1); 0.0 для пустой гистограммы."""
+        if not self.count:
+            return 0.0
+        rank = min(max(q, 0.0), 1.0) * (self.count - 1)
+        # крайние значения известны точно
+        if rank <= 0:
+            return self.min_seen
+        if rank >= self.count - 1:
+            return self.max_seen
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for i, c in enumerate(self._counts):
+            seen += c
+            if rank < seen:
+                return min(max(self._value(i), self.min_seen), self.max_seen)
+        return self.max_seen
+
+    def summary(self) -> dict | None:
+        """Те же ключи, что у summarize_latencies, плюс p999_ms."""
+        if not self.count:
+            return None
+        return {
+            "count": self.count,
+            "avg_ms": self.sum_ms / self.count,
+            "min_ms": self.min_seen,
+            "max_ms": self.max_seen,
+            "p50_ms": self.quantile(0.50),
+            "p90_ms": self.quantile(0.90),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "p999_ms": self.quantile(0.999),
+        }
+
+    def cumulative(self, bounds_ms) -> tuple[list[int], int, float]:
+        """Накопленные счётчики «≤ границы» для bounds_ms (по возрастанию), число и сумма.
+
+        Для экспорта без блокировки владельца: корзины копируются одним срезом
+        (атомарно под GIL), и число берётся из того же снимка — ряд монотонный
+        даже при параллельной записи. Корзина относится к границе по своему
+        значению, то есть с той же относительной ошибкой, что и квантили.
+        """
+        counts = self._counts[:]
+        seen = self.zero_count
+        sum_ms = self.sum_ms
+        out = []
+        index = 0
+        for bound in bounds_ms:
+            while index < len(counts) and self._value(index) <= bound:
+                seen += counts[index]
+                index += 1
+            out.append(seen)
+        return out, seen + sum(counts[index:]), sum_ms
+
+    def to_dict(self) -> dict:
+        """Разреженный снимок: только непустые бакеты."""
+        return {
+            "relative_error": self.relative_error,
+            "min_ms": self.min_ms,
+            "max_ms": self.max_ms,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum_ms": self.sum_ms,
+            "min_seen": self.min_seen,
+            "max_seen": self.max_seen,
+            "buckets": {str(i): c for i, c in enumerate(self._counts) if c},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyHistogram":
+        hist = cls(data["relative_error"], data["min_ms"], data["max_ms"])
+        for i, c in data.get("buckets", {}).items():
+            hist._counts[int(i)] += c
+        hist.zero_count = data.get("zero_count", 0)
+        hist.count = data["count"]
+        hist.sum_ms = data["sum_ms"]
+        hist.min_seen = data.get("min_seen")
+        hist.max_seen = data.get("max_seen")
+        return hist
+
+
+class OpStore:
+    """Колоночное хранилище операций прогона.
+
+    Вместо списка кортежей (~150 байт на операцию) каждая колонка — типизированный
+    array: начало/конец/латентность — double, байты — int64, тип операции и
+    успех — по байту, итого ~34 байта на операцию. array растёт с запасом
+    (амортизированно O(1) на добавление), поэтому десятки миллионов операций
+    помещаются в память. Расчёты отчёта идут векторно через numpy, если он
+    установлен, иначе одним проходом по колонкам.
+    """
+
+    def __init__(self):
+        self.op = array("b")
+        self.ok = array("b")
+        self.start = array("d")
+        self.end = array("d")
+        self.nbytes = array("q")
+        self.lat_ms = array("d")
+        self._names: list[str] = ["upload", "download"]
+        self._codes: dict[str, int] = {"upload": 0, "download": 1}
+
+    def code(self, op: str) -> int:
+        """Код типа операции; новые типы получают следующий номер."""
+        code = self._codes.get(op)
+        if code is None:
+            code = self._codes[op] = len(self._names)
+            self._names.append(op)
+        return code
+
+    def append(self, op: str, start: float, end: float, nbytes: int, ok: bool,
+               lat_ms: float) -> None:
+        self.op.append(self.code(op))
+        self.ok.append(1 if ok else 0)
+        self.start.append(start)
+        self.end.append(end)
+        self.nbytes.append(nbytes)
+        self.lat_ms.append(lat_ms)
+
+    def __len__(self) -> int:
+        return len(self.op)
+
+    def __iter__(self):
+        """Кортежи (op, start, end, nbytes, ok, lat_ms) — как у прежнего списка ops."""
+        names = self._names
+        for code, ok, start, end, nbytes, lat in zip(
+            self.op, self.ok, self.start, self.end, self.nbytes, self.lat_ms, strict=True
+        ):
+            yield names[code], start, end, nbytes, bool(ok), lat
+
+    def _np_columns(self) -> dict:
+        # копии, а не frombuffer-представления: живое представление запретило бы array расти
+        return {
+            "op": _np.array(self.op, dtype=_np.int8),
+            "ok": _np.array(self.ok, dtype=_np.bool_),
+            "start": _np.array(self.start, dtype=_np.float64),
+            "end": _np.array(self.end, dtype=_np.float64),
+            "nbytes": _np.array(self.nbytes, dtype=_np.int64),
+            "lat_ms": _np.array(self.lat_ms, dtype=_np.float64),
+        }
+
+    def spans(self) -> dict[str, float]:
+        """Активная длительность: всего (по успешным, иначе по всем), upload и download.
+
+        Длительность — от самого раннего начала до самого позднего конца; 0.0,
+        если операций нужного вида нет.
+        """
+        out = {"all": 0.0, "upload": 0.0, "download": 0.0}
+        if not len(self):
+            return out
+        up, down = self._codes["upload"], self._codes["download"]
+        if _np is not None:
+            c = self._np_columns()
+            ok = c["ok"]
+            masks = {
+                "all": ok if ok.any() else _np.ones_like(ok),
+                "upload": ok & (c["op"] == up),
+                "download": ok & (c["op"] == down),
+            }
+            for key, mask in masks.items():
+                if mask.any():
+                    out[key] = max(float(c["end"][mask].max() - c["start"][mask].min()), 1e-6)
+            return out
+        inf = float("inf")
+        lo = {"all": inf, "any": inf, "upload": inf, "download": inf}
+        hi = {"all": -inf, "any": -inf, "upload": -inf, "download": -inf}
+        for code, ok, start, end in zip(self.op, self.ok, self.start, self.end, strict=True):
+            keys = ("any", "all", "upload" if code == up else "download" if code == down else None)
+            for key in keys if ok else keys[:1]:
+                if key is not None:
+                    lo[key] = min(lo[key], start)
+                    hi[key] = max(hi[key], end)
+        if lo["all"] == inf:
+            lo["all"], hi["all"] = lo["any"], hi["any"]
+        for key in out:
+            if lo[key] != inf:
+                out[key] = max(hi[key] - lo[key], 1e-6)
+        return out
+
+    def window_stats(self, t0: float, t1: float) -> dict:
+        """Сводка операций, начавшихся в [t0, t1): счётчики, байты и латентность.
+
+        Латентность собирается в LatencyHistogram, как и в общем отчёте;
+        целые миллисекунды сворачиваются в пары (значение, число) до записи.
+        """
+        up, down = self._codes["upload"], self._codes["download"]
+        counts = {"write_ok_ops": 0, "read_ok_ops": 0, "err_ops": 0, "write_bytes": 0, "read_bytes": 0}
+        lat_values: dict[int, dict[float, int]] = {up: {}, down: {}}
+        if _np is not None and len(self):
+            c = self._np_columns()
+            mask = (c["start"] >= t0) & (c["start"] < t1)
+            ok = c["ok"] & mask
+            counts["err_ops"] = int((mask & ~c["ok"]).sum())
+            for code, ops_key, bytes_key in ((up, "write_ok_ops", "write_bytes"),
+                                             (down, "read_ok_ops", "read_bytes")):
+                sel = ok & (c["op"] == code)
+                counts[ops_key] = int(sel.sum())
+                counts[bytes_key] = int(c["nbytes"][sel].sum())
+                values, freq = _np.unique(c["lat_ms"][sel], return_counts=True)
+                lat_values[code] = dict(zip(values.tolist(), freq.tolist(), strict=True))
+        else:
+            for code, ok, start, nbytes, lat in zip(
+                self.op, self.ok, self.start, self.nbytes, self.lat_ms, strict=True
+            ):
+                if not t0 <= start < t1:
+                    continue
+                if not ok:
+                    counts["err_ops"] += 1
+                    continue
+                if code == up:
+                    counts["write_ok_ops"] += 1
+                    counts["write_bytes"] += nbytes
+                elif code == down:
+                    counts["read_ok_ops"] += 1
+                    counts["read_bytes"] += nbytes
+                else:
+                    continue
+                values = lat_values[code]
+                values[lat] = values.get(lat, 0) + 1
+        latency = {}
+        for code, name in ((up, "write"), (down, "read")):
+            if lat_values[code]:
+                hist = LatencyHistogram()
+                for value, freq in lat_values[code].items():
+                    hist.record(value, freq)
+                latency[name] = hist.summary()
+        counts["latency"] = latency
+        return counts
+
+    def file_stats(self, op: str):
+        """Скорости по уникальным размерам файлов успешных операций op.
+
+        Возвращает (top10_small, top10_large, overall) как Metrics.get_file_stats
+        или (None, None, None), если таких операций нет.
+        """
+        code = self._codes.get(op)
+        if code is None or not len(self):
+            return None, None, None
+        if _np is not None:
+            c = self._np_columns()
+            mask = c["ok"] & (c["op"] == code)
+            if not mask.any():
+                return None, None, None
+            nbytes, lat = c["nbytes"][mask], c["lat_ms"][mask]
+            sizes, inverse, counts = _np.unique(nbytes, return_inverse=True, return_counts=True)
+            fast = lat > 0
+            speeds = _np.zeros(len(lat))
+            speeds[fast] = (nbytes[fast] / 1024 / 1024) / (lat[fast] / 1000)
+            order = _np.argsort(inverse, kind="stable")
+            bounds = _np.concatenate(([0], _np.cumsum(counts)))
+
+            def group(i):
+                idx = order[bounds[i]:bounds[i + 1]]
+                return int(sizes[i]), int(counts[i]), speeds[idx][fast[idx]]
+
+            small, large = _top10_split(len(sizes))
+            return (
+                [_size_entry(*group(i)) for i in small],
+                [_size_entry(*group(i)) for i in large],
+                summarize_speeds(speeds[fast]),
+            )
+        by_size: dict[int, list] = {}
+        for c_op, ok, nbytes, lat in zip(self.op, self.ok, self.nbytes, self.lat_ms, strict=True):
+            if c_op != code or not ok:
+                continue
+            entry = by_size.setdefault(nbytes, [0, []])
+            entry[0] += 1
+            if lat > 0:
+                entry[1].append((nbytes / 1024 / 1024) / (lat / 1000))
+        if not by_size:
+            return None, None, None
+        ordered = sorted(by_size.items())
+        small, large = _top10_split(len(ordered))
+        all_speeds = [s for _, (_, speeds) in ordered for s in speeds]
+        return (
+            [_size_entry(ordered[i][0], *ordered[i][1]) for i in small],
+            [_size_entry(ordered[i][0], *ordered[i][1]) for i in large],
+            summarize_speeds(all_speeds),
+        )
+
+
+def _top10_split(total: int) -> tuple[range, range]:
+    """Индексы ТОП10 маленьких и больших среди total уникальных размеров (по возрастанию)."""
+    if total <= 1:
+        return range(total), range(total)
+    if total <= 10:
+        mid = total // 2
+        return range(0, mid), range(mid, total)
+    return range(0, 10), range(total - 10, total)
+
+
+def _size_entry(size_bytes: int, count: int, speeds) -> dict:
+    entry = {"size_bytes": size_bytes, "count": count}
+    entry.update(summarize_speeds(speeds))
+    return entry
+
+
 def classify_error(err: str | None) -> str:
     """Классифицирует текст ошибки в короткий тип для сводки отчёта."""
     if not err:
@@ -91,12 +536,14 @@ def classify_error(err: str | None) -> str:
 def build_timeline(ops, max_points: int = 300) -> list[dict]:
     """Строит посекундный таймлайн операций для графиков.
 
-    ops — кортежи (op, start, end, nbytes, ok, lat_ms); операция относится
-    к бакету по времени завершения. Длинные прогоны укрупняются так, чтобы
-    точек было не больше max_points.
+    ops — кортежи (op, start, end, nbytes, ok, lat_ms) или OpStore; операция
+    относится к бакету по времени завершения. Длинные прогоны укрупняются так,
+    чтобы точек было не больше max_points.
     """
-    if not ops:
+    if not len(ops):
         return []
+    if isinstance(ops, OpStore) and _np is not None:
+        return _build_timeline_np(ops, max_points)
     t_first = min(op[1] for op in ops)
     t_last = max(op[2] for op in ops)
     span = max(t_last - t_first, 1e-6)
@@ -120,6 +567,36 @@ def build_timeline(ops, max_points: int = 300) -> list[dict]:
     return [buckets[k] for k in sorted(buckets)]
 
 
+def _build_timeline_np(store: OpStore, max_points: int) -> list[dict]:
+    """build_timeline для OpStore: бакеты через bincount вместо цикла по операциям."""
+    c = store._np_columns()
+    return _timeline_np(c["start"], c["end"], c["ok"], c["op"] == store.code("upload"),
+                        c["op"] == store.code("download"), c["nbytes"], max_points)
+
+
+def _timeline_np(start, end, ok, upload, download, nbytes, max_points: int) -> list[dict]:
+    """Бакеты build_timeline по колонкам numpy: upload/download — маски типа операции."""
+    t_first = float(start.min())
+    span = max(float(end.max()) - t_first, 1e-6)
+    step = max(1, math.ceil(span / max_points))
+    slot = ((end - t_first) // step).astype(_np.int64)
+    is_write = ok & upload
+    is_read = ok & download
+    size = int(slot.max()) + 1
+    counts = {
+        "write_ops": _np.bincount(slot, weights=is_write, minlength=size),
+        "read_ops": _np.bincount(slot, weights=is_read, minlength=size),
+        "err_ops": _np.bincount(slot, weights=~ok, minlength=size),
+        "write_bytes": _np.bincount(slot, weights=nbytes * is_write, minlength=size),
+        "read_bytes": _np.bincount(slot, weights=nbytes * is_read, minlength=size),
+    }
+    present = _np.bincount(slot, minlength=size) > 0
+    return [
+        {"t_sec": int(i) * step, **{k: int(v[i]) for k, v in counts.items()}}
+        for i in _np.nonzero(present)[0]
+    ]
+
+
 def timeline_speeds(timeline: list[dict]) -> list[float]:
     """MB/s на бакет timeline; при укрупнённых бакетах делит на ширину шага."""
     if not timeline:
@@ -159,24 +636,33 @@ def read_ops_csv(path: str) -> list[dict]:
     with open(path, encoding="utf-8") as fh:
         for row in csv.DictReader(fh):
             try:
-                op = {
-                    "ts_start": float(row.get("ts_start") or 0.0),
-                    "ts_end": float(row.get("ts_end") or 0.0),
-                    "op": row.get("op") or "",
-                    "bytes": int(row.get("bytes") or 0),
-                    "status": row.get("status") or "",
-                    "latency_ms": float(row.get("latency_ms") or 0.0),
-                    "error": row.get("error") or "",
-                    "endpoint": row.get("endpoint") or "",
-                    "attempt": row.get("attempt") or "",
-                    "size_group": row.get("size_group") or "",
-                }
+                ops.append(_csv_op(row))
             except ValueError:
                 continue
-            ops.append(op)
     return ops
 
 
+def _csv_op(row: dict) -> dict:
+    """Операция из строки metrics.csv ({колонка: текст}); ValueError — битые числа."""
+    return {
+        "ts_start": float(row.get("ts_start") or 0.0),
+        "ts_end": float(row.get("ts_end") or 0.0),
+        "op": row.get("op") or "",
+        "bytes": int(row.get("bytes") or 0),
+        "status": row.get("status") or "",
+        "latency_ms": float(row.get("latency_ms") or 0.0),
+        "error": row.get("error") or "",
+        "endpoint": row.get("endpoint") or "",
+        "attempt": row.get("attempt") or "",
+        "size_group": row.get("size_group") or "",
+        # плановый старт open-loop; пусто в закрытом цикле и старых CSV
+        "ts_intended": float(row["ts_intended"]) if row.get("ts_intended") else None,
+        # фазы латентности; только непустые (нет в старых CSV и у aws CLI)
+        "phases": {phase: float(row[f"{phase}_ms"]) for phase in PHASES
+                   if row.get(f"{phase}_ms")},
+    }
+
+
 _AUTO_BUCKETS = [
     (1024**2, "<1MB"),
     (10 * 1024**2, "1–10MB"),
@@ -198,12 +684,352 @@ def _op_speed_mbps(op: dict) -> float:
     return (op["bytes"] / 1024 / 1024) / dur if dur > 0 else 0.0
 
 
-def analyze_operations(ops: list[dict]) -> dict | None:
-    """Сводная аналитика по операциям из metrics.csv (для просмотрщика метрик)."""
+SLOWEST_OPS = 5
+
+
+class OpColumns:
+    """Операции журнала по колонкам — вход векторного analyze_operations (нужен numpy).
+
+    Числовые колонки — numpy-массивы одной длины; op, endpoint, size_group и
+    error — коды в общей таблице strings (0 — пустая строка). ts_intended и
+    фазы (phases: {фаза: массив}) — NaN там, где значения нет; attempt — 0,
+    если номер попытки не записан.
+    """
+
+    CODED = ("op", "endpoint", "size_group", "error")
+
+    def __init__(self, columns: dict, strings: list[str]):
+        self.strings = strings
+        self.ts_start = columns["ts_start"]
+        self.ts_end = columns["ts_end"]
+        self.bytes = columns["bytes"]
+        self.latency_ms = columns["latency_ms"]
+        self.ok = columns["ok"]
+        self.attempt = columns["attempt"]
+        self.ts_intended = columns["ts_intended"]
+        self.op = columns["op"]
+        self.endpoint = columns["endpoint"]
+        self.size_group = columns["size_group"]
+        self.error = columns["error"]
+        self.phases = {phase: columns[f"{phase}_ms"] for phase in PHASES}
+
+    def __len__(self) -> int:
+        return len(self.ts_start)
+
+    def code(self, text: str) -> int | None:
+        """Код строки в strings; None — такой строки в журнале нет."""
+        try:
+            return self.strings.index(text)
+        except ValueError:
+            return None
+
+    @classmethod
+    def from_ops(cls, ops: list[dict]) -> OpColumns:
+        """Колонки из списка операций в формате read_ops_csv."""
+        intern = _StringTable()
+        nan = float("nan")
+        columns = {
+            "ts_start": _np.array([o["ts_start"] for o in ops], dtype=_np.float64),
+            "ts_end": _np.array([o["ts_end"] for o in ops], dtype=_np.float64),
+            "bytes": _np.array([o["bytes"] for o in ops], dtype=_np.int64),
+            "latency_ms": _np.array([o["latency_ms"] for o in ops], dtype=_np.float64),
+            "ok": _np.array([o["status"] == "ok" for o in ops], dtype=_np.bool_),
+            "attempt": _np.array([_attempt(o.get("attempt")) for o in ops], dtype=_np.int64),
+            "ts_intended": _np.array([nan if o.get("ts_intended") is None else o["ts_intended"]
+                                      for o in ops], dtype=_np.float64),
+            **{name: intern.codes([o.get(name) or "" for o in ops]) for name in cls.CODED},
+            **{f"{phase}_ms": _np.array([(o.get("phases") or {}).get(phase, nan) for o in ops],
+                                        dtype=_np.float64)
+               for phase in PHASES},
+        }
+        return cls(columns, intern.strings)
+
+
+def _attempt(value) -> int:
+    text = str(value or "")
+    return int(text) if text.isdigit() else 0
+
+
+class _StringTable:
+    """Интернирование строковых колонок в коды (0 — пустая строка)."""
+
+    def __init__(self):
+        self.strings: list[str] = [""]
+        self._ids: dict[str, int] = {"": 0}
+
+    def code(self, text: str) -> int:
+        index = self._ids.get(text)
+        if index is None:
+            index = self._ids[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+    def codes(self, values: list[str]):
+        code = self.code
+        return _np.fromiter((code(v) for v in values), dtype=_np.uint32, count=len(values))
+
+
+def _float_column(values: list[str], empty: float):
+    try:
+        return _np.array(values, dtype=_np.float64)  # быстрый путь: все значения заполнены
+    except ValueError:
+        return _np.array([float(v) if v else empty for v in values], dtype=_np.float64)
+
+
+def _int_column(values: list[str]):
+    try:
+        return _np.array(values, dtype=_np.int64)
+    except ValueError:
+        return _np.array([int(v) if v else 0 for v in values], dtype=_np.int64)
+
+
+# Колонки CSV, битое значение в которых выбрасывает строку (как в read_ops_csv)
+_CSV_FLOATS = ("ts_start", "ts_end", "latency_ms", "ts_intended", *(f"{phase}_ms" for phase in PHASES))
+
+
+def _parse_csv_chunk(rows: list[list[str]], index: dict[str, int], intern: _StringTable) -> dict:
+    def column(name: str) -> list[str]:
+        i = index.get(name)
+        if i is None:
+            return [""] * len(rows)
+        return [row[i] if i < len(row) else "" for row in rows]
+
+    nan = float("nan")
+    return {
+        "ts_start": _float_column(column("ts_start"), 0.0),
+        "ts_end": _float_column(column("ts_end"), 0.0),
+        "bytes": _int_column(column("bytes")),
+        "latency_ms": _float_column(column("latency_ms"), 0.0),
+        "ok": _np.array([v == "ok" for v in column("status")], dtype=_np.bool_),
+        "attempt": _np.array([_attempt(v) for v in column("attempt")], dtype=_np.int64),
+        "ts_intended": _float_column(column("ts_intended"), nan),
+        **{name: intern.codes(column(name)) for name in OpColumns.CODED},
+        **{f"{phase}_ms": _float_column(column(f"{phase}_ms"), nan) for phase in PHASES},
+    }
+
+
+def _csv_row_valid(row: list[str], index: dict[str, int]) -> bool:
+    try:
+        for name in _CSV_FLOATS:
+            i = index.get(name)
+            if i is not None and i < len(row) and row[i]:
+                float(row[i])
+        i = index.get("bytes")
+        if i is not None and i < len(row) and row[i]:
+            int(row[i])
+    except ValueError:
+        return False
+    return True
+
+
+def read_ops_columns(path: str, chunk_rows: int = 65_536) -> OpColumns:
+    """metrics.csv (новый и старый формат) в OpColumns пачками по chunk_rows строк (нужен numpy).
+
+    В памяти — колонки numpy и одна пачка строк CSV вместо dict на каждую
+    операцию; строки с битыми числами пропускаются, как в read_ops_csv.
+    """
+    intern = _StringTable()
+    parts: list[dict] = []
+    with open(path, encoding="utf-8", newline="") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None) or []
+        index = {name: i for i, name in enumerate(header)}
+        while chunk := list(itertools.islice(reader, chunk_rows)):
+            parts.append(_csv_chunk_columns(chunk, index, intern))
+    if not parts:
+        parts.append(_parse_csv_chunk([], index, intern))
+    columns = {name: _np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    return OpColumns(columns, intern.strings)
+
+
+def _csv_chunk_columns(chunk: list[list[str]], index: dict[str, int], intern: _StringTable) -> dict:
+    """Колонки пачки строк CSV; пустые и битые строки отбрасываются."""
+    rows = [row for row in chunk if row]
+    try:
+        return _parse_csv_chunk(rows, index, intern)
+    except ValueError:
+        # в пачке есть битая строка — отбрасываем такие и разбираем остаток
+        return _parse_csv_chunk([row for row in rows if _csv_row_valid(row, index)], index, intern)
+
+
+def _groups(codes, mask):
+    """Группы одинаковых кодов среди mask: [(код, индексы)] в порядке первого появления."""
+    positions = _np.flatnonzero(mask)
+    if not positions.size:
+        return []
+    sub = codes[positions]
+    order = _np.argsort(sub, kind="stable")
+    values, starts, counts = _np.unique(sub[order], return_index=True, return_counts=True)
+    groups = [(int(v), positions[order[a:a + n]]) for v, a, n in zip(values, starts, counts)]
+    # индексы группы по возрастанию: первый — место первого появления
+    groups.sort(key=lambda g: g[1][0])
+    return groups
+
+
+def _slowest_entry(ts0: float, op: str, nbytes: int, duration: float) -> dict:
+    return {
+        "offset_s": ts0,
+        "op": op,
+        "bytes": nbytes,
+        "duration_s": duration,
+        "speed_mbps": (nbytes / 1024 / 1024) / duration,
+    }
+
+
+def _size_labels(cols: OpColumns, ok) -> tuple[list[str], object]:
+    """Метка группы размеров на операцию: size_group из журнала или авто-бакет по байтам.
+
+    Возвращает (labels, label_of): label_of — номер метки в labels для каждой операции.
+    """
+    strings = cols.strings
+    labels = [label for _, label in _AUTO_BUCKETS]
+    label_ids = {label: i for i, label in enumerate(labels)}
+    group_lut = _np.zeros(len(strings), dtype=_np.int64)
+    for code in _np.unique(cols.size_group[ok]):
+        if code:
+            label = strings[code]
+            if label not in label_ids:
+                label_ids[label] = len(labels)
+                labels.append(label)
+            group_lut[code] = label_ids[label]
+    limits = _np.array([limit for limit, _ in _AUTO_BUCKETS[:-1]], dtype=_np.float64)
+    auto = _np.searchsorted(limits, cols.bytes, side="right")
+    return labels, _np.where(cols.size_group != 0, group_lut[cols.size_group], auto)
+
+
+def _error_classes(cols: OpColumns, err) -> tuple[list[str], object]:
+    """Тип ошибки (classify_error) на операцию — по разу на каждый различный текст.
+
+    Возвращает (classes, class_of): class_of — номер типа в classes для каждой операции.
+    """
+    classes: list[str] = []
+    class_ids: dict[str, int] = {}
+    class_lut = _np.zeros(len(cols.strings), dtype=_np.int64)
+    for code in _np.unique(cols.error[err]):
+        error_class = classify_error(cols.strings[code])
+        if error_class not in class_ids:
+            class_ids[error_class] = len(classes)
+            classes.append(error_class)
+        class_lut[code] = class_ids[error_class]
+    return classes, class_lut[cols.error]
+
+
+def _analyze_columns(cols: OpColumns) -> dict | None:
+    """analyze_operations по колонкам: каждая разбивка — проход numpy по массивам."""
+    if not len(cols):
+        return None
+    strings = cols.strings
+    ok = cols.ok
+    err = ~ok
+    nbytes = cols.bytes
+    lat = cols.latency_ms
+    dur = _np.maximum(cols.ts_end - cols.ts_start, 0.0)
+    speed = _np.divide(nbytes / 1024 / 1024, dur, out=_np.zeros(len(cols)), where=dur > 0)
+    has_speed = speed > 0
+    ok_bytes = int(nbytes[ok].sum())
+    ts_min = float(cols.ts_start.min())
+    duration = max(float(cols.ts_end.max()) - ts_min, 1e-6)
+
+    result: dict = {
+        "total": len(cols),
+        "ok": int(ok.sum()),
+        "err": int(err.sum()),
+        "ok_bytes": ok_bytes,
+        "duration_s": duration,
+        "throughput_MBps": ok_bytes / 1024 / 1024 / duration,
+        "speed": summarize_speeds(speed[ok & has_speed]),
+        "latency": summarize_latencies(lat[ok]),
+    }
+
+    by_op: dict[str, dict] = {}
+    for code, idx in _groups(cols.op, ok):
+        group_speed = speed[idx]
+        by_op[strings[code]] = {
+            "count": int(idx.size),
+            "bytes": int(nbytes[idx].sum()),
+            "latency": summarize_latencies(lat[idx]),
+            "speed": summarize_speeds(group_speed[group_speed > 0]),
+        }
+    result["by_op"] = by_op
+
+    with_phase = _np.zeros(len(cols), dtype=_np.bool_)
+    for values in cols.phases.values():
+        with_phase |= ~_np.isnan(values)
+    phases: dict[str, dict] = {}
+    for code, idx in _groups(cols.op, ok & with_phase):
+        per_phase = {}
+        for phase in PHASES:
+            values = cols.phases[phase][idx]
+            values = values[~_np.isnan(values)]
+            if values.size:
+                per_phase[phase] = summarize_latencies(values)
+        phases[strings[code]] = per_phase
+    result["phases"] = phases
+
+    labels, label_of = _size_labels(cols, ok)
+    size_buckets = []
+    for label_id, idx in _groups(label_of, ok):
+        group_speed = speed[idx]
+        entry = {"label": labels[label_id], "count": int(idx.size), "bytes": int(nbytes[idx].sum())}
+        entry.update(summarize_speeds(group_speed[group_speed > 0]))
+        entry["latency"] = summarize_latencies(lat[idx])
+        size_buckets.append((int(nbytes[idx].min()), entry))
+    result["size_buckets"] = [entry for _, entry in sorted(size_buckets, key=lambda item: item[0])]
+
+    by_endpoint: dict[str, dict] = {}
+    for code, idx in _groups(cols.endpoint, ok & (cols.endpoint != 0)):
+        group_speed = speed[idx]
+        by_endpoint[strings[code]] = {
+            "count": int(idx.size),
+            "bytes": int(nbytes[idx].sum()),
+            "speed": summarize_speeds(group_speed[group_speed > 0]),
+        }
+    result["by_endpoint"] = by_endpoint
+
+    classes, class_of = _error_classes(cols, err)
+    result["errors"] = {classes[class_id]: int(idx.size) for class_id, idx in _groups(class_of, err)}
+
+    attempts = cols.attempt[cols.attempt > 0]
+    result["retries"] = {
+        "ops_with_retries": int((attempts > 1).sum()),
+        "max_attempt": int(attempts.max()),
+    } if attempts.size else None
+
+    upload, download = cols.code("upload"), cols.code("download")
+    timeline = _timeline_np(cols.ts_start, cols.ts_end, ok, cols.op == upload, cols.op == download,
+                            nbytes, 300)
+    result["rps_series"] = [b["write_ops"] + b["read_ops"] + b["err_ops"] for b in timeline]
+
+    # Самые медленные по MB/s; при равной скорости — в порядке журнала, как у sorted()
+    candidates = _np.flatnonzero(ok & (dur > 0))
+    slowest = []
+    if candidates.size:
+        if candidates.size > SLOWEST_OPS:
+            cutoff = _np.partition(speed[candidates], SLOWEST_OPS - 1)[SLOWEST_OPS - 1]
+            candidates = candidates[speed[candidates] <= cutoff]
+        candidates = candidates[_np.argsort(speed[candidates], kind="stable")][:SLOWEST_OPS]
+        slowest = [
+            _slowest_entry(float(cols.ts_start[i]) - ts_min, strings[cols.op[i]],
+                           int(nbytes[i]), float(dur[i]))
+            for i in candidates
+        ]
+    result["slowest"] = slowest
+    return result
+
+
+def analyze_operations(ops) -> dict | None:
+    """Сводная аналитика по операциям из metrics.csv (для просмотрщика метрик).
+
+    ops — список операций в формате read_ops_csv или OpColumns (векторно через numpy).
+    """
+    if isinstance(ops, OpColumns):
+        return _analyze_columns(ops)
     if not ops:
         return None
     ok_ops = [o for o in ops if o["status"] == "ok"]
     err_ops = [o for o in ops if o["status"] != "ok"]
+    # скорость — один раз на операцию, для всех разбивок
+    ok_speeds = [_op_speed_mbps(o) for o in ok_ops]
     ok_bytes = sum(o["bytes"] for o in ok_ops)
     ts_min = min(o["ts_start"] for o in ops)
     ts_max = max(o["ts_end"] for o in ops)
@@ -216,18 +1042,17 @@ def analyze_operations(ops: list[dict]) -> dict | None:
         "ok_bytes": ok_bytes,
         "duration_s": duration,
         "throughput_MBps": ok_bytes / 1024 / 1024 / duration,
-        "speed": summarize_speeds([_op_speed_mbps(o) for o in ok_ops if _op_speed_mbps(o) > 0]),
+        "speed": summarize_speeds([speed for speed in ok_speeds if speed > 0]),
         "latency": summarize_latencies([o["latency_ms"] for o in ok_ops]),
     }
 
     # по типу операции
     by_op: dict[str, dict] = {}
-    for o in ok_ops:
+    for o, speed in zip(ok_ops, ok_speeds):
         agg = by_op.setdefault(o["op"], {"count": 0, "bytes": 0, "latencies": [], "speeds": []})
         agg["count"] += 1
         agg["bytes"] += o["bytes"]
         agg["latencies"].append(o["latency_ms"])
-        speed = _op_speed_mbps(o)
         if speed > 0:
             agg["speeds"].append(speed)
     for agg in by_op.values():
@@ -235,21 +1060,30 @@ def analyze_operations(ops: list[dict]) -> dict | None:
         agg["speed"] = summarize_speeds(agg.pop("speeds"))
     result["by_op"] = by_op
 
-    # по группам размеров (size_group из CSV или авто-бакеты)
-    buckets: dict[str, dict] = {}
+    # фазы латентности по типу операции (только клиенты, которые их меряют)
+    phase_values: dict[str, dict[str, list[float]]] = {}
     for o in ok_ops:
+        for phase, value in (o.get("phases") or {}).items():
+            phase_values.setdefault(o["op"], {}).setdefault(phase, []).append(value)
+    result["phases"] = {
+        op: {phase: summarize_latencies(values[phase]) for phase in PHASES if phase in values}
+        for op, values in phase_values.items()
+    }
+
+    # по группам размеров (size_group из CSV или авто-бакеты), по возрастанию минимального размера
+    buckets: dict[str, dict] = {}
+    for o, speed in zip(ok_ops, ok_speeds):
         label = o.get("size_group") or _auto_bucket(o["bytes"])
-        b = buckets.setdefault(label, {"count": 0, "bytes": 0, "speeds": [], "latencies": []})
+        b = buckets.setdefault(label, {"count": 0, "bytes": 0, "min_bytes": o["bytes"],
+                                       "speeds": [], "latencies": []})
         b["count"] += 1
         b["bytes"] += o["bytes"]
-        speed = _op_speed_mbps(o)
+        b["min_bytes"] = min(b["min_bytes"], o["bytes"])
         if speed > 0:
             b["speeds"].append(speed)
         b["latencies"].append(o["latency_ms"])
     size_buckets = []
-    for label, b in sorted(buckets.items(), key=lambda kv: min(
-            (o["bytes"] for o in ok_ops if (o.get("size_group") or _auto_bucket(o["bytes"])) == kv[0]),
-            default=0)):
+    for label, b in sorted(buckets.items(), key=lambda kv: kv[1]["min_bytes"]):
         entry = {"label": label, "count": b["count"], "bytes": b["bytes"]}
         entry.update(summarize_speeds(b["speeds"]))
         entry["latency"] = summarize_latencies(b["latencies"])
@@ -258,13 +1092,12 @@ def analyze_operations(ops: list[dict]) -> dict | None:
 
     # по endpoint (для кластерного режима)
     by_endpoint: dict[str, dict] = {}
-    for o in ok_ops:
+    for o, speed in zip(ok_ops, ok_speeds):
         if not o.get("endpoint"):
             continue
         e = by_endpoint.setdefault(o["endpoint"], {"count": 0, "bytes": 0, "speeds": []})
         e["count"] += 1
         e["bytes"] += o["bytes"]
-        speed = _op_speed_mbps(o)
         if speed > 0:
             e["speeds"].append(speed)
     for e in by_endpoint.values():
@@ -279,7 +1112,7 @@ def analyze_operations(ops: list[dict]) -> dict | None:
     result["errors"] = errors
 
     # повторы
-    attempts = [int(o["attempt"]) for o in ops if str(o.get("attempt") or "").isdigit()]
+    attempts = [a for a in (_attempt(o.get("attempt")) for o in ops) if a > 0]
     if attempts:
         result["retries"] = {
             "ops_with_retries": sum(1 for a in attempts if a > 1),
@@ -294,67 +1127,595 @@ def analyze_operations(ops: list[dict]) -> dict | None:
     timeline = build_timeline(tuples)
     result["rps_series"] = [b["write_ops"] + b["read_ops"] + b["err_ops"] for b in timeline]
 
+    # самые медленные операции по MB/s — с меткой времени от начала журнала
+    timed = [(speed, o) for o, speed in zip(ok_ops, ok_speeds) if o["ts_end"] > o["ts_start"]]
+    timed.sort(key=lambda item: item[0])
+    result["slowest"] = [
+        _slowest_entry(o["ts_start"] - ts_min, o["op"], o["bytes"], o["ts_end"] - o["ts_start"])
+        for _, o in timed[:SLOWEST_OPS]
+    ]
+
     return result
 
 
+# Гистограмма скоростей (MB/s) — та же LatencyHistogram, нижняя граница 1 байт/с
+_SPEED_MIN_MBPS = 1 / 1024 / 1024
+# Кэш classify_error в OpsSketch: тексты ошибок бывают уникальными (id запроса в тексте)
+_ERROR_CLASS_CACHE = 4096
+
+
+def _speed_histogram() -> LatencyHistogram:
+    return LatencyHistogram(min_ms=_SPEED_MIN_MBPS)
+
+
+def _speed_summary(hist: LatencyHistogram) -> dict:
+    """summarize_speeds по гистограмме скоростей: те же ключи, перцентили с ошибкой гистограммы."""
+    if not hist.count:
+        return summarize_speeds([])
+    return {
+        "avg_speed_mbps": hist.sum_ms / hist.count,
+        "median_speed_mbps": hist.quantile(0.50),
+        "min_speed_mbps": hist.min_seen,
+        "max_speed_mbps": hist.max_seen,
+        "p90_speed_mbps": hist.quantile(0.90),
+        "p95_speed_mbps": hist.quantile(0.95),
+    }
+
+
+class _StreamTimeline:
+    """Таймлайн build_timeline с фиксированным числом бакетов для OpsSketch.
+
+    Бакет — по времени завершения операции; границы — кратные step секунды
+    эпохи, step — степень двойки. Как только бакеты перестают умещаться в
+    max_points, step удваивается и соседние бакеты складываются. Границы не
+    зависят от первой операции, поэтому таймлайны частей журнала
+    объединяются бакет в бакет после приведения к общему шагу.
+    """
+
+    FIELDS = ("write_ops", "read_ops", "err_ops", "write_bytes", "read_bytes")
+
+    def __init__(self, max_points: int = 300):
+        self.max_points = max_points
+        self.step = 1
+        self.buckets: dict[int, list[int]] = {}
+        self.low: int | None = None
+        self.high: int | None = None
+
+    def _coarsen(self) -> None:
+        merged: dict[int, list[int]] = {}
+        for key, counts in self.buckets.items():
+            target = merged.get(key // 2)
+            if target is None:
+                merged[key // 2] = counts
+            else:
+                for i, value in enumerate(counts):
+                    target[i] += value
+        self.buckets = merged
+        self.step *= 2
+        if self.low is not None:
+            self.low //= 2
+            self.high //= 2
+
+    def _reserve(self, t_low: float, t_high: float) -> None:
+        """Укрупняет шаг, пока бакеты вместе с отрезком [t_low, t_high] не уложатся в max_points."""
+        while True:
+            low, high = int(t_low // self.step), int(t_high // self.step)
+            if self.low is not None:
+                low, high = min(low, self.low), max(high, self.high)
+            if high - low < self.max_points:
+                break
+            self._coarsen()
+        self.low, self.high = low, high
+
+    def add(self, end: float, ok: bool, op: str, nbytes: int) -> None:
+        self._reserve(end, end)
+        counts = self.buckets.setdefault(int(end // self.step), [0] * len(self.FIELDS))
+        if not ok:
+            counts[2] += 1
+        elif op == "upload":
+            counts[0] += 1
+            counts[3] += nbytes
+        elif op == "download":
+            counts[1] += 1
+            counts[4] += nbytes
+
+    def add_array(self, end, ok, upload, download, nbytes) -> None:
+        """add() для колонок numpy: upload/download — маски типа операции."""
+        if not end.size:
+            return
+        self._reserve(float(end.min()), float(end.max()))
+        keys = (end // self.step).astype(_np.int64)
+        low = int(keys.min())
+        slot = keys - low
+        size = int(slot.max()) + 1
+        is_write = ok & upload
+        is_read = ok & download
+        sums = [
+            _np.bincount(slot, weights=weights, minlength=size)
+            for weights in (is_write, is_read, ~ok, nbytes * is_write, nbytes * is_read)
+        ]
+        present = _np.bincount(slot, minlength=size) > 0
+        for i in _np.nonzero(present)[0]:
+            counts = self.buckets.setdefault(low + int(i), [0] * len(self.FIELDS))
+            for j, column in enumerate(sums):
+                counts[j] += int(column[i])
+
+    def merge(self, other: "_StreamTimeline") -> None:
+        if other.low is None:
+            return
+        while self.step < other.step:
+            self._coarsen()
+        self._reserve(other.low * other.step, other.high * other.step)
+        factor = self.step // other.step
+        for key, counts in other.buckets.items():
+            target = self.buckets.setdefault(key // factor, [0] * len(self.FIELDS))
+            for i, value in enumerate(counts):
+                target[i] += value
+
+    def to_list(self) -> list[dict]:
+        """Бакеты в формате build_timeline; t_sec — от начала первого бакета."""
+        return [
+            {"t_sec": (key - self.low) * self.step, **dict(zip(self.FIELDS, counts))}
+            for key, counts in sorted(self.buckets.items())
+        ]
+
+
+class OpsSketch:
+    """Потоковый analyze_operations: журнал любой длины за один проход в памяти фиксированного размера.
+
+    Операции сворачиваются в объединяемые наброски: латентность, фазы и
+    скорость — LatencyHistogram (перцентили с относительной ошибкой 1%),
+    разбивки по op/endpoint/группе размеров/типу ошибки — счётчики, RPS —
+    _StreamTimeline из не более чем max_points бакетов, медленные —
+    SLOWEST_OPS кандидатов в куче. Память растёт только с числом различных
+    op/endpoint/групп, но не операций.
+
+    add() принимает операцию в формате read_ops_csv, add_columns() — пачку
+    OpColumns (векторно); merge() складывает наброски частей журнала.
+    result() можно звать в любой момент, в том числе пока журнал дописывается:
+    сводка по уже добавленным операциям с ключами analyze_operations.
+    """
+
+    def __init__(self, max_points: int = 300):
+        self.total = 0
+        self.ok = 0
+        self.ok_bytes = 0
+        self.ts_min: float | None = None
+        self.ts_max: float | None = None
+        self.latency = LatencyHistogram()
+        self.speed = _speed_histogram()
+        self.by_op: dict[str, dict] = {}
+        self.phases: dict[str, dict[str, LatencyHistogram]] = {}
+        self.size_buckets: dict[str, dict] = {}
+        self.by_endpoint: dict[str, dict] = {}
+        self.errors: dict[str, int] = {}
+        self.attempts = 0  # операций с записанным номером попытки
+        self.ops_with_retries = 0
+        self.max_attempt = 0
+        self._timeline = _StreamTimeline(max_points)
+        # куча (-скорость, -номер операции, ts_start, op, bytes, длительность):
+        # в вершине — самая быстрая из кандидатов, при равной скорости — самая поздняя
+        self._slowest: list[tuple] = []
+        self._error_classes: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return self.total
+
+    # --- группы ---
+
+    def _op_group(self, op: str) -> dict:
+        group = self.by_op.get(op)
+        if group is None:
+            group = self.by_op[op] = {"count": 0, "bytes": 0, "latency": LatencyHistogram(),
+                                      "speed": _speed_histogram()}
+        return group
+
+    def _phase(self, op: str, phase: str) -> LatencyHistogram:
+        per_phase = self.phases.setdefault(op, {})
+        hist = per_phase.get(phase)
+        if hist is None:
+            hist = per_phase[phase] = LatencyHistogram()
+        return hist
+
+    def _size_group(self, label: str, min_bytes: int) -> dict:
+        group = self.size_buckets.get(label)
+        if group is None:
+            group = self.size_buckets[label] = {"count": 0, "bytes": 0, "min_bytes": min_bytes,
+                                                "speed": _speed_histogram(), "latency": LatencyHistogram()}
+        group["min_bytes"] = min(group["min_bytes"], min_bytes)
+        return group
+
+    def _endpoint(self, endpoint: str) -> dict:
+        group = self.by_endpoint.get(endpoint)
+        if group is None:
+            group = self.by_endpoint[endpoint] = {"count": 0, "bytes": 0, "speed": _speed_histogram()}
+        return group
+
+    def _span(self, start: float, end: float) -> None:
+        if self.ts_min is None or start < self.ts_min:
+            self.ts_min = start
+        if self.ts_max is None or end > self.ts_max:
+            self.ts_max = end
+
+    def _error_class(self, text: str) -> str:
+        error_class = self._error_classes.get(text)
+        if error_class is None:
+            if len(self._error_classes) >= _ERROR_CLASS_CACHE:
+                self._error_classes.clear()
+            error_class = self._error_classes[text] = classify_error(text)
+        return error_class
+
+    def _offer_slowest(self, speed: float, seq: int, start: float, op: str, nbytes: int,
+                       duration: float) -> None:
+        item = (-speed, -seq, start, op, nbytes, duration)
+        if len(self._slowest) < SLOWEST_OPS:
+            heapq.heappush(self._slowest, item)
+        elif item > self._slowest[0]:
+            heapq.heapreplace(self._slowest, item)
+
+    # --- добавление ---
+
+    def add(self, op: dict) -> None:
+        """Одна операция в формате read_ops_csv."""
+        start, end, nbytes = op["ts_start"], op["ts_end"], op["bytes"]
+        ok = op["status"] == "ok"
+        seq = self.total
+        self.total += 1
+        self._span(start, end)
+        attempt = _attempt(op.get("attempt"))
+        if attempt:
+            self.attempts += 1
+            self.ops_with_retries += attempt > 1
+            self.max_attempt = max(self.max_attempt, attempt)
+        self._timeline.add(end, ok, op["op"], nbytes)
+        if not ok:
+            error_class = self._error_class(op.get("error") or "")
+            self.errors[error_class] = self.errors.get(error_class, 0) + 1
+            return
+
+        self.ok += 1
+        self.ok_bytes += nbytes
+        speed = _op_speed_mbps(op)
+        latency = op["latency_ms"]
+        self.latency.record(latency)
+        group = self._op_group(op["op"])
+        group["count"] += 1
+        group["bytes"] += nbytes
+        group["latency"].record(latency)
+        size = self._size_group(op.get("size_group") or _auto_bucket(nbytes), nbytes)
+        size["count"] += 1
+        size["bytes"] += nbytes
+        size["latency"].record(latency)
+        endpoint = self._endpoint(op["endpoint"]) if op.get("endpoint") else None
+        if endpoint is not None:
+            endpoint["count"] += 1
+            endpoint["bytes"] += nbytes
+        if speed > 0:
+            for hist in (self.speed, group["speed"], size["speed"]):
+                hist.record(speed)
+            if endpoint is not None:
+                endpoint["speed"].record(speed)
+        for phase, value in (op.get("phases") or {}).items():
+            self._phase(op["op"], phase).record(value)
+        if end > start:
+            self._offer_slowest(speed, seq, start, op["op"], nbytes, end - start)
+
+    def add_columns(self, cols: OpColumns) -> None:
+        """Пачка операций по колонкам (нужен numpy): каждая разбивка — проход по массивам."""
+        n = len(cols)
+        if not n:
+            return
+        strings = cols.strings
+        ok = cols.ok
+        err = ~ok
+        nbytes = cols.bytes
+        lat = cols.latency_ms
+        dur = _np.maximum(cols.ts_end - cols.ts_start, 0.0)
+        speed = _np.divide(nbytes / 1024 / 1024, dur, out=_np.zeros(n), where=dur > 0)
+        has_speed = speed > 0
+        base = self.total
+        self.total += n
+        self.ok += int(ok.sum())
+        self.ok_bytes += int(nbytes[ok].sum())
+        self._span(float(cols.ts_start.min()), float(cols.ts_end.max()))
+        attempts = cols.attempt[cols.attempt > 0]
+        if attempts.size:
+            self.attempts += int(attempts.size)
+            self.ops_with_retries += int((attempts > 1).sum())
+            self.max_attempt = max(self.max_attempt, int(attempts.max()))
+        upload, download = cols.code("upload"), cols.code("download")
+        self._timeline.add_array(cols.ts_end, ok, cols.op == upload, cols.op == download, nbytes)
+
+        self.latency.record_many(lat[ok])
+        self.speed.record_many(speed[ok & has_speed])
+        for code, idx in _groups(cols.op, ok):
+            group = self._op_group(strings[code])
+            group["count"] += int(idx.size)
+            group["bytes"] += int(nbytes[idx].sum())
+            group["latency"].record_many(lat[idx])
+            group_speed = speed[idx]
+            group["speed"].record_many(group_speed[group_speed > 0])
+
+        with_phase = _np.zeros(n, dtype=_np.bool_)
+        for values in cols.phases.values():
+            with_phase |= ~_np.isnan(values)
+        for code, idx in _groups(cols.op, ok & with_phase):
+            for phase in PHASES:
+                values = cols.phases[phase][idx]
+                values = values[~_np.isnan(values)]
+                if values.size:
+                    self._phase(strings[code], phase).record_many(values)
+
+        labels, label_of = _size_labels(cols, ok)
+        for label_id, idx in _groups(label_of, ok):
+            size = self._size_group(labels[label_id], int(nbytes[idx].min()))
+            size["count"] += int(idx.size)
+            size["bytes"] += int(nbytes[idx].sum())
+            size["latency"].record_many(lat[idx])
+            group_speed = speed[idx]
+            size["speed"].record_many(group_speed[group_speed > 0])
+
+        for code, idx in _groups(cols.endpoint, ok & (cols.endpoint != 0)):
+            endpoint = self._endpoint(strings[code])
+            endpoint["count"] += int(idx.size)
+            endpoint["bytes"] += int(nbytes[idx].sum())
+            group_speed = speed[idx]
+            endpoint["speed"].record_many(group_speed[group_speed > 0])
+
+        classes, class_of = _error_classes(cols, err)
+        for class_id, idx in _groups(class_of, err):
+            self.errors[classes[class_id]] = self.errors.get(classes[class_id], 0) + int(idx.size)
+
+        candidates = _np.flatnonzero(ok & (dur > 0))
+        if candidates.size > SLOWEST_OPS:
+            cutoff = _np.partition(speed[candidates], SLOWEST_OPS - 1)[SLOWEST_OPS - 1]
+            candidates = candidates[speed[candidates] <= cutoff]
+        for i in candidates:
+            self._offer_slowest(float(speed[i]), base + int(i), float(cols.ts_start[i]),
+                                strings[cols.op[i]], int(nbytes[i]), float(dur[i]))
+
+    def merge(self, other: OpsSketch) -> OpsSketch:
+        """Добавляет к себе набросок следующей части журнала."""
+        base = self.total
+        self.total += other.total
+        self.ok += other.ok
+        self.ok_bytes += other.ok_bytes
+        if other.total:
+            self._span(other.ts_min, other.ts_max)
+        self.latency.merge(other.latency)
+        self.speed.merge(other.speed)
+        for op, group in other.by_op.items():
+            mine = self._op_group(op)
+            mine["count"] += group["count"]
+            mine["bytes"] += group["bytes"]
+            mine["latency"].merge(group["latency"])
+            mine["speed"].merge(group["speed"])
+        for op, per_phase in other.phases.items():
+            for phase, hist in per_phase.items():
+                self._phase(op, phase).merge(hist)
+        for label, group in other.size_buckets.items():
+            mine = self._size_group(label, group["min_bytes"])
+            mine["count"] += group["count"]
+            mine["bytes"] += group["bytes"]
+            mine["latency"].merge(group["latency"])
+            mine["speed"].merge(group["speed"])
+        for endpoint, group in other.by_endpoint.items():
+            mine = self._endpoint(endpoint)
+            mine["count"] += group["count"]
+            mine["bytes"] += group["bytes"]
+            mine["speed"].merge(group["speed"])
+        for error_class, count in other.errors.items():
+            self.errors[error_class] = self.errors.get(error_class, 0) + count
+        self.attempts += other.attempts
+        self.ops_with_retries += other.ops_with_retries
+        self.max_attempt = max(self.max_attempt, other.max_attempt)
+        self._timeline.merge(other._timeline)
+        for neg_speed, neg_seq, *rest in other._slowest:
+            self._offer_slowest(-neg_speed, base - neg_seq, *rest)
+        return self
+
+    # --- результат ---
+
+    def timeline(self) -> list[dict]:
+        """Таймлайн в формате build_timeline (не больше max_points бакетов)."""
+        return self._timeline.to_list()
+
+    def result(self) -> dict | None:
+        """Сводка с ключами analyze_operations; перцентили — оценки гистограмм."""
+        if not self.total:
+            return None
+        duration = max(self.ts_max - self.ts_min, 1e-6)
+        result: dict = {
+            "total": self.total,
+            "ok": self.ok,
+            "err": self.total - self.ok,
+            "ok_bytes": self.ok_bytes,
+            "duration_s": duration,
+            "throughput_MBps": self.ok_bytes / 1024 / 1024 / duration,
+            "speed": _speed_summary(self.speed),
+            "latency": self.latency.summary(),
+        }
+        result["by_op"] = {
+            op: {"count": g["count"], "bytes": g["bytes"], "latency": g["latency"].summary(),
+                 "speed": _speed_summary(g["speed"])}
+            for op, g in self.by_op.items()
+        }
+        result["phases"] = {
+            op: {phase: per_phase[phase].summary() for phase in PHASES if phase in per_phase}
+            for op, per_phase in self.phases.items()
+        }
+        size_buckets = []
+        for label, b in sorted(self.size_buckets.items(), key=lambda kv: kv[1]["min_bytes"]):
+            entry = {"label": label, "count": b["count"], "bytes": b["bytes"]}
+            entry.update(_speed_summary(b["speed"]))
+            entry["latency"] = b["latency"].summary()
+            size_buckets.append(entry)
+        result["size_buckets"] = size_buckets
+        result["by_endpoint"] = {
+            endpoint: {"count": e["count"], "bytes": e["bytes"], "speed": _speed_summary(e["speed"])}
+            for endpoint, e in self.by_endpoint.items()
+        }
+        result["errors"] = dict(self.errors)
+        result["retries"] = {
+            "ops_with_retries": self.ops_with_retries,
+            "max_attempt": self.max_attempt,
+        } if self.attempts else None
+        result["rps_series"] = [b["write_ops"] + b["read_ops"] + b["err_ops"] for b in self.timeline()]
+        result["slowest"] = [
+            _slowest_entry(start - self.ts_min, op, nbytes, duration)
+            for _, _, start, op, nbytes, duration in sorted(self._slowest, reverse=True)
+        ]
+        return result
+
+
 class RateWindow:
     """Скользящее окно операций для расчёта RPS/пропускной способности.
 
-    Хранит операции за последние `retention_sec`, без ограничения по количеству
-    (deque(maxlen=N) занижал RPS при высокой нагрузке).
+    Вместо очереди отдельных операций — кольцо счётчиков по бакетам
+    `bucket_sec` (байты и операции чтения/записи). add() — O(1), rates() —
+    O(окно / бакет) независимо от нагрузки: при 20k оп/с дашборд больше не
+    перебирает миллион записей на каждом тике. Кольцо разбито на `stripes`
+    полос со своими блокировками, поток пишет в свою полосу, поэтому
+    воркеры почти не ждут друг друга и чтение окна.
+    Окно считается с точностью до бакета; операции старше `retention_sec`
+    отбрасываются.
     """
 
-    def __init__(self, retention_sec: float = 60.0):
-        self._retention = retention_sec
-        self._lock = threading.Lock()
-        self._ops: deque[tuple[float, str, int, bool]] = deque()
+    def __init__(self, retention_sec: float = 60.0, bucket_sec: float = 0.1, stripes: int = 8):
+        self._bucket = bucket_sec
+        self._slots = max(int(math.ceil(retention_sec / bucket_sec)), 1)
+        self._stripes = [_RateStripe(self._slots) for _ in range(max(stripes, 1))]
 
     def add(self, ts: float, op: str, nbytes: int, ok: bool) -> None:
-        with self._lock:
-            self._ops.append((ts, op, nbytes, ok))
-            self._prune(time.time())
-
-    def _prune(self, now: float) -> None:
-        cutoff = now - self._retention
-        while self._ops and self._ops[0][0] < cutoff:
-            self._ops.popleft()
+        if not ok or op not in ("upload", "download"):
+            return
+        stripe = self._stripes[threading.get_ident() % len(self._stripes)]
+        stripe.add(int(ts // self._bucket), op == "upload", nbytes)
 
     def rates(self, window_sec: float = 5.0, now: float | None = None):
         """Возвращает (read_Bps, write_Bps, write_rps, read_rps) за окно."""
         if now is None:
             now = time.time()
-        rb = wb = 0
-        read_ops = write_ops = 0
-        with self._lock:
-            for ts, op, nbytes, ok in self._ops:
-                if now - ts <= window_sec and ok:
-                    if op == "download":
-                        rb += nbytes
-                        read_ops += 1
-                    elif op == "upload":
-                        wb += nbytes
-                        write_ops += 1
+        last = int(now // self._bucket)
+        count = min(max(int(math.ceil(window_sec / self._bucket)), 1), self._slots)
+        rb = wb = read_ops = write_ops = 0
+        for stripe in self._stripes:
+            s_rb, s_wb, s_ro, s_wo = stripe.sum(last - count + 1, last)
+            rb += s_rb
+            wb += s_wb
+            read_ops += s_ro
+            write_ops += s_wo
         w = window_sec if window_sec > 0 else 1.0
         return rb / w, wb / w, write_ops / w, read_ops / w
 
 
-class MetricsCsvWriter:
+class _RateStripe:
+    """Полоса кольца RateWindow: счётчики по бакетам с номером эпохи бакета."""
+
+    __slots__ = ("_lock", "_epoch", "_rb", "_wb", "_ro", "_wo")
+
+    def __init__(self, slots: int):
+        self._lock = threading.Lock()
+        self._epoch = [-1] * slots
+        self._rb = [0] * slots
+        self._wb = [0] * slots
+        self._ro = [0] * slots
+        self._wo = [0] * slots
+
+    def add(self, bucket: int, is_write: bool, nbytes: int) -> None:
+        i = bucket % len(self._epoch)
+        with self._lock:
+            epoch = self._epoch[i]
+            if epoch > bucket:
+                return  # операция старше удержания — слот уже занят свежим бакетом
+            if epoch < bucket:
+                self._epoch[i] = bucket
+                self._rb[i] = self._wb[i] = self._ro[i] = self._wo[i] = 0
+            if is_write:
+                self._wb[i] += nbytes
+                self._wo[i] += 1
+            else:
+                self._rb[i] += nbytes
+                self._ro[i] += 1
+
+    def sum(self, first: int, last: int) -> tuple[int, int, int, int]:
+        """Сумма (read_bytes, write_bytes, read_ops, write_ops) по бакетам first..last."""
+        slots = len(self._epoch)
+        rb = wb = ro = wo = 0
+        with self._lock:
+            for bucket in range(first, last + 1):
+                i = bucket % slots
+                if self._epoch[i] == bucket:
+                    rb += self._rb[i]
+                    wb += self._wb[i]
+                    ro += self._ro[i]
+                    wo += self._wo[i]
+        return rb, wb, ro, wo
+
+
+class _QueuedWriter:
+    """Фоновая запись операций: воркеры кладут записи в очередь, поток пишет пачками.
+
+    Наследник задаёт _write_batch(items) — запись и сброс на диск всего, что
+    накопилось к моменту пробуждения потока, и _close_files().
+    """
+
+    _SENTINEL = None
+
+    def __init__(self, name: str):
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._drain, daemon=True, name=name)
+        self._thread.start()
+
+    def _write_batch(self, items: list) -> None:
+        raise NotImplementedError
+
+    def _close_files(self) -> None:
+        raise NotImplementedError
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is self._SENTINEL:
+                break
+            # Дописываем всё, что уже накопилось, одним заходом и сбрасываем на диск
+            batch = [item]
+            done = False
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._SENTINEL:
+                    done = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            if done:
+                return
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._SENTINEL)
+        self._thread.join(timeout=10)
+        self._close_files()
+
+
+class MetricsCsvWriter(_QueuedWriter):
     """Пишет метрики в CSV одним фоновым потоком.
 
     Файл открывается один раз; воркеры кладут строки в очередь и не блокируются
     на дисковом I/O.
     """
 
-    _SENTINEL = None
-
     def __init__(self, path: str):
-        self._queue: queue.Queue = queue.Queue()
         self._file = open(path, "w", newline="", encoding="utf-8")
         self._writer = csv.DictWriter(self._file, fieldnames=CSV_FIELDS)
         self._writer.writeheader()
-        self._closed = False
-        self._thread = threading.Thread(target=self._drain, daemon=True, name="metrics-csv")
-        self._thread.start()
+        super().__init__("metrics-csv")
 
     def write_row(
         self,
@@ -370,7 +1731,10 @@ class MetricsCsvWriter:
         thread_id: int | None = None,
         attempt: int | None = None,
         size_group: str | None = None,
+        ts_intended: float | None = None,
+        phases: dict[str, float] | None = None,
     ) -> None:
+        phases = phases or {}
         self._queue.put({
             "ts_start": ts_start,
             "ts_end": ts_end,
@@ -383,30 +1747,15 @@ class MetricsCsvWriter:
             "thread_id": "" if thread_id is None else thread_id,
             "attempt": "" if attempt is None else attempt,
             "size_group": size_group or "",
+            "ts_intended": "" if ts_intended is None else ts_intended,
+            # пусто — фазы не было (keep-alive соединение) или клиент их не меряет
+            **{f"{phase}_ms": round(phases[phase], 3) if phase in phases else ""
+               for phase in PHASES},
         })
 
-    def _drain(self) -> None:
-        while True:
-            item = self._queue.get()
-            if item is self._SENTINEL:
-                break
-            self._writer.writerow(item)
-            # Дописываем всё, что уже накопилось, одним заходом и сбрасываем на диск
-            while True:
-                try:
-                    item = self._queue.get_nowait()
-                except queue.Empty:
-                    break
-                if item is self._SENTINEL:
-                    self._file.flush()
-                    return
-                self._writer.writerow(item)
-            self._file.flush()
+    def _write_batch(self, items: list) -> None:
+        self._writer.writerows(items)
+        self._file.flush()
 
-    def close(self) -> None:
-        if self._closed:
-            return
-        self._closed = True
-        self._queue.put(self._SENTINEL)
-        self._thread.join(timeout=10)
+    def _close_files(self) -> None:
         self._file.close()
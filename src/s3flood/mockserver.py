@@ -0,0 +1,784 @@
+"""Локальный S3-совместимый сервер для офлайн-прогонов и калибровки клиента.
+
+s3flood mock-server поднимает HTTP endpoint с PUT/GET (в т.ч. Range)/HEAD/
+DELETE, ListObjectsV2, multi-object delete и multipart upload. Подписи не
+проверяются. Хранилище — один из бэкендов:
+
+- memory — объекты в памяти процесса;
+- null — данные отбрасываются, запоминается только размер; GET отдаёт нули.
+  Бэкенд «нулевой стоимости»: прогон против него показывает потолок клиента;
+- disk — файлы в каталоге root/<bucket>/<key>.
+
+Поверх бэкенда можно добавить задержку ответа, ограничение полосы (общее на
+сервер, как у канала) и долю ответов 503 SlowDown.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import itertools
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterable, Iterator
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+CHUNK = 1024 * 1024
+# Незавершённые multipart-загрузки хранятся в бэкенде как объекты служебного бакета
+MPU_BUCKET = ".s3flood-multipart"
+_ZEROS = bytes(CHUNK)
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class MockError(Exception):
+    """Ошибка S3-протокола: превращается в XML-ответ <Error>."""
+
+    def __init__(self, status: int, code: str, message: str = ""):
+        super().__init__(message or code)
+        self.status = status
+        self.code = code
+
+
+class _Digest:
+    """Считает размер и md5 потока чанков по мере чтения."""
+
+    def __init__(self, chunks: Iterable[bytes], with_md5: bool = True):
+        self._chunks = chunks
+        self._md5 = hashlib.md5(usedforsecurity=False) if with_md5 else None
+        self.size = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            self.size += len(chunk)
+            if self._md5 is not None:
+                self._md5.update(chunk)
+            yield chunk
+
+    @property
+    def etag(self) -> str:
+        if self._md5 is None:
+            return f"{self.size:032x}"
+        return self._md5.hexdigest()
+
+
+class Backend:
+    """Хранилище объектов mock-сервера. Ключи бакета — без ведущего '/'."""
+
+    name = "base"
+
+    def put(self, bucket: str, key: str, chunks: Iterable[bytes]) -> tuple[int, str]:
+        """Сохраняет объект, возвращает (размер, etag без кавычек)."""
+        raise NotImplementedError
+
+    def size(self, bucket: str, key: str) -> int | None:
+        raise NotImplementedError
+
+    def read(self, bucket: str, key: str, start: int, length: int) -> Iterator[bytes]:
+        raise NotImplementedError
+
+    def delete(self, bucket: str, key: str) -> None:
+        raise NotImplementedError
+
+    def keys(self, bucket: str) -> list[tuple[str, int]]:
+        """Все объекты бакета (ключ, размер), отсортированные по ключу."""
+        raise NotImplementedError
+
+    def buckets(self) -> list[str]:
+        raise NotImplementedError
+
+
+class MemoryBackend(Backend):
+    name = "memory"
+
+    def __init__(self):
+        self._objects: dict[tuple[str, str], bytes] = {}
+        self._lock = threading.Lock()
+
+    def put(self, bucket, key, chunks):
+        digest = _Digest(chunks)
+        data = b"".join(digest)
+        with self._lock:
+            self._objects[(bucket, key)] = data
+        return digest.size, digest.etag
+
+    def size(self, bucket, key):
+        data = self._objects.get((bucket, key))
+        return None if data is None else len(data)
+
+    def read(self, bucket, key, start, length):
+        view = memoryview(self._objects[(bucket, key)])[start:start + length]
+        for offset in range(0, len(view), CHUNK):
+            yield view[offset:offset + CHUNK]
+
+    def delete(self, bucket, key):
+        with self._lock:
+            self._objects.pop((bucket, key), None)
+
+    def keys(self, bucket):
+        with self._lock:
+            items = [(k, len(v)) for (b, k), v in self._objects.items() if b == bucket]
+        return sorted(items)
+
+    def buckets(self):
+        with self._lock:
+            return sorted({b for b, _ in self._objects} - {MPU_BUCKET})
+
+
+class NullBackend(Backend):
+    """Данные не хранятся: только размеры объектов, GET отдаёт нули."""
+
+    name = "null"
+
+    def __init__(self):
+        self._sizes: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def put(self, bucket, key, chunks):
+        digest = _Digest(chunks, with_md5=False)
+        for _ in digest:
+            pass
+        with self._lock:
+            self._sizes[(bucket, key)] = digest.size
+        return digest.size, digest.etag
+
+    def size(self, bucket, key):
+        return self._sizes.get((bucket, key))
+
+    def read(self, bucket, key, start, length):
+        while length > 0:
+            n = min(length, CHUNK)
+            yield _ZEROS[:n]
+            length -= n
+
+    def delete(self, bucket, key):
+        with self._lock:
+            self._sizes.pop((bucket, key), None)
+
+    def keys(self, bucket):
+        with self._lock:
+            return sorted((k, n) for (b, k), n in self._sizes.items() if b == bucket)
+
+    def buckets(self):
+        with self._lock:
+            return sorted({b for b, _ in self._sizes} - {MPU_BUCKET})
+
+
+class DiskBackend(Backend):
+    """Объекты — файлы root/<bucket>/<key>; запись через временный файл."""
+
+    name = "disk"
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, bucket: str, key: str) -> Path:
+        path = (self.root / bucket / key).resolve()
+        if self.root not in path.parents or not key or key.endswith("/"):
+            raise MockError(400, "InvalidArgument", f"key not representable on disk: {key}")
+        return path
+
+    def put(self, bucket, key, chunks):
+        path = self._path(bucket, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        digest = _Digest(chunks)
+        try:
+            with open(tmp, "wb") as fh:
+                for chunk in digest:
+                    fh.write(chunk)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return digest.size, digest.etag
+
+    def size(self, bucket, key):
+        try:
+            path = self._path(bucket, key)
+            return path.stat().st_size if path.is_file() else None
+        except MockError:
+            return None
+
+    def read(self, bucket, key, start, length):
+        with open(self._path(bucket, key), "rb") as fh:
+            fh.seek(start)
+            while length > 0:
+                chunk = fh.read(min(length, CHUNK))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+
+    def delete(self, bucket, key):
+        try:
+            self._path(bucket, key).unlink(missing_ok=True)
+        except (MockError, IsADirectoryError):
+            pass
+
+    def keys(self, bucket):
+        base = self.root / bucket
+        items = []
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                if name.startswith(".") and name.endswith(".tmp"):
+                    continue
+                path = Path(dirpath) / name
+                try:
+                    items.append((path.relative_to(base).as_posix(), path.stat().st_size))
+                except OSError:
+                    continue
+        return sorted(items)
+
+    def buckets(self):
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and p.name != MPU_BUCKET)
+
+
+def make_backend(name: str, root: str | None = None) -> Backend:
+    if name == "memory":
+        return MemoryBackend()
+    if name == "null":
+        return NullBackend()
+    if name == "disk":
+        if not root:
+            raise ValueError("backend disk требует каталог (--root)")
+        return DiskBackend(root)
+    raise ValueError(f"неизвестный backend: {name}")
+
+
+class Throttle:
+    """Общая полоса сервера: байты проходят «через канал» по очереди."""
+
+    def __init__(self, bytes_per_sec: float):
+        self.rate = float(bytes_per_sec)
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + nbytes / self.rate
+            delay = self._next - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    injected_errors: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    by_method: dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, method: str, bytes_in: int = 0, bytes_out: int = 0, injected: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.injected_errors += int(injected)
+            self.by_method[method] = self.by_method.get(method, 0) + 1
+
+
+def _iso(ts: float | None = None) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(ts))
+
+
+def list_page(
+    keys: list[tuple[str, int]], prefix: str = "", delimiter: str = "", start_after: str = "",
+    max_keys: int = 1000,
+) -> tuple[list[tuple[str, int]], list[str], str | None]:
+    """Страница листинга: (объекты, общие префиксы, ключ продолжения или None)."""
+    contents: list[tuple[str, int]] = []
+    prefixes: list[str] = []
+    last = None
+    for key, size in keys:
+        if not key.startswith(prefix) or key <= start_after:
+            continue
+        if len(contents) + len(prefixes) >= max_keys:
+            return contents, prefixes, last
+        if delimiter:
+            pos = key.find(delimiter, len(prefix))
+            if pos >= 0:
+                common = key[:pos + len(delimiter)]
+                if not prefixes or prefixes[-1] != common:
+                    prefixes.append(common)
+                # Следующая страница продолжается после всей группы префикса
+                last = common + "\U0010ffff"
+                continue
+        contents.append((key, size))
+        last = key
+    return contents, prefixes, None
+
+
+class MockS3Server:
+    """S3-совместимый HTTP-сервер поверх Backend.
+
+    latency_ms (+ равномерный джиттер до latency_jitter_ms) добавляется к каждому
+    ответу, bandwidth ограничивает суммарный поток тел запросов и ответов
+    (байт/с), error_rate — доля запросов, на которые отвечаем 503 SlowDown.
+    """
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 0, backend: Backend | None = None,
+        latency_ms: float = 0.0, latency_jitter_ms: float = 0.0,
+        bandwidth: float | None = None, error_rate: float = 0.0, seed: int | None = None,
+    ):
+        self.backend = backend or MemoryBackend()
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.throttle = Throttle(bandwidth) if bandwidth else None
+        self.error_rate = error_rate
+        self.stats = MockStats()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._uploads: dict[str, tuple[str, str]] = {}
+        self._uploads_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> MockS3Server:
+        """Запускает сервер в фоновом потоке (для тестов и калибровки in-process)."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _roll_error(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < self.error_rate
+
+    def _delay(self) -> None:
+        delay = self.latency_ms
+        if self.latency_jitter_ms:
+            with self._rng_lock:
+                delay += self._rng.uniform(0, self.latency_jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    # --- multipart ---
+
+    def create_upload(self, bucket: str, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        with self._uploads_lock:
+            self._uploads[upload_id] = (bucket, key)
+        return upload_id
+
+    def _upload_target(self, upload_id: str) -> tuple[str, str]:
+        with self._uploads_lock:
+            target = self._uploads.get(upload_id)
+        if target is None:
+            raise MockError(404, "NoSuchUpload", "upload id not found")
+        return target
+
+    def put_part(self, upload_id: str, part: int, chunks: Iterable[bytes]) -> tuple[int, str]:
+        self._upload_target(upload_id)
+        return self.backend.put(MPU_BUCKET, f"{upload_id}/{part:05d}", chunks)
+
+    def complete_upload(self, upload_id: str, parts: list[int]) -> tuple[str, str, str]:
+        bucket, key = self._upload_target(upload_id)
+        names = [f"{upload_id}/{part:05d}" for part in parts]
+        sizes = [self.backend.size(MPU_BUCKET, name) for name in names]
+        if any(size is None for size in sizes):
+            raise MockError(400, "InvalidPart", "part not uploaded")
+        chunks = itertools.chain.from_iterable(
+            self.backend.read(MPU_BUCKET, name, 0, size) for name, size in zip(names, sizes)
+        )
+        _, etag = self.backend.put(bucket, key, chunks)
+        self.abort_upload(upload_id)
+        return bucket, key, f"{etag}-{len(parts)}"
+
+    def abort_upload(self, upload_id: str) -> None:
+        with self._uploads_lock:
+            self._uploads.pop(upload_id, None)
+        for name, _ in self.backend.keys(MPU_BUCKET):
+            if name.startswith(f"{upload_id}/"):
+                self.backend.delete(MPU_BUCKET, name)
+
+
+def _xml(tag: str, body: str) -> bytes:
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<{tag} xmlns="http://s3.amazonaws.com/doc/2006-03-01/">{body}</{tag}>').encode()
+
+
+def _make_handler(server: MockS3Server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = "s3flood-mock"
+
+        def log_message(self, *args):
+            pass
+
+        # --- ввод/вывод ---
+
+        def _body_chunks(self) -> Iterator[bytes]:
+            """Тело запроса: Content-Length, chunked и aws-chunked (потоковая подпись)."""
+            streaming = "aws-chunked" in (self.headers.get("Content-Encoding") or "") or (
+                self.headers.get("x-amz-content-sha256") or ""
+            ).startswith("STREAMING-")
+            if (self.headers.get("Transfer-Encoding") or "").lower() == "chunked":
+                raw = self._read_chunked()
+            else:
+                raw = self._read_exact(int(self.headers.get("Content-Length") or 0))
+            yield from _decode_aws_chunked(_Reader(raw)) if streaming else raw
+            self._body_read = True
+
+        def _read_exact(self, remaining: int) -> Iterator[bytes]:
+            while remaining > 0:
+                chunk = self.rfile.read(min(remaining, CHUNK))
+                if not chunk:
+                    raise ConnectionError("client closed connection mid-body")
+                remaining -= len(chunk)
+                self._count_in(len(chunk))
+                yield chunk
+
+        def _read_chunked(self) -> Iterator[bytes]:
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    while self.rfile.readline().strip():
+                        pass  # трейлеры
+                    return
+                yield from self._read_exact(size)
+                self.rfile.readline()
+
+        def _count_in(self, nbytes: int) -> None:
+            self._bytes_in += nbytes
+            if server.throttle:
+                server.throttle.consume(nbytes)
+
+        def _drain(self) -> None:
+            for _ in self._body_chunks():
+                pass
+
+        def _send(self, status: int, body: bytes = b"", headers: dict | None = None,
+                  chunks: Iterable[bytes] | None = None, length: int | None = None) -> None:
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("x-amz-request-id", uuid.uuid4().hex[:16])
+            self.send_header("Content-Length", str(len(body) if chunks is None else length))
+            self.end_headers()
+            if self.command == "HEAD":
+                return
+            for chunk in ([body] if chunks is None else chunks):
+                if not chunk:
+                    continue
+                if server.throttle:
+                    server.throttle.consume(len(chunk))
+                self.wfile.write(chunk)
+                self._bytes_out += len(chunk)
+
+        def _error(self, exc: MockError) -> None:
+            # Как у S3: <Error> без пространства имён
+            body = (f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{exc.code}</Code>'
+                    f"<Message>{escape(str(exc))}</Message>"
+                    f"<RequestId>{uuid.uuid4().hex[:16]}</RequestId></Error>").encode()
+            self._send(exc.status, body if self.command != "HEAD" else b"",
+                       {"Content-Type": "application/xml"})
+
+        # --- диспетчеризация ---
+
+        def _handle(self) -> None:
+            self._bytes_in = 0
+            self._bytes_out = 0
+            self._body_read = False
+            injected = False
+            parts = urlsplit(self.path)
+            path = unquote(parts.path)
+            query = parse_qs(parts.query, keep_blank_values=True)
+            bucket, _, key = path.lstrip("/").partition("/")
+            try:
+                server._delay()
+                if server._roll_error():
+                    injected = True
+                    self._drain()
+                    raise MockError(503, "SlowDown", "Please reduce your request rate.")
+                self._dispatch(bucket, key, query)
+            except MockError as exc:
+                self._drain_quietly()
+                self._error(exc)
+            except (ConnectionError, BrokenPipeError):
+                self.close_connection = True
+            except Exception as exc:  # бэкенд (диск) — ошибка сервера, а не обрыв прогона
+                self._drain_quietly()
+                self._error(MockError(500, "InternalError", str(exc)))
+            finally:
+                server.stats.add(self.command, self._bytes_in, self._bytes_out, injected)
+
+        def _drain_quietly(self) -> None:
+            # Тело могло остаться непрочитанным — дочитываем, иначе keep-alive собьётся;
+            # прочитанное наполовину не восстановить — соединение закрываем
+            if self._body_read:
+                return
+            if self._bytes_in:
+                self.close_connection = True
+                return
+            try:
+                self._drain()
+            except Exception:
+                self.close_connection = True
+
+        def _dispatch(self, bucket: str, key: str, query: dict) -> None:
+            method = self.command
+            if not bucket:
+                if method == "GET":
+                    return self._list_buckets()
+                raise MockError(405, "MethodNotAllowed")
+            if bucket == MPU_BUCKET:
+                raise MockError(400, "InvalidBucketName")
+            if not key:
+                if method == "GET":
+                    return self._list_objects(bucket, query)
+                if method == "POST" and "delete" in query:
+                    return self._delete_objects(bucket)
+                if method in ("PUT", "HEAD"):
+                    self._drain()
+                    return self._send(200)
+                if method == "DELETE":
+                    return self._send(204)
+                raise MockError(405, "MethodNotAllowed")
+            if method == "PUT":
+                if "uploadId" in query:
+                    size, etag = server.put_part(
+                        query["uploadId"][0], int(query["partNumber"][0]), self._body_chunks(),
+                    )
+                else:
+                    size, etag = server.backend.put(bucket, key, self._body_chunks())
+                return self._send(200, headers={"ETag": f'"{etag}"'})
+            if method == "POST":
+                if "uploads" in query:
+                    self._drain()
+                    upload_id = server.create_upload(bucket, key)
+                    return self._send(200, _xml(
+                        "InitiateMultipartUploadResult",
+                        f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                        f"<UploadId>{upload_id}</UploadId>",
+                    ))
+                if "uploadId" in query:
+                    body = b"".join(self._body_chunks())
+                    numbers = [int(el.text or 0) for el in _parse_xml(body).iter("PartNumber")]
+                    _, _, etag = server.complete_upload(query["uploadId"][0], numbers)
+                    return self._send(200, _xml(
+                        "CompleteMultipartUploadResult",
+                        f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                        f"<ETag>&quot;{etag}&quot;</ETag>",
+                    ))
+                raise MockError(400, "InvalidRequest")
+            if method == "DELETE":
+                if "uploadId" in query:
+                    server.abort_upload(query["uploadId"][0])
+                else:
+                    server.backend.delete(bucket, key)
+                return self._send(204)
+            if method in ("GET", "HEAD"):
+                return self._get(bucket, key)
+            raise MockError(405, "MethodNotAllowed")
+
+        def _get(self, bucket: str, key: str) -> None:
+            size = server.backend.size(bucket, key)
+            if size is None:
+                raise MockError(404, "NoSuchKey", "The specified key does not exist.")
+            headers = {"Content-Type": "application/octet-stream", "Accept-Ranges": "bytes",
+                       "Last-Modified": time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime()),
+                       "ETag": '"mock"'}
+            start, length, status = 0, size, 200
+            match = _RANGE_RE.match((self.headers.get("Range") or "").strip())
+            if match and size > 0:
+                first, last = match.groups()
+                if first:
+                    start = int(first)
+                    end = min(int(last), size - 1) if last else size - 1
+                else:
+                    start = max(size - int(last or 0), 0)
+                    end = size - 1
+                if start >= size or end < start:
+                    raise MockError(416, "InvalidRange", "The requested range is not satisfiable")
+                length = end - start + 1
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            chunks = server.backend.read(bucket, key, start, length) if self.command == "GET" else None
+            self._send(status, headers=headers, chunks=chunks or [], length=length)
+
+        def _list_objects(self, bucket: str, query: dict) -> None:
+            def arg(name: str, default: str = "") -> str:
+                return query.get(name, [default])[0]
+
+            v2 = arg("list-type") == "2"
+            prefix, delimiter = arg("prefix"), arg("delimiter")
+            max_keys = max(0, min(int(arg("max-keys", "1000") or 1000), 1000))
+            if v2:
+                token = arg("continuation-token")
+                start_after = _decode_token(token) if token else arg("start-after")
+            else:
+                start_after = arg("marker")
+            contents, prefixes, next_key = list_page(
+                server.backend.keys(bucket), prefix, delimiter, start_after, max_keys,
+            )
+            modified = _iso()
+            body = [f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>",
+                    f"<MaxKeys>{max_keys}</MaxKeys>",
+                    f"<IsTruncated>{'true' if next_key else 'false'}</IsTruncated>"]
+            if delimiter:
+                body.append(f"<Delimiter>{escape(delimiter)}</Delimiter>")
+            if v2:
+                body.append(f"<KeyCount>{len(contents) + len(prefixes)}</KeyCount>")
+                if next_key:
+                    body.append(f"<NextContinuationToken>{_encode_token(next_key)}</NextContinuationToken>")
+            elif next_key:
+                body.append(f"<NextMarker>{escape(next_key)}</NextMarker>")
+            for key, size in contents:
+                body.append(f"<Contents><Key>{escape(key)}</Key><LastModified>{modified}</LastModified>"
+                            f"<ETag>&quot;mock&quot;</ETag><Size>{size}</Size>"
+                            f"<StorageClass>STANDARD</StorageClass></Contents>")
+            for common in prefixes:
+                body.append(f"<CommonPrefixes><Prefix>{escape(common)}</Prefix></CommonPrefixes>")
+            self._send(200, _xml("ListBucketResult", "".join(body)),
+                       {"Content-Type": "application/xml"})
+
+        def _delete_objects(self, bucket: str) -> None:
+            root = _parse_xml(b"".join(self._body_chunks()))
+            deleted = []
+            for el in root.iter("Object"):
+                key = el.findtext("Key") or ""
+                server.backend.delete(bucket, key)
+                deleted.append(f"<Deleted><Key>{escape(key)}</Key></Deleted>")
+            self._send(200, _xml("DeleteResult", "".join(deleted)),
+                       {"Content-Type": "application/xml"})
+
+        def _list_buckets(self) -> None:
+            entries = "".join(
+                f"<Bucket><Name>{escape(name)}</Name><CreationDate>{_iso(0)}</CreationDate></Bucket>"
+                for name in server.backend.buckets()
+            )
+            self._send(200, _xml("ListAllMyBucketsResult", f"<Buckets>{entries}</Buckets>"),
+                       {"Content-Type": "application/xml"})
+
+        do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = _handle
+
+    return Handler
+
+
+def _encode_token(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def _decode_token(token: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(token.encode()).decode()
+    except ValueError:
+        raise MockError(400, "InvalidArgument", "invalid continuation token") from None
+
+
+def _parse_xml(data: bytes) -> ET.Element:
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError as exc:
+        raise MockError(400, "MalformedXML", str(exc)) from None
+    for el in root.iter():
+        if "}" in el.tag:
+            el.tag = el.tag.split("}", 1)[1]
+    return root
+
+
+class _Reader:
+    """Буферизованное чтение из итератора чанков (для декодирования aws-chunked)."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buf = b""
+
+    def _fill(self) -> bool:
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self._buf += bytes(chunk)
+        return True
+
+    def readline(self) -> bytes:
+        while b"\r\n" not in self._buf:
+            if not self._fill():
+                line, self._buf = self._buf, b""
+                return line
+        line, self._buf = self._buf.split(b"\r\n", 1)
+        return line
+
+    def read(self, n: int) -> Iterator[bytes]:
+        while n > 0:
+            if not self._buf and not self._fill():
+                raise MockError(400, "IncompleteBody", "aws-chunked body truncated")
+            piece, self._buf = self._buf[:n], self._buf[n:]
+            n -= len(piece)
+            yield piece
+
+
+def _decode_aws_chunked(reader: _Reader) -> Iterator[bytes]:
+    """Тело с Content-Encoding: aws-chunked — '<hex>;chunk-signature=..\\r\\n<data>\\r\\n'."""
+    while True:
+        header = reader.readline()
+        if not header:
+            return
+        size = int(header.split(b";")[0].strip() or b"0", 16)
+        if size == 0:
+            return  # дальше — трейлеры с контрольными суммами, их не проверяем
+        yield from reader.read(size)
+        reader.readline()
+
+
+def run_mock_server(
+    listen: str = "127.0.0.1:9000", backend: str = "memory", root: str | None = None,
+    latency_ms: float = 0.0, latency_jitter_ms: float = 0.0, bandwidth: float | None = None,
+    error_rate: float = 0.0,
+) -> None:
+    """Точка входа s3flood mock-server: работает до Ctrl+C, в конце печатает статистику."""
+    host, _, port = listen.rpartition(":")
+    server = MockS3Server(
+        host or "127.0.0.1", int(port), make_backend(backend, root),
+        latency_ms=latency_ms, latency_jitter_ms=latency_jitter_ms,
+        bandwidth=bandwidth, error_rate=error_rate,
+    )
+    extras = []
+    if latency_ms or latency_jitter_ms:
+        extras.append(f"задержка {latency_ms:g}+{latency_jitter_ms:g} ms")
+    if bandwidth:
+        extras.append(f"полоса {bandwidth / 1024 / 1024:.1f} MB/s")
+    if error_rate:
+        extras.append(f"ошибки {error_rate:.1%}")
+    print(f"mock-server: {server.endpoint} (backend: {server.backend.name}"
+          + (", " + ", ".join(extras) if extras else "") + ")", flush=True)
+    started = time.time()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    stats = server.stats
+    elapsed = max(time.time() - started, 1e-6)
+    methods = ", ".join(f"{m}={n}" for m, n in sorted(stats.by_method.items()))
+    print(f"\nmock-server: {stats.requests} запросов за {elapsed:.1f} с ({methods}), "
+          f"принято {stats.bytes_in / 1024 / 1024:.1f} MB, отдано {stats.bytes_out / 1024 / 1024:.1f} MB, "
+          f"инъекций ошибок: {stats.injected_errors}", flush=True)
@@ -0,0 +1,418 @@
+"""Компактный бинарный журнал операций: metrics_format: binary.
+
+Альтернатива metrics.csv для длинных прогонов: каждая операция — запись
+фиксированной ширины RECORD (88 байт, little-endian) без форматирования
+чисел в потоке записи, строки (op, endpoint, size_group, текст ошибки) —
+номера в таблице строк. Файл только дописывается:
+
+- <path> — заголовок HEADER (магия, версия, размер записи) и записи подряд;
+- <path>.strings — таблица строк, по JSON-строке на строку файла; номер
+  строки — её id (0 — пустая строка, в файле не хранится).
+
+Новая строка попадает в таблицу раньше первой ссылающейся на неё записи, а
+недописанный хвост (последняя запись или строка) читатель отбрасывает,
+поэтому журнал можно открыть, пока прогон его ещё пишет. OpLog отображает
+файл через mmap: с numpy columns() — представления numpy.frombuffer прямо
+поверх страниц файла, без разбора и копирования; без numpy — проход
+struct.iter_unpack.
+
+OpsTail и analyze_stream читают любой журнал (CSV или бинарный) пачками в
+OpsSketch — сводку фиксированного размера для многосуточных прогонов,
+в том числе пока файл ещё пишется.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import itertools
+import json
+import math
+import mmap
+import struct
+
+from .metrics import (
+    PHASES,
+    OpColumns,
+    OpsSketch,
+    _csv_chunk_columns,
+    _csv_op,
+    _QueuedWriter,
+    _StringTable,
+    read_ops_columns,
+    read_ops_csv,
+)
+
+try:  # numpy необязателен: без него колонки собираются проходом по записям
+    import numpy as _np
+except ImportError:  # pragma: no cover - зависит от окружения
+    _np = None
+
+METRICS_FORMATS = ("csv", "binary")
+MAGIC = b"S3FLOPS\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sHH4x")
+# ts_start, ts_end, ts_intended (NaN — нет), bytes, thread_id (-1 — нет), latency_ms,
+# фазы (NaN — нет), id op/endpoint/size_group, attempt (0 — нет), id ошибки, ok;
+# размер кратен 8 — колонки double в mmap выровнены
+RECORD = struct.Struct(f"<3d2qf{len(PHASES)}f4HIB7x")
+FIELDS = (
+    "ts_start", "ts_end", "ts_intended", "bytes", "thread_id", "latency_ms",
+    *(f"{phase}_ms" for phase in PHASES),
+    "op", "endpoint", "size_group", "attempt", "error", "ok",
+)
+# Колонки-ссылки на таблицу строк
+STRING_FIELDS = ("op", "endpoint", "size_group", "error")
+
+if _np is not None:
+    RECORD_DTYPE = _np.dtype([
+        ("ts_start", "<f8"), ("ts_end", "<f8"), ("ts_intended", "<f8"), ("bytes", "<i8"),
+        ("thread_id", "<i8"), ("latency_ms", "<f4"), *((f"{phase}_ms", "<f4") for phase in PHASES),
+        ("op", "<u2"), ("endpoint", "<u2"), ("size_group", "<u2"), ("attempt", "<u2"),
+        ("error", "<u4"), ("ok", "u1"), ("_pad", "V7"),
+    ])
+    assert RECORD_DTYPE.itemsize == RECORD.size
+else:  # pragma: no cover - зависит от окружения
+    RECORD_DTYPE = None
+
+_NAN = float("nan")
+# С какого размера файла метрик просмотрщик переходит на потоковую сводку (analyze_stream)
+STREAM_MIN_BYTES = 512 * 1024 * 1024
+
+
+def strings_path(path: str) -> str:
+    return f"{path}.strings"
+
+
+def is_oplog(path: str) -> bool:
+    """Файл начинается с магии бинарного журнала."""
+    try:
+        with open(path, "rb") as fh:
+            return fh.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class MetricsBinaryWriter(_QueuedWriter):
+    """Пишет операции в бинарный журнал одним фоновым потоком.
+
+    Тот же write_row, что у MetricsCsvWriter, но воркер кладёт в очередь
+    кортеж, а поток записи упаковывает пачку в один буфер и пишет его
+    одним вызовом.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._file.flush()
+        self._strings = open(strings_path(path), "w", encoding="utf-8")
+        self._ids: dict[str, int] = {"": 0}
+        super().__init__("metrics-oplog")
+
+    def write_row(
+        self,
+        *,
+        ts_start: float,
+        ts_end: float,
+        op: str,
+        nbytes: int,
+        ok: bool,
+        latency_ms: int,
+        error: str | None = None,
+        endpoint: str | None = None,
+        thread_id: int | None = None,
+        attempt: int | None = None,
+        size_group: str | None = None,
+        ts_intended: float | None = None,
+        phases: dict[str, float] | None = None,
+    ) -> None:
+        self._queue.put((ts_start, ts_end, op, nbytes, ok, latency_ms, error, endpoint,
+                         thread_id, attempt, size_group, ts_intended, phases))
+
+    def _intern(self, text: str | None, new: list[str]) -> int:
+        text = text or ""
+        index = self._ids.get(text)
+        if index is None:
+            index = self._ids[text] = len(self._ids)
+            new.append(json.dumps(text, ensure_ascii=False))
+        return index
+
+    def _write_batch(self, items: list) -> None:
+        buf = bytearray(RECORD.size * len(items))
+        new: list[str] = []
+        for i, (ts_start, ts_end, op, nbytes, ok, latency_ms, error, endpoint,
+                thread_id, attempt, size_group, ts_intended, phases) in enumerate(items):
+            phases = phases or {}
+            RECORD.pack_into(
+                buf, i * RECORD.size,
+                ts_start, ts_end, _NAN if ts_intended is None else ts_intended, nbytes,
+                -1 if thread_id is None else thread_id, latency_ms,
+                *(phases.get(phase, _NAN) for phase in PHASES),
+                self._intern(op, new), self._intern(endpoint, new), self._intern(size_group, new),
+                attempt or 0, self._intern(error, new), 1 if ok else 0,
+            )
+        # Строки — раньше записей, которые на них ссылаются
+        if new:
+            self._strings.write("\n".join(new) + "\n")
+            self._strings.flush()
+        self._file.write(buf)
+        self._file.flush()
+
+    def _close_files(self) -> None:
+        self._file.close()
+        self._strings.close()
+
+
+class OpLog:
+    """Журнал операций, отображённый в память (см. модуль).
+
+    len() — число целых записей на момент открытия или последнего refresh();
+    strings — таблица строк (индекс — id).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        self._mm: mmap.mmap | None = None
+        self.strings: list[str] = [""]
+        self.count = 0
+        self.refresh()
+
+    def _unmap(self) -> None:
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # на отображение ещё смотрят массивы records(): закроется вместе с ними
+            self._mm = None
+
+    def refresh(self) -> None:
+        """Подхватывает записи и строки, дописанные с момента открытия."""
+        self._unmap()
+        size = self._fh.seek(0, 2)
+        if size < HEADER.size:
+            raise ValueError(f"{self.path}: не журнал операций s3flood (нет заголовка)")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: не журнал операций s3flood")
+        if version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{self.path}: неподдерживаемая версия журнала {version}")
+        self.count = (size - HEADER.size) // RECORD.size
+        self.strings = [""]
+        try:
+            with open(strings_path(self.path), encoding="utf-8") as fh:
+                for line in fh:
+                    if not line.endswith("\n"):
+                        break  # строка ещё дописывается
+                    self.strings.append(json.loads(line))
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self) -> OpLog:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._unmap()
+        self._fh.close()
+
+    def string(self, index: int) -> str:
+        return self.strings[index] if index < len(self.strings) else "?"
+
+    def records(self):
+        """Структурированный numpy-массив поверх mmap (нужен numpy); живёт, пока журнал открыт."""
+        if _np is None:
+            raise RuntimeError("для records() нужен numpy")
+        return _np.frombuffer(self._mm, dtype=RECORD_DTYPE, count=self.count, offset=HEADER.size)
+
+    def columns(self) -> dict:
+        """Колонки FIELDS: с numpy — представления без копирования, без него — списки."""
+        if _np is not None:
+            recs = self.records()
+            return {name: recs[name] for name in FIELDS}
+        rows = list(self._iter_raw())
+        return {name: [row[i] for row in rows] for i, name in enumerate(FIELDS)}
+
+    def op_columns(self, start: int = 0, stop: int | None = None) -> OpColumns:
+        """OpColumns записей [start, stop) для analyze_operations (нужен numpy).
+
+        Время, байты и коды строк — представления поверх mmap; float32
+        латентности и фаз приводятся к float64 (копия), ok — к bool.
+        """
+        recs = self.records()[start:stop]
+        strings = list(self.strings)
+        top = max((int(recs[name].max()) for name in STRING_FIELDS if len(recs)), default=0)
+        strings += ["?"] * (top + 1 - len(strings))  # строки ещё не дописаны
+        columns = {name: recs[name] for name in
+                   ("ts_start", "ts_end", "ts_intended", "bytes", *STRING_FIELDS)}
+        columns["latency_ms"] = recs["latency_ms"].astype(_np.float64)
+        columns["ok"] = recs["ok"].astype(_np.bool_)
+        columns["attempt"] = recs["attempt"].astype(_np.int64)
+        for phase in PHASES:
+            columns[f"{phase}_ms"] = recs[f"{phase}_ms"].astype(_np.float64)
+        return OpColumns(columns, strings)
+
+    def _iter_raw(self, start: int = 0, stop: int | None = None):
+        stop = self.count if stop is None else min(stop, self.count)
+        return RECORD.iter_unpack(
+            memoryview(self._mm)[HEADER.size + start * RECORD.size:HEADER.size + stop * RECORD.size])
+
+    def iter_ops(self, start: int = 0, stop: int | None = None):
+        """Операции [start, stop) в формате read_ops_csv (dict на операцию)."""
+        string = self.string
+        phase_slice = slice(6, 6 + len(PHASES))
+        for row in self._iter_raw(start, stop):
+            ts_start, ts_end, ts_intended, nbytes, _thread_id, latency_ms = row[:6]
+            op, endpoint, size_group, attempt, error, ok = row[6 + len(PHASES):]
+            yield {
+                "ts_start": ts_start,
+                "ts_end": ts_end,
+                "op": string(op),
+                "bytes": nbytes,
+                "status": "ok" if ok else "err",
+                "latency_ms": latency_ms,
+                "error": string(error),
+                "endpoint": string(endpoint),
+                "attempt": str(attempt) if attempt else "",
+                "size_group": string(size_group),
+                "ts_intended": None if math.isnan(ts_intended) else ts_intended,
+                "phases": {phase: value for phase, value in zip(PHASES, row[phase_slice])
+                           if not math.isnan(value)},
+            }
+
+
+def read_ops(path: str) -> list[dict]:
+    """Операции из metrics.csv или бинарного журнала — формат определяется по содержимому."""
+    if not is_oplog(path):
+        return read_ops_csv(path)
+    with OpLog(path) as log:
+        return list(log.iter_ops())
+
+
+def load_ops(path: str):
+    """Операции для analyze_operations: с numpy — OpColumns (CSV пачками, журнал — через mmap),
+    без numpy — список dict (read_ops)."""
+    if _np is None:
+        return read_ops(path)
+    if not is_oplog(path):
+        return read_ops_columns(path)
+    with OpLog(path) as log:
+        # колонки держат отображение открытым и после close()
+        return log.op_columns()
+
+
+class OpsTail:
+    """Дочитывание журнала операций (metrics.csv или бинарного), пока прогон его пишет.
+
+    update(sketch) сворачивает в OpsSketch операции, дописанные с прошлого
+    вызова, пачками по chunk_rows — в памяти не больше одной пачки, сколько бы
+    ни весил журнал. Недописанный хвост не теряется: в CSV разбираются только
+    целые записи (строка до перевода строки вне кавычек — текст ошибки бывает
+    многострочным), остаток ждёт следующего update(); в бинарном журнале
+    хвост отбрасывает OpLog.refresh().
+    """
+
+    READ_BLOCK = 4 * 1024 * 1024
+
+    def __init__(self, path: str, chunk_rows: int = 65_536):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self._log: OpLog | None = None
+        self._fh = None
+        if is_oplog(path):
+            self._log = OpLog(path)
+            self._done = 0
+        else:
+            self._fh = open(path, "rb")
+            self._pending = b""
+            self._index: dict[str, int] | None = None
+
+    def __enter__(self) -> OpsTail:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+        if self._fh is not None:
+            self._fh.close()
+
+    def update(self, sketch: OpsSketch) -> int:
+        """Добавляет в sketch новые операции; возвращает их число."""
+        if self._log is not None:
+            return self._update_oplog(sketch)
+        added = 0
+        while block := self._fh.read(self.READ_BLOCK):
+            added += self._fold_csv(self._complete_records(block), sketch)
+        return added
+
+    def _update_oplog(self, sketch: OpsSketch) -> int:
+        log = self._log
+        log.refresh()
+        start = self._done
+        while self._done < len(log):
+            stop = min(self._done + self.chunk_rows, len(log))
+            if _np is not None:
+                sketch.add_columns(log.op_columns(self._done, stop))
+            else:
+                for op in log.iter_ops(self._done, stop):
+                    sketch.add(op)
+            self._done = stop
+        return self._done - start
+
+    def _complete_records(self, block: bytes) -> bytes:
+        """Целые записи CSV из дочитанного блока; недописанный хвост — в _pending."""
+        data = self._pending + block
+        end = data.rfind(b"\n") + 1
+        # перевод строки внутри кавычек — не конец записи: откатываемся к
+        # последнему, перед которым кавычек чётное число
+        quotes = data.count(b'"', 0, end)
+        while quotes % 2 and end:
+            start = data.rfind(b"\n", 0, end - 1) + 1
+            quotes -= data.count(b'"', start, end)
+            end = start
+        self._pending = data[end:]
+        return data[:end]
+
+    def _fold_csv(self, data: bytes, sketch: OpsSketch) -> int:
+        if not data:
+            return 0
+        reader = csv.reader(io.StringIO(data.decode("utf-8"), newline=""))
+        if self._index is None:
+            header = next(reader, None) or []
+            self._index = {name: i for i, name in enumerate(header)}
+        index = self._index
+        added = 0
+        while chunk := list(itertools.islice(reader, self.chunk_rows)):
+            if _np is not None:
+                # своя таблица строк на пачку: уникальные тексты ошибок не копятся
+                intern = _StringTable()
+                cols = OpColumns(_csv_chunk_columns(chunk, index, intern), intern.strings)
+                sketch.add_columns(cols)
+                added += len(cols)
+                continue
+            for row in chunk:
+                if not row:
+                    continue
+                try:
+                    op = _csv_op({name: row[i] for name, i in index.items() if i < len(row)})
+                except ValueError:
+                    continue
+                sketch.add(op)
+                added += 1
+        return added
+
+
+def analyze_stream(path: str, chunk_rows: int = 65_536) -> OpsSketch:
+    """Набросок OpsSketch по всему файлу метрик за один проход (память не зависит от размера)."""
+    sketch = OpsSketch()
+    with OpsTail(path, chunk_rows) as tail:
+        tail.update(sketch)
+    return sketch
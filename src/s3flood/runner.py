@@ -1,19 +1,49 @@
-"""Запуск S3-операций через субпроцессы aws CLI.
+"""Запуск S3-операций: aws CLI, нативный клиент и batch-движки s5cmd/rclone.
 
-Изолирует всю работу с aws CLI: окружение/профили, запуск процессов
+Изолирует работу с внешними клиентами: окружение/профили, запуск процессов
 с возможностью прерывания, ретраи с backoff и реестр активных процессов
-для корректного завершения по Ctrl+C.
+для корректного завершения по Ctrl+C. Runner — единый интерфейс
+upload/download/list/delete, через который executor вызывает выбранный
+клиент (`client` в конфиге); make_runner создаёт движок по имени.
 """
 from __future__ import annotations
 
+import asyncio
+import http.client
 import inspect
 import json
 import os
+import re
+import shlex
+import shutil
+import socket
 import subprocess
+import tempfile
 import threading
 import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
 from pathlib import Path
 
+from .aioclient import AsyncS3Client, aio_download, aio_upload
+from .listing import ParallelLister
+from .s3client import (
+    RequestAborted,
+    S3Error,
+    abort_native_requests,
+    close_native_clients,
+    get_client,
+    native_delete,
+    native_download,
+    native_list_objects,
+    native_list_pages,
+    native_upload,
+    resolve_credentials,
+    resolve_region,
+    split_bucket,
+)
+
 CONFIG_HOME = Path.home()
 CUSTOM_AWS_PROFILE = "s3flood-temp"
 CUSTOM_AWS_CONFIG_PATH = Path(
@@ -22,6 +52,9 @@ CUSTOM_AWS_CONFIG_PATH = Path(
 _custom_config_signature: tuple | None = None
 _custom_config_lock = threading.Lock()
 
+# Ключей на страницу листинга (максимум ListObjectsV2)
+LIST_PAGE_SIZE = 1000
+
 # Механизм отслеживания активных процессов для корректного завершения при прерывании
 _active_processes: set[subprocess.Popen] = set()
 _active_processes_lock = threading.Lock()
@@ -253,6 +286,84 @@ def aws_list_objects(
         return None
 
 
+class ListingError(Exception):
+    """Листинг бакета прервался ошибкой (Runner.list_pages)."""
+
+
+def native_parallel_pages(
+    bucket: str,
+    endpoint: str,
+    access_key: str | None,
+    secret_key: str | None,
+    aws_profile: str | None,
+    workers: int,
+    mode: str = "range",
+    page_size: int = LIST_PAGE_SIZE,
+):
+    """Параллельный листинг (listing.ParallelLister) встроенным клиентом при любом client.
+
+    Страницы [{key, size}] с ключами относительно префикса, без порядка между
+    диапазонами ключей; ошибка — ListingError.
+    """
+    name, prefix = split_bucket(bucket)
+    try:
+        client = get_client(endpoint, access_key, secret_key, aws_profile)
+        lister = ParallelLister(client, name, prefix, workers=workers, mode=mode, page_size=page_size)
+        for objects in lister.pages():
+            yield [{"key": obj["key"][len(prefix):], "size": obj["size"]} for obj in objects]
+    except (S3Error, RequestAborted, OSError, http.client.HTTPException) as exc:
+        raise ListingError(str(exc)) from exc
+
+
+def aws_list_pages(
+    bucket: str,
+    endpoint: str,
+    access_key: str | None,
+    secret_key: str | None,
+    aws_profile: str | None,
+    multipart_threshold: int | None = None,
+    multipart_chunksize: int | None = None,
+    max_concurrent_requests: int | None = None,
+    page_size: int = LIST_PAGE_SIZE,
+):
+    """Листинг по страницам: s3api list-objects-v2 --max-items/--starting-token.
+
+    Каждая страница — отдельный вызов CLI, поэтому в памяти не больше одной
+    страницы JSON. Ключи — относительно префикса из s3://bucket/prefix;
+    ошибка вызова — ListingError.
+    """
+    env, profile_name = _get_aws_env(
+        access_key, secret_key, aws_profile,
+        multipart_threshold, multipart_chunksize, max_concurrent_requests
+    )
+    bucket_name, prefix = split_bucket(bucket)
+    token = None
+    while True:
+        cmd = ["aws", "s3api", "list-objects-v2", "--bucket", bucket_name, "--endpoint-url", endpoint,
+               "--page-size", str(page_size), "--max-items", str(page_size)]
+        if prefix:
+            cmd.extend(["--prefix", prefix])
+        if token:
+            cmd.extend(["--starting-token", token])
+        if profile_name:
+            cmd.extend(["--profile", profile_name])
+        try:
+            res = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        except OSError as exc:
+            raise ListingError(str(exc)) from exc
+        if res.returncode != 0:
+            raise ListingError(res.stderr.strip()[-300:] or f"exit code {res.returncode}")
+        try:
+            data = json.loads(res.stdout) if res.stdout.strip() else {}
+            yield [{"key": obj["Key"][len(prefix):], "size": obj.get("Size", 0)}
+                   for obj in data.get("Contents") or []]
+        except (json.JSONDecodeError, KeyError) as exc:
+            raise ListingError(f"неожиданный ответ list-objects-v2: {exc}") from exc
+        token = data.get("NextToken")
+        if not token:
+            return
+
+
 def aws_check_bucket_access(
     bucket: str,
     endpoint: str,
@@ -320,6 +431,24 @@ def aws_cp_download(
     return res
 
 
+def aws_delete_object(
+    bucket: str,
+    key: str,
+    endpoint: str,
+    access_key: str | None,
+    secret_key: str | None,
+    aws_profile: str | None,
+    stop: threading.Event | None = None,
+):
+    """Удаляет объект через aws s3 rm."""
+    env, profile_name = _get_aws_env(access_key, secret_key, aws_profile)
+    url = f"{bucket}/{key}" if bucket.startswith("s3://") else f"s3://{bucket}/{key}"
+    cmd = ["aws", "s3", "rm", url, "--endpoint-url", endpoint]
+    if profile_name:
+        cmd.extend(["--profile", profile_name])
+    return _run_interruptible(cmd, env, stop)
+
+
 def retry_with_backoff(func, max_retries: int, backoff_base: float, *args, stop: threading.Event | None = None, **kwargs):
     """Выполняет функцию с повторами и экспоненциальным backoff.
 
@@ -370,3 +499,826 @@ def retry_with_backoff(func, max_retries: int, backoff_base: float, *args, stop:
     return last_result, False, last_error or "max retries exceeded", max_retries + 1
 
 
+async def retry_with_backoff_async(func, max_retries: int, backoff_base: float, *args,
+                                  stop: threading.Event | None = None, **kwargs):
+    """Async-вариант retry_with_backoff для engine: asyncio (func — корутина с параметром stop).
+
+    Семантика и результат (result, ok, error, attempts) те же; backoff-пауза
+    не блокирует event loop.
+    """
+    last_error = None
+    last_result = None
+
+    async def wait_or_abort(attempt: int) -> bool:
+        wait_time = backoff_base ** attempt
+        for _ in range(int(wait_time * 10)):
+            if stop and stop.is_set():
+                return False
+            await asyncio.sleep(0.1)
+        return True
+
+    for attempt in range(max_retries + 1):
+        attempts = attempt + 1
+        if stop and stop.is_set():
+            return None, False, "interrupted by user", attempts
+        try:
+            result = await func(*args, stop=stop, **kwargs)
+        except Exception as e:
+            result = None
+            last_error = str(e)
+        else:
+            if result.returncode == 0:
+                return result, True, None, attempts
+            last_result = result
+            stderr = getattr(result, "stderr", None)
+            last_error = stderr[-200:] if stderr else f"exit code {result.returncode}"
+        if attempt < max_retries:
+            if not await wait_or_abort(attempt):
+                return None, False, "interrupted by user", attempts
+            continue
+        return last_result, False, last_error or "max retries exceeded", attempts
+    return last_result, False, last_error or "max retries exceeded", max_retries + 1
+
+
+class Runner(ABC):
+    """Движок S3-операций — единый интерфейс для executor'а.
+
+    upload/download/delete возвращают subprocess.CompletedProcess (returncode 0 —
+    успех, stderr — текст ошибки), как их понимает retry_with_backoff.
+    list_objects возвращает [{key, size}] или None при ошибке; ключи — относительно
+    префикса из s3://bucket/prefix, в том виде, в каком их принимает download.
+    list_pages отдаёт тот же листинг по страницам, по мере получения.
+    """
+
+    name = "base"
+    # Есть ли upload_async/download_async для engine: asyncio
+    supports_async = False
+
+    def __init__(
+        self,
+        access_key: str | None = None,
+        secret_key: str | None = None,
+        aws_profile: str | None = None,
+        multipart_threshold: int | None = None,
+        multipart_chunksize: int | None = None,
+        max_concurrent_requests: int | None = None,
+        threads: int = 8,
+    ):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.aws_profile = aws_profile
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        self.max_concurrent_requests = max_concurrent_requests
+        self.threads = max(int(threads or 1), 1)
+        # Лимит полосы (throttle.Limiter); по блокам тела его соблюдает только native
+        self.limiter = None
+
+    @abstractmethod
+    def upload(self, local: Path, bucket: str, key: str, endpoint: str,
+               stop: threading.Event | None = None):
+        """Загружает локальный файл в bucket/key."""
+
+    @abstractmethod
+    def download(self, bucket: str, key: str, endpoint: str,
+                 stop: threading.Event | None = None):
+        """Читает объект; stdout результата — число прочитанных байт, если известно."""
+
+    @abstractmethod
+    def list_objects(self, bucket: str, endpoint: str) -> list[dict] | None:
+        """Листинг бакета (с учётом префикса)."""
+
+    def list_pages(self, bucket: str, endpoint: str, page_size: int = LIST_PAGE_SIZE):
+        """Листинг по страницам [{key, size}]; ошибка — ListingError.
+
+        Без постраничного API у движка листинг приходит одной страницей.
+        """
+        objects = self.list_objects(bucket, endpoint)
+        if objects is None:
+            raise ListingError(f"{self.name}: листинг {bucket} не удался")
+        yield objects
+
+    @abstractmethod
+    def delete(self, bucket: str, key: str, endpoint: str,
+               stop: threading.Event | None = None):
+        """Удаляет объект."""
+
+    def abort(self) -> None:
+        """Прерывает операции в полёте (Ctrl+C)."""
+
+    def close(self) -> None:
+        """Освобождает ресурсы движка в конце прогона."""
+
+
+class AwsCliRunner(Runner):
+    """aws CLI: отдельный процесс на каждую операцию."""
+
+    name = "awscli"
+
+    def _cli_settings(self) -> tuple:
+        return (self.access_key, self.secret_key, self.aws_profile,
+                self.multipart_threshold, self.multipart_chunksize,
+                self.max_concurrent_requests)
+
+    def upload(self, local, bucket, key, endpoint, stop=None):
+        return aws_cp_upload(local, bucket, key, endpoint, *self._cli_settings(), stop=stop)
+
+    def download(self, bucket, key, endpoint, stop=None):
+        return aws_cp_download(bucket, key, endpoint, *self._cli_settings(), stop=stop)
+
+    def list_objects(self, bucket, endpoint):
+        objects = aws_list_objects(bucket, endpoint, *self._cli_settings())
+        if objects is None:
+            return None
+        # aws_list_objects листит весь бакет полными ключами — приводим к контракту Runner
+        _, prefix = split_bucket(bucket)
+        return [{"key": obj["key"][len(prefix):], "size": obj["size"]}
+                for obj in objects if obj["key"].startswith(prefix)]
+
+    def list_pages(self, bucket, endpoint, page_size=LIST_PAGE_SIZE):
+        return aws_list_pages(bucket, endpoint, *self._cli_settings(), page_size=page_size)
+
+    def delete(self, bucket, key, endpoint, stop=None):
+        return aws_delete_object(bucket, key, endpoint, self.access_key, self.secret_key,
+                                 self.aws_profile, stop=stop)
+
+    def abort(self) -> None:
+        _terminate_all_processes()
+
+
+class NativeRunner(Runner):
+    """Встроенный HTTP-клиент (s3client): запросы в процессе, keep-alive пул.
+
+    Для engine: asyncio есть upload_async/download_async на AsyncS3Client —
+    клиенты создаются в event loop движка и закрываются aclose().
+    """
+
+    name = "native"
+    supports_async = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._aio_clients: dict[str, AsyncS3Client] = {}
+        self._aio_loop: asyncio.AbstractEventLoop | None = None
+
+    def upload(self, local, bucket, key, endpoint, stop=None):
+        return native_upload(
+            local, bucket, key, endpoint, self.access_key, self.secret_key, self.aws_profile,
+            self.multipart_threshold, self.multipart_chunksize, self.max_concurrent_requests,
+            stop=stop, limiter=self.limiter,
+        )
+
+    def download(self, bucket, key, endpoint, stop=None):
+        return native_download(bucket, key, endpoint, self.access_key, self.secret_key,
+                               self.aws_profile, stop=stop, limiter=self.limiter)
+
+    def list_objects(self, bucket, endpoint):
+        return native_list_objects(bucket, endpoint, self.access_key, self.secret_key,
+                                   self.aws_profile)
+
+    def list_pages(self, bucket, endpoint, page_size=LIST_PAGE_SIZE):
+        pages = native_list_pages(bucket, endpoint, self.access_key, self.secret_key,
+                                  self.aws_profile, page_size)
+        try:
+            yield from pages
+        except (S3Error, RequestAborted, OSError, http.client.HTTPException) as exc:
+            raise ListingError(str(exc)) from exc
+
+    def delete(self, bucket, key, endpoint, stop=None):
+        return native_delete(bucket, key, endpoint, self.access_key, self.secret_key,
+                             self.aws_profile, stop=stop)
+
+    def _aio_client(self, endpoint: str) -> AsyncS3Client:
+        client = self._aio_clients.get(endpoint)
+        if client is None:
+            self._aio_loop = asyncio.get_running_loop()
+            client = AsyncS3Client(
+                endpoint=endpoint,
+                credentials=resolve_credentials(self.access_key, self.secret_key,
+                                                self.aws_profile),
+                region=resolve_region(self.aws_profile),
+                limiter=self.limiter,
+            )
+            self._aio_clients[endpoint] = client
+        return client
+
+    async def upload_async(self, local, bucket, key, endpoint, stop=None):
+        return await aio_upload(
+            self._aio_client(endpoint), local, bucket, key, self.multipart_threshold,
+            self.multipart_chunksize, self.max_concurrent_requests, stop=stop,
+        )
+
+    async def download_async(self, bucket, key, endpoint, stop=None):
+        return await aio_download(self._aio_client(endpoint), bucket, key, stop=stop)
+
+    async def aclose(self) -> None:
+        """Закрывает async-клиенты; вызывать в event loop движка перед его остановкой."""
+        clients, self._aio_clients = self._aio_clients, {}
+        for client in clients.values():
+            client.close_async()
+        self._aio_loop = None
+
+    def _abort_async(self) -> None:
+        for client in list(self._aio_clients.values()):
+            client.abort_async()
+
+    def abort(self) -> None:
+        abort_native_requests()
+        loop = self._aio_loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._abort_async)
+            except RuntimeError:
+                pass  # loop уже остановлен
+
+    def close(self) -> None:
+        close_native_clients()
+
+
+def _s3_url(bucket: str, key: str = "") -> str:
+    base = bucket if bucket.startswith("s3://") else f"s3://{bucket}"
+    return f"{base.rstrip('/')}/{key}" if key else base.rstrip("/")
+
+
+def _scratch_dir(prefix: str) -> Path:
+    """Каталог для служебных файлов batch-клиентов (в RAM через /dev/shm, если он есть).
+
+    s5cmd и rclone не умеют писать объект в /dev/null, поэтому download
+    пишет во временный файл и сразу удаляет его.
+    """
+    shm = Path("/dev/shm")
+    base = str(shm) if shm.is_dir() and os.access(shm, os.W_OK) else None
+    return Path(tempfile.mkdtemp(prefix=prefix, dir=base))
+
+
+def _client_env(access_key: str | None, secret_key: str | None,
+                aws_profile: str | None) -> dict:
+    env = os.environ.copy()
+    env["AWS_EC2_METADATA_DISABLED"] = "true"
+    if access_key and secret_key:
+        env["AWS_ACCESS_KEY_ID"] = access_key
+        env["AWS_SECRET_ACCESS_KEY"] = secret_key
+    elif aws_profile:
+        env["AWS_PROFILE"] = aws_profile
+    return env
+
+
+def _failed(args: list[str], error: str) -> subprocess.CompletedProcess:
+    return subprocess.CompletedProcess(args, 1, "", error)
+
+
+_S5CMD_PLAIN_ERROR_RE = re.compile(r'^ERROR "(?P<command>.+?)": (?P<error>.*)$')
+# Метка команды: уникальное имя служебного файла в scratch-каталоге
+_S5CMD_TOKEN_RE = re.compile(r"s3flood-op-([0-9a-f]{32})")
+
+
+def _s5cmd_key(op: str, args: list[str]) -> tuple:
+    """Ключ сопоставления команды без метки (rm): (операция, позиционные аргументы)."""
+    count = 2 if op in ("cp", "mv") else 1
+    return (op, *args[-count:])
+
+
+def _s5cmd_token(*texts: str) -> str | None:
+    for text in texts:
+        match = _S5CMD_TOKEN_RE.search(text or "")
+        if match:
+            return match.group(1)
+    return None
+
+
+def parse_s5cmd_line(line: str) -> dict | None:
+    """Разбирает строку вывода `s5cmd --json run`.
+
+    Возвращает {token, key, ok, error, size} или None для строк, не относящихся
+    к операции. token — метка команды из пути служебного файла (cp), key —
+    запасной ключ по аргументам для команд без метки (rm).
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        op = data.get("operation") or ""
+        if data.get("error"):
+            command = data.get("command") or ""
+            try:
+                tokens = shlex.split(command)
+            except ValueError:
+                tokens = command.split()
+            if not tokens:
+                return None
+            return {"token": _s5cmd_token(command), "key": _s5cmd_key(tokens[0], tokens[1:]),
+                    "ok": False, "error": str(data["error"]), "size": 0}
+        if not op:
+            return None
+        positional = [data.get("source") or ""]
+        if data.get("destination"):
+            positional.append(data["destination"])
+        size = (data.get("object") or {}).get("size") or 0
+        return {"token": _s5cmd_token(*positional), "key": _s5cmd_key(op, positional),
+                "ok": bool(data.get("success", True)), "error": None, "size": int(size)}
+    match = _S5CMD_PLAIN_ERROR_RE.match(line)
+    if match:
+        command = match.group("command")
+        tokens = command.split()
+        if tokens:
+            return {"token": _s5cmd_token(command), "key": _s5cmd_key(tokens[0], tokens[1:]),
+                    "ok": False, "error": match.group("error"), "size": 0}
+    return None
+
+
+class _Pending:
+    __slots__ = ("event", "result")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: subprocess.CompletedProcess | None = None
+
+
+class _S5cmdProcess:
+    """Один процесс `s5cmd run`: команды пишутся в stdin, ответы читаются потоками.
+
+    Результат сопоставляется с ожидающим воркером по метке команды; rm
+    метки не имеет и сопоставляется по URL в порядке отправки. Воркер,
+    бросивший ожидание (stop или таймаут), снимается с учёта сразу — его
+    поздний результат отбрасывается и не достаётся чужой операции.
+    """
+
+    def __init__(self, cmd: list[str], env: dict):
+        self.proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, bufsize=1, env=env,
+        )
+        _register_process(self.proc)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._by_token: dict[str, _Pending] = {}
+        self._by_key: dict[tuple, deque[_Pending]] = {}
+        self._stderr_tail: deque[str] = deque(maxlen=20)
+        self._readers = [
+            threading.Thread(target=self._read, args=(self.proc.stdout, False), daemon=True),
+            threading.Thread(target=self._read, args=(self.proc.stderr, True), daemon=True),
+        ]
+        for t in self._readers:
+            t.start()
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _read(self, stream, is_stderr: bool) -> None:
+        for line in stream:
+            parsed = parse_s5cmd_line(line)
+            if parsed is None:
+                if is_stderr and line.strip():
+                    self._stderr_tail.append(line.strip())
+                continue
+            if parsed["ok"]:
+                result = subprocess.CompletedProcess(list(parsed["key"]), 0,
+                                                     str(parsed["size"]), "")
+            else:
+                result = _failed(list(parsed["key"]), parsed["error"])
+            self._resolve(parsed["token"], parsed["key"], result)
+        if not is_stderr:
+            self._fail_all()
+
+    def _resolve(self, token: str | None, key: tuple,
+                 result: subprocess.CompletedProcess) -> None:
+        with self._lock:
+            if token is not None:
+                pending = self._by_token.pop(token, None)
+            else:
+                waiters = self._by_key.get(key)
+                pending = waiters.popleft() if waiters else None
+                if waiters is not None and not waiters:
+                    self._by_key.pop(key, None)
+        if pending is not None:
+            pending.result = result
+            pending.event.set()
+
+    def _forget(self, token: str | None, key: tuple, pending: _Pending) -> None:
+        with self._lock:
+            if token is not None:
+                self._by_token.pop(token, None)
+                return
+            waiters = self._by_key.get(key)
+            if waiters is not None:
+                try:
+                    waiters.remove(pending)
+                except ValueError:
+                    pass
+                if not waiters:
+                    self._by_key.pop(key, None)
+
+    def _fail_all(self) -> None:
+        try:
+            code = self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            code = None
+        _unregister_process(self.proc)
+        tail = "; ".join(self._stderr_tail) or "no output"
+        with self._lock:
+            waiters = list(self._by_token.values())
+            waiters += [p for q in self._by_key.values() for p in q]
+            self._by_token.clear()
+            self._by_key.clear()
+        for pending in waiters:
+            pending.result = _failed(["s5cmd"], f"s5cmd exited with code {code}: {tail}")
+            pending.event.set()
+
+    def submit(self, op: str, args: list[str], flags: list[str], token: str | None,
+               stop: threading.Event | None, timeout: float) -> subprocess.CompletedProcess:
+        key = _s5cmd_key(op, args)
+        line = " ".join([op, *flags, *(shlex.quote(a) for a in args)])
+        pending = _Pending()
+        with self._lock:
+            if not self.alive():
+                return _failed([line], "s5cmd process is not running")
+            if token is not None:
+                self._by_token[token] = pending
+            else:
+                self._by_key.setdefault(key, deque()).append(pending)
+        try:
+            with self._write_lock:
+                self.proc.stdin.write(line + "\n")
+                self.proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as exc:
+            self._forget(token, key, pending)
+            return _failed([line], f"s5cmd stdin closed: {exc}")
+        deadline = time.monotonic() + timeout
+        while not pending.event.wait(0.25):
+            if stop is not None and stop.is_set():
+                self._forget(token, key, pending)
+                return _failed([line], "interrupted by user")
+            if time.monotonic() >= deadline:
+                self._forget(token, key, pending)
+                return _failed([line], f"s5cmd: operation timeout after {timeout:.0f}s")
+        return pending.result
+
+    def close(self, timeout: float = 30.0) -> None:
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        _unregister_process(self.proc)
+
+    def kill(self) -> None:
+        if self.alive():
+            self.proc.kill()
+        _unregister_process(self.proc)
+
+
+class S5cmdRunner(Runner):
+    """s5cmd: один долгоживущий `s5cmd run` на endpoint, команды идут через stdin.
+
+    Операции сериализуются в строки командного файла; s5cmd исполняет их
+    своим пулом воркеров (--numworkers = threads), а результат каждой
+    приходит JSON-строкой (--json). Тысячи операций проходят через один
+    процесс — fork/exec на операцию больше не ограничивает RPS.
+
+    Каждая cp получает метку — уникальное имя служебного файла: download
+    пишет в scratch/s3flood-op-<hex>, upload читает через симлинк с таким
+    именем. По метке результат находит свою операцию, даже если s5cmd
+    нормализует пути в выводе.
+    """
+
+    name = "s5cmd"
+    binary = ["s5cmd"]
+    op_timeout = 600.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._procs: dict[str, _S5cmdProcess] = {}
+        self._scratch: Path | None = None
+        self._env = _client_env(self.access_key, self.secret_key, self.aws_profile)
+
+    def _process(self, endpoint: str) -> _S5cmdProcess:
+        with self._lock:
+            proc = self._procs.get(endpoint)
+            if proc is None or not proc.alive():
+                cmd = [*self.binary, "--json", "--endpoint-url", endpoint,
+                       "--numworkers", str(self.threads), "run"]
+                proc = _S5cmdProcess(cmd, self._env)
+                self._procs[endpoint] = proc
+            return proc
+
+    def _cp_flags(self) -> list[str]:
+        # s5cmd всегда грузит multipart'ом и порога не имеет: multipart_threshold
+        # не применяется; --part-size задаётся в MiB, минимум S3 — 5 MiB.
+        flags = []
+        if self.multipart_chunksize:
+            flags += ["--part-size", str(max(self.multipart_chunksize // (1024 * 1024), 5))]
+        if self.max_concurrent_requests:
+            flags += ["--concurrency", str(self.max_concurrent_requests)]
+        return flags
+
+    def _scratch_path(self) -> tuple[str, Path]:
+        with self._lock:
+            if self._scratch is None:
+                self._scratch = _scratch_dir("s3flood-s5cmd-")
+            token = uuid.uuid4().hex
+            return token, self._scratch / f"s3flood-op-{token}"
+
+    def _submit(self, endpoint, op, args, flags, token, stop):
+        try:
+            proc = self._process(endpoint)
+        except OSError as exc:
+            return _failed(["s5cmd"], f"failed to start s5cmd: {exc}")
+        return proc.submit(op, args, flags, token, stop, self.op_timeout)
+
+    def upload(self, local, bucket, key, endpoint, stop=None):
+        token, link = self._scratch_path()
+        try:
+            link.symlink_to(Path(local).resolve())
+        except OSError as exc:
+            return _failed(["s5cmd"], f"failed to prepare upload: {exc}")
+        try:
+            return self._submit(endpoint, "cp", [str(link), _s3_url(bucket, key)],
+                                self._cp_flags(), token, stop)
+        finally:
+            try:
+                link.unlink()
+            except OSError:
+                pass
+
+    def download(self, bucket, key, endpoint, stop=None):
+        token, target = self._scratch_path()
+        try:
+            return self._submit(endpoint, "cp", [_s3_url(bucket, key), str(target)],
+                                self._cp_flags(), token, stop)
+        finally:
+            try:
+                target.unlink()
+            except OSError:
+                pass
+
+    def delete(self, bucket, key, endpoint, stop=None):
+        return self._submit(endpoint, "rm", [_s3_url(bucket, key)], [], None, stop)
+
+    def list_objects(self, bucket, endpoint):
+        url = _s3_url(bucket) + "/*"
+        cmd = [*self.binary, "--json", "--endpoint-url", endpoint, "ls", url]
+        try:
+            res = subprocess.run(cmd, capture_output=True, text=True, env=self._env,
+                                 timeout=self.op_timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if res.returncode != 0:
+            return None
+        base = _s3_url(bucket) + "/"
+        objects = []
+        for line in res.stdout.splitlines():
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if data.get("type") == "directory":
+                continue
+            key = data.get("key") or ""
+            if key.startswith(base):
+                key = key[len(base):]
+            objects.append({"key": key, "size": int(data.get("size") or 0)})
+        return objects
+
+    def abort(self) -> None:
+        with self._lock:
+            procs = list(self._procs.values())
+        for proc in procs:
+            proc.kill()
+
+    def close(self) -> None:
+        with self._lock:
+            procs = list(self._procs.values())
+            self._procs.clear()
+            scratch, self._scratch = self._scratch, None
+        for proc in procs:
+            proc.close()
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rclone_fs(endpoint: str, bucket: str) -> str:
+    """On-the-fly remote rclone: `:s3,endpoint="…":bucket/prefix`."""
+    path = bucket.replace("s3://", "", 1).strip("/")
+    quoted = endpoint.replace('"', '""')
+    return f':s3,endpoint="{quoted}":{path}'
+
+
+class RcloneRunner(Runner):
+    """rclone: один долгоживущий `rclone rcd`, операции — вызовы rc API по HTTP.
+
+    Пакетного режима через stdin у rclone нет, но rc-сервер держит пул
+    соединений к S3 и исполняет вызовы параллельно — fork/exec на операцию
+    не нужен. Креды и параметры multipart передаются процессу через
+    RCLONE_S3_* переменные, endpoint — в on-the-fly строке remote.
+    """
+
+    name = "rclone"
+    binary = ["rclone"]
+    startup_timeout = 15.0
+    op_timeout = 600.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._proc: subprocess.Popen | None = None
+        self._port = 0
+        self._local = threading.local()
+        self._inflight: set[http.client.HTTPConnection] = set()
+        self._scratch: Path | None = None
+
+    def _env(self) -> dict:
+        env = _client_env(self.access_key, self.secret_key, self.aws_profile)
+        env["RCLONE_S3_PROVIDER"] = "Other"
+        env["RCLONE_S3_NO_CHECK_BUCKET"] = "true"
+        if self.access_key and self.secret_key:
+            env["RCLONE_S3_ACCESS_KEY_ID"] = self.access_key
+            env["RCLONE_S3_SECRET_ACCESS_KEY"] = self.secret_key
+        else:
+            env["RCLONE_S3_ENV_AUTH"] = "true"
+        if self.multipart_threshold:
+            env["RCLONE_S3_UPLOAD_CUTOFF"] = f"{self.multipart_threshold}B"
+        if self.multipart_chunksize:
+            env["RCLONE_S3_CHUNK_SIZE"] = f"{self.multipart_chunksize}B"
+        if self.max_concurrent_requests:
+            env["RCLONE_S3_UPLOAD_CONCURRENCY"] = str(self.max_concurrent_requests)
+        return env
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                return
+            self._port = _free_port()
+            cmd = [*self.binary, "rcd", "--rc-no-auth", f"--rc-addr=127.0.0.1:{self._port}"]
+            # Логи rcd не читаем: PIPE без читателя переполнился бы и остановил процесс
+            self._proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL,
+                                          stderr=subprocess.DEVNULL, env=self._env())
+            _register_process(self._proc)
+            self._local = threading.local()
+            deadline = time.time() + self.startup_timeout
+            while time.time() < deadline:
+                if self._proc.poll() is not None:
+                    raise OSError(f"rclone rcd exited with code {self._proc.returncode}")
+                try:
+                    self._call_raw("rc/noop", {})
+                    return
+                except OSError:
+                    time.sleep(0.1)
+            raise OSError("rclone rcd did not start in time")
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection("127.0.0.1", self._port, timeout=self.op_timeout)
+            self._local.conn = conn
+        return conn
+
+    def _call_raw(self, method: str, params: dict) -> tuple[int, dict]:
+        conn = self._connection()
+        body = json.dumps(params).encode()
+        self._inflight.add(conn)
+        try:
+            conn.request("POST", f"/{method}", body=body,
+                         headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            data = resp.read()
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            self._local.conn = None
+            if isinstance(exc, socket.timeout):
+                raise OSError(f"Read timeout after {self.op_timeout:.0f}s") from exc
+            raise OSError(str(exc)) from exc
+        finally:
+            self._inflight.discard(conn)
+        try:
+            payload = json.loads(data) if data else {}
+        except json.JSONDecodeError:
+            payload = {"error": data.decode(errors="replace")[-300:]}
+        return resp.status, payload
+
+    def _call(self, method: str, params: dict,
+              stop: threading.Event | None = None) -> subprocess.CompletedProcess:
+        args = ["rclone", "rc", method]
+        if stop is not None and stop.is_set():
+            return _failed(args, "interrupted by user")
+        try:
+            self._ensure_started()
+            status, payload = self._call_raw(method, params)
+        except OSError as exc:
+            if stop is not None and stop.is_set():
+                return _failed(args, "interrupted by user")
+            return _failed(args, f"rclone: {exc}")
+        if status != 200:
+            return _failed(args, str(payload.get("error") or f"HTTP {status}"))
+        return subprocess.CompletedProcess(args, 0, json.dumps(payload), "")
+
+    def _scratch_dir(self) -> Path:
+        with self._lock:
+            if self._scratch is None:
+                self._scratch = _scratch_dir("s3flood-rclone-")
+            return self._scratch
+
+    def upload(self, local, bucket, key, endpoint, stop=None):
+        local = Path(local).resolve()
+        return self._call("operations/copyfile", {
+            "srcFs": str(local.parent), "srcRemote": local.name,
+            "dstFs": _rclone_fs(endpoint, bucket), "dstRemote": key,
+        }, stop)
+
+    def download(self, bucket, key, endpoint, stop=None):
+        scratch = self._scratch_dir()
+        name = uuid.uuid4().hex
+        try:
+            return self._call("operations/copyfile", {
+                "srcFs": _rclone_fs(endpoint, bucket), "srcRemote": key,
+                "dstFs": str(scratch), "dstRemote": name,
+            }, stop)
+        finally:
+            try:
+                (scratch / name).unlink()
+            except OSError:
+                pass
+
+    def delete(self, bucket, key, endpoint, stop=None):
+        return self._call("operations/deletefile", {
+            "fs": _rclone_fs(endpoint, bucket), "remote": key,
+        }, stop)
+
+    def list_objects(self, bucket, endpoint):
+        res = self._call("operations/list", {
+            "fs": _rclone_fs(endpoint, bucket), "remote": "",
+            "opt": {"recurse": True, "filesOnly": True},
+        })
+        if res.returncode != 0:
+            return None
+        items = json.loads(res.stdout).get("list") or []
+        return [{"key": item.get("Path") or "", "size": int(item.get("Size") or 0)}
+                for item in items]
+
+    def abort(self) -> None:
+        """Останавливает rcd и рвёт висящие rc-вызовы — воркеры сразу получают ошибку."""
+        with self._lock:
+            proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+        for conn in list(self._inflight):
+            sock = conn.sock
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def close(self) -> None:
+        with self._lock:
+            proc, self._proc = self._proc, None
+            scratch, self._scratch = self._scratch, None
+        if proc is not None:
+            if proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+            _unregister_process(proc)
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+RUNNERS: dict[str, type[Runner]] = {
+    "awscli": AwsCliRunner,
+    "native": NativeRunner,
+    "s5cmd": S5cmdRunner,
+    "rclone": RcloneRunner,
+}
+
+
+def make_runner(args, client: str | None = None) -> Runner:
+    """Создаёт движок по полю client или явному имени (неизвестное — awscli с предупреждением)."""
+    client = client or getattr(args, "client", None) or "awscli"
+    runner_cls = RUNNERS.get(client)
+    if runner_cls is None:
+        print(f"Клиент {client} не поддерживается, используется awscli")
+        runner_cls = AwsCliRunner
+    return runner_cls(
+        access_key=getattr(args, "access_key", None),
+        secret_key=getattr(args, "secret_key", None),
+        aws_profile=getattr(args, "aws_profile", None),
+        multipart_threshold=getattr(args, "aws_cli_multipart_threshold", None),
+        multipart_chunksize=getattr(args, "aws_cli_multipart_chunksize", None),
+        max_concurrent_requests=getattr(args, "aws_cli_max_concurrent_requests", None),
+        threads=getattr(args, "threads", None) or 8,
+    )
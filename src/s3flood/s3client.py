@@ -0,0 +1,1012 @@
+"""Нативный S3-клиент: HTTP/1.1 + SigV4 без внешних зависимостей.
+
+Каждая операция через aws CLI — отдельный процесс с холодным стартом Python
+(сотни мс), и на мелких объектах прогон измеряет CPython, а не бэкенд.
+Здесь запросы выполняются внутри процесса s3flood: подпись SigV4, пул
+keep-alive соединений на каждый endpoint, потоковая передача тела без
+буферизации объекта в памяти.
+
+native_upload/native_download повторяют сигнатуры aws_cp_upload/aws_cp_download
+из runner.py и возвращают subprocess.CompletedProcess, поэтому
+retry_with_backoff и executor работают с ними без изменений. В атрибуте
+phases результата — разбивка латентности операции по фазам (RequestPhases).
+"""
+from __future__ import annotations
+
+import configparser
+import functools
+import hashlib
+import hmac
+import http.client
+import os
+import random
+import socket
+import ssl
+import struct
+import subprocess
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import quote, urlsplit
+
+if TYPE_CHECKING:
+    from .throttle import Limiter
+
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+DEFAULT_REGION = "us-east-1"
+# Значения по умолчанию совпадают с aws CLI — результаты клиентов сопоставимы
+DEFAULT_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+DEFAULT_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+DEFAULT_MAX_CONCURRENT_REQUESTS = 10
+MAX_PARTS = 10000
+IO_CHUNK = 1024 * 1024
+# Общий несжимаемый блок для data_source: synthetic (кратен IO_CHUNK)
+SYNTHETIC_BLOCK = 8 * IO_CHUNK
+DEFAULT_TIMEOUT = 60.0
+POOL_MAX_IDLE = 256
+
+# Ошибки, после которых запрос на переиспользованном соединении повторяется
+# на свежем: сервер мог закрыть простаивающее keep-alive соединение
+_STALE_CONN_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+    ConnectionAbortedError,
+)
+
+
+class S3Error(Exception):
+    """Ошибка S3 из XML-ответа; текст в формате aws CLI для classify_error."""
+
+    def __init__(self, code: str, message: str, status: int, operation: str = "request"):
+        self.code = code
+        self.message = message
+        self.status = status
+        self.operation = operation
+        super().__init__(
+            f"An error occurred ({code}) when calling the {operation} operation: {message}"
+        )
+
+
+class RequestAborted(Exception):
+    """Операция прервана по stop (Ctrl+C)."""
+
+
+@dataclass(frozen=True)
+class Credentials:
+    access_key: str
+    secret_key: str
+    session_token: str | None = None
+
+
+class RequestPhases:
+    """Длительности фаз операции, мс: dns, connect, tls, send, ttfb, transfer.
+
+    send — отправка заголовков и тела, ttfb — от конца отправки до заголовков
+    ответа (время сервера), transfer — чтение тела ответа. dns/connect/tls
+    есть только у запросов на новом соединении — у keep-alive соединения из
+    пула их нет. У операции из нескольких запросов (multipart) фазы
+    суммируются по запросам; части пишут сюда из разных потоков.
+    """
+
+    def __init__(self):
+        self.ms: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, timings: dict[str, float]) -> None:
+        with self._lock:
+            for phase, value in timings.items():
+                self.ms[phase] = self.ms.get(phase, 0.0) + value
+
+    def as_dict(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self.ms)
+
+
+@dataclass
+class S3Response:
+    status: int
+    headers: dict[str, str]
+    data: bytes = b""
+    nbytes: int = 0
+
+
+def _aws_file(env_name: str, default: str) -> Path:
+    return Path(os.environ.get(env_name) or (Path.home() / ".aws" / default)).expanduser()
+
+
+def _read_ini_section(path: Path, section: str) -> dict[str, str]:
+    parser = configparser.RawConfigParser()
+    try:
+        parser.read(path, encoding="utf-8")
+    except (OSError, configparser.Error):
+        return {}
+    if not parser.has_section(section):
+        return {}
+    return dict(parser.items(section))
+
+
+def _profile_settings(profile: str) -> dict[str, str]:
+    """Настройки профиля из ~/.aws/credentials и ~/.aws/config (credentials важнее)."""
+    config_section = "default" if profile == "default" else f"profile {profile}"
+    merged = _read_ini_section(_aws_file("AWS_CONFIG_FILE", "config"), config_section)
+    merged.update(_read_ini_section(_aws_file("AWS_SHARED_CREDENTIALS_FILE", "credentials"), profile))
+    return merged
+
+
+def resolve_credentials(
+    access_key: str | None,
+    secret_key: str | None,
+    aws_profile: str | None,
+) -> Credentials | None:
+    """Креды: явные ключи → профиль AWS → переменные окружения → профиль default.
+
+    None — анонимный доступ (запросы уходят без подписи).
+    """
+    if access_key and secret_key:
+        return Credentials(access_key, secret_key)
+    if aws_profile:
+        prof = _profile_settings(aws_profile)
+        if prof.get("aws_access_key_id") and prof.get("aws_secret_access_key"):
+            return Credentials(
+                prof["aws_access_key_id"], prof["aws_secret_access_key"],
+                prof.get("aws_session_token"),
+            )
+    env_ak = os.environ.get("AWS_ACCESS_KEY_ID")
+    env_sk = os.environ.get("AWS_SECRET_ACCESS_KEY")
+    if env_ak and env_sk:
+        return Credentials(env_ak, env_sk, os.environ.get("AWS_SESSION_TOKEN"))
+    prof = _profile_settings(os.environ.get("AWS_PROFILE") or "default")
+    if prof.get("aws_access_key_id") and prof.get("aws_secret_access_key"):
+        return Credentials(
+            prof["aws_access_key_id"], prof["aws_secret_access_key"],
+            prof.get("aws_session_token"),
+        )
+    return None
+
+
+def resolve_region(aws_profile: str | None) -> str:
+    region = os.environ.get("AWS_DEFAULT_REGION") or os.environ.get("AWS_REGION")
+    if region:
+        return region
+    if aws_profile:
+        region = _profile_settings(aws_profile).get("region")
+    return region or DEFAULT_REGION
+
+
+def _uri_encode(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def canonical_query(query: list[tuple[str, str]] | None) -> str:
+    if not query:
+        return ""
+    pairs = sorted((_uri_encode(k), _uri_encode(v)) for k, v in query)
+    return "&".join(f"{k}={v}" for k, v in pairs)
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def signing_key(secret_key: str, date: str, region: str, service: str = "s3") -> bytes:
+    k_date = _hmac(("AWS4" + secret_key).encode("utf-8"), date)
+    k_region = _hmac(k_date, region)
+    k_service = _hmac(k_region, service)
+    return _hmac(k_service, "aws4_request")
+
+
+def sign_v4(
+    method: str,
+    path: str,
+    query: list[tuple[str, str]] | None,
+    headers: dict[str, str],
+    payload_hash: str,
+    creds: Credentials,
+    region: str,
+    amz_date: str,
+    key: bytes | None = None,
+) -> str:
+    """Возвращает значение заголовка Authorization (AWS Signature Version 4).
+
+    headers должны уже содержать host, x-amz-date и x-amz-content-sha256;
+    path — URI-кодированный путь запроса (S3 не кодирует его повторно).
+    """
+    date = amz_date[:8]
+    canon = {k.lower(): " ".join(str(v).strip().split()) for k, v in headers.items()}
+    names = sorted(canon)
+    canonical_headers = "".join(f"{n}:{canon[n]}\n" for n in names)
+    signed_headers = ";".join(names)
+    canonical_request = "\n".join([
+        method, path, canonical_query(query), canonical_headers, signed_headers, payload_hash,
+    ])
+    scope = f"{date}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope,
+        hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    if key is None:
+        key = signing_key(creds.secret_key, date, region)
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    return (
+        f"AWS4-HMAC-SHA256 Credential={creds.access_key}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+
+
+def split_bucket(bucket: str) -> tuple[str, str]:
+    """'s3://name/some/prefix' → ('name', 'some/prefix/')."""
+    text = bucket.replace("s3://", "", 1).strip("/")
+    name, _, prefix = text.partition("/")
+    return name, (prefix.rstrip("/") + "/") if prefix else ""
+
+
+def _error_from_response(resp: S3Response, operation: str) -> S3Error:
+    code = f"HTTP{resp.status}"
+    message = http.client.responses.get(resp.status, "")
+    if resp.data:
+        try:
+            root = ET.fromstring(resp.data)
+            code = root.findtext("Code") or code
+            message = root.findtext("Message") or message
+        except ET.ParseError:
+            pass
+    return S3Error(code, message, resp.status, operation)
+
+
+def _strip_ns(root: ET.Element) -> ET.Element:
+    for el in root.iter():
+        if "}" in el.tag:
+            el.tag = el.tag.split("}", 1)[1]
+    return root
+
+
+def _parse_upload_id(resp: S3Response) -> str:
+    root = _strip_ns(ET.fromstring(resp.data))
+    upload_id = root.findtext("UploadId")
+    if not upload_id:
+        raise S3Error("InvalidResponse", "no UploadId in response", resp.status,
+                      "CreateMultipartUpload")
+    return upload_id
+
+
+def _part_ranges(size: int, chunksize: int | None) -> list[tuple[int, int]]:
+    """(offset, length) частей multipart: не больше MAX_PARTS, как у aws CLI."""
+    chunk = max(chunksize or DEFAULT_MULTIPART_CHUNKSIZE, -(-size // MAX_PARTS))
+    return [(off, min(chunk, size - off)) for off in range(0, size, chunk)]
+
+
+def _complete_body(etags: list[str]) -> bytes:
+    parts = "".join(
+        f"<Part><PartNumber>{i}</PartNumber><ETag>{etag}</ETag></Part>"
+        for i, etag in enumerate(etags, start=1)
+    )
+    return f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode()
+
+
+def _check_complete(resp: S3Response) -> None:
+    # S3 может вернуть 200 с <Error> в теле, если сборка упала в процессе
+    if b"<Error>" in resp.data:
+        raise _error_from_response(
+            S3Response(500, resp.headers, resp.data), "CompleteMultipartUpload"
+        )
+
+
+@dataclass
+class ListPage:
+    """Страница ListObjectsV2: объекты {key, size}, префиксы и курсор продолжения."""
+    objects: list[dict]
+    prefixes: list[str]
+    next_token: str | None
+    is_truncated: bool
+
+
+def parse_list_page(data: bytes) -> ListPage:
+    root = _strip_ns(ET.fromstring(data))
+    objects = [
+        {"key": el.findtext("Key") or "", "size": int(el.findtext("Size") or 0)}
+        for el in root.iter("Contents")
+    ]
+    prefixes = [el.findtext("Prefix") or "" for el in root.iter("CommonPrefixes")]
+    truncated = (root.findtext("IsTruncated") or "").lower() == "true"
+    token = root.findtext("NextContinuationToken") or None
+    return ListPage(objects, prefixes, token if truncated else None, truncated)
+
+
+def _timed_create_connection(timings: dict, address, timeout, source_address=None) -> socket.socket:
+    """socket.create_connection с раздельным замером DNS и TCP connect (мс в timings)."""
+    host, port = address
+    started = time.perf_counter()
+    infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    resolved = time.perf_counter()
+    timings["dns"] = (resolved - started) * 1000
+    error: OSError | None = None
+    for family, type_, proto, _name, sockaddr in infos:
+        sock = socket.socket(family, type_, proto)
+        try:
+            sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+        except OSError as exc:
+            sock.close()
+            error = exc
+            continue
+        timings["connect"] = (time.perf_counter() - resolved) * 1000
+        return sock
+    raise error or OSError(f"getaddrinfo returned no addresses for {host}")
+
+
+class ConnectionPool:
+    """Пул keep-alive соединений к одному endpoint (LIFO, потокобезопасный).
+
+    Занятые соединения тоже учитываются — abort() закрывает их сокеты,
+    чтобы Ctrl+C не ждал таймаута зависшего запроса.
+    """
+
+    def __init__(self, scheme: str, host: str, port: int | None, timeout: float,
+                 max_idle: int = POOL_MAX_IDLE):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: list[http.client.HTTPConnection] = []
+        self._busy: set[http.client.HTTPConnection] = set()
+        self._lock = threading.Lock()
+        self._ssl_context: ssl.SSLContext | None = None
+        if scheme == "https":
+            self._ssl_context = ssl.create_default_context(
+                cafile=os.environ.get("AWS_CA_BUNDLE") or None
+            )
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            conn = http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout, context=self._ssl_context
+            )
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        # Без auto_open: закрытое abort() соединение не переподключится молча
+        # посреди send(), а поднимет ошибку в потоке, который его использует.
+        conn.auto_open = 0
+        # Фазы установки соединения: первый запрос на нём добавит их к своим
+        timings: dict[str, float] = {}
+        conn._create_connection = functools.partial(_timed_create_connection, timings)
+        started = time.perf_counter()
+        conn.connect()
+        if self.scheme == "https":
+            elapsed = (time.perf_counter() - started) * 1000
+            timings["tls"] = max(elapsed - timings["dns"] - timings["connect"], 0.0)
+        conn.setup_ms = timings
+        return conn
+
+    def acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        """Возвращает (соединение, reused) — reused=True для взятого из пула."""
+        with self._lock:
+            if self._idle:
+                conn = self._idle.pop()
+                self._busy.add(conn)
+                return conn, True
+        conn = self._new_connection()
+        with self._lock:
+            self._busy.add(conn)
+        return conn, False
+
+    def release(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._busy.discard(conn)
+            if len(self._idle) < self.max_idle and conn.sock is not None:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def discard(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._busy.discard(conn)
+        conn.close()
+
+    def abort(self) -> None:
+        """Рвёт все соединения, включая занятые запросами."""
+        with self._lock:
+            conns = list(self._busy) + self._idle
+            self._idle.clear()
+        for conn in conns:
+            conn.aborted = True
+            sock = conn.sock
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class _FileBody:
+    """Тело запроса из диапазона файла; итерируется заново при повторе запроса."""
+
+    def __init__(self, path: Path, offset: int, length: int):
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+    def __iter__(self):
+        remaining = self.length
+        buf = bytearray(min(IO_CHUNK, max(remaining, 1)))
+        view = memoryview(buf)
+        with open(self.path, "rb", buffering=0) as fh:
+            fh.seek(self.offset)
+            while remaining > 0:
+                n = fh.readinto(view[:min(len(buf), remaining)])
+                if not n:
+                    raise OSError(f"{self.path}: file is shorter than expected")
+                remaining -= n
+                yield view[:n]
+
+
+@dataclass(frozen=True)
+class SyntheticObject:
+    """Объект без файла (data_source: synthetic): size байт несжимаемых данных.
+
+    Стоит в Job.path вместо пути; name — имя объекта, как у файла датасета.
+    """
+
+    name: str
+    size: int
+
+
+_synthetic_block: bytes | None = None
+_synthetic_lock = threading.Lock()
+
+
+def synthetic_block() -> bytes:
+    """Случайный блок SYNTHETIC_BLOCK байт; генерируется один раз на процесс."""
+    global _synthetic_block
+    if _synthetic_block is None:
+        with _synthetic_lock:
+            if _synthetic_block is None:
+                _synthetic_block = os.urandom(SYNTHETIC_BLOCK)
+    return _synthetic_block
+
+
+class _SyntheticBody:
+    """Тело из общего блока в памяти для диапазона синтетического объекта.
+
+    Блок IO_CHUNK номер k объекта — срез общего блока, сдвинутый на nonce
+    загрузки и k, с меткой (nonce, k) в первых 16 байтах: содержимое не
+    повторяется ни внутри объекта, ни между загрузками, а диапазоны частей
+    multipart совпадают с тем же объектом целиком. Итерируется заново при повторе.
+    """
+
+    _STAMP = struct.Struct("<QQ")
+
+    def __init__(self, nonce: int, offset: int, length: int):
+        self.nonce = nonce
+        self.offset = offset
+        self.length = length
+
+    def __iter__(self):
+        block = synthetic_block()
+        base = self.nonce % SYNTHETIC_BLOCK
+        buf = bytearray(min(IO_CHUNK, max(self.length, 1)))
+        view = memoryview(buf)
+        pos = self.offset
+        end = self.offset + self.length
+        while pos < end:
+            index, start = divmod(pos, IO_CHUNK)
+            n = min(IO_CHUNK - start, end - pos, len(buf))
+            src = (base + index * IO_CHUNK + start) % SYNTHETIC_BLOCK
+            first = min(n, SYNTHETIC_BLOCK - src)
+            view[:first] = block[src:src + first]
+            if n > first:
+                view[first:n] = block[:n - first]
+            if start < self._STAMP.size:
+                stamp = self._STAMP.pack(self.nonce, index)
+                m = min(self._STAMP.size, start + n) - start
+                view[:m] = stamp[start:start + m]
+            pos += n
+            yield view[:n]
+
+
+def upload_source(path: Path | SyntheticObject):
+    """Размер загружаемого объекта и фабрика тел его диапазонов (offset, length)."""
+    if isinstance(path, SyntheticObject):
+        nonce = random.getrandbits(64)
+        return path.size, lambda offset, length: _SyntheticBody(nonce, offset, length)
+    return os.path.getsize(path), lambda offset, length: _FileBody(path, offset, length)
+
+
+@dataclass
+class S3Client:
+    """Клиент одного endpoint: подпись запросов и пул соединений."""
+
+    endpoint: str
+    credentials: Credentials | None
+    region: str = DEFAULT_REGION
+    timeout: float = DEFAULT_TIMEOUT
+    # Лимит полосы прогона: байты тела проходят через него блоками по IO_CHUNK
+    limiter: Limiter | None = field(default=None, repr=False, compare=False)
+    _pool: ConnectionPool = field(init=False, repr=False)
+    _key_cache: tuple[str, bytes] | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        parts = urlsplit(self.endpoint if "://" in self.endpoint else f"http://{self.endpoint}")
+        self.scheme = parts.scheme or "http"
+        self.host_header = parts.netloc
+        self.base_path = parts.path.rstrip("/")
+        self._pool = ConnectionPool(self.scheme, parts.hostname or "", parts.port, self.timeout)
+
+    def _signing_key(self, date: str) -> bytes:
+        cached = self._key_cache
+        if cached and cached[0] == date:
+            return cached[1]
+        key = signing_key(self.credentials.secret_key, date, self.region)
+        self._key_cache = (date, key)
+        return key
+
+    def _throttle(self, nbytes: int, stop: threading.Event | None) -> None:
+        limiter = self.limiter
+        if limiter is not None and not limiter.acquire_bytes(self.endpoint, nbytes, stop):
+            raise RequestAborted("interrupted by user")
+
+    def _path(self, bucket: str, key: str = "") -> str:
+        path = f"{self.base_path}/{bucket}"
+        if key:
+            path += "/" + _uri_encode(key, safe="/-_.~")
+        return path
+
+    def _prepare_headers(self, method: str, path: str, query, headers: dict | None,
+                         payload_hash: str) -> dict[str, str]:
+        out = {"host": self.host_header}
+        if headers:
+            out.update({k.lower(): str(v) for k, v in headers.items()})
+        if self.credentials is None:
+            return out
+        amz_date = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        out["x-amz-date"] = amz_date
+        out["x-amz-content-sha256"] = payload_hash
+        if self.credentials.session_token:
+            out["x-amz-security-token"] = self.credentials.session_token
+        out["authorization"] = sign_v4(
+            method, path, query, out, payload_hash, self.credentials, self.region, amz_date,
+            key=self._signing_key(amz_date[:8]),
+        )
+        return out
+
+    def _build_request(self, method: str, bucket: str, key: str, query, headers: dict | None,
+                       body) -> tuple[str, dict[str, str]]:
+        """Цель запроса (путь?query) и подписанные заголовки — общее для sync и asyncio."""
+        path = self._path(bucket, key)
+        if isinstance(body, (bytes, bytearray)):
+            payload_hash = hashlib.sha256(body).hexdigest()
+            length = len(body)
+        elif body is None:
+            payload_hash = EMPTY_SHA256
+            length = 0
+        else:
+            payload_hash = UNSIGNED_PAYLOAD
+            length = body.length
+        hdrs = self._prepare_headers(method, path, query, headers, payload_hash)
+        if length or method in ("PUT", "POST"):
+            hdrs["content-length"] = str(length)
+        target = path
+        if query:
+            target += "?" + canonical_query(query)
+        return target, hdrs
+
+    def request(
+        self,
+        method: str,
+        bucket: str,
+        key: str = "",
+        query: list[tuple[str, str]] | None = None,
+        headers: dict | None = None,
+        body: bytes | _FileBody | None = None,
+        discard_body: bool = False,
+        stop: threading.Event | None = None,
+        operation: str = "request",
+        phases: RequestPhases | None = None,
+    ) -> S3Response:
+        """Выполняет запрос; при discard_body тело ответа читается и отбрасывается.
+
+        Ответ со статусом >= 300 поднимает S3Error, сетевые ошибки — OSError.
+        Длительности фаз добавляются в phases.
+        """
+        target, hdrs = self._build_request(method, bucket, key, query, headers, body)
+        for attempt in (0, 1):
+            conn, reused = self._pool.acquire()
+            timings = {} if reused else dict(getattr(conn, "setup_ms", {}))
+            try:
+                resp = self._exchange(conn, method, target, hdrs, body, discard_body, stop,
+                                      timings)
+            except BaseException as exc:
+                self._pool.discard(conn)
+                if getattr(conn, "aborted", False):
+                    raise RequestAborted("interrupted by user") from exc
+                if isinstance(exc, _STALE_CONN_ERRORS) and reused and attempt == 0:
+                    continue
+                raise
+            break
+        if phases is not None:
+            phases.add(timings)
+        if resp.status >= 300:
+            raise _error_from_response(resp, operation)
+        return resp
+
+    def _exchange(self, conn, method, target, headers, body, discard_body, stop,
+                  timings: dict) -> S3Response:
+        started = time.perf_counter()
+        conn.putrequest(method, target, skip_host=True, skip_accept_encoding=True)
+        for name, value in headers.items():
+            conn.putheader(name, value)
+        conn.endheaders()
+        if isinstance(body, (bytes, bytearray)):
+            if body:
+                self._throttle(len(body), stop)
+                conn.send(body)
+        elif body is not None:
+            for chunk in body:
+                if stop is not None and stop.is_set():
+                    raise RequestAborted("interrupted by user")
+                self._throttle(len(chunk), stop)
+                conn.send(chunk)
+        sent = time.perf_counter()
+        resp = conn.getresponse()
+        first_byte = time.perf_counter()
+        resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+        data = b""
+        nbytes = 0
+        if discard_body and resp.status < 300:
+            buf = bytearray(IO_CHUNK)
+            while True:
+                if stop is not None and stop.is_set():
+                    raise RequestAborted("interrupted by user")
+                n = resp.readinto(buf)
+                if not n:
+                    break
+                nbytes += n
+                self._throttle(n, stop)
+            # readinto на обрыве соединения просто возвращает 0 — недочитанное
+            # тело иначе сошло бы за успешное чтение
+            expected = resp_headers.get("content-length")
+            if expected is not None and nbytes != int(expected):
+                conn.close()
+                raise http.client.IncompleteRead(b"", int(expected) - nbytes)
+        else:
+            data = resp.read()
+            nbytes = len(data)
+        timings["send"] = (sent - started) * 1000
+        timings["ttfb"] = (first_byte - sent) * 1000
+        timings["transfer"] = (time.perf_counter() - first_byte) * 1000
+        if resp.will_close:
+            self._pool.discard(conn)
+        else:
+            self._pool.release(conn)
+        return S3Response(resp.status, resp_headers, data, nbytes)
+
+    # --- операции ---
+
+    def put_object(self, bucket: str, key: str, body: bytes | _FileBody,
+                   stop: threading.Event | None = None,
+                   phases: RequestPhases | None = None) -> S3Response:
+        return self.request("PUT", bucket, key, body=body, stop=stop, operation="PutObject",
+                            phases=phases)
+
+    def get_object(self, bucket: str, key: str, stop: threading.Event | None = None,
+                   phases: RequestPhases | None = None) -> int:
+        """Скачивает объект, не сохраняя его; возвращает число прочитанных байт."""
+        resp = self.request("GET", bucket, key, discard_body=True, stop=stop,
+                            operation="GetObject", phases=phases)
+        return resp.nbytes
+
+    def create_multipart_upload(self, bucket: str, key: str,
+                                phases: RequestPhases | None = None) -> str:
+        resp = self.request("POST", bucket, key, query=[("uploads", "")],
+                            operation="CreateMultipartUpload", phases=phases)
+        return _parse_upload_id(resp)
+
+    def upload_part(self, bucket: str, key: str, upload_id: str, part_number: int,
+                    body: _FileBody, stop: threading.Event | None = None,
+                    phases: RequestPhases | None = None) -> str:
+        resp = self.request(
+            "PUT", bucket, key,
+            query=[("partNumber", str(part_number)), ("uploadId", upload_id)],
+            body=body, stop=stop, operation="UploadPart", phases=phases,
+        )
+        return resp.headers.get("etag", "")
+
+    def complete_multipart_upload(self, bucket: str, key: str, upload_id: str,
+                                  etags: list[str], phases: RequestPhases | None = None) -> None:
+        resp = self.request("POST", bucket, key, query=[("uploadId", upload_id)],
+                            body=_complete_body(etags), operation="CompleteMultipartUpload",
+                            phases=phases)
+        _check_complete(resp)
+
+    def abort_multipart_upload(self, bucket: str, key: str, upload_id: str) -> None:
+        self.request("DELETE", bucket, key, query=[("uploadId", upload_id)],
+                     operation="AbortMultipartUpload")
+
+    def upload_file(
+        self,
+        path: Path | SyntheticObject,
+        bucket: str,
+        key: str,
+        multipart_threshold: int | None = None,
+        multipart_chunksize: int | None = None,
+        max_concurrent_requests: int | None = None,
+        stop: threading.Event | None = None,
+        phases: RequestPhases | None = None,
+    ) -> int:
+        """Загружает файл (multipart выше порога, как aws s3 cp); возвращает размер."""
+        size, make_body = upload_source(path)
+        threshold = multipart_threshold or DEFAULT_MULTIPART_THRESHOLD
+        if size < threshold:
+            self.put_object(bucket, key, make_body(0, size), stop=stop, phases=phases)
+            return size
+        ranges = _part_ranges(size, multipart_chunksize)
+        upload_id = self.create_multipart_upload(bucket, key, phases=phases)
+        try:
+            def send_part(item):
+                number, (offset, length) = item
+                return self.upload_part(bucket, key, upload_id, number,
+                                        make_body(offset, length), stop=stop, phases=phases)
+
+            workers = min(max_concurrent_requests or DEFAULT_MAX_CONCURRENT_REQUESTS, len(ranges))
+            if workers <= 1:
+                etags = [send_part(item) for item in enumerate(ranges, start=1)]
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    etags = list(pool.map(send_part, enumerate(ranges, start=1)))
+            self.complete_multipart_upload(bucket, key, upload_id, etags, phases=phases)
+        except BaseException:
+            try:
+                self.abort_multipart_upload(bucket, key, upload_id)
+            except (S3Error, OSError):
+                pass
+            raise
+        return size
+
+    def delete_object(self, bucket: str, key: str, stop: threading.Event | None = None) -> None:
+        self.request("DELETE", bucket, key, stop=stop, operation="DeleteObject")
+
+    def list_objects_page(
+        self,
+        bucket: str,
+        prefix: str = "",
+        continuation_token: str | None = None,
+        start_after: str | None = None,
+        delimiter: str | None = None,
+        max_keys: int = 1000,
+    ) -> ListPage:
+        """Одна страница ListObjectsV2."""
+        query = [("list-type", "2"), ("max-keys", str(max_keys))]
+        if prefix:
+            query.append(("prefix", prefix))
+        if continuation_token:
+            query.append(("continuation-token", continuation_token))
+        if start_after:
+            query.append(("start-after", start_after))
+        if delimiter:
+            query.append(("delimiter", delimiter))
+        resp = self.request("GET", bucket, query=query, operation="ListObjectsV2")
+        return parse_list_page(resp.data)
+
+    def iter_pages(self, bucket: str, prefix: str = "", max_keys: int = 1000):
+        """Страницы листинга ([{key, size}, ...]) по мере получения, в порядке ключей."""
+        token = None
+        while True:
+            page = self.list_objects_page(bucket, prefix, continuation_token=token, max_keys=max_keys)
+            yield page.objects
+            token = page.next_token
+            if not page.is_truncated or not token:
+                return
+
+    def iter_objects(self, bucket: str, prefix: str = "", max_keys: int = 1000):
+        """Объекты {key, size} постранично, в порядке ключей; в памяти — одна страница."""
+        for objects in self.iter_pages(bucket, prefix, max_keys):
+            yield from objects
+
+    def abort(self) -> None:
+        self._pool.abort()
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+_clients: dict[tuple, S3Client] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(
+    endpoint: str,
+    access_key: str | None,
+    secret_key: str | None,
+    aws_profile: str | None,
+    limiter: Limiter | None = None,
+) -> S3Client:
+    """Клиент для endpoint (кешируется — пул соединений общий для всех воркеров).
+
+    limiter — лимит полосы прогона; клиенты без него его не сбрасывают.
+    """
+    cache_key = (endpoint, access_key, secret_key, aws_profile)
+    with _clients_lock:
+        client = _clients.get(cache_key)
+        if client is None:
+            client = S3Client(
+                endpoint=endpoint,
+                credentials=resolve_credentials(access_key, secret_key, aws_profile),
+                region=resolve_region(aws_profile),
+            )
+            _clients[cache_key] = client
+        if limiter is not None:
+            client.limiter = limiter
+        return client
+
+
+def abort_native_requests() -> None:
+    """Рвёт соединения всех клиентов — аналог _terminate_all_processes для native."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    for client in clients:
+        client.abort()
+
+
+def close_native_clients() -> None:
+    """Закрывает пулы всех закешированных клиентов (конец прогона)."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+def _describe_error(exc: BaseException, url: str) -> str:
+    """Текст ошибки в духе aws CLI, чтобы classify_error давал те же типы."""
+    if isinstance(exc, S3Error):
+        return str(exc)
+    if isinstance(exc, RequestAborted):
+        return "interrupted by user"
+    if isinstance(exc, (socket.timeout, TimeoutError)):
+        return f"Read timeout on endpoint URL: \"{url}\""
+    if isinstance(exc, (ConnectionRefusedError, socket.gaierror)):
+        return f"Could not connect to the endpoint URL: \"{url}\": {exc}"
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _result(args: list[str], error: str | None, stdout: str = "",
+            phases: RequestPhases | None = None) -> subprocess.CompletedProcess:
+    if error is None:
+        res = subprocess.CompletedProcess(args, 0, stdout, "")
+    else:
+        res = subprocess.CompletedProcess(args, 1, stdout, error)
+    # Разбивка латентности по фазам — для Metrics.record (у aws CLI её нет)
+    res.phases = phases.as_dict() if phases is not None else None
+    return res
+
+
+def native_upload(
+    local: Path | SyntheticObject,
+    bucket: str,
+    key: str,
+    endpoint: str,
+    access_key: str | None,
+    secret_key: str | None,
+    aws_profile: str | None,
+    multipart_threshold: int | None = None,
+    multipart_chunksize: int | None = None,
+    max_concurrent_requests: int | None = None,
+    stop: threading.Event | None = None,
+    limiter: Limiter | None = None,
+):
+    """Загружает файл в S3 нативным клиентом (сигнатура как у aws_cp_upload)."""
+    name, prefix = split_bucket(bucket)
+    url = f"{endpoint}/{name}/{prefix}{key}"
+    args = ["native", "PUT", url]
+    phases = RequestPhases()
+    try:
+        client = get_client(endpoint, access_key, secret_key, aws_profile, limiter)
+        client.upload_file(
+            local if isinstance(local, SyntheticObject) else Path(local), name, prefix + key,
+            multipart_threshold, multipart_chunksize, max_concurrent_requests, stop=stop,
+            phases=phases,
+        )
+    except (S3Error, RequestAborted, OSError, http.client.HTTPException) as exc:
+        return _result(args, _describe_error(exc, url), phases=phases)
+    return _result(args, None, phases=phases)
+
+
+def native_download(
+    bucket: str,
+    key: str,
+    endpoint: str,
+    access_key: str | None,
+    secret_key: str | None,
+    aws_profile: str | None,
+    multipart_threshold: int | None = None,
+    multipart_chunksize: int | None = None,
+    max_concurrent_requests: int | None = None,
+    stop: threading.Event | None = None,
+    limiter: Limiter | None = None,
+):
+    """Читает объект нативным клиентом без записи на диск (сигнатура как у aws_cp_download)."""
+    name, prefix = split_bucket(bucket)
+    url = f"{endpoint}/{name}/{prefix}{key}"
+    args = ["native", "GET", url]
+    phases = RequestPhases()
+    try:
+        client = get_client(endpoint, access_key, secret_key, aws_profile, limiter)
+        nbytes = client.get_object(name, prefix + key, stop=stop, phases=phases)
+    except (S3Error, RequestAborted, OSError, http.client.HTTPException) as exc:
+        return _result(args, _describe_error(exc, url), phases=phases)
+    return _result(args, None, stdout=str(nbytes), phases=phases)
+
+
+def native_delete(
+    bucket: str,
+    key: str,
+    endpoint: str,
+    access_key: str | None,
+    secret_key: str | None,
+    aws_profile: str | None,
+    stop: threading.Event | None = None,
+):
+    """Удаляет объект нативным клиентом (сигнатура как у aws_delete_object)."""
+    name, prefix = split_bucket(bucket)
+    url = f"{endpoint}/{name}/{prefix}{key}"
+    args = ["native", "DELETE", url]
+    try:
+        client = get_client(endpoint, access_key, secret_key, aws_profile)
+        client.delete_object(name, prefix + key, stop=stop)
+    except (S3Error, RequestAborted, OSError, http.client.HTTPException) as exc:
+        return _result(args, _describe_error(exc, url))
+    return _result(args, None)
+
+
+def native_list_pages(
+    bucket: str,
+    endpoint: str,
+    access_key: str | None,
+    secret_key: str | None,
+    aws_profile: str | None,
+    page_size: int = 1000,
+):
+    """Листинг бакета по страницам ListObjectsV2: [{key, size}] на каждую страницу.
+
+    Ключи — относительно префикса из s3://bucket/prefix. Следующая страница
+    запрашивается, только когда забрали предыдущую; ошибки — исключения клиента.
+    """
+    name, prefix = split_bucket(bucket)
+    client = get_client(endpoint, access_key, secret_key, aws_profile)
+    for objects in client.iter_pages(name, prefix, max_keys=page_size):
+        yield [{"key": obj["key"][len(prefix):], "size": obj["size"]} for obj in objects]
+
+
+def native_list_objects(
+    bucket: str,
+    endpoint: str,
+    access_key: str | None,
+    secret_key: str | None,
+    aws_profile: str | None,
+) -> list[dict] | None:
+    """Листинг бакета целиком; [{key, size}] или None при ошибке.
+
+    Ключи возвращаются относительно префикса из s3://bucket/prefix — в том
+    виде, в каком их принимает native_download.
+    """
+    try:
+        return [obj for page in native_list_pages(bucket, endpoint, access_key, secret_key, aws_profile)
+                for obj in page]
+    except (S3Error, RequestAborted, OSError, http.client.HTTPException):
+        return None
@@ -0,0 +1,171 @@
+"""Ограничение нагрузки: token bucket для IOPS и пропускной способности.
+
+Limiter держит лимиты прогона — операций в секунду (проверяются воркером
+перед каждой операцией) и байт в секунду (проверяются нативным клиентом на
+каждом блоке отправки/приёма). Область действия — весь прогон (global) или
+каждый endpoint отдельно (endpoint). Лимиты можно менять на ходу: с
+дашборда клавишами или сообщением от родительского процесса.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+# Запас токенов после простоя: больше — резче всплеск после паузы, меньше — ровнее нагрузка
+BURST_SEC = 0.05
+
+
+class TokenBucket:
+    """Token bucket с резервированием: токены можно взять в долг.
+
+    acquire() под блокировкой только пересчитывает баланс и сразу уходит из
+    неё, ожидание — вне блокировки, поэтому воркеры почти не конкурируют.
+    Запрос больше ёмкости не зависает, а просто ждёт дольше. rate=None —
+    без ограничения.
+    """
+
+    def __init__(self, rate: float | None, burst_sec: float = BURST_SEC):
+        self._lock = threading.Lock()
+        self._burst_sec = burst_sec
+        self._rate: float | None = None
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self.set_rate(rate)
+
+    @property
+    def rate(self) -> float | None:
+        return self._rate
+
+    def _refill(self, now: float) -> None:
+        if self._rate:
+            self._tokens = min(self._tokens + (now - self._last) * self._rate,
+                               self._rate * self._burst_sec)
+        self._last = now
+
+    def set_rate(self, rate: float | None) -> None:
+        """Меняет скорость на ходу; накопленный долг сохраняется."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = float(rate) if rate and rate > 0 else None
+            if self._rate is None:
+                self._tokens = 0.0
+
+    def reserve(self, amount: float) -> float:
+        """Списывает amount токенов; возвращает, сколько секунд ждать до их появления."""
+        with self._lock:
+            if self._rate is None:
+                return 0.0
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            return -self._tokens / self._rate if self._tokens < 0 else 0.0
+
+    def acquire(self, amount: float = 1.0, stop: threading.Event | None = None) -> bool:
+        """Блокирует до появления токенов; False — если во время ожидания пришёл stop."""
+        delay = self.reserve(amount)
+        if delay <= 0:
+            return True
+        if stop is not None:
+            return not stop.wait(delay)
+        time.sleep(delay)
+        return True
+
+    async def acquire_async(self, amount: float = 1.0,
+                            stop: threading.Event | None = None) -> bool:
+        """acquire() для event loop движка asyncio."""
+        delay = self.reserve(amount)
+        while delay > 0:
+            if stop is not None and stop.is_set():
+                return False
+            step = min(delay, 0.1)
+            await asyncio.sleep(step)
+            delay -= step
+        return True
+
+
+class Limiter:
+    """Лимиты прогона: IOPS и байт/с, на весь прогон или на каждый endpoint."""
+
+    SCOPES = ("global", "endpoint")
+
+    def __init__(self, max_iops: float | None = None, max_bytes_per_sec: float | None = None,
+                 scope: str = "global"):
+        if scope not in self.SCOPES:
+            raise ValueError(f"неизвестная область лимита: {scope!r} (global | endpoint)")
+        self.scope = scope
+        self.max_iops = max_iops or None
+        self.max_bytes_per_sec = max_bytes_per_sec or None
+        self._lock = threading.Lock()
+        self._ops: dict[str, TokenBucket] = {}
+        self._bytes: dict[str, TokenBucket] = {}
+
+    @property
+    def active(self) -> bool:
+        return bool(self.max_iops or self.max_bytes_per_sec)
+
+    def _bucket(self, buckets: dict[str, TokenBucket], endpoint: str | None) -> TokenBucket:
+        name = (endpoint or "") if self.scope == "endpoint" else ""
+        bucket = buckets.get(name)
+        if bucket is None:
+            with self._lock:
+                bucket = buckets.get(name)
+                if bucket is None:
+                    rate = self.max_iops if buckets is self._ops else self.max_bytes_per_sec
+                    bucket = buckets[name] = TokenBucket(rate)
+        return bucket
+
+    def acquire_op(self, endpoint: str | None = None,
+                   stop: threading.Event | None = None) -> bool:
+        """Перед каждой операцией: токен IOPS."""
+        if not self.max_iops:
+            return True
+        return self._bucket(self._ops, endpoint).acquire(1, stop)
+
+    async def acquire_op_async(self, endpoint: str | None = None,
+                               stop: threading.Event | None = None) -> bool:
+        if not self.max_iops:
+            return True
+        return await self._bucket(self._ops, endpoint).acquire_async(1, stop)
+
+    def acquire_bytes(self, endpoint: str | None, nbytes: int,
+                      stop: threading.Event | None = None) -> bool:
+        """На каждом блоке отправки/приёма: nbytes токенов полосы."""
+        if not self.max_bytes_per_sec or nbytes <= 0:
+            return True
+        return self._bucket(self._bytes, endpoint).acquire(nbytes, stop)
+
+    async def acquire_bytes_async(self, endpoint: str | None, nbytes: int,
+                                  stop: threading.Event | None = None) -> bool:
+        if not self.max_bytes_per_sec or nbytes <= 0:
+            return True
+        bucket = self._bucket(self._bytes, endpoint)
+        return await bucket.acquire_async(nbytes, stop)
+
+    def set_limits(self, max_iops: float | None, max_bytes_per_sec: float | None) -> None:
+        """Меняет лимиты на ходу (None — снять лимит)."""
+        with self._lock:
+            self.max_iops = max_iops or None
+            self.max_bytes_per_sec = max_bytes_per_sec or None
+            for bucket in self._ops.values():
+                bucket.set_rate(self.max_iops)
+            for bucket in self._bytes.values():
+                bucket.set_rate(self.max_bytes_per_sec)
+
+    def scale(self, factor: float) -> None:
+        """Умножает заданные лимиты на factor (клавиши +/- на дашборде)."""
+        self.set_limits(
+            self.max_iops * factor if self.max_iops else None,
+            self.max_bytes_per_sec * factor if self.max_bytes_per_sec else None,
+        )
+
+    def describe(self) -> str:
+        """Короткая строка для дашборда: «200 оп/с · 50.0 MB/s»."""
+        parts = []
+        if self.max_iops:
+            parts.append(f"{self.max_iops:.0f} оп/с")
+        if self.max_bytes_per_sec:
+            parts.append(f"{self.max_bytes_per_sec / 1024 / 1024:.1f} MB/s")
+        if parts and self.scope == "endpoint":
+            parts.append("на endpoint")
+        return " · ".join(parts)
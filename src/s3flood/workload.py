@@ -0,0 +1,201 @@
+"""Профиль нагрузки из реального бакета: s3flood profile-bucket.
+
+Листинг ListObjectsV2 читается постранично и сразу сворачивается в
+гистограмму размеров с лог-корзинами и статистику ветвления префиксов —
+в памяти одна страница и счётчики, а не весь листинг. Результат —
+JSON-дескриптор нагрузки; его гистограмму принимает распределение
+empirical (dataset-create --distribution empirical:path=workload.json,
+synthetic_distribution), чтобы повторить форму продакшен-бакета.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import time
+
+from .s3client import S3Client, split_bucket
+
+WORKLOAD_VERSION = 1
+# Корзин на каждую степень двойки: точность формы ~±12% по размеру
+SUB_BUCKETS = 4
+MAX_DEPTH = 8
+PROGRESS_EVERY = 100_000
+
+
+class SizeHistogram:
+    """Лог-гистограмма неотрицательных целых: SUB_BUCKETS линейных корзин на октаву.
+
+    Значения меньше SUB_BUCKETS хранятся точно. Память — число непустых
+    корзин (не больше ~4 на каждую степень двойки), min/max/сумма точные.
+    """
+
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min: int | None = None
+        self.max: int | None = None
+
+    @staticmethod
+    def _index(value: int) -> int:
+        if value < SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - SUB_BUCKETS.bit_length()
+        return (shift + 1) * SUB_BUCKETS + ((value >> shift) - SUB_BUCKETS)
+
+    @staticmethod
+    def bounds(index: int) -> tuple[int, int]:
+        """Диапазон [lower, upper] корзины index."""
+        if index < SUB_BUCKETS:
+            return index, index
+        shift, sub = divmod(index, SUB_BUCKETS)
+        shift -= 1
+        lower = (SUB_BUCKETS + sub) << shift
+        return lower, lower + (1 << shift) - 1
+
+    def add(self, value: int) -> None:
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def buckets(self) -> list[list[int]]:
+        """[[lower, upper, count], ...] по возрастанию — формат load_histogram."""
+        return [[*self.bounds(i), self.counts[i]] for i in sorted(self.counts)]
+
+    def quantile(self, q: float) -> int | None:
+        """Оценка квантиля сверху: верхняя граница корзины (не больше max)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.bounds(index)[1], self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+class PrefixFanout:
+    """Ветвление префиксов («каталогов» по '/') на глубинах 1..max_depth за один проход.
+
+    Листинг отсортирован по ключу, а все ключи с общим префиксом идут в нём
+    подряд — поэтому на каждую глубину хватает текущего префикса и счётчика
+    его объектов, а не множества всех префиксов.
+    """
+
+    def __init__(self, max_depth: int = MAX_DEPTH):
+        self.max_depth = max_depth
+        self.key_depth: dict[int, int] = {}
+        self._current: list[str | None] = [None] * max_depth
+        self._objects = [0] * max_depth
+        self.prefixes = [0] * max_depth
+        self.per_prefix = [SizeHistogram() for _ in range(max_depth)]
+
+    def _close(self, level: int) -> None:
+        if self._current[level] is not None:
+            self.prefixes[level] += 1
+            self.per_prefix[level].add(self._objects[level])
+
+    def add(self, key: str) -> None:
+        parts = key.split("/")[:-1]
+        depth = len(parts)
+        self.key_depth[depth] = self.key_depth.get(depth, 0) + 1
+        prefix = ""
+        for level in range(min(depth, self.max_depth)):
+            prefix += parts[level] + "/"
+            if prefix != self._current[level]:
+                self._close(level)
+                self._current[level] = prefix
+                self._objects[level] = 0
+            self._objects[level] += 1
+
+    def finish(self) -> list[dict]:
+        """Итог по глубинам: число префиксов, ветвление от уровня выше, объектов на префикс."""
+        for level in range(self.max_depth):
+            self._close(level)
+            self._current[level] = None
+        out = []
+        parent = 1
+        for level in range(self.max_depth):
+            count = self.prefixes[level]
+            if not count:
+                break
+            stats = self.per_prefix[level].summary()
+            out.append({
+                "depth": level + 1,
+                "prefixes": count,
+                "fanout": count / parent,
+                "objects_per_prefix": {k: stats[k] for k in ("min", "p50", "p99", "max")},
+            })
+            parent = count
+        return out
+
+
+def profile_objects(objects, max_objects: int | None = None, progress=None) -> dict:
+    """Гистограмма размеров и ветвление префиксов по потоку {key, size}.
+
+    max_objects — остановиться раньше (выборка с начала листинга); progress(n)
+    вызывается каждые PROGRESS_EVERY объектов.
+    """
+    sizes = SizeHistogram()
+    fanout = PrefixFanout()
+    complete = True
+    for obj in objects:
+        if max_objects is not None and sizes.count >= max_objects:
+            complete = False
+            break
+        sizes.add(obj["size"])
+        fanout.add(obj["key"])
+        if progress is not None and sizes.count % PROGRESS_EVERY == 0:
+            progress(sizes.count)
+    return {
+        "objects": sizes.count,
+        "bytes": sizes.total,
+        "complete": complete,
+        "size": sizes.summary(),
+        "histogram": sizes.buckets(),
+        "key_depth": {str(d): n for d, n in sorted(fanout.key_depth.items())},
+        "prefixes": fanout.finish(),
+    }
+
+
+def profile_bucket(client: S3Client, bucket: str, out_path: str,
+                   max_objects: int | None = None, page_size: int = 1000) -> dict:
+    """Профилирует бакет (s3://bucket/prefix) и пишет дескриптор нагрузки в out_path."""
+    name, prefix = split_bucket(bucket)
+    started = time.monotonic()
+
+    def progress(n: int) -> None:
+        rate = n / max(time.monotonic() - started, 1e-9)
+        print(f"\rprofile-bucket: {n} объектов ({rate:.0f}/с)...", end="", file=sys.stderr, flush=True)
+
+    objects = ({"key": obj["key"][len(prefix):], "size": obj["size"]}
+               for obj in client.iter_objects(name, prefix, max_keys=page_size))
+    profile = profile_objects(objects, max_objects, progress)
+    if profile["objects"] >= PROGRESS_EVERY:
+        print(file=sys.stderr)
+    descriptor = {
+        "s3flood_workload": WORKLOAD_VERSION,
+        "endpoint": client.endpoint,
+        "bucket": name,
+        "prefix": prefix,
+        "profiled_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "list_sec": round(time.monotonic() - started, 3),
+        **profile,
+    }
+    with open(out_path, "w", encoding="utf-8") as fh:
+        json.dump(descriptor, fh, indent=2)
+    return descriptor
@@ -6,7 +6,9 @@ from prompt_toolkit.output import DummyOutput
 
 import s3flood.browser as browser_mod
 from s3flood.browser import BucketBrowserApp, ProgressState, Row, make_bar, render_progress_lines
-from s3flood.s3browser_io import OpResult
+from s3flood.mockserver import MockS3Server
+from s3flood.s3browser_io import OpResult, S3Entry
+from s3flood.s3client import Credentials, S3Client
 
 
 def make_app(tmp_path):
@@ -50,6 +52,11 @@ class TestRenderProgressLines:
                        if "Ошибок" in t][0]
         assert "Ошибок: 2" in errors_line
 
+    def test_unknown_total_shows_counters(self):
+        p = ProgressState(title="Объём префикса", current="data/", done=12, bytes_done=2048)
+        text = "".join(t for _s, t in render_progress_lines(p, width=60))
+        assert "12 объектов" in text and "/0" not in text
+
     def test_lines_fit_width(self):
         p = ProgressState(title="Копирование ↑", current="x" * 200,
                           done=1, total=2, bytes_done=1, bytes_total=2)
@@ -101,3 +108,29 @@ class TestCancelBatch:
         asyncio.run(app._op_transfer_batch(
             [Row(name="a.bin", size=1, payload=f)], move=False, from_local=True))
         assert app.progress is None
+
+
+class TestPrefixSize:
+    def test_counts_prefix_and_fills_dir_row(self, tmp_path):
+        srv = MockS3Server().start()
+        client = S3Client(srv.endpoint, Credentials("ak", "sk"))
+        try:
+            for i in range(250):
+                srv.backend.put("b", f"logs/{i % 5}/{i:04d}", [b"x" * 10])
+            srv.backend.put("b", "other", [b"x"])
+            app = BucketBrowserApp(
+                bucket="b", endpoint=srv.endpoint, env={}, start_dir=tmp_path,
+                client=client, input=DummyInput(), output=DummyOutput(),
+            )
+            row = Row(name="logs/", is_dir=True, payload=S3Entry(key="logs/", name="logs/", is_dir=True))
+            asyncio.run(app._op_prefix_size("logs/", row))
+        finally:
+            client.close()
+            srv.close()
+        assert row.size == 2500 and row.meta == "250 объектов"
+        assert app.progress is None and "250 объектов" in app.status_msg
+
+    def test_without_client(self, tmp_path):
+        app = make_app(tmp_path)
+        asyncio.run(app._op_prefix_size("", None))
+        assert "клиент" in app.status_err
@@ -3,7 +3,13 @@ from argparse import Namespace
 import pytest
 
 from s3flood.app_settings import save_app_settings
-from s3flood.config import RunConfigModel, discover_configs, resolve_run_settings
+from s3flood.config import (
+    RunConfigModel,
+    discover_configs,
+    parse_duration,
+    parse_stages,
+    resolve_run_settings,
+)
 
 
 def make_config(**over):
@@ -40,6 +46,21 @@ class TestResolveRunSettings:
         s = resolve_run_settings(Namespace(profile="mixed-70-30"), make_config())
         assert s.profile == "mixed"
 
+    def test_list_workers_and_mode(self):
+        s = resolve_run_settings(Namespace(profile="read", list_workers=4), make_config(list_mode="prefix"))
+        assert (s.list_workers, s.list_mode) == (4, "prefix")
+        s = resolve_run_settings(Namespace(profile="read"), make_config())
+        assert (s.list_workers, s.list_mode) == (1, "range")
+        with pytest.raises(SystemExit):
+            resolve_run_settings(Namespace(profile="read", list_mode="hash"), make_config())
+
+    def test_metrics_listen(self):
+        s = resolve_run_settings(Namespace(profile="write", metrics_listen=":9109"), make_config())
+        assert s.metrics_listen == ":9109"
+        assert resolve_run_settings(Namespace(profile="write"), make_config()).metrics_listen is None
+        with pytest.raises(SystemExit, match="metrics_listen"):
+            resolve_run_settings(Namespace(profile="write"), make_config(metrics_listen="host:http"))
+
     def test_missing_bucket_raises(self):
         with pytest.raises(SystemExit):
             resolve_run_settings(
@@ -55,6 +76,64 @@ class TestResolveRunSettings:
         assert s.endpoints == ["http://n1:9000", "http://n2:9000"]
 
 
+class TestSyntheticSource:
+    def test_defaults(self):
+        s = resolve_run_settings(_min_args(data_source="synthetic"), None)
+        assert s.data_source == "synthetic"
+        assert s.synthetic_bytes == 1024**3
+        assert s.synthetic_group_limits == [1024**2, 32 * 1024**2, 256 * 1024**2]
+        assert s.synthetic_min_counts == [10, 5, 1]
+        assert resolve_run_settings(_min_args(), None).data_source == "files"
+
+    def test_distribution(self):
+        s = resolve_run_settings(_min_args(data_source="synthetic"),
+                                 make_config(synthetic_distribution={"name": "pareto", "alpha": 1.5}))
+        assert s.synthetic_distribution["name"] == "pareto"
+        assert s.synthetic_distribution["max"] == 256 * 1024**2
+
+    @pytest.mark.parametrize("over", [
+        {"data_source": "tape"},
+        {"synthetic_bytes": "lots"},
+        {"synthetic_group_limits": "1MB,2MB"},
+        {"synthetic_min_counts": "1,-1,1"},
+        {"synthetic_distribution": "gauss"},
+    ])
+    def test_invalid(self, over):
+        with pytest.raises(SystemExit):
+            resolve_run_settings(_min_args(), make_config(**{"data_source": "synthetic", **over}))
+
+
+class TestStages:
+    def test_duration_units(self):
+        assert parse_duration("90") == 90.0
+        assert parse_duration("5m") == 300.0
+        assert parse_duration("1.5h") == 5400.0
+        assert parse_duration("250ms") == 0.25
+        assert parse_duration(12) == 12.0
+
+    def test_string_form(self):
+        stages = parse_stages("5m:200,10m:200,5m:=50", initial_threads=10)
+        assert stages == [
+            {"name": "ramp 10→200", "duration_sec": 300.0, "threads": 200, "ramp": True},
+            {"name": "hold 200", "duration_sec": 600.0, "threads": 200, "ramp": True},
+            {"name": "hold 50", "duration_sec": 300.0, "threads": 50, "ramp": False},
+        ]
+
+    def test_yaml_form_via_config(self):
+        cfg = make_config(threads=4, stages=[
+            {"duration": "30s", "threads": 16, "name": "разгон"},
+            {"duration_sec": 60, "target": 16},
+        ])
+        s = resolve_run_settings(Namespace(profile="write"), cfg)
+        assert [st["name"] for st in s.stages] == ["разгон", "hold 16"]
+        assert s.stages[1]["duration_sec"] == 60.0
+
+    @pytest.mark.parametrize("raw", ["5m", "5m:0", "0s:10", "x:10", [{"threads": 5}]])
+    def test_invalid(self, raw):
+        with pytest.raises(SystemExit):
+            parse_stages(raw, initial_threads=1)
+
+
 class TestDataDirPriority:
     def test_default_when_no_sources(self, tmp_path, monkeypatch):
         monkeypatch.chdir(tmp_path)
@@ -121,3 +121,8 @@ class TestBuildDashboard:
     def test_mixed_phase(self):
         out = render(base_state(profile="mixed", phase="MIXED", total_to_read=50, files_read=10))
         assert "MIXED" in out
+
+    def test_phase_breakdown_line(self):
+        out = render(base_state(phases={"write": {"connect": [0.4, 2.5], "ttfb": [12.0, 80.25]}}))
+        assert "connect 0.4/2.5" in out and "ttfb 12.0/80.2" in out
+        assert "p50/p99" not in render(base_state())
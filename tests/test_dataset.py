@@ -1,9 +1,25 @@
+import json
 import random
+import statistics
+import time
 import zlib
 
 import pytest
 
-from s3flood.dataset import parse_size, plan_file_sizes, plan_and_generate, write_random_file
+import s3flood.dataset as dataset_mod
+from s3flood.dataset import (
+    MANIFEST_NAME,
+    load_dataset,
+    load_manifest,
+    parse_distribution,
+    parse_size,
+    plan_and_generate,
+    random_chunk,
+    sample_sizes,
+    plan_file_sizes,
+    plan_sizes,
+    write_random_file,
+)
 
 
 class TestParseSize:
@@ -48,6 +64,17 @@ class TestWriteRandomFile:
         ratio = len(zlib.compress(data)) / len(data)
         assert ratio > 0.95
 
+    def test_seeded_stream(self, tmp_path):
+        a, b = tmp_path / "a.bin", tmp_path / "b.bin"
+        write_random_file(a, 3 * 1024 * 1024 + 5, b"seed")
+        write_random_file(b, 1024, b"seed")
+        data = a.read_bytes()
+        assert data[:1024] == b.read_bytes()
+        # блоки потока не повторяются: дедупликация не сработает
+        blocks = [data[i:i + 1024 * 1024] for i in range(0, len(data), 1024 * 1024)]
+        assert len(set(blocks)) == len(blocks)
+        assert random_chunk(b"other", 0, 1024) != data[:1024]
+
 
 class TestPlanAndGenerate:
     def test_random_fill_with_varied_sizes(self, tmp_path):
@@ -96,3 +123,177 @@ class TestPlanAndGenerate:
         sizes = {f.stat().st_size for f in small_files}
         # symlink-режим должен давать хотя бы несколько разных размеров
         assert len(sizes) >= 2
+
+
+class TestPlanSynthetic:
+    def test_groups_follow_dataset_distribution(self):
+        planned = plan_sizes(600 * 1024, (3, 2, 1), (10 * 1024, 50 * 1024, 200 * 1024),
+                                 random.Random(1))
+        by_group = {}
+        for group, size in planned:
+            by_group.setdefault(group, []).append(size)
+        assert len(by_group["small"]) >= 3 and len(by_group["large"]) >= 1
+        assert all(102 <= s <= 10 * 1024 for s in by_group["small"])
+        assert all(50 * 1024 < s <= 200 * 1024 for s in by_group["large"])
+        assert sum(s for _, s in planned) <= 600 * 1024 + 200 * 1024
+
+
+class TestManifest:
+    def make(self, tmp_path, target="300KB"):
+        plan_and_generate(
+            path=str(tmp_path),
+            target_bytes=target,
+            use_symlinks=False,
+            min_counts="3,2,1",
+            group_limits="10KB,50KB,100KB",
+            safety_ratio=0.8,
+        )
+        return tmp_path / "data"
+
+    def test_written_and_loaded(self, tmp_path):
+        data_dir = self.make(tmp_path)
+        entries, from_manifest = load_dataset(data_dir)
+        assert from_manifest
+        files = {p.relative_to(data_dir).as_posix(): p.stat().st_size
+                 for p in data_dir.rglob("*.bin")}
+        assert {e["path"]: e["size"] for e in entries} == files
+        assert {e["group"] for e in entries} == {"small", "medium", "large"}
+        assert all(e["content"].startswith("shake128:") for e in entries)
+
+    def test_append_keeps_previous_entries(self, tmp_path):
+        first = len(load_dataset(self.make(tmp_path))[0])
+        entries, from_manifest = load_dataset(self.make(tmp_path))
+        assert from_manifest
+        assert len(entries) > first
+        assert len(entries) == len(list((tmp_path / "data").rglob("*.bin")))
+
+    def test_stale_manifest_falls_back_to_scan(self, tmp_path):
+        data_dir = self.make(tmp_path)
+        time.sleep(0.05)
+        (data_dir / "small" / "extra.bin").write_bytes(b"x" * 10)
+        assert load_manifest(data_dir) is None
+        entries, from_manifest = load_dataset(data_dir)
+        assert not from_manifest
+        assert {"path": "small/extra.bin", "size": 10, "group": "small"} in entries
+
+    def test_truncated_manifest_ignored(self, tmp_path):
+        data_dir = self.make(tmp_path)
+        manifest = data_dir / MANIFEST_NAME
+        lines = manifest.read_text().splitlines()
+        manifest.write_text("\n".join(lines[:-1]) + "\n")
+        assert load_manifest(data_dir) is None
+
+    def test_scan_skips_hidden_and_follows_file_symlinks(self, tmp_path):
+        data_dir = tmp_path / "data"
+        (data_dir / "small").mkdir(parents=True)
+        (data_dir / ".cache").mkdir()
+        (data_dir / ".cache" / "x.bin").write_bytes(b"x")
+        (data_dir / "small" / ".hidden").write_bytes(b"x")
+        seed = tmp_path / "seed.bin"
+        seed.write_bytes(b"s" * 7)
+        (data_dir / "small" / "link.bin").symlink_to(seed)
+        entries, from_manifest = load_dataset(data_dir)
+        assert not from_manifest
+        assert entries == [{"path": "small/link.bin", "size": 7, "group": "small"}]
+
+
+class TestReproducibleDataset:
+    def generate(self, path, jobs):
+        plan_and_generate(
+            path=str(path),
+            target_bytes="600KB",
+            use_symlinks=False,
+            min_counts="3,2,1",
+            group_limits="10KB,50KB,200KB",
+            safety_ratio=0.8,
+            jobs=jobs,
+            seed=42,
+        )
+        data_dir = path / "data"
+        return {p.relative_to(data_dir).as_posix(): p.read_bytes() for p in data_dir.rglob("*.bin")}
+
+    def test_same_seed_same_dataset_any_jobs(self, tmp_path):
+        serial = self.generate(tmp_path / "a", jobs=1)
+        parallel = self.generate(tmp_path / "b", jobs=2)
+        assert serial == parallel
+
+    def test_regenerate_does_not_duplicate_manifest(self, tmp_path):
+        files = self.generate(tmp_path, jobs=1)
+        self.generate(tmp_path, jobs=1)
+        entries, from_manifest = load_dataset(tmp_path / "data")
+        assert from_manifest and len(entries) == len(files)
+
+
+LIMITS = (100 * 1024, 1024**3, 10 * 1024**3)
+
+
+class TestDistributions:
+    def test_parse(self, tmp_path):
+        assert parse_distribution(None, LIMITS) is None
+        assert parse_distribution("uniform", LIMITS) is None
+        dist = parse_distribution("lognormal:median=16KB,sigma=2", LIMITS)
+        assert dist == {"name": "lognormal", "median": 16 * 1024, "sigma": 2.0,
+                        "min": 1024, "max": 10 * 1024**3}
+        assert parse_distribution({"name": "pareto", "alpha": 1.5, "min": "4KB"}, LIMITS)["min"] == 4096
+        for bad in ("gauss", "pareto:alpha=-1", "zipf:q=1", "lognormal:min=1MB,max=1KB", "empirical"):
+            with pytest.raises(ValueError):
+                parse_distribution(bad, LIMITS)
+
+    @pytest.mark.parametrize("spec, median_range", [
+        ("lognormal:median=16KB,sigma=2", (14 * 1024, 18 * 1024)),
+        ("pareto:alpha=1.2,min=4KB", (4 * 1024, 8 * 1024)),
+        ("zipf:s=1.2", (1024, 64 * 1024)),
+    ])
+    def test_shapes(self, spec, median_range):
+        dist = parse_distribution(spec, LIMITS)
+        sizes = sample_sizes(dist, 20_000, random.Random(3))
+        assert all(dist["min"] <= s <= dist["max"] for s in sizes)
+        lo, hi = median_range
+        assert lo <= statistics.median(sizes) <= hi
+        # тяжёлый хвост: максимум на порядки выше медианы
+        assert max(sizes) > 100 * statistics.median(sizes)
+
+    def test_empirical_histogram(self, tmp_path):
+        hist = tmp_path / "h.csv"
+        hist.write_text("lower,upper,count\n4KB,16KB,90\n1MB,2MB,10\n64MB,128MB,0\n")
+        dist = parse_distribution(f"empirical:path={hist}", LIMITS)
+        assert dist["histogram"] == [[4096, 16384, 90], [1024**2, 2 * 1024**2, 10]]
+        sizes = sample_sizes(dist, 10_000, random.Random(1))
+        small = sum(1 for s in sizes if s <= 16384)
+        assert 0.87 < small / len(sizes) < 0.93
+        assert all(s <= 2 * 1024**2 for s in sizes)
+
+    def test_numpy_and_plain_agree(self, monkeypatch):
+        if dataset_mod._np is None:
+            pytest.skip("numpy не установлен")
+        dist = parse_distribution("lognormal:median=64KB", LIMITS)
+        fast = sample_sizes(dist, 1000, random.Random(5))
+        monkeypatch.setattr(dataset_mod, "_np", None)
+        assert sample_sizes(dist, 1000, random.Random(5)) == fast
+
+    def test_plan_sizes_reaches_target(self):
+        dist = parse_distribution("pareto:alpha=1.1,min=4KB,max=64MB", LIMITS)
+        planned = plan_sizes(256 * 1024**2, (1, 1, 1), LIMITS, random.Random(1), dist)
+        total = sum(size for _, size in planned)
+        assert 256 * 1024**2 - 4096 <= total <= 256 * 1024**2
+        assert {g for g, _ in planned} == {"small", "medium"}
+
+    def test_dataset_records_distribution(self, tmp_path):
+        plan_and_generate(
+            path=str(tmp_path),
+            target_bytes="1MB",
+            use_symlinks=False,
+            min_counts="1,1,1",
+            group_limits="16KB,256KB,1MB",
+            safety_ratio=0.8,
+            seed=9,
+            distribution="lognormal:median=8KB,sigma=1",
+        )
+        manifest = tmp_path / "data" / MANIFEST_NAME
+        header = json.loads(manifest.read_text().splitlines()[0])
+        assert header["seed"] == 9 and header["distribution"]["name"] == "lognormal"
+        entries, _ = load_dataset(tmp_path / "data")
+        assert statistics.median(e["size"] for e in entries) < 16 * 1024
+        with pytest.raises(ValueError):
+            plan_and_generate(str(tmp_path / "x"), "1MB", True, "1,1,1", "16KB,256KB,1MB", 0.8,
+                              distribution="zipf")
@@ -0,0 +1,107 @@
+import json
+import multiprocessing
+from argparse import Namespace
+from multiprocessing.connection import Listener
+
+import pytest
+from test_s3client import FakeS3
+
+from s3flood.config import resolve_run_settings
+from s3flood.distributed import parse_agent_address, resolve_authkey, serve_agent
+from s3flood.executor import run_profile
+
+AUTHKEY = b"test-key"
+
+
+def _agent_main(conn, data_dir):
+    """Агент в отдельном процессе: сообщает порт и обслуживает один прогон."""
+    with Listener(("127.0.0.1", 0), authkey=AUTHKEY) as listener:
+        conn.send(listener.address[1])
+        serve_agent(listener, data_dir=data_dir, once=True)
+
+
+@pytest.fixture
+def agents(tmp_path):
+    data = tmp_path / "data" / "small"
+    data.mkdir(parents=True)
+    for i in range(10):
+        (data / f"f{i}.bin").write_bytes(b"d" * (i + 1))
+    mp = multiprocessing.get_context("spawn")
+    procs, addresses = [], []
+    for _ in range(2):
+        parent, child = mp.Pipe()
+        proc = mp.Process(target=_agent_main, args=(child, str(tmp_path / "data")), daemon=True)
+        proc.start()
+        assert parent.poll(30)
+        addresses.append(f"127.0.0.1:{parent.recv()}")
+        procs.append(proc)
+    yield addresses
+    for proc in procs:
+        proc.join(timeout=30)
+        if proc.is_alive():
+            proc.kill()
+
+
+def run_controller(tmp_path, server, addresses, profile):
+    ns = Namespace(
+        profile=profile, client="native", endpoint=server.endpoint, bucket="b",
+        access_key="ak", secret_key="sk", report=str(tmp_path / "r.json"),
+        metrics=str(tmp_path / "m.csv"), threads=4, agents=addresses,
+    )
+    args = resolve_run_settings(ns, None).to_namespace()
+    args.agent_authkey = AUTHKEY
+    args.agent_start_delay = 0.5
+    run_profile(args)
+    return json.loads((tmp_path / "r.json").read_text())
+
+
+class TestAddress:
+    def test_parse(self):
+        assert parse_agent_address("node1:9800") == ("node1", 9800)
+        assert parse_agent_address("node1") == ("node1", 9700)
+        assert parse_agent_address(":9800", default_host="0.0.0.0") == ("0.0.0.0", 9800)
+        with pytest.raises(ValueError):
+            parse_agent_address("node1:http")
+
+    def test_authkey_required(self, monkeypatch):
+        monkeypatch.delenv("S3FLOOD_AGENT_KEY", raising=False)
+        with pytest.raises(SystemExit):
+            resolve_authkey(None)
+        monkeypatch.setenv("S3FLOOD_AGENT_KEY", "k")
+        assert resolve_authkey(None) == b"k"
+
+
+class TestController:
+    def test_write_merges_agent_streams(self, tmp_path, agents):
+        server = FakeS3()
+        try:
+            report = run_controller(tmp_path, server, agents, "write")
+        finally:
+            server.close()
+        # каждый агент пишет свой (здесь одинаковый) датасет целиком
+        assert report["write_ok_ops"] == 20
+        assert report["write_bytes"] == 2 * sum(range(1, 11))
+        assert report["meta"]["agents"] == agents
+        assert len((tmp_path / "m.csv").read_text().splitlines()) == 21
+
+    def test_read_splits_bucket_listing(self, tmp_path, agents):
+        server = FakeS3()
+        for i in range(9):
+            server.objects[f"/b/k{i}"] = b"x" * 10
+        try:
+            report = run_controller(tmp_path, server, agents, "read")
+        finally:
+            server.close()
+        # агенты делят листинг: каждый объект прочитан ровно один раз
+        assert report["read_ok_ops"] == 9
+        assert report["err_ops"] == 0
+
+    def test_unreachable_agent(self, tmp_path):
+        server = FakeS3()
+        with Listener(("127.0.0.1", 0)) as probe:
+            port = probe.address[1]
+        try:
+            with pytest.raises(SystemExit):
+                run_controller(tmp_path, server, [f"127.0.0.1:{port}"], "write")
+        finally:
+            server.close()
@@ -1,10 +1,15 @@
 import csv
 import json
+import multiprocessing
 import time
+from argparse import Namespace
 
 import pytest
+from test_s3client import FakeS3
 
-from s3flood.executor import Metrics
+from s3flood.config import resolve_run_settings
+from s3flood.executor import ArrivalSchedule, Metrics, ShardSink, StageSchedule, run_profile
+from s3flood.mockserver import MockS3Server
 
 
 def make_metrics(tmp_path, **kwargs):
@@ -27,6 +32,26 @@ class TestCsvOutput:
         assert rows[0]["thread_id"] == "7"
         assert rows[0]["attempt"] == "2"
         assert rows[0]["size_group"] == "small"
+        assert rows[0]["ttfb_ms"] == ""
+
+    def test_phase_breakdown_in_report(self, tmp_path):
+        m = make_metrics(tmp_path)
+        t = time.time()
+        for i in range(10):
+            m.record("download", t - 1, t, 100, True, None,
+                     phases={"connect": 2.0, "ttfb": 10.0 * (i + 1), "transfer": 5.0})
+        m.record("download", t - 1, t, 100, False, "boom", phases={"ttfb": 1e6})
+        m.record("upload", t - 1, t, 100, True, None)  # aws CLI: фаз нет
+        summary = m.finalize()
+        phases = summary["latency_phases"]
+        assert list(phases) == ["read"]
+        assert list(phases["read"]) == ["connect", "ttfb", "transfer"]
+        assert phases["read"]["ttfb"]["count"] == 10
+        assert phases["read"]["ttfb"]["max_ms"] == 100.0
+        with open(tmp_path / "m.csv") as f:
+            rows = list(csv.DictReader(f))
+        assert rows[0]["connect_ms"] == "2.0" and rows[0]["dns_ms"] == ""
+        assert m.phase_quantiles()["read"]["connect"] == [2.0, 2.0]
 
 
 class TestWarmup:
@@ -68,7 +93,9 @@ class TestFinalize:
         out = m.finalize()
         w = out["latency"]["write"]
         assert w["count"] == 5
-        assert w["p50_ms"] <= w["p90_ms"] <= w["p95_ms"] <= w["p99_ms"]
+        assert w["p50_ms"] <= w["p90_ms"] <= w["p95_ms"] <= w["p99_ms"] <= w["p999_ms"]
+        assert w["p50_ms"] == pytest.approx(300, rel=0.01)
+        assert w["max_ms"] == 2000
         assert out["latency"]["read"]["count"] == 1
 
     def test_speed_p90_not_below_median(self, tmp_path):
@@ -89,3 +116,217 @@ class TestFinalize:
         with open(tmp_path / "r.json") as f:
             data = json.load(f)
         assert data["write_ok_ops"] == 1
+
+
+class TestShardSink:
+    def test_records_arrive_in_batches_before_done(self):
+        parent, child = multiprocessing.Pipe()
+        sink = ShardSink(child)
+        t = time.time()
+        for i in range(ShardSink.BATCH + 1):
+            sink.record("upload", t, t, i, True, None, f"f{i}", endpoint="http://e", thread_id=1,
+                        attempt=1, size_group="small")
+        sink.send("done", None)
+        messages = []
+        while parent.poll(1):
+            messages.append(parent.recv())
+        kinds = [kind for kind, _ in messages]
+        assert kinds == ["ops", "ops", "done"]
+        rows = [row for kind, payload in messages if kind == "ops" for row in payload]
+        assert [row[3] for row in rows] == list(range(ShardSink.BATCH + 1))
+        assert rows[0] == ("upload", t, t, 0, True, None, "f0", "http://e", 1, 1, "small", None,
+                           None)
+
+
+class TestProcesses:
+    def test_sharded_run_matches_single_process(self, tmp_path):
+        data = tmp_path / "data" / "small"
+        data.mkdir(parents=True)
+        for i in range(24):
+            (data / f"f{i}.bin").write_bytes(b"d" * (i + 1))
+        reports = {}
+        for processes in (1, 3):
+            server = FakeS3()
+            ns = Namespace(
+                profile="write", client="native", endpoint=server.endpoint, bucket="b",
+                access_key="ak", secret_key="sk", data_dir=str(tmp_path / "data"),
+                report=str(tmp_path / f"r{processes}.json"),
+                metrics=str(tmp_path / f"m{processes}.csv"), threads=6, processes=processes,
+            )
+            try:
+                run_profile(resolve_run_settings(ns, None).to_namespace())
+            finally:
+                server.close()
+            assert len(server.objects) == 24
+            reports[processes] = json.loads((tmp_path / f"r{processes}.json").read_text())
+        single, sharded = reports[1], reports[3]
+        assert sharded["meta"]["processes"] == 3
+        for field in ("write_ok_ops", "write_bytes", "err_ops"):
+            assert sharded[field] == single[field]
+        assert sharded["latency"]["write"]["count"] == 24
+        # фазы нативного клиента доходят от дочерних процессов
+        assert sharded["latency_phases"]["write"]["ttfb"]["count"] == 24
+        with open(tmp_path / "m3.csv") as f:
+            rows = list(csv.DictReader(f))
+        assert sorted(int(r["bytes"]) for r in rows) == list(range(1, 25))
+        assert all(r["ttfb_ms"] for r in rows)
+
+
+class TestOpenLoop:
+    def test_constant_schedule(self):
+        sched = ArrivalSchedule(4.0, start=100.0)
+        assert [sched.next_slot() for _ in range(3)] == [100.0, 100.25, 100.5]
+
+    def test_poisson_schedule_mean_rate(self):
+        sched = ArrivalSchedule(50.0, "poisson", start=0.0, seed=3)
+        slots = [sched.next_slot() for _ in range(5001)]
+        gaps = [b - a for a, b in zip(slots, slots[1:], strict=False)]
+        assert sum(gaps) / len(gaps) == pytest.approx(1 / 50.0, rel=0.05)
+        assert len(set(gaps)) > 100
+
+    def test_intended_latency_recorded(self, tmp_path):
+        m = make_metrics(tmp_path)
+        t = time.time()
+        m.record("upload", t - 1, t, 100, True, None, intended=t - 3)
+        out = m.finalize()
+        assert out["latency"]["write"]["p50_ms"] == pytest.approx(1000, rel=0.01)
+        assert out["latency_intended"]["write"]["p50_ms"] == pytest.approx(3000, rel=0.01)
+        with open(tmp_path / "m.csv") as f:
+            assert float(next(csv.DictReader(f))["ts_intended"]) == pytest.approx(t - 3)
+
+    def test_requires_rate(self, tmp_path):
+        ns = Namespace(profile="write", endpoint="http://e", bucket="b", pattern="open-loop")
+        with pytest.raises(SystemExit):
+            resolve_run_settings(ns, None)
+
+    def test_slow_backend_shows_queueing_from_intended_start(self, tmp_path):
+        # 1 поток, 100 мс на операцию, план 20 оп/с: бэкенд не успевает,
+        # и опоздание по расписанию видно только в latency_intended
+        data = tmp_path / "data" / "small"
+        data.mkdir(parents=True)
+        for i in range(10):
+            (data / f"f{i}.bin").write_bytes(b"d" * 100)
+        srv = MockS3Server(latency_ms=100).start()
+        try:
+            ns = Namespace(
+                profile="write", client="native", endpoint=srv.endpoint, bucket="b",
+                access_key="ak", secret_key="sk", data_dir=str(tmp_path / "data"),
+                report=str(tmp_path / "r.json"), metrics=str(tmp_path / "m.csv"), threads=1,
+                pattern="open-loop", arrival_rate=20.0,
+            )
+            run_profile(resolve_run_settings(ns, None).to_namespace())
+        finally:
+            srv.close()
+        report = json.loads((tmp_path / "r.json").read_text())
+        assert report["write_ok_ops"] == 10
+        assert report["meta"]["arrival_rate"] == 20.0
+        service = report["latency"]["write"]
+        intended = report["latency_intended"]["write"]
+        assert service["max_ms"] < 400
+        # десятая операция запланирована на 0.45 с, а закончилась не раньше 1 с
+        assert intended["max_ms"] >= 500
+        assert intended["max_ms"] > service["max_ms"] + 300
+
+
+class TestStages:
+    STAGES = [
+        {"name": "ramp", "duration_sec": 10.0, "threads": 20, "ramp": True},
+        {"name": "hold", "duration_sec": 5.0, "threads": 20, "ramp": True},
+        {"name": "drop", "duration_sec": 5.0, "threads": 5, "ramp": False},
+    ]
+
+    def test_schedule(self):
+        sched = StageSchedule(self.STAGES, initial=10)
+        assert sched.total_sec == 20.0 and sched.max_threads == 20
+        assert sched.at(0.0) == (0, 10)
+        assert sched.at(5.0) == (0, 15)
+        assert sched.at(12.0) == (1, 20)
+        assert sched.at(15.0) == (2, 5)
+        assert sched.at(25.0) == (None, 5)
+        windows = sched.windows(100.0)
+        assert [(w["start"], w["end"]) for w in windows] == [(100, 110), (110, 115), (115, 120)]
+
+    @pytest.mark.parametrize("engine", ["threads", "asyncio"])
+    def test_run_reports_per_stage(self, tmp_path, engine):
+        data = tmp_path / "data" / "small"
+        data.mkdir(parents=True)
+        for i in range(20):
+            (data / f"f{i}.bin").write_bytes(b"d" * 100)
+        srv = MockS3Server(latency_ms=20).start()
+        try:
+            ns = Namespace(
+                profile="write", client="native", endpoint=srv.endpoint, bucket="b",
+                access_key="ak", secret_key="sk", data_dir=str(tmp_path / "data"),
+                report=str(tmp_path / "r.json"), metrics=str(tmp_path / "m.csv"), threads=1,
+                engine=engine, stages="1s:4,1s:=1",
+            )
+            t0 = time.monotonic()
+            run_profile(resolve_run_settings(ns, None).to_namespace())
+            elapsed = time.monotonic() - t0
+        finally:
+            srv.close()
+        report = json.loads((tmp_path / "r.json").read_text())
+        stages = report["stages"]
+        assert [(s["name"], s["threads"]) for s in stages] == [("ramp 1→4", 4), ("hold 1", 1)]
+        # датасет идёт по кругу, а прогон заканчивается вместе со стадиями
+        assert elapsed < 5
+        assert sum(s["write_ok_ops"] for s in stages) == report["write_ok_ops"]
+        assert all(s["latency"]["write"]["p50_ms"] >= 15 for s in stages)
+
+
+class TestSyntheticSource:
+    @pytest.mark.parametrize("engine", ["threads", "asyncio"])
+    def test_write_without_dataset(self, tmp_path, engine, capsys):
+        srv = MockS3Server().start()
+        try:
+            ns = Namespace(
+                profile="write", client="awscli", endpoint=srv.endpoint, bucket="b",
+                access_key="ak", secret_key="sk", data_dir=str(tmp_path / "missing"),
+                report=str(tmp_path / "r.json"), metrics=str(tmp_path / "m.csv"), threads=4,
+                engine=engine, data_source="synthetic", synthetic_bytes="3MB",
+                synthetic_group_limits="16KB,256KB,1MB", synthetic_min_counts="4,2,1",
+            )
+            run_profile(resolve_run_settings(ns, None).to_namespace())
+            objects = dict(srv.backend.keys("b"))
+        finally:
+            srv.close()
+        assert "awscli заменён на native" in capsys.readouterr().out
+        report = json.loads((tmp_path / "r.json").read_text())
+        assert report["err_ops"] == 0
+        assert report["write_ok_ops"] == len(objects) >= 7
+        assert report["write_bytes"] == sum(objects.values())
+
+
+class TestStreamingRead:
+    @pytest.mark.parametrize("processes,list_workers", [(1, None), (2, None), (1, 4), (2, 3)])
+    def test_reads_whole_listing_once(self, tmp_path, processes, list_workers):
+        srv = MockS3Server().start()
+        try:
+            for i in range(1200):
+                srv.backend.put("b", f"data/o{i:05d}", [b"x" * (i % 7 + 1)])
+            ns = Namespace(
+                profile="read", client="native", endpoint=srv.endpoint, bucket="s3://b/data/",
+                access_key="ak", secret_key="sk", report=str(tmp_path / "r.json"),
+                metrics=str(tmp_path / "m.csv"), threads=4, processes=processes,
+                list_workers=list_workers,
+            )
+            run_profile(resolve_run_settings(ns, None).to_namespace())
+        finally:
+            srv.close()
+        report = json.loads((tmp_path / "r.json").read_text())
+        # доли процессов не пересекаются и покрывают весь листинг (в т.ч. параллельный)
+        assert report["err_ops"] == 0 and report["read_ok_ops"] == 1200
+        assert report["read_bytes"] == sum(i % 7 + 1 for i in range(1200))
+
+    def test_empty_bucket(self, tmp_path, capsys):
+        srv = MockS3Server().start()
+        try:
+            ns = Namespace(
+                profile="read", client="native", endpoint=srv.endpoint, bucket="b",
+                access_key="ak", secret_key="sk", report=str(tmp_path / "r.json"),
+                metrics=str(tmp_path / "m.csv"), threads=2,
+            )
+            assert run_profile(resolve_run_settings(ns, None).to_namespace()) is None
+        finally:
+            srv.close()
+        assert "No objects found" in capsys.readouterr().out
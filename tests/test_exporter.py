@@ -0,0 +1,133 @@
+import socket
+import time
+import urllib.error
+import urllib.request
+from argparse import Namespace
+
+import pytest
+
+from s3flood.config import resolve_run_settings
+from s3flood.executor import Metrics, run_profile
+from s3flood.exporter import CONTENT_TYPE, MetricsExporter, parse_listen, render_metrics
+from s3flood.metrics import LatencyHistogram
+
+
+def make_metrics(tmp_path, **kwargs):
+    m = Metrics(str(tmp_path / "m.csv"), str(tmp_path / "r.json"), **kwargs)
+    m.meta = {"version": "1.0", "profile": "mixed", "client": "native", "engine": "threads"}
+    return m
+
+
+def samples(text: str) -> dict[str, float]:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines() if line and not line.startswith("#")
+    }
+
+
+class TestParseListen:
+    @pytest.mark.parametrize("value,expected", [
+        (":9109", ("0.0.0.0", 9109)),
+        ("9109", ("0.0.0.0", 9109)),
+        ("127.0.0.1:9109", ("127.0.0.1", 9109)),
+        ("[::1]:9109", ("::1", 9109)),
+    ])
+    def test_forms(self, value, expected):
+        assert parse_listen(value) == expected
+
+    @pytest.mark.parametrize("value", ["host:", ":http", ":70000", ":-1", ""])
+    def test_invalid(self, value):
+        with pytest.raises(ValueError):
+            parse_listen(value)
+
+
+def test_histogram_cumulative_is_monotonic_and_complete():
+    hist = LatencyHistogram()
+    for value in (0, 3, 7, 40, 40, 900, 20_000):
+        hist.record(value)
+    cumulative, count, sum_ms = hist.cumulative([5, 10, 50, 1000, 10_000])
+    assert cumulative == [2, 3, 5, 6, 6]
+    assert count == 7 and sum_ms == 20_990
+
+
+class TestRender:
+    def test_counters_and_histogram(self, tmp_path):
+        m = make_metrics(tmp_path)
+        t = time.time()
+        for lat in (0.004, 0.02, 0.3):
+            m.record("upload", t - lat, t, 1000, True, None, endpoint="http://e1")
+        m.record("download", t - 0.1, t, 500, True, None, endpoint="http://e2")
+        m.record("download", t - 0.1, t, 0, False, "timed out", endpoint="http://e2")
+        text = render_metrics(m, {"inflight": {"upload": 3, "download": 1}, "queue": 12, "workers": 8})
+        got = samples(text)
+        assert got['s3flood_operations_total{op="upload",endpoint="http://e1",status="ok"}'] == 3
+        assert got['s3flood_operations_total{op="download",endpoint="http://e2",status="err"}'] == 1
+        assert got['s3flood_bytes_total{op="upload",endpoint="http://e1"}'] == 3000
+        assert got['s3flood_errors_total{class="timeout"}'] == 1
+        assert got['s3flood_latency_seconds_bucket{op="upload",endpoint="http://e1",le="0.005"}'] == 1
+        assert got['s3flood_latency_seconds_bucket{op="upload",endpoint="http://e1",le="0.25"}'] == 2
+        assert got['s3flood_latency_seconds_bucket{op="upload",endpoint="http://e1",le="+Inf"}'] == 3
+        assert got['s3flood_latency_seconds_count{op="upload",endpoint="http://e1"}'] == 3
+        assert got['s3flood_latency_seconds_sum{op="upload",endpoint="http://e1"}'] == pytest.approx(0.324, abs=0.005)
+        assert got['s3flood_inflight{op="upload"}'] == 3
+        assert got["s3flood_queue_depth"] == 12 and got["s3flood_workers"] == 8
+        assert "# TYPE s3flood_latency_seconds histogram" in text
+        m.close()
+
+    def test_warmup_ops_not_exported(self, tmp_path):
+        m = make_metrics(tmp_path, warmup_sec=3600)
+        t = time.time()
+        m.record("upload", t - 1, t, 100, True, None, endpoint="http://e1")
+        got = samples(render_metrics(m))
+        assert got["s3flood_warmup_operations_total"] == 1
+        assert not any(name.startswith("s3flood_operations_total") for name in got)
+        assert not any(name.startswith("s3flood_inflight") for name in got)
+        m.close()
+
+    def test_label_escaping(self, tmp_path):
+        m = make_metrics(tmp_path)
+        t = time.time()
+        m.record("upload", t - 1, t, 1, True, None, endpoint='http://a"b\\c')
+        assert 'endpoint="http://a\\"b\\\\c"' in render_metrics(m)
+        m.close()
+
+
+class TestExporterServer:
+    def test_serves_metrics(self, tmp_path):
+        m = make_metrics(tmp_path)
+        exporter = MetricsExporter(m, "127.0.0.1:0").start()
+        try:
+            host, port = exporter.address
+            t = time.time()
+            m.record("upload", t - 0.01, t, 10, True, None, endpoint="http://e1")
+            exporter.gauges = {"queue": 5}
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as resp:
+                assert resp.headers["Content-Type"] == CONTENT_TYPE
+                got = samples(resp.read().decode())
+            assert got['s3flood_operations_total{op="upload",endpoint="http://e1",status="ok"}'] == 1
+            assert got["s3flood_queue_depth"] == 5
+            with pytest.raises(urllib.error.HTTPError) as err:
+                urllib.request.urlopen(f"http://{host}:{port}/other", timeout=5)
+            assert err.value.code == 404
+        finally:
+            exporter.close()
+            m.close()
+
+    def test_busy_port_fails_run(self, tmp_path):
+        busy = socket.socket()
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        data = tmp_path / "data"
+        data.mkdir()
+        (data / "f.bin").write_bytes(b"x" * 10)
+        ns = Namespace(
+            profile="write", client="native", endpoint="http://127.0.0.1:1", bucket="b",
+            access_key="ak", secret_key="sk", report=str(tmp_path / "r.json"),
+            metrics=str(tmp_path / "m.csv"), threads=1, data_dir=str(data),
+            metrics_listen=f"127.0.0.1:{busy.getsockname()[1]}",
+        )
+        try:
+            with pytest.raises(SystemExit, match="metrics_listen"):
+                run_profile(resolve_run_settings(ns, None).to_namespace())
+        finally:
+            busy.close()
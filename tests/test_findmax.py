@@ -0,0 +1,110 @@
+import json
+from argparse import Namespace
+
+import pytest
+
+from s3flood.config import resolve_run_settings
+from s3flood.findmax import SaturationSearch, run_find_max, step_result
+from s3flood.mockserver import MockS3Server, make_backend
+
+
+def drive(search, capacity):
+    """Прогоняет поиск против «бэкенда», который держит нагрузку до capacity."""
+    points = []
+    while (point := search.next_point()) is not None:
+        points.append(point)
+        search.report(point, point <= capacity)
+    return points
+
+
+class TestSaturationSearch:
+    def test_doubles_then_bisects(self):
+        search = SaturationSearch(1, 1024)
+        points = drive(search, capacity=37)
+        assert points[:7] == [1, 2, 4, 8, 16, 32, 64]
+        assert search.best == 37
+        assert all(p < 64 for p in points[7:])
+
+    def test_stops_at_limit(self):
+        search = SaturationSearch(4, 20)
+        assert drive(search, capacity=1000) == [4, 8, 16, 20]
+        assert search.best == 20
+
+    def test_first_step_fails_searches_down(self):
+        search = SaturationSearch(16, 1024)
+        drive(search, capacity=5)
+        assert search.best == 5
+
+    def test_rate_precision(self):
+        search = SaturationSearch(10.0, 10_000.0, integer=False)
+        drive(search, capacity=333.0)
+        assert search.best == pytest.approx(333.0, rel=0.05)
+        assert search.best <= 333.0
+
+    def test_max_steps(self):
+        search = SaturationSearch(1.0, 1e9, integer=False, max_steps=3)
+        assert len(drive(search, capacity=1e12)) == 3
+
+
+class TestStepResult:
+    SUMMARY = {
+        "duration_sec": 2.0, "write_ok_ops": 99, "read_ok_ops": 0, "err_ops": 1,
+        "write_MBps_avg": 5.0, "read_MBps_avg": 0.0,
+        "latency": {"write": {"p99_ms": 20.0}},
+        "latency_intended": {"write": {"p99_ms": 80.0}},
+    }
+
+    def test_threads_uses_service_latency(self):
+        result = step_result(8, "threads", self.SUMMARY, slo_p99_ms=50, slo_error_rate=0.02)
+        assert result["p99_ms"] == 20.0 and result["passed"]
+        assert result["ops_per_sec"] == pytest.approx(49.5)
+        assert result["error_rate"] == pytest.approx(0.01)
+
+    def test_rate_uses_intended_latency(self):
+        result = step_result(100.0, "rate", self.SUMMARY, slo_p99_ms=50, slo_error_rate=0.02)
+        assert result["p99_ms"] == 80.0 and not result["passed"]
+
+    def test_error_rate_breaks_slo(self):
+        assert not step_result(8, "threads", self.SUMMARY, 50, 0.001)["passed"]
+
+
+class TestRunFindMax:
+    @pytest.fixture
+    def settings(self, tmp_path):
+        data = tmp_path / "data" / "small"
+        data.mkdir(parents=True)
+        for i in range(10):
+            (data / f"f{i}.bin").write_bytes(b"d" * 1000)
+        srv = MockS3Server(backend=make_backend("null")).start()
+
+        def make(**kwargs):
+            ns = Namespace(
+                profile="write", client="native", endpoint=srv.endpoint, bucket="b",
+                access_key="ak", secret_key="sk", data_dir=str(tmp_path / "data"),
+                report=str(tmp_path / "r.json"), metrics=str(tmp_path / "m.csv"), threads=1,
+                find_max=True, find_max_step_sec=0.3, **kwargs,
+            )
+            return resolve_run_settings(ns, None).to_namespace()
+
+        yield make
+        srv.close()
+
+    def test_curve_in_report(self, tmp_path, settings):
+        run_find_max(settings(slo_p99_ms=10_000.0, find_max_limit=4))
+        report = json.loads((tmp_path / "r.json").read_text())["find_max"]
+        assert [s["threads"] for s in report["steps"]] == [1, 2, 4]
+        assert all(s["passed"] and s["ops"] > 0 for s in report["steps"])
+        assert report["max"]["threads"] == 4 and report["limit_reached"]
+        # у каждого шага свой отчёт и CSV
+        assert (tmp_path / "r.step03.json").exists() and (tmp_path / "m.step03.csv").exists()
+
+    def test_nothing_within_slo(self, tmp_path, settings):
+        out = run_find_max(settings(slo_p99_ms=1e-6, find_max_by="rate", find_max_start=20.0))
+        steps = out["find_max"]["steps"]
+        assert out["find_max"]["max"] is None
+        assert steps[0]["rate"] == 20.0 and not steps[0]["passed"]
+        assert all(s["rate"] < 20.0 for s in steps[1:])
+
+    def test_requires_slo(self, settings):
+        with pytest.raises(SystemExit):
+            settings()
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from s3flood.listing import ParallelLister, key_successor, list_bench, split_point
+from s3flood.mockserver import MockS3Server
+from s3flood.s3client import Credentials, S3Client, S3Error
+
+
+class TestKeyMath:
+    def test_successor_bounds_prefix(self):
+        assert key_successor("data/") == "data0"
+        assert key_successor("") is None
+        for key in ("data/", "data/x", "data/\U0010ffff"):
+            assert key < key_successor("data/")
+
+    def test_split_point_strictly_inside(self):
+        rnd = random.Random(7)
+        alphabet = "ab/09z~"
+        for _ in range(2000):
+            lo = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 6)))
+            hi = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 6)))
+            if lo >= hi:
+                lo, hi = hi, lo
+            if lo == hi:
+                continue
+            mid = split_point(lo, hi)
+            assert mid is None or lo < mid < hi
+        mid = split_point("k/0001", None)
+        assert mid is not None and mid > "k/0001"
+
+
+@pytest.fixture
+def bucket():
+    srv = MockS3Server().start()
+    client = S3Client(srv.endpoint, Credentials("ak", "sk"))
+    keys = [f"data/{d:02d}/{i:04d}" for d in range(12) for i in range(60)]
+    keys += ["data/top.bin", "other/skip.bin"]
+    for key in keys:
+        srv.backend.put("b", key, [b"x" * (len(key) % 7)])
+    yield client, srv, sorted(k for k in keys if k.startswith("data/"))
+    client.close()
+    srv.close()
+
+
+class TestParallelLister:
+    @pytest.mark.parametrize("mode", ["range", "prefix"])
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_full_coverage_without_duplicates(self, bucket, mode, workers):
+        client, _srv, expected = bucket
+        lister = ParallelLister(client, "b", "data/", workers=workers, mode=mode, page_size=50)
+        keys = [obj["key"] for page in lister.pages() for obj in page]
+        assert sorted(keys) == expected
+        assert lister.stats.objects == len(expected)
+        assert lister.stats.bytes == sum(len(k) % 7 for k in expected)
+        assert lister.stats.requests >= len(expected) // 50
+        if mode == "prefix":
+            # уровень + 12 общих префиксов + деления, если поток освободился раньше
+            assert lister.stats.ranges == 13 + lister.stats.splits
+
+    def test_error_propagates(self):
+        client = S3Client("http://127.0.0.1:1", Credentials("ak", "sk"))
+        lister = ParallelLister(client, "b", workers=2)
+        with pytest.raises((S3Error, OSError)):
+            list(lister.pages())
+
+    def test_early_close_stops_workers(self, bucket):
+        client, _srv, _expected = bucket
+        lister = ParallelLister(client, "b", "data/", workers=4, page_size=10)
+        pages = lister.pages()
+        next(pages)
+        pages.close()
+        assert lister.stats.objects < 720
+
+
+def test_list_bench_summary(bucket):
+    client, _srv, expected = bucket
+    out = list_bench(client, "b", "data/", workers=3, page_size=100)
+    assert out["workers"] == 3 and out["mode"] == "range"
+    assert out["objects"] == len(expected)
+    assert out["requests_per_sec"] > 0
+    assert out["latency"]["count"] == out["requests"]
@@ -1,14 +1,21 @@
 import csv
+import random
 import threading
 import time
 
 import pytest
 
 from s3flood.metrics import (
+    LatencyHistogram,
     MetricsCsvWriter,
+    OpColumns,
+    OpsSketch,
+    OpStore,
     RateWindow,
     analyze_operations,
+    build_timeline,
     percentile,
+    read_ops_columns,
     read_ops_csv,
     summarize_latencies,
     summarize_speeds,
@@ -73,10 +80,100 @@ class TestAnalyzeOperations:
         r = analyze_operations(ops)
         assert sum(r["rps_series"]) == 10
 
+    def test_slowest_by_speed(self):
+        ops = [make_op(ts_start=1000 + i, ts_end=1001 + i, bytes=(10 - i) * 1024**2) for i in range(8)]
+        ops.append(make_op(ts_start=1000, ts_end=1000))  # без длительности — не в топе
+        slowest = analyze_operations(ops)["slowest"]
+        assert [o["bytes"] // 1024**2 for o in slowest] == [3, 4, 5, 6, 7]
+        assert slowest[0] == {"offset_s": 7.0, "op": "upload", "bytes": 3 * 1024**2,
+                              "duration_s": 1.0, "speed_mbps": 3.0}
+
     def test_empty(self):
         assert analyze_operations([]) is None
 
 
+def assert_close(got, want, path="r"):
+    """Рекурсивное сравнение результатов analyze_operations с допуском для float."""
+    if isinstance(want, dict):
+        assert isinstance(got, dict) and list(got) == list(want), path
+        for key in want:
+            assert_close(got[key], want[key], f"{path}.{key}")
+    elif isinstance(want, list):
+        assert isinstance(got, list) and len(got) == len(want), path
+        for i, (g, w) in enumerate(zip(got, want)):
+            assert_close(g, w, f"{path}[{i}]")
+    elif isinstance(want, float):
+        assert got == pytest.approx(want, rel=1e-9, abs=1e-9), path
+    else:
+        assert got == want and type(got) is type(want), path
+
+
+def random_ops(n: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    ops = []
+    for i in range(n):
+        start = 1000 + rng.random() * 600
+        dur = rng.choice([0.0, rng.random() * 3, rng.random() * 0.01])
+        ok = rng.random() > 0.1
+        ops.append(make_op(
+            ts_start=start, ts_end=start + dur, op=rng.choice(["upload", "download"]),
+            bytes=rng.choice([0, 512, 3 * 1024**2, 40 * 1024**2, 2 * 1024**3]),
+            status="ok" if ok else "err", latency_ms=float(int(dur * 1000)),
+            error="" if ok else rng.choice(["", "An error occurred (SlowDown) x", "read timed out",
+                                            f"connection reset #{i}", "boom"]),
+            endpoint=rng.choice(["", "http://n1", "http://n2"]),
+            attempt=rng.choice(["", "1", "1", "2", "4"]),
+            size_group=rng.choice(["", "", "small", "large", "<1MB"]),
+            ts_intended=rng.choice([None, start - 0.5]),
+            phases={p: round(rng.random() * 50, 3) for p in rng.sample(["connect", "ttfb", "transfer"], rng.randint(0, 3))},
+        ))
+    return ops
+
+
+class TestOpColumns:
+    @pytest.fixture(autouse=True)
+    def _need_numpy(self):
+        import s3flood.metrics as metrics_mod
+        if metrics_mod._np is None:
+            pytest.skip("numpy не установлен")
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_vectorized_matches_plain(self, seed):
+        ops = random_ops(400, seed)
+        assert_close(analyze_operations(OpColumns.from_ops(ops)), analyze_operations(ops))
+
+    def test_only_errors_and_ties(self):
+        ops = [make_op(status="err", error="") for _ in range(3)]
+        ops += [make_op(ts_start=1000 + i, bytes=1024**2) for i in range(8)]  # равные скорости
+        assert_close(analyze_operations(OpColumns.from_ops(ops)), analyze_operations(ops))
+        assert analyze_operations(OpColumns.from_ops([])) is None
+
+    @pytest.mark.parametrize("chunk_rows", [1, 7, 65_536])
+    def test_chunked_csv_loader(self, tmp_path, chunk_rows):
+        p = tmp_path / "m.csv"
+        w = MetricsCsvWriter(str(p))
+        for o in random_ops(150):
+            w.write_row(ts_start=o["ts_start"], ts_end=o["ts_end"], op=o["op"], nbytes=o["bytes"],
+                        ok=o["status"] == "ok", latency_ms=int(o["latency_ms"]), error=o["error"],
+                        endpoint=o["endpoint"], attempt=int(o["attempt"]) if o["attempt"] else None,
+                        size_group=o["size_group"], ts_intended=o["ts_intended"], phases=o["phases"])
+        w.close()
+        with open(p, "a", encoding="utf-8") as fh:
+            fh.write("broken,row,upload,x,ok,1\n\n")
+        ops = read_ops_csv(str(p))
+        assert len(ops) == 150
+        cols = read_ops_columns(str(p), chunk_rows=chunk_rows)
+        assert len(cols) == 150
+        assert_close(analyze_operations(cols), analyze_operations(ops))
+
+    def test_old_format_and_header_only(self, tmp_path):
+        p = tmp_path / "old.csv"
+        p.write_text("ts_start,ts_end,op,bytes,status,latency_ms,error\n1.0,2.0,upload,100,ok,1000,\n")
+        assert_close(analyze_operations(read_ops_columns(str(p))), analyze_operations(read_ops_csv(str(p))))
+        p.write_text("ts_start,ts_end,op,bytes,status,latency_ms,error\n")
+        assert analyze_operations(read_ops_columns(str(p))) is None
+
+
 class TestReadOpsCsv:
     def test_reads_new_format(self, tmp_path):
         p = tmp_path / "m.csv"
@@ -100,6 +197,19 @@ class TestReadOpsCsv:
         assert len(ops) == 1
         assert ops[0]["endpoint"] == ""
         assert ops[0]["status"] == "ok"
+        assert ops[0]["phases"] == {}
+
+    def test_phase_columns_roundtrip(self, tmp_path):
+        p = tmp_path / "m.csv"
+        w = MetricsCsvWriter(str(p))
+        w.write_row(ts_start=1.0, ts_end=2.0, op="download", nbytes=100, ok=True,
+                    latency_ms=1000, phases={"send": 0.5, "ttfb": 900.1234, "transfer": 99.0})
+        w.close()
+        ops = read_ops_csv(str(p))
+        assert ops[0]["phases"] == {"send": 0.5, "ttfb": 900.123, "transfer": 99.0}
+        r = analyze_operations(ops)
+        assert list(r["phases"]["download"]) == ["send", "ttfb", "transfer"]
+        assert r["phases"]["download"]["ttfb"]["p50_ms"] == pytest.approx(900.123)
 
 
 class TestPercentile:
@@ -147,6 +257,154 @@ class TestSummaries:
         assert summarize_latencies([]) is None
 
 
+class TestLatencyHistogram:
+    def sample(self, n=20000, seed=1):
+        import random
+        rnd = random.Random(seed)
+        return [rnd.lognormvariate(3, 1.5) for _ in range(n)]
+
+    def test_quantiles_within_relative_error(self):
+        values = self.sample()
+        h = LatencyHistogram(relative_error=0.01)
+        for v in values:
+            h.record(v)
+        exact = sorted(values)
+        for q in (0.5, 0.9, 0.99, 0.999):
+            ref = exact[int(q * (len(exact) - 1))]
+            assert h.quantile(q) == pytest.approx(ref, rel=0.0101)
+        s = h.summary()
+        assert s["count"] == len(values)
+        assert s["avg_ms"] == pytest.approx(sum(values) / len(values))
+        assert s["max_ms"] == max(values) and s["min_ms"] == min(values)
+        assert s["p50_ms"] <= s["p99_ms"] <= s["p999_ms"] <= s["max_ms"]
+
+    def test_memory_is_fixed(self):
+        h = LatencyHistogram()
+        size = len(h._counts)
+        for v in self.sample(5000):
+            h.record(v)
+        h.record(10 ** 12)  # за пределами диапазона — в последний бакет
+        assert len(h._counts) == size
+        assert h.quantile(1.0) == 10 ** 12
+
+    def test_zero_latency_is_exact(self):
+        h = LatencyHistogram()
+        for v in (0, 0, 0, 5):
+            h.record(v)
+        assert h.quantile(0.5) == 0.0
+        assert h.summary()["min_ms"] == 0.0
+
+    def test_merge_equals_combined(self):
+        a, b, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i, v in enumerate(self.sample(4000)):
+            (a if i % 2 else b).record(v)
+            both.record(v)
+        merged = a.copy().merge(b)
+        assert merged.summary() == pytest.approx(both.summary())
+        assert a.count + b.count == merged.count
+
+    def test_record_many_matches_record(self):
+        np = pytest.importorskip("numpy")
+        values = [0.0, 0.0005, *self.sample(3000)]
+        one, many = LatencyHistogram(), LatencyHistogram()
+        for v in values:
+            one.record(v)
+        many.record_many(np.array(values))
+        assert many.count == one.count and many.zero_count == one.zero_count
+        assert sum(many._counts) == sum(one._counts)
+        assert many.summary() == pytest.approx(one.summary(), rel=0.0101)
+
+    def test_merge_rejects_other_params(self):
+        with pytest.raises(ValueError):
+            LatencyHistogram(0.01).merge(LatencyHistogram(0.02))
+
+    def test_dict_roundtrip(self):
+        h = LatencyHistogram()
+        for v in self.sample(1000):
+            h.record(v)
+        snap = h.to_dict()
+        assert len(snap["buckets"]) < len(h._counts)
+        assert LatencyHistogram.from_dict(snap).summary() == h.summary()
+
+    def test_empty(self):
+        h = LatencyHistogram()
+        assert h.summary() is None and h.quantile(0.99) == 0.0
+
+
+class TestOpStore:
+    def fill(self):
+        import random
+        rnd = random.Random(7)
+        store, tuples = OpStore(), []
+        t0 = 1000.0
+        for i in range(3000):
+            op = ("upload", "download", "delete")[i % 3]
+            start = t0 + i * 0.37
+            lat = rnd.choice([0, 5, 40, 900])
+            nbytes = rnd.choice([1024, 4096, 65536]) * (1 + i % 17)
+            row = (op, start, start + lat / 1000, nbytes, i % 11 != 0, lat)
+            store.append(*row)
+            tuples.append(row)
+        return store, tuples
+
+    def test_iterates_like_tuples(self):
+        store, tuples = self.fill()
+        assert len(store) == len(tuples)
+        assert list(store) == tuples
+
+    def test_timeline_matches_tuple_path(self):
+        store, tuples = self.fill()
+        assert build_timeline(store) == build_timeline(tuples)
+        assert build_timeline(store, max_points=50) == build_timeline(tuples, max_points=50)
+        assert build_timeline(OpStore()) == []
+
+    @pytest.mark.parametrize("op", ["upload", "download"])
+    def test_numpy_and_plain_paths_agree(self, monkeypatch, op):
+        import s3flood.metrics as metrics_mod
+        store, _ = self.fill()
+        if metrics_mod._np is None:
+            pytest.skip("numpy не установлен")
+        vec = (store.file_stats(op), store.spans(), build_timeline(store))
+        monkeypatch.setattr(metrics_mod, "_np", None)
+        plain = (store.file_stats(op), store.spans(), build_timeline(store))
+        assert vec[1] == pytest.approx(plain[1])
+        assert vec[2] == plain[2]
+        for v, p in zip(vec[0][:2], plain[0][:2], strict=True):
+            assert [e["size_bytes"] for e in v] == [e["size_bytes"] for e in p]
+            for ve, pe in zip(v, p, strict=True):
+                assert ve == pytest.approx(pe)
+        assert vec[0][2] == pytest.approx(plain[0][2])
+
+    def test_spans_fall_back_to_all_ops_without_success(self):
+        store = OpStore()
+        store.append("upload", 10.0, 12.0, 1, False, 2000)
+        store.append("upload", 11.0, 15.0, 1, False, 4000)
+        spans = store.spans()
+        assert spans["all"] == pytest.approx(5.0)
+        assert spans["upload"] == 0.0
+        assert store.file_stats("upload") == (None, None, None)
+
+    def test_window_stats(self, monkeypatch):
+        import s3flood.metrics as metrics_mod
+        store, tuples = self.fill()
+        t0, t1 = 1100.0, 1500.0
+        stats = store.window_stats(t0, t1)
+        inside = [r for r in tuples if t0 <= r[1] < t1]
+        assert stats["err_ops"] == sum(1 for r in inside if not r[4])
+        assert stats["write_ok_ops"] == sum(1 for r in inside if r[4] and r[0] == "upload")
+        assert stats["read_bytes"] == sum(r[3] for r in inside if r[4] and r[0] == "download")
+        assert stats["latency"]["write"]["count"] == stats["write_ok_ops"]
+        monkeypatch.setattr(metrics_mod, "_np", None)
+        assert store.window_stats(t0, t1) == stats
+        assert store.window_stats(0.0, 1.0)["latency"] == {}
+
+    def test_compact_columns(self):
+        store, _ = self.fill()
+        per_op = sum(col.itemsize for col in (store.op, store.ok, store.start, store.end,
+                                              store.nbytes, store.lat_ms))
+        assert per_op == 34
+
+
 class TestRateWindow:
     def test_no_loss_above_400_ops(self):
         # регрессия: deque(maxlen=400) терял операции и занижал RPS
@@ -175,11 +433,49 @@ class TestRateWindow:
         _, wb, wrps, _ = w.rates(window_sec=5.0, now=now)
         assert wrps == 0.0 and wb == 0.0
 
+    def test_concurrent_writers_lose_nothing(self):
+        w = RateWindow()
+        now = time.time()
+
+        def worker():
+            for _ in range(2000):
+                w.add(ts=now, op="upload", nbytes=10, ok=True)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        _, wb, wrps, _ = w.rates(window_sec=1.0, now=now)
+        assert wrps == pytest.approx(16000)
+        assert wb == pytest.approx(160000)
+
+    def test_ring_slot_reused_after_retention(self):
+        w = RateWindow(retention_sec=1.0, bucket_sec=0.1)
+        now = 1000.05
+        w.add(ts=now - 1.0, op="upload", nbytes=100, ok=True)  # тот же слот кольца
+        w.add(ts=now, op="upload", nbytes=7, ok=True)
+        w.add(ts=now - 1.0, op="upload", nbytes=100, ok=True)  # устарела — отброшена
+        _, wb, wrps, _ = w.rates(window_sec=0.1, now=now)
+        assert wrps == pytest.approx(1 / 0.1) and wb == pytest.approx(70)
+
+    def test_rates_cost_independent_of_op_count(self):
+        w = RateWindow()
+        now = time.time()
+        for i in range(50000):
+            w.add(ts=now - (i % 300) * 0.01, op="download", nbytes=1, ok=True)
+        t = time.perf_counter()
+        rb, _, _, rrps = w.rates(window_sec=5.0, now=now)
+        assert time.perf_counter() - t < 0.05
+        assert rrps == pytest.approx(50000 / 5.0)
+
 
 class TestMetricsCsvWriter:
     FIELDS = [
         "ts_start", "ts_end", "op", "bytes", "status",
         "latency_ms", "error", "endpoint", "thread_id", "attempt", "size_group",
+        "ts_intended",
+        "dns_ms", "connect_ms", "tls_ms", "send_ms", "ttfb_ms", "transfer_ms",
     ]
 
     def test_writes_header_and_rows(self, tmp_path):
@@ -274,3 +570,74 @@ class TestSummarySpeedStats:
         assert stats["ops_per_sec"] == 0.0
         assert stats["peak_MBps"] == 0.0
         assert stats["speeds"] == []
+
+
+class TestOpsSketch:
+    def sketch_of(self, ops, columns=False, parts=1):
+        sketch = OpsSketch()
+        size = -(-len(ops) // parts)
+        for i in range(0, len(ops), size):
+            part = OpsSketch()
+            if columns:
+                part.add_columns(OpColumns.from_ops(ops[i:i + size]))
+            else:
+                for op in ops[i:i + size]:
+                    part.add(op)
+            sketch.merge(part)
+        return sketch
+
+    def check_against_exact(self, got, want):
+        for key in ("total", "ok", "err", "ok_bytes", "errors", "retries", "slowest"):
+            assert got[key] == pytest.approx(want[key]), key
+        assert got["duration_s"] == pytest.approx(want["duration_s"])
+        assert got["latency"]["p90_ms"] == pytest.approx(want["latency"]["p90_ms"], rel=0.03)
+        assert got["speed"]["median_speed_mbps"] == pytest.approx(want["speed"]["median_speed_mbps"], rel=0.03)
+        assert got["latency"]["max_ms"] == want["latency"]["max_ms"]
+        assert {op: (g["count"], g["bytes"]) for op, g in got["by_op"].items()} == {
+            op: (g["count"], g["bytes"]) for op, g in want["by_op"].items()}
+        assert [(b["label"], b["count"], b["bytes"]) for b in got["size_buckets"]] == [
+            (b["label"], b["count"], b["bytes"]) for b in want["size_buckets"]]
+        assert {ep: e["count"] for ep, e in got["by_endpoint"].items()} == {
+            ep: e["count"] for ep, e in want["by_endpoint"].items()}
+        assert {op: {ph: v["count"] for ph, v in per.items()} for op, per in got["phases"].items()} == {
+            op: {ph: v["count"] for ph, v in per.items()} for op, per in want["phases"].items()}
+        assert sum(got["rps_series"]) == sum(want["rps_series"]) == got["total"]
+
+    @pytest.mark.parametrize("parts", [1, 4])
+    def test_rows_match_exact_analysis(self, parts):
+        ops = random_ops(1500, 11)
+        self.check_against_exact(self.sketch_of(ops, parts=parts).result(), analyze_operations(ops))
+
+    @pytest.mark.parametrize("parts", [1, 3])
+    def test_columns_match_rows(self, parts):
+        pytest.importorskip("numpy")
+        ops = random_ops(1500, 12)
+        got = self.sketch_of(ops, columns=True, parts=parts).result()
+        self.check_against_exact(got, analyze_operations(ops))
+        rows = self.sketch_of(ops).result()
+        assert got["latency"] == pytest.approx(rows["latency"], rel=0.0101)
+        assert got["slowest"] == rows["slowest"]
+
+    def test_timeline_is_bounded_and_mergeable(self):
+        sketch, early, late = OpsSketch(max_points=50), OpsSketch(max_points=50), OpsSketch(max_points=50)
+        for i in range(2000):
+            op = make_op(ts_start=1000 + i * 7, ts_end=1001 + i * 7, bytes=10)
+            sketch.add(op)
+            (early if i < 300 else late).add(op)
+        timeline = sketch.timeline()
+        assert len(timeline) <= 50
+        assert sum(b["write_ops"] for b in timeline) == 2000
+        assert sum(b["write_bytes"] for b in timeline) == 20_000
+        assert early._timeline.step < late._timeline.step
+        assert early.merge(late).timeline() == timeline
+
+    def test_state_does_not_grow_with_ops(self):
+        sketch = OpsSketch()
+        for i in range(5000):
+            sketch.add(make_op(ts_start=1000 + i, ts_end=1001 + i, status="err", error=f"connection reset #{i}"))
+        assert len(sketch._slowest) == 0 and len(sketch._timeline.buckets) <= 300
+        assert sketch.result()["errors"] == {"connection": 5000}
+
+    def test_empty(self):
+        assert OpsSketch().result() is None
+        assert OpsSketch().merge(OpsSketch()).result() is None
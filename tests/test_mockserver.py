@@ -0,0 +1,182 @@
+import http.client
+import json
+import time
+from argparse import Namespace
+
+import pytest
+
+from s3flood.config import resolve_run_settings
+from s3flood.executor import run_profile
+from s3flood.metrics import classify_error
+from s3flood.mockserver import MockS3Server, list_page, make_backend
+from s3flood.s3client import Credentials, S3Client, S3Error
+
+
+@pytest.fixture(params=["memory", "null", "disk"])
+def server(request, tmp_path):
+    srv = MockS3Server(backend=make_backend(request.param, str(tmp_path / "store"))).start()
+    yield srv
+    srv.close()
+
+
+def client_for(srv):
+    return S3Client(srv.endpoint, Credentials("ak", "sk"))
+
+
+def raw(srv, method, path, body=b"", headers=None):
+    host, port = srv.endpoint[len("http://"):].split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=10)
+    conn.request(method, path, body=body, headers=headers or {})
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp, data
+
+
+class TestListPage:
+    KEYS = [("a/1", 1), ("a/2", 1), ("b", 1), ("c/x/1", 1)]
+
+    def test_delimiter_groups_prefixes(self):
+        contents, prefixes, token = list_page(self.KEYS, delimiter="/")
+        assert contents == [("b", 1)]
+        assert prefixes == ["a/", "c/"]
+        assert token is None
+
+    def test_pagination_skips_whole_prefix_group(self):
+        contents, prefixes, token = list_page(self.KEYS, delimiter="/", max_keys=1)
+        assert (contents, prefixes) == ([], ["a/"])
+        contents, prefixes, _ = list_page(self.KEYS, delimiter="/", start_after=token, max_keys=1)
+        assert contents == [("b", 1)]
+
+
+class TestBackends:
+    def test_put_get_head_delete(self, server):
+        client = client_for(server)
+        client.put_object("b", "dir/k", b"hello")
+        resp = client.request("HEAD", "b", "dir/k", operation="HeadObject")
+        assert resp.headers["content-length"] == "5"
+        assert client.get_object("b", "dir/k") == 5
+        client.delete_object("b", "dir/k")
+        with pytest.raises(S3Error) as exc:
+            client.get_object("b", "dir/k")
+        assert exc.value.code == "NoSuchKey"
+
+    def test_list_with_pagination(self, server):
+        client = client_for(server)
+        for i in range(5):
+            client.put_object("b", f"p/{i}", b"x" * i)
+        client.put_object("b", "other", b"y")
+        page = client.list_objects_page("b", prefix="p/", max_keys=2)
+        keys = [o["key"] for o in page.objects]
+        while page.next_token:
+            page = client.list_objects_page("b", prefix="p/", continuation_token=page.next_token,
+                                            max_keys=2)
+            keys += [o["key"] for o in page.objects]
+        assert keys == [f"p/{i}" for i in range(5)]
+
+    def test_multipart_upload(self, server, tmp_path):
+        f = tmp_path / "big.bin"
+        payload = bytes(range(256)) * 100
+        f.write_bytes(payload)
+        client = client_for(server)
+        client.upload_file(f, "b", "big", multipart_threshold=10000, multipart_chunksize=8000)
+        assert server.backend.size("b", "big") == len(payload)
+        data = b"".join(server.backend.read("b", "big", 0, len(payload)))
+        if server.backend.name != "null":
+            assert data == payload
+        # служебные объекты частей удалены после complete
+        assert server.backend.keys(".s3flood-multipart") == []
+
+
+class TestProtocol:
+    def test_range_get(self):
+        srv = MockS3Server().start()
+        try:
+            raw(srv, "PUT", "/b/k", b"0123456789")
+            resp, data = raw(srv, "GET", "/b/k", headers={"Range": "bytes=2-5"})
+            assert resp.status == 206 and data == b"2345"
+            assert resp.getheader("Content-Range") == "bytes 2-5/10"
+            resp, data = raw(srv, "GET", "/b/k", headers={"Range": "bytes=-3"})
+            assert data == b"789"
+        finally:
+            srv.close()
+
+    def test_aws_chunked_body_is_decoded(self):
+        srv = MockS3Server().start()
+        try:
+            body = b"5;chunk-signature=aa\r\nhello\r\n0;chunk-signature=bb\r\n\r\n"
+            resp, _ = raw(srv, "PUT", "/b/k", body, {
+                "Content-Encoding": "aws-chunked",
+                "x-amz-content-sha256": "STREAMING-AWS4-HMAC-SHA256-PAYLOAD",
+                "x-amz-decoded-content-length": "5",
+            })
+            assert resp.status == 200
+            assert b"".join(srv.backend.read("b", "k", 0, 5)) == b"hello"
+        finally:
+            srv.close()
+
+    def test_multi_object_delete(self):
+        srv = MockS3Server().start()
+        try:
+            raw(srv, "PUT", "/b/k1", b"1")
+            raw(srv, "PUT", "/b/k2", b"2")
+            body = b"<Delete><Object><Key>k1</Key></Object><Object><Key>k2</Key></Object></Delete>"
+            resp, data = raw(srv, "POST", "/b?delete", body)
+            assert resp.status == 200 and data.count(b"<Deleted>") == 2
+            assert srv.backend.keys("b") == []
+        finally:
+            srv.close()
+
+
+class TestInjection:
+    def test_error_rate_returns_slowdown(self):
+        srv = MockS3Server(error_rate=1.0).start()
+        try:
+            client = client_for(srv)
+            with pytest.raises(S3Error) as exc:
+                client.put_object("b", "k", b"x" * 100)
+            assert classify_error(str(exc.value)) == "SlowDown"
+            # статистика пишется после ответа
+            deadline = time.monotonic() + 2
+            while srv.stats.injected_errors < 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert srv.stats.injected_errors == 1
+            # тело отклонённого запроса дочитано — keep-alive соединение остаётся рабочим
+            srv.error_rate = 0.0
+            client.put_object("b", "k", b"y")
+            assert srv.backend.size("b", "k") == 1
+        finally:
+            srv.close()
+
+    def test_latency_and_bandwidth(self):
+        srv = MockS3Server(latency_ms=50, bandwidth=1024 * 1024).start()
+        try:
+            client = client_for(srv)
+            t0 = time.monotonic()
+            client.put_object("b", "k", b"x" * 256 * 1024)
+            elapsed = time.monotonic() - t0
+            # 50 мс задержки + 256 KB при 1 MB/s
+            assert elapsed >= 0.25
+        finally:
+            srv.close()
+
+
+class TestCalibration:
+    def test_run_profile_against_null_backend(self, tmp_path):
+        data = tmp_path / "data" / "small"
+        data.mkdir(parents=True)
+        for i in range(20):
+            (data / f"f{i}.bin").write_bytes(b"d" * 1000)
+        srv = MockS3Server(backend=make_backend("null")).start()
+        try:
+            ns = Namespace(
+                profile="write", client="native", endpoint=srv.endpoint, bucket="b",
+                access_key="ak", secret_key="sk", data_dir=str(tmp_path / "data"),
+                report=str(tmp_path / "r.json"), metrics=str(tmp_path / "m.csv"), threads=4,
+            )
+            run_profile(resolve_run_settings(ns, None).to_namespace())
+        finally:
+            srv.close()
+        report = json.loads((tmp_path / "r.json").read_text())
+        assert report["write_ok_ops"] == 20 and report["err_ops"] == 0
+        assert len(srv.backend.keys("b")) == 20
@@ -0,0 +1,207 @@
+import json
+import time
+from argparse import Namespace
+
+import pytest
+
+import s3flood.oplog as oplog_mod
+from s3flood.config import resolve_run_settings
+from s3flood.executor import run_profile
+from s3flood.metrics import MetricsCsvWriter, OpsSketch, analyze_operations, read_ops_csv
+from s3flood.mockserver import MockS3Server
+from s3flood.oplog import (
+    HEADER,
+    RECORD,
+    MetricsBinaryWriter,
+    OpLog,
+    OpsTail,
+    analyze_stream,
+    is_oplog,
+    load_ops,
+    read_ops,
+    strings_path,
+)
+
+ROWS = [
+    dict(ts_start=1.0, ts_end=2.5, op="upload", nbytes=100, ok=True, latency_ms=1500,
+         endpoint="http://e1", thread_id=3, attempt=1, size_group="small",
+         phases={"connect": 1.5, "ttfb": 40.25}),
+    dict(ts_start=2.0, ts_end=2.1, op="download", nbytes=7, ok=False, latency_ms=100,
+         error="An error occurred (SlowDown) when calling GetObject: «медленнее»\nretry",
+         endpoint="http://e2", attempt=3, ts_intended=1.75),
+    dict(ts_start=3.0, ts_end=4.0, op="upload", nbytes=1 << 40, ok=True, latency_ms=1000,
+         endpoint="http://e1", size_group="large", thread_id=140_000_000_000_000),
+]
+
+
+def write_both(tmp_path, rows=ROWS):
+    csv_path, ops_path = tmp_path / "m.csv", tmp_path / "m.ops"
+    for writer in (MetricsCsvWriter(str(csv_path)), MetricsBinaryWriter(str(ops_path))):
+        for row in rows:
+            writer.write_row(**row)
+        writer.close()
+    return str(csv_path), str(ops_path)
+
+
+class TestRoundtrip:
+    def test_same_ops_as_csv(self, tmp_path):
+        csv_path, ops_path = write_both(tmp_path)
+        assert is_oplog(ops_path) and not is_oplog(csv_path)
+        from_csv, from_log = read_ops(csv_path), read_ops(ops_path)
+        assert from_csv == read_ops_csv(csv_path)
+        assert len(from_log) == len(from_csv) == 3
+        for got, want in zip(from_log, from_csv, strict=True):
+            assert got.keys() == want.keys()
+            assert got["phases"] == pytest.approx(want["phases"])
+            assert {k: v for k, v in got.items() if k != "phases"} == {
+                k: v for k, v in want.items() if k != "phases"}
+        assert analyze_operations(from_log)["errors"] == {"SlowDown": 1}
+
+    def test_fixed_width_and_string_table(self, tmp_path):
+        _, ops_path = write_both(tmp_path)
+        with open(ops_path, "rb") as fh:
+            assert len(fh.read()) == HEADER.size + 3 * RECORD.size
+        with open(strings_path(ops_path), encoding="utf-8") as fh:
+            strings = [json.loads(line) for line in fh]
+        # каждая строка — один раз, в порядке первого появления
+        assert strings[:4] == ["upload", "http://e1", "small", "download"]
+        assert len(strings) == len(set(strings))
+
+    def test_columns_zero_copy(self, tmp_path):
+        if oplog_mod._np is None:
+            pytest.skip("numpy не установлен")
+        _, ops_path = write_both(tmp_path)
+        with OpLog(ops_path) as log:
+            cols = log.columns()
+            assert cols["bytes"].base is not None  # представление поверх mmap, не копия
+            assert cols["bytes"].tolist() == [100, 7, 1 << 40]
+            assert cols["ok"].tolist() == [1, 0, 1]
+            assert [log.string(i) for i in cols["endpoint"]] == ["http://e1", "http://e2", "http://e1"]
+            assert cols["thread_id"].tolist() == [3, -1, 140_000_000_000_000]
+            del cols
+
+    def test_plain_columns_without_numpy(self, tmp_path, monkeypatch):
+        _, ops_path = write_both(tmp_path)
+        monkeypatch.setattr(oplog_mod, "_np", None)
+        with OpLog(ops_path) as log:
+            cols = log.columns()
+        assert cols["bytes"] == [100, 7, 1 << 40]
+        assert cols["attempt"] == [1, 3, 0]
+
+
+def test_load_ops_columns_match_plain(tmp_path):
+    if oplog_mod._np is None:
+        pytest.skip("numpy не установлен")
+    csv_path, ops_path = write_both(tmp_path)
+    want = analyze_operations(read_ops_csv(csv_path))
+    for path in (csv_path, ops_path):
+        got = analyze_operations(load_ops(path))
+        assert got.keys() == want.keys()
+        assert got["by_op"].keys() == want["by_op"].keys()
+        assert got["errors"] == want["errors"] and got["retries"] == want["retries"]
+        assert list(got["by_endpoint"]) == list(want["by_endpoint"])
+        assert [o["bytes"] for o in got["slowest"]] == [o["bytes"] for o in want["slowest"]]
+
+
+class TestLiveRead:
+    def test_partial_tail_ignored_and_refresh(self, tmp_path):
+        _, ops_path = write_both(tmp_path)
+        with open(ops_path, "ab") as fh:
+            fh.write(b"\x00" * (RECORD.size // 2))  # запись ещё дописывается
+        with open(strings_path(ops_path), "a", encoding="utf-8") as fh:
+            fh.write('"недописан')
+        with OpLog(ops_path) as log:
+            assert len(log) == 3
+            n_strings = len(log.strings)
+            with open(ops_path, "ab") as fh:
+                fh.write(b"\x00" * (RECORD.size - RECORD.size // 2))
+            with open(strings_path(ops_path), "a", encoding="utf-8") as fh:
+                fh.write('"\n')
+            log.refresh()
+            assert len(log) == 4
+            assert log.strings[-1] == "недописан" and len(log.strings) == n_strings + 1
+
+    def test_rejects_foreign_file(self, tmp_path):
+        p = tmp_path / "x.ops"
+        p.write_bytes(b"ts_start,ts_end,op,bytes\n")
+        with pytest.raises(ValueError):
+            OpLog(str(p))
+
+
+class TestStreaming:
+    @pytest.fixture(params=["numpy", "plain"])
+    def numpy_mode(self, request, monkeypatch):
+        if request.param == "plain":
+            monkeypatch.setattr(oplog_mod, "_np", None)
+        elif oplog_mod._np is None:
+            pytest.skip("numpy не установлен")
+
+    def test_analyze_stream_matches_exact(self, tmp_path, numpy_mode):
+        for path in write_both(tmp_path):
+            got, want = analyze_stream(path, chunk_rows=2).result(), analyze_operations(read_ops(path))
+            for key in ("total", "ok", "err", "ok_bytes", "errors", "retries", "slowest"):
+                assert got[key] == want[key], key
+            assert list(got["by_endpoint"]) == list(want["by_endpoint"])
+            assert {op: list(per) for op, per in got["phases"].items()} == {
+                op: list(per) for op, per in want["phases"].items()}
+
+    def test_csv_tail_waits_for_complete_records(self, tmp_path, numpy_mode):
+        csv_path, _ = write_both(tmp_path, ROWS * 4)
+        data = open(csv_path, "rb").read()
+        live = tmp_path / "live.csv"
+        live.write_bytes(b"")
+        sketch = OpsSketch()
+        # запись кусками произвольной длины: в том числе посреди многострочного текста ошибки
+        with OpsTail(str(live), chunk_rows=3) as tail:
+            seen = []
+            for pos in range(0, len(data), 37):
+                with open(live, "ab") as fh:
+                    fh.write(data[pos:pos + 37])
+                tail.update(sketch)
+                seen.append(sketch.total)
+        assert seen == sorted(seen) and sketch.total == 12
+        assert sketch.result()["errors"] == {"SlowDown": 4}
+
+    def test_oplog_tail_picks_up_new_records(self, tmp_path, numpy_mode):
+        path = str(tmp_path / "m.ops")
+        writer = MetricsBinaryWriter(path)
+        sketch = OpsSketch()
+        with OpsTail(path) as tail:
+            assert tail.update(sketch) == 0 and sketch.result() is None
+            writer.write_row(**ROWS[0])
+            added = 0
+            for _ in range(200):  # поток записи сбрасывает пачку на диск асинхронно
+                added += tail.update(sketch)
+                if added:
+                    break
+                time.sleep(0.01)
+            assert added == 1
+            for row in ROWS[1:]:
+                writer.write_row(**row)
+            writer.close()
+            assert tail.update(sketch) == 2
+        assert sketch.result()["ok_bytes"] == 100 + (1 << 40)
+
+
+def test_run_writes_binary_log(tmp_path):
+    srv = MockS3Server().start()
+    data = tmp_path / "data"
+    data.mkdir()
+    for i in range(5):
+        (data / f"f{i}.bin").write_bytes(b"x" * (i + 1))
+    try:
+        ns = Namespace(
+            profile="write", client="native", endpoint=srv.endpoint, bucket="b",
+            access_key="ak", secret_key="sk", report=str(tmp_path / "r.json"),
+            threads=2, data_dir=str(data), metrics_format="binary",
+        )
+        settings = resolve_run_settings(ns, None)
+        assert settings.metrics == "metrics.ops"
+        settings.metrics = str(tmp_path / "m.ops")
+        run_profile(settings.to_namespace())
+    finally:
+        srv.close()
+    ops = read_ops(str(tmp_path / "m.ops"))
+    assert len(ops) == 5 and {o["status"] for o in ops} == {"ok"}
+    assert sorted(o["bytes"] for o in ops) == [1, 2, 3, 4, 5]
+    assert all(o["endpoint"] == srv.endpoint for o in ops)
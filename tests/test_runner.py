@@ -0,0 +1,315 @@
+import json
+import os
+import sys
+import threading
+from argparse import Namespace
+
+import pytest
+
+from s3flood.metrics import classify_error
+from s3flood.mockserver import MockS3Server
+from s3flood.runner import (
+    AwsCliRunner,
+    ListingError,
+    NativeRunner,
+    RcloneRunner,
+    Runner,
+    S5cmdRunner,
+    _rclone_fs,
+    make_runner,
+    parse_s5cmd_line,
+)
+
+# Заглушка `s5cmd --json ... run`: читает команды из stdin и отвечает JSON-строками,
+# как настоящий s5cmd. Команды, пришедшие пачкой, отвечаются в обратном порядке —
+# результат должен находить свою операцию не по порядку строк. Команда с "hang"
+# остаётся без ответа.
+FAKE_S5CMD = r'''
+import json, os, select, shlex, sys
+def answer(line):
+    tokens = shlex.split(line)
+    op, paths = tokens[0], [t for t in tokens[1:] if not t.startswith("--") and not t.isdigit()]
+    if any("hang" in p for p in paths):
+        return None
+    if any("missing" in p for p in paths):
+        return {"operation": op, "command": line,
+                "error": "An error occurred (NoSuchKey) when calling the GetObject operation: none"}
+    out = {"operation": op, "success": True, "source": paths[0]}
+    if op == "cp":
+        out["destination"] = paths[1]
+        out["object"] = {"size": 7}
+    return out
+buf, batch = b"", []
+while True:
+    chunk = os.read(0, 65536)
+    if not chunk:
+        break
+    buf += chunk
+    *lines, buf = buf.split(b"\n")
+    batch += [l.decode() for l in lines if l.strip()]
+    if select.select([0], [], [], 0.05)[0]:
+        continue
+    for line in reversed(batch):
+        out = answer(line)
+        if out is not None:
+            print(json.dumps(out), flush=True)
+    batch = []
+'''
+
+# Заглушка `rclone rcd`: rc API на http.server, вызовы пишутся в журнал FAKE_RC_LOG
+FAKE_RCD = r'''
+import json, os, sys, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+addr = next(a.split("=", 1)[1] for a in sys.argv if a.startswith("--rc-addr="))
+host, port = addr.rsplit(":", 1)
+log = open(os.environ["FAKE_RC_LOG"], "a")
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    def log_message(self, *args):
+        pass
+    def do_POST(self):
+        params = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+        method = self.path.strip("/")
+        log.write(json.dumps({"method": method, "params": params}) + "\n")
+        log.flush()
+        status, out = 200, {}
+        remote = params.get("srcRemote") or params.get("remote") or ""
+        if "hang" in remote:
+            time.sleep(30)
+        if "missing" in remote:
+            status, out = 500, {"error": "object not found"}
+        elif method == "operations/list":
+            out = {"list": [{"Path": "dir/a.bin", "Size": 3}, {"Path": "b.bin", "Size": 5}]}
+        body = json.dumps(out).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+ThreadingHTTPServer((host, int(port)), Handler).serve_forever()
+'''
+
+
+def _fake_s5cmd(tmp_path):
+    script = tmp_path / "s5cmd.py"
+    script.write_text(FAKE_S5CMD)
+    runner = S5cmdRunner(threads=4)
+    runner.binary = [sys.executable, str(script)]
+    runner.op_timeout = 10.0  # сломанный движок должен падать тестом, а не вешать его
+    return runner
+
+
+@pytest.fixture
+def fake_rclone(tmp_path, monkeypatch):
+    script = tmp_path / "rclone.py"
+    script.write_text(FAKE_RCD)
+    log = tmp_path / "rc.log"
+    monkeypatch.setenv("FAKE_RC_LOG", str(log))
+    runner = RcloneRunner(access_key="ak", secret_key="sk")
+    runner.binary = [sys.executable, str(script)]
+    runner.op_timeout = 10.0
+    runner.calls = lambda: [json.loads(line) for line in log.read_text().splitlines()]
+    yield runner
+    runner.close()
+
+
+class TestParseS5cmdLine:
+    def test_success_line(self):
+        line = json.dumps({"operation": "cp", "success": True, "source": "/tmp/a",
+                           "destination": "s3://b/a", "object": {"size": 10}})
+        parsed = parse_s5cmd_line(line)
+        assert parsed == {"token": None, "key": ("cp", "/tmp/a", "s3://b/a"), "ok": True,
+                          "error": None, "size": 10}
+
+    def test_token_taken_from_scratch_path(self):
+        token = "0123456789abcdef0123456789abcdef"
+        line = json.dumps({"operation": "cp", "success": True, "source": "s3://b/k",
+                           "destination": f"/dev/shm/x/s3flood-op-{token}"})
+        assert parse_s5cmd_line(line)["token"] == token
+
+    def test_error_line_keyed_by_command(self):
+        line = json.dumps({"operation": "cp", "command": "cp --concurrency 5 s3://b/x /tmp/x",
+                           "error": "NoSuchKey"})
+        parsed = parse_s5cmd_line(line)
+        assert parsed["key"] == ("cp", "s3://b/x", "/tmp/x")
+        assert not parsed["ok"]
+
+    def test_plain_error_and_noise(self):
+        parsed = parse_s5cmd_line('ERROR "rm s3://b/k": access denied')
+        assert parsed["key"] == ("rm", "s3://b/k")
+        assert parse_s5cmd_line("") is None
+        assert parse_s5cmd_line("not json") is None
+
+
+class TestS5cmdRunner:
+    def test_concurrent_batch_through_one_process(self, tmp_path):
+        runner = _fake_s5cmd(tmp_path)
+        f = tmp_path / "a.bin"
+        f.write_bytes(b"payload")
+        results = {}
+
+        def work(i):
+            if i % 2:
+                results[i] = runner.upload(f, "bucket", f"k{i}", "http://s3")
+            else:
+                results[i] = runner.download("bucket", "missing" if i == 4 else f"k{i}",
+                                             "http://s3")
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert {i: r.returncode for i, r in results.items()} == {
+            i: (1 if i == 4 else 0) for i in range(8)
+        }
+        assert classify_error(results[4].stderr) == "NoSuchKey"
+        assert runner.delete("bucket", "k0", "http://s3").returncode == 0
+        assert len(runner._procs) == 1
+        runner.close()
+
+    def test_unanswered_command_times_out(self, tmp_path):
+        runner = _fake_s5cmd(tmp_path)
+        runner.op_timeout = 0.5
+        res = runner.download("bucket", "hang", "http://s3")
+        assert classify_error(res.stderr) == "timeout"
+        # поздний ответ не должен достаться следующей операции с тем же ключом
+        assert runner.download("bucket", "k1", "http://s3").returncode == 0
+        runner.close()
+
+    def test_stop_interrupts_wait(self, tmp_path):
+        runner = _fake_s5cmd(tmp_path)
+        stop = threading.Event()
+        threading.Timer(0.3, stop.set).start()
+        res = runner.delete("bucket", "hang", "http://s3", stop=stop)
+        assert classify_error(res.stderr) == "interrupted"
+        runner.close()
+
+    def test_missing_binary_fails_operation(self, tmp_path):
+        runner = S5cmdRunner()
+        runner.binary = [str(tmp_path / "no-such-s5cmd")]
+        res = runner.delete("bucket", "k", "http://s3")
+        assert res.returncode != 0
+        runner.close()
+
+
+class TestRcloneRunner:
+    def test_fs_string_quotes_endpoint(self):
+        assert _rclone_fs("http://h:9000", "s3://bucket/runs/") == ':s3,endpoint="http://h:9000":bucket/runs'
+
+    def test_upload_download_delete(self, fake_rclone, tmp_path):
+        f = tmp_path / "a.bin"
+        f.write_bytes(b"abc")
+        assert fake_rclone.upload(f, "bucket", "dir/a.bin", "http://s3").returncode == 0
+        assert fake_rclone.download("bucket", "dir/a.bin", "http://s3").returncode == 0
+        assert fake_rclone.delete("bucket", "dir/a.bin", "http://s3").returncode == 0
+        calls = fake_rclone.calls()
+        assert calls[0]["method"] == "rc/noop"
+        upload = calls[1]["params"]
+        assert upload["srcFs"] == str(tmp_path) and upload["srcRemote"] == "a.bin"
+        assert upload["dstFs"] == ':s3,endpoint="http://s3":bucket'
+        assert [c["method"] for c in calls[2:]] == ["operations/copyfile", "operations/deletefile"]
+
+    def test_error_is_mapped_to_failed_result(self, fake_rclone):
+        res = fake_rclone.download("bucket", "missing", "http://s3")
+        assert res.returncode != 0
+        assert res.stderr == "object not found"
+
+    def test_list_objects_relative_keys(self, fake_rclone):
+        assert fake_rclone.list_objects("s3://bucket/runs", "http://s3") == [
+            {"key": "dir/a.bin", "size": 3}, {"key": "b.bin", "size": 5},
+        ]
+
+    def test_list_pages_single_page(self, fake_rclone):
+        assert list(fake_rclone.list_pages("s3://bucket/runs", "http://s3")) == [
+            [{"key": "dir/a.bin", "size": 3}, {"key": "b.bin", "size": 5}],
+        ]
+
+    def test_timeout_and_close(self, fake_rclone):
+        fake_rclone.op_timeout = 0.5
+        res = fake_rclone.delete("bucket", "hang", "http://s3")
+        assert classify_error(res.stderr) == "timeout"
+        proc = fake_rclone._proc
+        fake_rclone.close()
+        assert proc.poll() is not None
+
+    def test_stop_before_call(self, fake_rclone):
+        stop = threading.Event()
+        stop.set()
+        res = fake_rclone.delete("bucket", "k", "http://s3", stop=stop)
+        assert classify_error(res.stderr) == "interrupted"
+
+
+# Заглушка `aws s3api list-objects-v2`: страницы по --max-items, NextToken — индекс следующего ключа
+FAKE_AWS = r'''
+import json, sys
+args = sys.argv[1:]
+opt = lambda name, default=None: args[args.index(name) + 1] if name in args else default
+if opt("--bucket") != "b":
+    sys.exit("An error occurred (NoSuchBucket)")
+keys = [k for k in (f"p/k{i:03d}" for i in range(25)) if k.startswith(opt("--prefix", ""))]
+start = int(opt("--starting-token", 0))
+end = start + int(opt("--max-items"))
+out = {"Contents": [{"Key": k, "Size": int(k[-3:])} for k in keys[start:end]]}
+if end < len(keys):
+    out["NextToken"] = str(end)
+print(json.dumps(out))
+'''
+
+
+class TestListPages:
+    def test_native_pages_relative_keys(self):
+        srv = MockS3Server().start()
+        try:
+            for i in range(250):
+                srv.backend.put("b", f"p/k{i:03d}", [b"x" * i])
+            srv.backend.put("b", "other/k", [b"x"])
+            runner = NativeRunner(access_key="ak", secret_key="sk")
+            pages = list(runner.list_pages("s3://b/p/", srv.endpoint, page_size=100))
+        finally:
+            srv.close()
+        # ошибка соединения приходит как ListingError
+        with pytest.raises(ListingError):
+            list(runner.list_pages("s3://b/p/", "http://127.0.0.1:1"))
+        assert [len(page) for page in pages] == [100, 100, 50]
+        assert pages[2][-1] == {"key": "k249", "size": 249}
+
+    def test_awscli_pages_by_starting_token(self, tmp_path, monkeypatch):
+        script = tmp_path / "aws"
+        script.write_text(f"#!{sys.executable}\n{FAKE_AWS}")
+        script.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+        runner = AwsCliRunner(access_key="ak", secret_key="sk")
+        pages = list(runner.list_pages("s3://b/p/", "http://s3", page_size=10))
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert pages[0][0] == {"key": "k000", "size": 0}
+        with pytest.raises(ListingError, match="NoSuchBucket"):
+            list(runner.list_pages("s3://nope", "http://s3"))
+
+    def test_fallback_without_listing(self):
+        class NoListing(Runner):
+            def upload(self, local, bucket, key, endpoint, stop=None): ...
+            def download(self, bucket, key, endpoint, stop=None): ...
+            def list_objects(self, bucket, endpoint):
+                return None
+            def delete(self, bucket, key, endpoint, stop=None): ...
+
+        with pytest.raises(ListingError):
+            next(NoListing().list_pages("s3://b", "http://s3"))
+
+
+class TestMakeRunner:
+    def test_by_client_name(self):
+        assert isinstance(make_runner(Namespace(client="native")), NativeRunner)
+        assert isinstance(make_runner(Namespace(client=None)), AwsCliRunner)
+
+    def test_unknown_client_falls_back_to_awscli(self, capsys):
+        assert isinstance(make_runner(Namespace(client="s3cmd")), AwsCliRunner)
+        assert "s3cmd" in capsys.readouterr().out
+
+    def test_incomplete_engine_fails_on_construction(self):
+        class Partial(Runner):
+            def upload(self, local, bucket, key, endpoint, stop=None):
+                pass
+
+        with pytest.raises(TypeError):
+            Partial()
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+import time
+from argparse import Namespace
+
+import pytest
+
+from s3flood.config import resolve_run_settings
+from s3flood.executor import run_profile
+from s3flood.mockserver import MockS3Server, make_backend
+from s3flood.throttle import Limiter, TokenBucket
+
+
+class TestTokenBucket:
+    def test_rate(self):
+        bucket = TokenBucket(100.0)
+        t0 = time.monotonic()
+        for _ in range(31):
+            bucket.acquire()
+        # старт с пустым запасом: 31 токен при 100/с
+        assert 0.2 <= time.monotonic() - t0 < 0.6
+
+    def test_unlimited(self):
+        bucket = TokenBucket(None)
+        assert bucket.reserve(10**9) == 0.0
+
+    def test_set_rate_at_runtime(self):
+        bucket = TokenBucket(1.0)
+        assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+        assert bucket.reserve(1) == pytest.approx(2.0, abs=0.05)
+        bucket.set_rate(1000.0)
+        # долг пересчитывается по новой скорости
+        assert bucket.reserve(1) < 0.01
+
+    def test_stop_interrupts_wait(self):
+        bucket = TokenBucket(0.5)
+        bucket.reserve(1)
+        stop = threading.Event()
+        threading.Timer(0.1, stop.set).start()
+        t0 = time.monotonic()
+        assert bucket.acquire(1, stop) is False
+        assert time.monotonic() - t0 < 1.0
+
+    def test_async(self):
+        bucket = TokenBucket(50.0)
+
+        async def take():
+            for _ in range(11):
+                await bucket.acquire_async()
+
+        t0 = time.monotonic()
+        asyncio.run(take())
+        assert time.monotonic() - t0 >= 0.15
+
+
+class TestLimiter:
+    def test_scope(self):
+        glob = Limiter(max_iops=10)
+        assert glob._bucket(glob._ops, "a") is glob._bucket(glob._ops, "b")
+        per = Limiter(max_iops=10, scope="endpoint")
+        assert per._bucket(per._ops, "a") is not per._bucket(per._ops, "b")
+        with pytest.raises(ValueError):
+            Limiter(scope="thread")
+
+    def test_scale_and_describe(self):
+        limiter = Limiter(max_iops=100, max_bytes_per_sec=10 * 1024 * 1024, scope="endpoint")
+        bucket = limiter._bucket(limiter._ops, "a")
+        limiter.scale(1.1)
+        assert limiter.max_iops == pytest.approx(110)
+        assert bucket.rate == pytest.approx(110)
+        assert limiter.describe() == "110 оп/с · 11.0 MB/s · на endpoint"
+        assert not Limiter().active and Limiter().describe() == ""
+
+
+def run_write(tmp_path, srv, **kwargs):
+    data = tmp_path / "data" / "small"
+    data.mkdir(parents=True, exist_ok=True)
+    for i in range(10):
+        (data / f"f{i}.bin").write_bytes(b"d" * 20_000)
+    ns = Namespace(
+        profile="write", client="native", endpoint=srv.endpoint, bucket="b",
+        access_key="ak", secret_key="sk", data_dir=str(tmp_path / "data"),
+        report=str(tmp_path / "r.json"), metrics=str(tmp_path / "m.csv"), threads=4, **kwargs,
+    )
+    t0 = time.monotonic()
+    run_profile(resolve_run_settings(ns, None).to_namespace())
+    return time.monotonic() - t0, json.loads((tmp_path / "r.json").read_text())
+
+
+class TestRunLimits:
+    @pytest.fixture
+    def srv(self):
+        srv = MockS3Server(backend=make_backend("null")).start()
+        yield srv
+        srv.close()
+
+    @pytest.mark.parametrize("engine", ["threads", "asyncio"])
+    def test_max_iops(self, tmp_path, srv, engine):
+        elapsed, report = run_write(tmp_path, srv, max_iops=20.0, engine=engine)
+        assert report["write_ok_ops"] == 10
+        assert report["meta"]["max_iops"] == 20.0
+        # 10 операций при 20 оп/с: не меньше ~0.45 с, ожидание токена не в латентности
+        assert elapsed >= 0.4
+        assert report["latency"]["write"]["p50_ms"] < 100
+
+    def test_max_throughput(self, tmp_path, srv):
+        # 200 KB при 0.5 MB/s — не меньше ~0.35 с
+        elapsed, report = run_write(tmp_path, srv, max_throughput_mbps=0.5)
+        assert report["write_bytes"] == 200_000
+        assert elapsed >= 0.3
+
+    def test_bad_scope(self, tmp_path):
+        ns = Namespace(profile="write", endpoint="http://e", bucket="b", throttle_scope="thread")
+        with pytest.raises(SystemExit):
+            resolve_run_settings(ns, None)
@@ -0,0 +1,71 @@
+import json
+import random
+
+from s3flood.dataset import parse_distribution, sample_sizes
+from s3flood.mockserver import MockS3Server
+from s3flood.s3client import Credentials, S3Client
+from s3flood.workload import PrefixFanout, SizeHistogram, profile_bucket
+
+
+class TestSizeHistogram:
+    def test_buckets_cover_values_exactly(self):
+        hist = SizeHistogram()
+        for v in range(5000):
+            hist.add(v)
+        buckets = hist.buckets()
+        assert sum(b[2] for b in buckets) == 5000
+        # корзины смежные и не перекрываются
+        assert all(a[1] + 1 == b[0] for a, b in zip(buckets, buckets[1:]))
+        # лог-шаг: ширина корзины ≤ 1/4 её нижней границы
+        assert all(hi - lo + 1 <= max(lo // 4, 1) for lo, hi, _ in buckets)
+        assert hist.summary()["min"] == 0 and hist.summary()["max"] == 4999
+
+    def test_quantile_upper_estimate(self):
+        hist = SizeHistogram()
+        for v in [100] * 90 + [10**9] * 10:
+            hist.add(v)
+        assert 100 <= hist.quantile(0.5) < 128
+        assert hist.quantile(0.99) == 10**9
+
+
+class TestPrefixFanout:
+    def test_sorted_listing(self):
+        fanout = PrefixFanout()
+        keys = sorted(
+            [f"a/{d}/{i}" for d in range(3) for i in range(4)]
+            + [f"b/{i}" for i in range(6)]
+            + ["root.txt"]
+        )
+        for key in keys:
+            fanout.add(key)
+        levels = fanout.finish()
+        assert fanout.key_depth == {0: 1, 1: 6, 2: 12}
+        assert levels[0]["prefixes"] == 2 and levels[0]["objects_per_prefix"]["max"] == 12
+        assert levels[1]["prefixes"] == 3 and levels[1]["fanout"] == 1.5
+        assert levels[1]["objects_per_prefix"]["min"] == 4
+
+
+class TestProfileBucket:
+    def test_streams_pages_into_descriptor(self, tmp_path):
+        srv = MockS3Server().start()
+        try:
+            client = S3Client(srv.endpoint, Credentials("ak", "sk"))
+            sizes = [random.Random(i).randint(1, 70_000) for i in range(450)]
+            for i, size in enumerate(sizes):
+                client.put_object("b", f"data/{i % 3}/{i:04d}.bin", b"x" * size)
+            client.put_object("b", "other/skip.bin", b"x")
+            out = tmp_path / "w.json"
+            desc = profile_bucket(client, "s3://b/data/", str(out), page_size=100)
+            sample = profile_bucket(client, "b", str(tmp_path / "s.json"), max_objects=50, page_size=20)
+            client.close()
+        finally:
+            srv.close()
+        assert desc["objects"] == 450 and desc["bytes"] == sum(sizes) and desc["complete"]
+        assert desc["prefix"] == "data/" and desc["key_depth"] == {"1": 450}
+        assert desc["prefixes"][0]["prefixes"] == 3
+        assert json.loads(out.read_text())["histogram"] == desc["histogram"]
+        assert sample["objects"] == 50 and not sample["complete"]
+        # дескриптор годится как распределение empirical
+        dist = parse_distribution(f"empirical:path={out}", (1024, 1024**2, 1024**3))
+        drawn = sample_sizes(dist, 2000, random.Random(1))
+        assert all(1 <= s <= 70_000 * 1.25 for s in drawn)